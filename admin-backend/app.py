@@ -9,6 +9,7 @@ import bcrypt
 import random
 import string
 import json
+import threading
 
 # 加载环境变量配置文件
 try:
@@ -41,6 +42,14 @@ except ImportError:
 
 import os
 
+from voucher_storage import (
+    VOUCHER_FILE_COLUMNS, VOUCHER_FILE_JOIN, VoucherUploadError, create_voucher_tables, get_voucher_store
+)
+import v9_services
+from v9_services import V9ServiceError
+from verification_store import create_verification_store, create_verification_tables
+import voucher_storage
+
 app = Flask(__name__)
 
 # 配置静态文件路径
@@ -67,9 +76,6 @@ WECHAT_APP_ID = os.getenv('WECHAT_APP_ID', '')
 WECHAT_APP_SECRET = os.getenv('WECHAT_APP_SECRET', '')
 WECHAT_REDIRECT_URI = os.getenv('WECHAT_REDIRECT_URI', 'http://localhost:3000/wechat/callback')
 
-# 验证码存储（模拟短信验证码）
-verification_codes = {}  # {phone: {'code': '123456', 'expire_at': timestamp}}
-
 def init_db():
     """初始化数据库"""
     conn = sqlite3.connect(DATABASE)
@@ -428,6 +434,12 @@ def init_db():
         )
     ''')
 
+    # 凭证文件表（对象存储 + SHA-256 去重）
+    create_voucher_tables(cursor)
+
+    # 手机验证码表（多个 worker 共享）
+    create_verification_tables(cursor)
+
     # 系统通知表
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS system_notifications (
@@ -681,6 +693,9 @@ def get_db():
     conn.row_factory = sqlite3.Row
     return conn
 
+# 验证码存储（模拟短信验证码），默认保存在数据库中，多个 worker 共享
+verification_codes = create_verification_store(get_db)  # {phone: {'code': '123456', 'expire_at': timestamp}}
+
 def hash_password(password):
     """密码哈希（SHA256）"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -774,7 +789,6 @@ MIGRATED = False
 def backup_database():
     """备份数据库"""
     try:
-        import shutil
         from datetime import datetime
         
         # 创建备份目录
@@ -786,8 +800,14 @@ def backup_database():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_file = os.path.join(backup_dir, f'lingzhi_ecosystem_backup_{timestamp}.db')
         
-        # 复制数据库
-        shutil.copy2(DATABASE, backup_file)
+        # 复制数据库（使用 SQLite 在线备份，其它进程正在写入时也能得到一致的副本）
+        src = sqlite3.connect(DATABASE)
+        dst = sqlite3.connect(backup_file)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
         print(f"数据库备份成功: {backup_file}")
         
         # 清理旧备份（保留最近 7 天）
@@ -4754,7 +4774,7 @@ def get_company_accounts():
 
 @app.route('/api/recharge/upload-voucher', methods=['POST'])
 def upload_transfer_voucher():
-    """上传转账凭证"""
+    """上传转账凭证（请求体边解析边写入对象存储，不经过 request.files；order_no 须在文件之前提交）"""
     try:
         auth_header = request.headers.get('Authorization')
         if not auth_header or not auth_header.startswith('Bearer '):
@@ -4765,120 +4785,128 @@ def upload_transfer_voucher():
         if not user_id:
             return jsonify({'success': False, 'message': 'token无效'}), 401
 
-        order_no = request.form.get('order_no')
-        transfer_amount = request.form.get('transfer_amount')
-        transfer_time = request.form.get('transfer_time')
-        transfer_account = request.form.get('transfer_account', '')
-        remark = request.form.get('remark', '')
-
-        if not order_no:
-            return jsonify({'success': False, 'message': '订单号不能为空'}), 400
-
-        if not transfer_amount:
-            return jsonify({'success': False, 'message': '转账金额不能为空'}), 400
-
-        # 检查是否有上传文件
-        if 'voucher_file' not in request.files:
-            return jsonify({'success': False, 'message': '请上传转账凭证'}), 400
-
-        file = request.files['voucher_file']
-        if file.filename == '':
-            return jsonify({'success': False, 'message': '文件名为空'}), 400
+        try:
+            store = get_voucher_store(get_db)
+        except Exception as e:
+            return jsonify({'success': False, 'message': f'对象存储不可用: {str(e)}'}), 503
 
-        # 简单的文件验证
-        allowed_extensions = {'jpg', 'jpeg', 'png', 'pdf'}
-        file_ext = file.filename.split('.')[-1].lower() if '.' in file.filename else ''
-        if file_ext not in allowed_extensions:
-            return jsonify({'success': False, 'message': '仅支持JPG、PNG、PDF格式'}), 400
+        # 订单号须在文件之前提交：写入对象存储前先校验订单与用户权限
+        orders = {}
 
-        # 保存文件到临时目录
-        import os
-        upload_dir = '/tmp/vouchers'
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
-        
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        filename = f"{order_no}_{timestamp}_{random.randint(1000, 9999)}.{file_ext}"
-        file_path = os.path.join(upload_dir, filename)
-        file.save(file_path)
-        
-        # 生成文件URL（这里使用相对路径，实际应该是上传到对象存储）
-        image_url = f"/uploads/vouchers/{filename}"
+        def check_order(fields):
+            order_no = fields.get('order_no')
+            if not order_no:
+                raise VoucherUploadError('订单号不能为空')
+            conn = get_db()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, user_id, amount FROM recharge_records WHERE order_no = ?", (order_no,))
+                recharge_record = cursor.fetchone()
+            finally:
+                conn.close()
+            if not recharge_record:
+                raise VoucherUploadError('订单不存在', 404)
+            if recharge_record['user_id'] != user_id:
+                raise VoucherUploadError('无权操作此订单', 403)
+            orders['record'] = recharge_record
 
-        conn = get_db()
-        cursor = conn.cursor()
+        try:
+            upload = store.receive(
+                request.stream, request.headers.get('Content-Type'), request.content_length, validate=check_order
+            )
+        except VoucherUploadError as e:
+            return jsonify({'success': False, 'message': e.message}), e.status
 
-        # 获取充值记录
-        cursor.execute("SELECT id, user_id, amount FROM recharge_records WHERE order_no = ?", (order_no,))
-        recharge_record = cursor.fetchone()
+        # 校验未通过时删除已写入的对象
+        registered = False
+        try:
+            recharge_record = orders['record']
+            transfer_amount = upload.fields.get('transfer_amount')
+            transfer_time = upload.fields.get('transfer_time')
+            transfer_account = upload.fields.get('transfer_account', '')
+            remark = upload.fields.get('remark', '')
 
-        if not recharge_record:
-            conn.close()
-            return jsonify({'success': False, 'message': '订单不存在'}), 404
+            if not transfer_amount:
+                return jsonify({'success': False, 'message': '转账金额不能为空'}), 400
 
-        # 验证用户权限
-        if recharge_record['user_id'] != user_id:
-            conn.close()
-            return jsonify({'success': False, 'message': '无权操作此订单'}), 403
-
-        # 验证转账金额
-        try:
-            amount = float(transfer_amount)
-            if abs(amount - float(recharge_record['amount'])) > 0.01:
-                conn.close()
-                return jsonify({'success': False, 'message': '转账金额与订单金额不符'}), 400
-        except:
-            conn.close()
-            return jsonify({'success': False, 'message': '转账金额格式错误'}), 400
+            conn = get_db()
+            cursor = conn.cursor()
 
-        # 解析转账时间
-        parsed_transfer_time = None
-        if transfer_time:
+            # 验证转账金额
             try:
-                parsed_transfer_time = datetime.strptime(transfer_time, '%Y-%m-%d %H:%M:%S')
+                amount = float(transfer_amount)
+                if abs(amount - float(recharge_record['amount'])) > 0.01:
+                    conn.close()
+                    return jsonify({'success': False, 'message': '转账金额与订单金额不符'}), 400
             except:
-                pass
+                conn.close()
+                return jsonify({'success': False, 'message': '转账金额格式错误'}), 400
 
-        # 插入转账凭证
-        cursor.execute(
-            """INSERT INTO transfer_vouchers (recharge_record_id, user_id, image_url, transfer_amount, transfer_time, transfer_account, remark)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (
-                recharge_record['id'],
-                user_id,
-                image_url,
-                amount,
-                parsed_transfer_time,
-                transfer_account,
-                remark
+            # 解析转账时间
+            parsed_transfer_time = None
+            if transfer_time:
+                try:
+                    parsed_transfer_time = datetime.strptime(transfer_time, '%Y-%m-%d %H:%M:%S')
+                except:
+                    pass
+
+            # 登记文件（内容重复时复用已有对象）
+            image_url = store.register(upload)
+            registered = True
+
+            # 插入转账凭证
+            cursor.execute(
+                """INSERT INTO transfer_vouchers (recharge_record_id, user_id, image_url, file_sha256, transfer_amount, transfer_time, transfer_account, remark)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    recharge_record['id'],
+                    user_id,
+                    image_url,
+                    upload.sha256,
+                    amount,
+                    parsed_transfer_time,
+                    transfer_account,
+                    remark
+                )
             )
-        )
 
-        voucher_id = cursor.lastrowid
+            voucher_id = cursor.lastrowid
 
-        # 更新充值记录状态
-        cursor.execute(
-            """UPDATE recharge_records
-               SET voucher_id = ?, audit_status = 'pending', payment_status = 'pending'
-               WHERE id = ?""",
-            (voucher_id, recharge_record['id'])
-        )
+            # 更新充值记录状态
+            cursor.execute(
+                """UPDATE recharge_records
+                   SET voucher_id = ?, audit_status = 'pending', payment_status = 'pending'
+                   WHERE id = ?""",
+                (voucher_id, recharge_record['id'])
+            )
 
-        conn.commit()
-        conn.close()
+            conn.commit()
+            conn.close()
+        finally:
+            if not registered:
+                store.discard(upload)
 
         return jsonify({
             'success': True,
             'message': '凭证上传成功，等待审核',
             'data': {
                 'voucher_id': voucher_id,
-                'audit_status': 'pending'
+                'audit_status': 'pending',
+                'file_size': upload.size,
+                'duplicate': upload.duplicate
             }
         })
 
     except Exception as e:
         return jsonify({'success': False, 'message': f'上传凭证失败: {str(e)}'}), 500
 
+def voucher_file_urls(voucher):
+    """凭证原图/缩略图的预签名链接（对象存储不可用时返回原始 image_url）"""
+    try:
+        return get_voucher_store(get_db).file_urls(voucher)
+    except Exception:
+        return {'image_url': voucher['image_url'], 'thumbnail_url': None}
+
 @app.route('/api/recharge/voucher/<int:voucher_id>', methods=['GET'])
 def get_voucher_detail(voucher_id):
     """获取转账凭证详情"""
@@ -4895,10 +4923,11 @@ def get_voucher_detail(voucher_id):
         conn = get_db()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT tv.*, rr.order_no, rr.amount as order_amount
+        cursor.execute(f"""
+            SELECT tv.*, rr.order_no, rr.amount as order_amount, {VOUCHER_FILE_COLUMNS}
             FROM transfer_vouchers tv
             LEFT JOIN recharge_records rr ON tv.recharge_record_id = rr.id
+            {VOUCHER_FILE_JOIN}
             WHERE tv.id = ? AND tv.user_id = ?
         """, (voucher_id, user_id))
         voucher = cursor.fetchone()
@@ -4916,7 +4945,7 @@ def get_voucher_detail(voucher_id):
                 'id': voucher['id'],
                 'recharge_record_id': voucher['recharge_record_id'],
                 'order_no': voucher['order_no'],
-                'image_url': voucher['image_url'],
+                **voucher_file_urls(voucher),
                 'transfer_amount': float(voucher['transfer_amount']),
                 'transfer_time': voucher['transfer_time'],
                 'transfer_account': voucher['transfer_account'],
@@ -4951,12 +4980,14 @@ def get_pending_vouchers():
         cursor = conn.cursor()
 
         # 获取待审核凭证
-        cursor.execute("""
-            SELECT tv.*, u.username, u.phone, rr.order_no, rr.amount as order_amount, rt.name as tier_name
+        cursor.execute(f"""
+            SELECT tv.*, u.username, u.phone, rr.order_no, rr.amount as order_amount, rt.name as tier_name,
+                   {VOUCHER_FILE_COLUMNS}
             FROM transfer_vouchers tv
             LEFT JOIN users u ON tv.user_id = u.id
             LEFT JOIN recharge_records rr ON tv.recharge_record_id = rr.id
             LEFT JOIN recharge_tiers rt ON rr.tier_id = rt.id
+            {VOUCHER_FILE_JOIN}
             WHERE tv.audit_status = 'pending'
             ORDER BY tv.created_at DESC
             LIMIT ? OFFSET ?
@@ -4980,7 +5011,7 @@ def get_pending_vouchers():
                 'order_no': voucher['order_no'],
                 'tier_name': voucher['tier_name'],
                 'order_amount': float(voucher['order_amount']),
-                'image_url': voucher['image_url'],
+                **voucher_file_urls(voucher),
                 'transfer_amount': float(voucher['transfer_amount']),
                 'transfer_time': voucher['transfer_time'],
                 'transfer_account': voucher['transfer_account'],
@@ -5118,10 +5149,11 @@ def get_all_vouchers():
 
         # 获取凭证列表
         cursor.execute(f"""
-            SELECT tv.*, u.username, u.phone, rr.order_no, rr.amount as order_amount
+            SELECT tv.*, u.username, u.phone, rr.order_no, rr.amount as order_amount, {VOUCHER_FILE_COLUMNS}
             FROM transfer_vouchers tv
             LEFT JOIN users u ON tv.user_id = u.id
             LEFT JOIN recharge_records rr ON tv.recharge_record_id = rr.id
+            {VOUCHER_FILE_JOIN}
             {where_clause}
             ORDER BY tv.created_at DESC
             LIMIT ? OFFSET ?
@@ -5144,7 +5176,7 @@ def get_all_vouchers():
                 'recharge_record_id': voucher['recharge_record_id'],
                 'order_no': voucher['order_no'],
                 'order_amount': float(voucher['order_amount']),
-                'image_url': voucher['image_url'],
+                **voucher_file_urls(voucher),
                 'transfer_amount': float(voucher['transfer_amount']),
                 'transfer_time': voucher['transfer_time'],
                 'transfer_account': voucher['transfer_account'],
@@ -5745,656 +5777,152 @@ def mark_all_notifications_read():
         return jsonify({'success': False, 'message': f'操作失败: {str(e)}'}), 500
 
 # ============ v9.0 生态系统升级 ============
+# 业务逻辑在 v9_services，与智能体工具共用；这里只负责鉴权、解析请求与返回 JSON
 
-# 推荐分润系统工具函数
 def calculate_commission(user_id, amount, transaction_type, transaction_id=None, conn=None):
-    """
-    计算推荐分润（支持3级分润：5%/3%/2%）
-    
-    Args:
-        user_id: 用户ID（被推荐人）
-        amount: 原始金额
-        transaction_type: 交易类型
-        transaction_id: 交易ID
-        conn: 数据库连接（可选）
-    
-    Returns:
-        分润记录列表
-    """
-    should_close = False
-    if conn is None:
-        conn = get_db()
-        should_close = True
-    
+    """计算推荐分润（支持3级分润：5%/3%/2%），未传入连接时自行打开并提交"""
+    if conn is not None:
+        return v9_services.calculate_commission(conn, user_id, amount, transaction_type, transaction_id)
+    conn = get_db()
     try:
-        cursor = conn.cursor()
-        commissions = []
-        
-        # 查找推荐关系链（最多3级）
-        current_referee_id = user_id
-        for level in range(1, 4):  # 1-3级
-            # 查找当前层级的推荐人
-            cursor.execute(
-                "SELECT referrer_id FROM referral_relationships WHERE referee_id = ? AND status = 'active'",
-                (current_referee_id,)
-            )
-            result = cursor.fetchone()
-            
-            if not result:
-                break
-            
-            referrer_id = result['referrer_id']
-            
-            # 计算分润金额
-            commission_rates = {
-                1: 0.05,  # 5%
-                2: 0.03,  # 3%
-                3: 0.02   # 2%
-            }
-            
-            rate = commission_rates.get(level, 0)
-            commission_amount = amount * rate
-            
-            # 创建分润记录
-            cursor.execute('''
-                INSERT INTO referral_commissions
-                (referrer_id, referee_id, level, transaction_id, transaction_type, 
-                 original_amount, commission_rate, commission_amount, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending')
-            ''', (referrer_id, current_referee_id, level, transaction_id, transaction_type,
-                  amount, rate, commission_amount))
-            
-            commissions.append({
-                'referrer_id': referrer_id,
-                'referee_id': current_referee_id,
-                'level': level,
-                'commission_amount': commission_amount
-            })
-            
-            # 继续查找上一级推荐人
-            current_referee_id = referrer_id
-        
-        if should_close:
-            conn.commit()
-        
+        commissions = v9_services.calculate_commission(conn, user_id, amount, transaction_type, transaction_id)
+        conn.commit()
         return commissions
     finally:
-        if should_close:
-            conn.close()
+        conn.close()
 
 def settle_commission(commission_id, conn=None):
+    """结算分润，未传入连接时自行打开并提交"""
+    if conn is not None:
+        return v9_services.settle_commission(conn, commission_id)
+    conn = get_db()
+    try:
+        settled = v9_services.settle_commission(conn, commission_id)
+        conn.commit()
+        return settled
+    finally:
+        conn.close()
+
+def v9_call(service, error_prefix, *args, message=None, **kwargs):
     """
-    结算分润
-    
+    鉴权后调用 v9_services 中的业务函数并返回 JSON 响应
+
     Args:
-        commission_id: 分润记录ID
-        conn: 数据库连接（可选）
+        service: 业务函数（第一、二个参数为数据库连接与当前用户ID）
+        error_prefix: 未预期异常时的提示前缀
+        message: 成功时的提示，可以是以返回数据为参数的函数
     """
-    should_close = False
-    if conn is None:
-        conn = get_db()
-        should_close = True
-    
     try:
-        cursor = conn.cursor()
-        
-        # 获取分润记录
-        cursor.execute(
-            "SELECT * FROM referral_commissions WHERE id = ? AND status = 'pending'",
-            (commission_id,)
-        )
-        commission = cursor.fetchone()
-        
-        if not commission:
-            if should_close:
-                conn.close()
-            return False
-        
-        # 更新推荐人灵值
-        cursor.execute('''
-            UPDATE users 
-            SET total_lingzhi = total_lingzhi + ?
-            WHERE id = ?
-        ''', (int(commission['commission_amount']), commission['referrer_id']))
-        
-        # 更新分润状态
-        cursor.execute('''
-            UPDATE referral_commissions 
-            SET status = 'settled', settled_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (commission_id,))
-        
-        if should_close:
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        user_id = verify_token(token)
+        if not user_id:
+            return jsonify({'success': False, 'message': '未授权'}), 401
+
+        conn = get_db()
+        try:
+            data = service(conn, user_id, *args, **kwargs)
             conn.commit()
-        
-        return True
-    finally:
-        if should_close:
+        finally:
             conn.close()
 
+        body = {'success': True}
+        if message:
+            body['message'] = message(data) if callable(message) else message
+        if data is not None:
+            body['data'] = data
+        return jsonify(body)
+
+    except V9ServiceError as e:
+        return jsonify({'success': False, 'message': e.message}), e.status
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'{error_prefix}: {str(e)}'}), 500
+
+def v9_json_fields(*names):
+    """请求体中给出的字段"""
+    data = request.get_json(silent=True) or {}
+    return {name: data[name] for name in names if name in data}
+
 # v9.0 推荐分润系统API
 @app.route('/api/v9/referrals', methods=['GET'])
 def get_user_referrals():
     """获取用户推荐列表"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # 获取推荐的直推用户列表
-        cursor.execute('''
-            SELECT u.id, u.username, u.email, u.phone, u.created_at,
-                   r.level, r.created_at as referral_created_at
-            FROM referral_relationships r
-            JOIN users u ON r.referee_id = u.id
-            WHERE r.referrer_id = ?
-            ORDER BY r.created_at DESC
-        ''', (user_id,))
-        
-        referrals = [dict(ref) for ref in cursor.fetchall()]
-        
-        # 计算分润总额
-        cursor.execute('''
-            SELECT SUM(commission_amount) as total_commission,
-                   COUNT(*) as total_count
-            FROM referral_commissions
-            WHERE referrer_id = ? AND status = 'settled'
-        ''', (user_id,))
-        stats = cursor.fetchone()
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'referrals': referrals,
-                'total_commission': stats['total_commission'] or 0,
-                'total_count': stats['total_count'] or 0
-            }
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'获取失败: {str(e)}'}), 500
+    return v9_call(v9_services.list_referrals, '获取失败')
 
 @app.route('/api/v9/commissions', methods=['GET'])
 def get_commissions():
     """获取分润记录"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # 获取分润记录
-        cursor.execute('''
-            SELECT c.*, u1.username as referrer_name, u2.username as referee_name
-            FROM referral_commissions c
-            JOIN users u1 ON c.referrer_id = u1.id
-            JOIN users u2 ON c.referee_id = u2.id
-            WHERE c.referrer_id = ?
-            ORDER BY c.created_at DESC
-            LIMIT 50
-        ''', (user_id,))
-        
-        commissions = [dict(com) for com in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': commissions
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'获取失败: {str(e)}'}), 500
+    return v9_call(v9_services.list_commissions, '获取失败')
 
 # v9.0 用户资源库系统API
 @app.route('/api/v9/resources', methods=['POST'])
 def add_user_resource():
     """添加用户资源"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        data = request.json
-        resource_type = data.get('resource_type')  # skill, asset, connection, time, data, brand
-        resource_name = data.get('resource_name')
-        description = data.get('description', '')
-        estimated_value = data.get('estimated_value')
-        tags = data.get('tags', '')
-        
-        if not resource_type or not resource_name:
-            return jsonify({
-                'success': False,
-                'message': '资源类型和资源名称不能为空'
-            }), 400
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO user_resources
-            (user_id, resource_type, resource_name, description, estimated_value, tags)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, resource_type, resource_name, description, estimated_value, tags))
-        
-        resource_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'message': '资源添加成功',
-            'data': {'resource_id': resource_id}
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'添加失败: {str(e)}'}), 500
+    return v9_call(
+        v9_services.add_resource, '添加失败', message='资源添加成功',
+        **v9_json_fields('resource_type', 'resource_name', 'description', 'estimated_value', 'tags')
+    )
 
 @app.route('/api/v9/resources', methods=['GET'])
 def get_user_resources():
     """获取用户资源库"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # 获取用户资源列表
-        cursor.execute('''
-            SELECT * FROM user_resources
-            WHERE user_id = ? AND status = 'active'
-            ORDER BY created_at DESC
-        ''', (user_id,))
-        
-        resources = [dict(res) for res in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': resources
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'获取失败: {str(e)}'}), 500
+    return v9_call(v9_services.list_resources, '获取失败')
 
 @app.route('/api/v9/resources/<int:resource_id>', methods=['PUT'])
 def update_user_resource(resource_id):
     """更新用户资源"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        data = request.json
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # 检查资源归属
-        cursor.execute(
-            "SELECT * FROM user_resources WHERE id = ? AND user_id = ?",
-            (resource_id, user_id)
-        )
-        if not cursor.fetchone():
-            conn.close()
-            return jsonify({'success': False, 'message': '资源不存在或无权操作'}), 404
-        
-        # 更新资源
-        update_fields = []
-        update_values = []
-        
-        if 'resource_name' in data:
-            update_fields.append('resource_name = ?')
-            update_values.append(data['resource_name'])
-        if 'description' in data:
-            update_fields.append('description = ?')
-            update_values.append(data['description'])
-        if 'estimated_value' in data:
-            update_fields.append('estimated_value = ?')
-            update_values.append(data['estimated_value'])
-        if 'tags' in data:
-            update_fields.append('tags = ?')
-            update_values.append(data['tags'])
-        if 'availability' in data:
-            update_fields.append('availability = ?')
-            update_values.append(data['availability'])
-        
-        if update_fields:
-            update_fields.append('updated_at = CURRENT_TIMESTAMP')
-            update_values.append(resource_id)
-            
-            cursor.execute(f'''
-                UPDATE user_resources
-                SET {', '.join(update_fields)}
-                WHERE id = ?
-            ''', update_values)
-            conn.commit()
-        
-        conn.close()
-        
-        return jsonify({'success': True, 'message': '更新成功'})
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'更新失败: {str(e)}'}), 500
+    return v9_call(
+        v9_services.update_resource, '更新失败', resource_id, message='更新成功',
+        **v9_json_fields(*v9_services.RESOURCE_UPDATE_FIELDS)
+    )
 
 # v9.0 项目系统API
 @app.route('/api/v9/projects', methods=['POST'])
 def create_project():
     """创建项目"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        data = request.json
-        title = data.get('title')
-        description = data.get('description', '')
-        project_type = data.get('project_type')
-        budget = data.get('budget')
-        required_skills = data.get('required_skills', '')
-        required_assets = data.get('required_assets', '')
-        duration = data.get('duration')
-        location = data.get('location', '')
-        deadline = data.get('deadline')
-        
-        if not title or not project_type:
-            return jsonify({
-                'success': False,
-                'message': '项目标题和项目类型不能为空'
-            }), 400
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO projects
-            (title, description, project_type, budget, required_skills, required_assets,
-             duration, location, creator_id, deadline)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (title, description, project_type, budget, required_skills, required_assets,
-              duration, location, user_id, deadline))
-        
-        project_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'message': '项目创建成功',
-            'data': {'project_id': project_id}
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'创建失败: {str(e)}'}), 500
+    return v9_call(
+        v9_services.create_project, '创建失败', message='项目创建成功',
+        **v9_json_fields('title', 'description', 'project_type', 'budget', 'required_skills',
+                         'required_assets', 'duration', 'location', 'deadline')
+    )
 
 @app.route('/api/v9/projects', methods=['GET'])
 def get_project_list():
     """获取项目列表"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        project_type = request.args.get('project_type')
-        status = request.args.get('status', 'open')
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # 构建查询条件
-        conditions = ["status = ?"]
-        params = [status]
-        
-        if project_type:
-            conditions.append("project_type = ?")
-            params.append(project_type)
-        
-        # 获取项目列表
-        cursor.execute(f'''
-            SELECT p.*, u.username as creator_name
-            FROM projects p
-            JOIN users u ON p.creator_id = u.id
-            WHERE {' AND '.join(conditions)}
-            ORDER BY p.created_at DESC
-            LIMIT 50
-        ''', params)
-        
-        projects = [dict(proj) for proj in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': projects
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'获取失败: {str(e)}'}), 500
+    return v9_call(
+        v9_services.list_projects, '获取失败',
+        project_type=request.args.get('project_type'),
+        status=request.args.get('status', 'open')
+    )
 
 @app.route('/api/v9/projects/<int:project_id>/match', methods=['POST'])
 def match_resources(project_id):
     """资源智能匹配"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # 获取项目信息
-        cursor.execute(
-            "SELECT * FROM projects WHERE id = ? AND creator_id = ?",
-            (project_id, user_id)
-        )
-        project = cursor.fetchone()
-        
-        if not project:
-            conn.close()
-            return jsonify({'success': False, 'message': '项目不存在或无权操作'}), 404
-        
-        # 获取项目需求
-        required_skills = project['required_skills'].split(',') if project['required_skills'] else []
-        required_assets = project['required_assets'].split(',') if project['required_assets'] else []
-        
-        # 获取所有可用资源
-        cursor.execute('''
-            SELECT * FROM user_resources
-            WHERE availability = 'available' AND status = 'active'
-        ''')
-        all_resources = cursor.fetchall()
-        
-        # 计算匹配度
-        matches = []
-        for resource in all_resources:
-            match_score = 0.0
-            match_reasons = []
-            
-            # 技能匹配
-            if resource['resource_type'] == 'skill':
-                resource_skills = resource['tags'].split(',') if resource['tags'] else []
-                for skill in required_skills:
-                    if skill.strip() in resource_skills:
-                        match_score += 0.3
-                        match_reasons.append(f"技能匹配: {skill}")
-            
-            # 资产匹配
-            elif resource['resource_type'] == 'asset':
-                resource_assets = resource['tags'].split(',') if resource['tags'] else []
-                for asset in required_assets:
-                    if asset.strip() in resource_assets:
-                        match_score += 0.4
-                        match_reasons.append(f"资产匹配: {asset}")
-            
-            # 限制最大匹配度
-            match_score = min(match_score, 1.0)
-            
-            # 保存匹配结果
-            if match_score > 0.3:  # 最低匹配度30%
-                cursor.execute('''
-                    INSERT INTO resource_matches
-                    (project_id, user_id, resource_id, match_score, match_reason)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (project_id, resource['user_id'], resource['id'], match_score,
-                      ', '.join(match_reasons)))
-                
-                matches.append({
-                    'project_id': project_id,
-                    'user_id': resource['user_id'],
-                    'resource_id': resource['id'],
-                    'match_score': match_score,
-                    'match_reason': ', '.join(match_reasons)
-                })
-        
-        # 按匹配度排序
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'message': f'匹配到 {len(matches)} 个资源',
-            'data': matches
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'匹配失败: {str(e)}'}), 500
+    return v9_call(
+        v9_services.match_resources, '匹配失败', project_id,
+        message=lambda matches: f'匹配到 {len(matches)} 个资源'
+    )
 
 @app.route('/api/v9/projects/<int:project_id>/join', methods=['POST'])
 def join_project(project_id):
     """参与项目"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        data = request.json
-        resource_id = data.get('resource_id')
-        role = data.get('role', 'participant')
-        
-        if not resource_id:
-            return jsonify({
-                'success': False,
-                'message': '请指定使用的资源'
-            }), 400
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # 检查项目状态
-        cursor.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
-        project = cursor.fetchone()
-        
-        if not project or project['status'] != 'open':
-            conn.close()
-            return jsonify({
-                'success': False,
-                'message': '项目不存在或已关闭'
-            }), 404
-        
-        # 添加参与者
-        cursor.execute('''
-            INSERT INTO project_participants
-            (project_id, user_id, role, contribution)
-            VALUES (?, ?, ?, ?)
-        ''', (project_id, user_id, role, f'使用资源ID: {resource_id}'))
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'message': '参与项目成功'
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'参与失败: {str(e)}'}), 500
+    return v9_call(
+        v9_services.join_project, '参与失败', project_id, message='参与项目成功',
+        **v9_json_fields('resource_id', 'role')
+    )
 
 # v9.0 数字资产系统API
 @app.route('/api/v9/assets', methods=['POST'])
 def create_digital_asset():
     """创建数字资产"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        data = request.json
-        asset_type = data.get('asset_type')
-        asset_name = data.get('asset_name')
-        description = data.get('description', '')
-        image_url = data.get('image_url', '')
-        metadata = data.get('metadata', '{}')
-        rarity = data.get('rarity', 'common')
-        value = data.get('value')
-        
-        if not asset_type or not asset_name:
-            return jsonify({
-                'success': False,
-                'message': '资产类型和资产名称不能为空'
-            }), 400
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO digital_assets
-            (user_id, asset_type, asset_name, description, image_url, metadata, rarity, value)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, asset_type, asset_name, description, image_url, metadata, rarity, value))
-        
-        asset_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'message': '资产创建成功',
-            'data': {'asset_id': asset_id}
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'创建失败: {str(e)}'}), 500
+    return v9_call(
+        v9_services.create_asset, '创建失败', message='资产创建成功',
+        **v9_json_fields('asset_type', 'asset_name', 'description', 'image_url', 'metadata', 'rarity', 'value')
+    )
 
 @app.route('/api/v9/assets', methods=['GET'])
 def get_user_assets():
     """获取用户资产列表"""
-    try:
-        user_id = verify_token(request.headers.get('Authorization'))
-        if not user_id:
-            return jsonify({'success': False, 'message': '未授权'}), 401
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # 获取用户资产列表
-        cursor.execute('''
-            SELECT * FROM digital_assets
-            WHERE user_id = ?
-            ORDER BY created_at DESC
-        ''', (user_id,))
-        
-        assets = [dict(ast) for ast in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': assets
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'获取失败: {str(e)}'}), 500
+    return v9_call(v9_services.list_assets, '获取失败')
 
 # ============ v9.0 生态系统升级结束 ============
 
@@ -6410,20 +5938,83 @@ except ImportError:
     EXTENSION_AVAILABLE = False
     print("警告: extension_features 模块未找到")
 
+# ============ 应用工厂 ============
+
+_app_initialized = False
+_app_init_lock = threading.Lock()
+
+
+def add_response_headers(response):
+    """添加自定义响应头"""
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Max-Age', '86400')
+    response.headers.add('X-Content-Type-Options', 'nosniff')
+    response.headers.add('X-Frame-Options', 'SAMEORIGIN')
+    return response
+
+
+def enable_wal():
+    """多个 worker 进程读写同一个数据库文件：切换为 WAL 模式（写入数据库文件，持久生效），读写互不阻塞"""
+    conn = sqlite3.connect(DATABASE)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+
+
+def create_app():
+    """
+    完成启动时的一次性初始化并返回 app（开发服务器与 gunicorn 共用，重复调用只执行一次）
+
+    路由注册在模块级 app 上，这里只负责扩展功能路由、数据库备份、默认数据与响应头。
+    gunicorn（preload_app）在 master 进程中调用一次，worker fork 后直接使用初始化好的 app。
+    """
+    global _app_initialized
+    with _app_init_lock:
+        if _app_initialized:
+            return app
+
+        # 初始化扩展功能
+        if EXTENSION_AVAILABLE:
+            try:
+                init_extension_features(app, get_db, verify_token)
+                print("✅ 扩展功能初始化成功")
+            except Exception as e:
+                print(f"❌ 扩展功能初始化失败: {e}")
+
+        # 备份数据库
+        print("正在备份数据库...")
+        backup_database()
+        enable_wal()
+
+        # 初始化默认数据
+        init_default_data()
+
+        app.after_request(add_response_headers)
+        _app_initialized = True
+    return app
+
+
+def init_worker():
+    """gunicorn worker fork 后调用：丢弃从 master 继承的进程内资源，并检查本 worker 的数据库连接"""
+    # 数据库连接按请求创建（get_db），不会跨进程共享；凭证存储的后处理线程不会随 fork 复制，在 worker 中重新创建
+    voucher_storage.reset_voucher_store()
+    conn = get_db()
+    try:
+        conn.execute("SELECT 1 FROM users LIMIT 1").fetchall()
+    finally:
+        conn.close()
+    print(f"worker {os.getpid()} 已就绪")
+
+
 # ============ 启动服务 ============
 
 if __name__ == '__main__':
-    # 初始化扩展功能
-    if EXTENSION_AVAILABLE:
-        try:
-            init_extension_features(app, get_db, verify_token)
-            print("✅ 扩展功能初始化成功")
-        except Exception as e:
-            print(f"❌ 扩展功能初始化失败: {e}")
-
-    # 使用8080端口，配置所有CORS头部
+    # 开发服务器（单进程）；生产环境使用 gunicorn -c gunicorn.conf.py wsgi:app
     port = 8080
-    
+
     print("=" * 50)
     print("灵值生态园 API 服务启动中...")
     print("=" * 50)
@@ -6431,22 +6022,4 @@ if __name__ == '__main__':
     print("默认管理员账号: admin / admin123")
     print("=" * 50)
 
-    # 备份数据库
-    print("正在备份数据库...")
-    backup_database()
-
-    # 初始化默认数据
-    init_default_data()
-
-    # 添加自定义响应头
-    @app.after_request
-    def after_request(response):
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-        response.headers.add('Access-Control-Max-Age', '86400')
-        response.headers.add('X-Content-Type-Options', 'nosniff')
-        response.headers.add('X-Frame-Options', 'SAMEORIGIN')
-        return response
-
-    app.run(host='0.0.0.0', port=port, debug=True)
+    create_app().run(host='0.0.0.0', port=port, debug=True)
@@ -6,17 +6,24 @@
 
 import sqlite3
 import os
+import sys
 from datetime import datetime
 
+# 复用 src/storage/database/bulk_pipeline 的分批复制（仅依赖标准库）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from storage.database.bulk_pipeline import ProgressReporter, copy_rows
+
 # 数据库路径
 OLD_DATABASE = '../灵值生态园智能体移植包/src/auth/auth.db'
 NEW_DATABASE = 'lingzhi_ecosystem.db'
 
+# 每批迁移的记录数
+MIGRATION_BATCH_SIZE = 1000
+
 def backup_database():
     """备份数据库"""
     try:
         import shutil
-        from datetime import datetime
         
         backup_dir = 'backups'
         if not os.path.exists(backup_dir):
@@ -247,46 +254,62 @@ def migrate_simple_table(conn_old, conn_new, table_name, field_mapping=None):
         print(f"  ❌ 表 {table_name} 没有共有字段")
         return 0
     
-    # 获取旧数据
+    # 构建插入语句
+    placeholders = ','.join(['?' for _ in common_column_names])
+    insert_sql = f"INSERT INTO {table_name} ({','.join(common_column_names)}) VALUES ({placeholders})"
+    
+    # 分批读取旧数据并写入
     cursor_old.execute(f"SELECT {','.join(common_column_names)} FROM {table_name}")
-    old_data = cursor_old.fetchall()
+    stats = _copy_in_batches(cursor_old, conn_new, insert_sql, table_name)
     
-    if not old_data:
+    if not stats.read:
         print(f"  ⊘ 表 {table_name} 无数据")
         return 0
     
-    # 构建插入语句
-    placeholders = ','.join(['?' for _ in common_column_names])
-    insert_sql = f"INSERT INTO {table_name} ({','.join(common_column_names)}) VALUES ({placeholders})"
+    print(f"  ✅ 表 {table_name}: 迁移 {stats.inserted} 条记录")
+    return stats.inserted
+
+def _copy_in_batches(cursor_old, conn_new, insert_sql, table_name, transform=None):
+    """分批复制（fetchmany + executemany，逐批提交）；整批失败时逐行写入并跳过问题行"""
+    return copy_rows(
+        cursor_old,
+        conn_new,
+        insert_sql,
+        transform=transform,
+        batch_size=MIGRATION_BATCH_SIZE,
+        on_progress=ProgressReporter(f"  表 {table_name}", every=10, log=print),
+        on_row_error=lambda row, e: print(f"  ❌ 迁移失败: {e}")
+    )
+
+def _load_user_id_mapping(conn_old, conn_new):
+    """旧用户ID -> 新用户ID（按用户名，其次按邮箱匹配）"""
+    cursor_new = conn_new.cursor()
+    cursor_new.execute("SELECT id, username, email FROM users")
+    new_users = {}
+    new_users_email = {}
+    for new_id, username, email in cursor_new.fetchall():
+        new_users[username] = new_id
+        if email:
+            new_users_email[email] = new_id
     
-    # 插入数据
-    migrated = 0
-    for row in old_data:
-        try:
-            cursor_new.execute(insert_sql, row)
-            migrated += 1
-        except Exception as e:
-            print(f"  ❌ 迁移失败: {e}")
-    
-    print(f"  ✅ 表 {table_name}: 迁移 {migrated} 条记录")
-    return migrated
+    cursor_old = conn_old.cursor()
+    cursor_old.execute("SELECT id, name, email FROM users")
+    mapping = {}
+    for old_user_id, name, email in cursor_old.fetchall():
+        new_user_id = new_users.get(name) or new_users_email.get(email)
+        if new_user_id:
+            mapping[old_user_id] = new_user_id
+    return mapping
 
-def migrate_with_user_mapping(conn_old, conn_new, table_name, user_id_field):
+def migrate_with_user_mapping(conn_old, conn_new, table_name, user_id_field, target_table=None, user_mapping=None):
     """迁移需要用户ID映射的表"""
+    target_table = target_table or table_name
     cursor_old = conn_old.cursor()
     cursor_new = conn_new.cursor()
     
-    # 获取用户ID映射（需要设置 row_factory）
-    conn_new.row_factory = sqlite3.Row
-    cursor_new = conn_new.cursor()
-    
-    cursor_new.execute("SELECT id, username, email FROM users")
-    new_users = {row['username']: row['id'] for row in cursor_new.fetchall()}
-    new_users_email = {row['email']: row['id'] for row in cursor_new.fetchall() if row['email']}
-    
-    # 恢复 row_factory
-    conn_new.row_factory = None
-    cursor_new = conn_new.cursor()
+    # 获取用户ID映射
+    if user_mapping is None:
+        user_mapping = _load_user_id_mapping(conn_old, conn_new)
     
     # 获取旧表结构
     cursor_old.execute(f"PRAGMA table_info({table_name})")
@@ -294,7 +317,7 @@ def migrate_with_user_mapping(conn_old, conn_new, table_name, user_id_field):
     old_column_names = [col[1] for col in old_columns]
     
     # 获取新表结构
-    cursor_new.execute(f"PRAGMA table_info({table_name})")
+    cursor_new.execute(f"PRAGMA table_info({target_table})")
     new_columns = cursor_new.fetchall()
     new_column_names = [col[1] for col in new_columns]
     
@@ -310,53 +333,30 @@ def migrate_with_user_mapping(conn_old, conn_new, table_name, user_id_field):
         print(f"  ❌ 表 {table_name} 没有 {user_id_field} 字段")
         return 0
     
-    # 获取旧数据
+    user_index = common_column_names.index(user_id_field)
+    
+    def map_user_id(row):
+        # 映射用户ID，找不到对应新用户的记录跳过
+        new_user_id = user_mapping.get(row[user_index])
+        if not new_user_id:
+            return None
+        row = list(row)
+        row[user_index] = new_user_id
+        return row
+    
+    # 构建插入语句
+    placeholders = ','.join(['?' for _ in common_column_names])
+    insert_sql = f"INSERT INTO {target_table} ({','.join(common_column_names)}) VALUES ({placeholders})"
+    
+    # 分批读取旧数据并写入
     cursor_old.execute(f"SELECT {','.join(common_column_names)} FROM {table_name}")
-    old_data = cursor_old.fetchall()
+    stats = _copy_in_batches(cursor_old, conn_new, insert_sql, target_table, transform=map_user_id)
     
-    if not old_data:
+    if not stats.read:
         return 0
     
-    # 获取旧用户信息
-    cursor_old.execute("SELECT id, name, email FROM users")
-    old_users = cursor_old.fetchall()
-    old_user_map = {}
-    for old_user in old_users:
-        old_user_id, name, email = old_user
-        old_user_map[old_user_id] = {'name': name, 'email': email}
-    
-    # 迁移数据
-    migrated = 0
-    for row in old_data:
-        try:
-            # 转换为字典
-            row_dict = dict(zip(common_column_names, row))
-            
-            # 映射用户ID
-            old_user_id = row_dict[user_id_field]
-            if old_user_id not in old_user_map:
-                continue
-            
-            old_user_info = old_user_map[old_user_id]
-            new_user_id = new_users.get(old_user_info['name']) or new_users_email.get(old_user_info['email'])
-            
-            if not new_user_id:
-                continue
-            
-            # 更新用户ID
-            row_dict[user_id_field] = new_user_id
-            
-            # 构建插入语句
-            placeholders = ','.join(['?' for _ in common_column_names])
-            insert_sql = f"INSERT INTO {table_name} ({','.join(common_column_names)}) VALUES ({placeholders})"
-            
-            cursor_new.execute(insert_sql, list(row_dict.values()))
-            migrated += 1
-        except Exception as e:
-            print(f"  ❌ 迁移失败: {e}")
-    
-    print(f"  ✅ 表 {table_name}: 迁移 {migrated} 条记录")
-    return migrated
+    print(f"  ✅ 表 {target_table}: 迁移 {stats.inserted} 条记录")
+    return stats.inserted
 
 def migrate_all_data():
     """迁移所有数据"""
@@ -393,81 +393,18 @@ def migrate_all_data():
     ]
     
     print("\n--- 迁移用户关联数据表 ---")
+    user_mapping = _load_user_id_mapping(conn_old, conn_new)
     for table, user_field in user_mapping_tables:
-        count = migrate_with_user_mapping(conn_old, conn_new, table, user_field)
+        count = migrate_with_user_mapping(conn_old, conn_new, table, user_field, user_mapping=user_mapping)
         total_migrated += count
     
-    # 迁移用户贡献数据
+    # 迁移用户贡献数据（user_contributions_v2 -> user_contributions）
     print("\n--- 迁移用户贡献数据 ---")
-    cursor_old = conn_old.cursor()
-    cursor_new = conn_new.cursor()
-    
-    # 设置 row_factory 以便访问字段名
-    conn_new.row_factory = sqlite3.Row
-    cursor_new = conn_new.cursor()
-    
-    cursor_new.execute("SELECT id, username, email FROM users")
-    new_users = {row['username']: row['id'] for row in cursor_new.fetchall()}
-    
-    # 恢复 row_factory
-    conn_new.row_factory = None
-    cursor_new = conn_new.cursor()
-    
-    cursor_old.execute("SELECT * FROM user_contributions_v2")
-    old_data = cursor_old.fetchall()
-    
-    if old_data:
-        cursor_old.execute("PRAGMA table_info(user_contributions_v2)")
-        columns = cursor_old.fetchall()
-        column_names = [col[1] for col in columns]
-        
-        # 获取用户ID映射
-        conn_new.row_factory = sqlite3.Row
-        cursor_new = conn_new.cursor()
-        
-        cursor_new.execute("SELECT id, username, email FROM users")
-        new_users = {row['username']: row['id'] for row in cursor_new.fetchall()}
-        new_users_email = {row['email']: row['id'] for row in cursor_new.fetchall() if row['email']}
-        
-        conn_new.row_factory = None
-        cursor_new = conn_new.cursor()
-        
-        cursor_old.execute("SELECT id, name, email FROM users")
-        old_users = cursor_old.fetchall()
-        old_user_map = {}
-        for old_user in old_users:
-            old_user_id, name, email = old_user
-            old_user_map[old_user_id] = {'name': name, 'email': email}
-        
-        migrated = 0
-        for row in old_data:
-            try:
-                row_dict = dict(zip(column_names, row))
-                
-                # 映射用户ID
-                old_user_id = row_dict['user_id']
-                if old_user_id not in old_user_map:
-                    continue
-                
-                old_user_info = old_user_map[old_user_id]
-                new_user_id = new_users.get(old_user_info['name']) or new_users_email.get(old_user_info['email'])
-                
-                if not new_user_id:
-                    continue
-                
-                # 更新用户ID
-                row_dict['user_id'] = new_user_id
-                
-                # 插入数据
-                placeholders = ','.join(['?' for _ in column_names])
-                insert_sql = f"INSERT INTO user_contributions ({','.join(column_names)}) VALUES ({placeholders})"
-                cursor_new.execute(insert_sql, list(row_dict.values()))
-                migrated += 1
-            except Exception as e:
-                print(f"  ❌ 迁移失败: {e}")
-        
-        print(f"  ✅ 表 user_contributions: 迁移 {migrated} 条记录")
-        total_migrated += migrated
+    count = migrate_with_user_mapping(
+        conn_old, conn_new, 'user_contributions_v2', 'user_id',
+        target_table='user_contributions', user_mapping=user_mapping
+    )
+    total_migrated += count
     
     conn_new.commit()
     conn_new.close()
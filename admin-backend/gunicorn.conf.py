@@ -0,0 +1,59 @@
+"""
+灵值生态园后端 gunicorn 配置
+
+用法（在 admin-backend 目录下）：
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+- worker 数：ADMIN_WORKERS，默认 CPU 核数 * 2 + 1，不超过 ADMIN_MAX_WORKERS
+- worker 类型：ADMIN_WORKER_CLASS，默认 gthread（每个 worker ADMIN_THREADS 个线程）；
+  智能对话等长时间等待模型返回的请求较多时可改为 gevent（需安装 gevent）
+- preload_app：master 进程导入应用并执行一次启动初始化（建表、备份、默认数据），worker fork 后共享
+- post_fork：每个 worker 丢弃从 master 继承的进程内资源并检查自己的数据库连接
+- 平滑重启：kill -HUP <master> 按新配置重建 worker；更新代码后用 ./start.sh reload
+  （preload_app 下 HUP 不会重新加载代码，改为 USR2 启动新 master，新 worker 就绪后 QUIT 旧 master）
+- 验证码默认保存在数据库中；VERIFICATION_CODE_BACKEND=memory 只适用于单进程，多 worker 时拒绝启动
+"""
+
+import multiprocessing
+import os
+
+# 监听地址
+bind = f"0.0.0.0:{os.getenv('ADMIN_PORT', '8080')}"
+
+# 数据库等相对路径以 admin-backend 为准
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+# worker 数上限（每个 worker 都会打开自己的数据库连接）
+ADMIN_MAX_WORKERS = int(os.getenv("ADMIN_MAX_WORKERS", "16"))
+
+workers = int(os.getenv("ADMIN_WORKERS", min(multiprocessing.cpu_count() * 2 + 1, ADMIN_MAX_WORKERS)))
+worker_class = os.getenv("ADMIN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("ADMIN_THREADS", "4"))
+worker_connections = int(os.getenv("ADMIN_WORKER_CONNECTIONS", "1000"))
+
+preload_app = True
+
+# 需覆盖智能对话的模型调用时长
+timeout = int(os.getenv("ADMIN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("ADMIN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# 定期重启 worker，避免长时间运行的内存增长
+max_requests = int(os.getenv("ADMIN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+pidfile = os.getenv("ADMIN_PIDFILE", "/tmp/admin-backend.pid")
+accesslog = os.getenv("ADMIN_ACCESS_LOG", "-")
+errorlog = os.getenv("ADMIN_ERROR_LOG", "-")
+
+if workers > 1 and os.getenv("VERIFICATION_CODE_BACKEND", "sqlite") == "memory":
+    raise RuntimeError(
+        f"VERIFICATION_CODE_BACKEND=memory 只适用于单进程，当前 workers={workers}："
+        "发送与校验验证码会落在不同 worker 上。请使用默认的 sqlite 后端或设置 ADMIN_WORKERS=1"
+    )
+
+
+def post_fork(server, worker):
+    from app import init_worker
+
+    init_worker()
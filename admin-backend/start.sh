@@ -9,5 +9,24 @@ export COZE_PROJECT_SPACE_ID='7597311229212246070'
 
 cd /var/www/backend
 
-# 启动服务
-nohup python3 app.py > backend.log 2>&1 &
+PIDFILE=${ADMIN_PIDFILE:-/tmp/admin-backend.pid}
+export ADMIN_PIDFILE=$PIDFILE
+
+case "$1" in
+    reload)
+        # 平滑更新代码：USR2 启动新的 master（加载新代码），新 worker 就绪后让旧 master 处理完请求退出
+        # （新 master 的 pid 先写入 $PIDFILE.2，旧 master 退出后改名为 $PIDFILE）
+        OLD_PID=$(cat "$PIDFILE")
+        kill -USR2 "$OLD_PID"
+        for _ in $(seq 1 30); do
+            [ -f "$PIDFILE.2" ] && break
+            sleep 1
+        done
+        sleep 5
+        kill -QUIT "$OLD_PID"
+        ;;
+    *)
+        # 启动服务（gunicorn 多 worker，配置见 gunicorn.conf.py）
+        nohup gunicorn -c gunicorn.conf.py wsgi:app > backend.log 2>&1 &
+        ;;
+esac
@@ -0,0 +1,352 @@
+"""
+v9.0 生态系统业务逻辑
+
+推荐分润、资源库、项目与资源匹配、数字资产的业务逻辑，供两处直接调用：
+- admin-backend/app.py 的 /api/v9/* 路由（只负责鉴权、解析请求与返回 JSON）
+- src/tools 下的智能体工具（同机部署时进程内调用，不再经过本机 HTTP 回环）
+
+约定：
+- 第一个参数是 sqlite3 连接（row_factory 为 sqlite3.Row），写操作不提交，由调用方 commit/close
+- 返回值即接口响应中的 data 字段
+- 业务错误抛出 V9ServiceError（status 为对应的 HTTP 状态码）
+"""
+
+from typing import Any, Dict, List, Optional
+
+# 推荐分润比例（1-3级）
+COMMISSION_RATES = {
+    1: 0.05,
+    2: 0.03,
+    3: 0.02,
+}
+# 列表接口返回的最大条数
+LIST_LIMIT = 50
+# 资源匹配的最低匹配度
+MIN_MATCH_SCORE = 0.3
+# 资源更新允许修改的字段
+RESOURCE_UPDATE_FIELDS = ('resource_name', 'description', 'estimated_value', 'tags', 'availability')
+
+
+class V9ServiceError(Exception):
+    """业务错误（status 为返回给客户端的 HTTP 状态码）"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+# ============ 推荐分润 ============
+
+def calculate_commission(conn, user_id, amount, transaction_type, transaction_id=None) -> List[Dict[str, Any]]:
+    """
+    计算推荐分润（支持3级分润：5%/3%/2%）
+
+    Args:
+        user_id: 用户ID（被推荐人）
+        amount: 原始金额
+        transaction_type: 交易类型
+        transaction_id: 交易ID
+
+    Returns:
+        分润记录列表
+    """
+    cursor = conn.cursor()
+    commissions = []
+
+    # 沿推荐关系链向上查找（最多3级）
+    current_referee_id = user_id
+    for level in range(1, len(COMMISSION_RATES) + 1):
+        cursor.execute(
+            "SELECT referrer_id FROM referral_relationships WHERE referee_id = ? AND status = 'active'",
+            (current_referee_id,)
+        )
+        result = cursor.fetchone()
+        if not result:
+            break
+
+        referrer_id = result['referrer_id']
+        rate = COMMISSION_RATES[level]
+        commission_amount = amount * rate
+
+        cursor.execute('''
+            INSERT INTO referral_commissions
+            (referrer_id, referee_id, level, transaction_id, transaction_type,
+             original_amount, commission_rate, commission_amount, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+        ''', (referrer_id, current_referee_id, level, transaction_id, transaction_type,
+              amount, rate, commission_amount))
+
+        commissions.append({
+            'referrer_id': referrer_id,
+            'referee_id': current_referee_id,
+            'level': level,
+            'commission_amount': commission_amount
+        })
+        current_referee_id = referrer_id
+
+    return commissions
+
+
+def settle_commission(conn, commission_id) -> bool:
+    """结算一条待结算的分润，返回是否结算成功"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT * FROM referral_commissions WHERE id = ? AND status = 'pending'",
+        (commission_id,)
+    )
+    commission = cursor.fetchone()
+    if not commission:
+        return False
+
+    cursor.execute('''
+        UPDATE users
+        SET total_lingzhi = total_lingzhi + ?
+        WHERE id = ?
+    ''', (int(commission['commission_amount']), commission['referrer_id']))
+    cursor.execute('''
+        UPDATE referral_commissions
+        SET status = 'settled', settled_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (commission_id,))
+    return True
+
+
+def list_referrals(conn, user_id) -> Dict[str, Any]:
+    """用户的直推列表与已结算分润统计"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT u.id, u.username, u.email, u.phone, u.created_at,
+               r.level, r.created_at as referral_created_at
+        FROM referral_relationships r
+        JOIN users u ON r.referee_id = u.id
+        WHERE r.referrer_id = ?
+        ORDER BY r.created_at DESC
+    ''', (user_id,))
+    referrals = [dict(ref) for ref in cursor.fetchall()]
+
+    cursor.execute('''
+        SELECT SUM(commission_amount) as total_commission,
+               COUNT(*) as total_count
+        FROM referral_commissions
+        WHERE referrer_id = ? AND status = 'settled'
+    ''', (user_id,))
+    stats = cursor.fetchone()
+
+    return {
+        'referrals': referrals,
+        'total_commission': stats['total_commission'] or 0,
+        'total_count': stats['total_count'] or 0
+    }
+
+
+def list_commissions(conn, user_id) -> List[Dict[str, Any]]:
+    """用户最近的分润记录"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT c.*, u1.username as referrer_name, u2.username as referee_name
+        FROM referral_commissions c
+        JOIN users u1 ON c.referrer_id = u1.id
+        JOIN users u2 ON c.referee_id = u2.id
+        WHERE c.referrer_id = ?
+        ORDER BY c.created_at DESC
+        LIMIT ?
+    ''', (user_id, LIST_LIMIT))
+    return [dict(com) for com in cursor.fetchall()]
+
+
+# ============ 用户资源库 ============
+
+def add_resource(conn, user_id, resource_type=None, resource_name=None, description='',
+                 estimated_value=None, tags='') -> Dict[str, Any]:
+    """添加用户资源（resource_type: skill, asset, connection, time, data, brand）"""
+    if not resource_type or not resource_name:
+        raise V9ServiceError('资源类型和资源名称不能为空')
+
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO user_resources
+        (user_id, resource_type, resource_name, description, estimated_value, tags)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (user_id, resource_type, resource_name, description, estimated_value, tags))
+    return {'resource_id': cursor.lastrowid}
+
+
+def list_resources(conn, user_id) -> List[Dict[str, Any]]:
+    """用户的有效资源"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT * FROM user_resources
+        WHERE user_id = ? AND status = 'active'
+        ORDER BY created_at DESC
+    ''', (user_id,))
+    return [dict(res) for res in cursor.fetchall()]
+
+
+def update_resource(conn, user_id, resource_id, **fields) -> None:
+    """更新用户自己的资源，只修改 RESOURCE_UPDATE_FIELDS 中给出的字段"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id FROM user_resources WHERE id = ? AND user_id = ?",
+        (resource_id, user_id)
+    )
+    if not cursor.fetchone():
+        raise V9ServiceError('资源不存在或无权操作', 404)
+
+    updates = [(name, fields[name]) for name in RESOURCE_UPDATE_FIELDS if name in fields]
+    if not updates:
+        return
+
+    assignments = ', '.join(f'{name} = ?' for name, _ in updates)
+    cursor.execute(f'''
+        UPDATE user_resources
+        SET {assignments}, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', [value for _, value in updates] + [resource_id])
+
+
+# ============ 项目 ============
+
+def create_project(conn, user_id, title=None, project_type=None, description='', budget=None,
+                   required_skills='', required_assets='', duration=None, location='',
+                   deadline=None) -> Dict[str, Any]:
+    """创建项目"""
+    if not title or not project_type:
+        raise V9ServiceError('项目标题和项目类型不能为空')
+
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO projects
+        (title, description, project_type, budget, required_skills, required_assets,
+         duration, location, creator_id, deadline)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (title, description, project_type, budget, required_skills, required_assets,
+          duration, location, user_id, deadline))
+    return {'project_id': cursor.lastrowid}
+
+
+def list_projects(conn, user_id, project_type: Optional[str] = None, status: str = 'open') -> List[Dict[str, Any]]:
+    """按状态（默认 open）与类型筛选的项目列表"""
+    conditions = ["p.status = ?"]
+    params: List[Any] = [status or 'open']
+    if project_type:
+        conditions.append("p.project_type = ?")
+        params.append(project_type)
+    params.append(LIST_LIMIT)
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT p.*, u.username as creator_name
+        FROM projects p
+        JOIN users u ON p.creator_id = u.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY p.created_at DESC
+        LIMIT ?
+    ''', params)
+    return [dict(proj) for proj in cursor.fetchall()]
+
+
+def _split_tags(value) -> List[str]:
+    return value.split(',') if value else []
+
+
+def match_resources(conn, user_id, project_id) -> List[Dict[str, Any]]:
+    """
+    为自己创建的项目匹配可用资源
+
+    技能类资源按技能标签匹配（每项 0.3），资产类资源按资产标签匹配（每项 0.4），
+    匹配度超过 MIN_MATCH_SCORE 的结果写入 resource_matches，按匹配度降序返回。
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT * FROM projects WHERE id = ? AND creator_id = ?",
+        (project_id, user_id)
+    )
+    project = cursor.fetchone()
+    if not project:
+        raise V9ServiceError('项目不存在或无权操作', 404)
+
+    wanted = {
+        'skill': ([s.strip() for s in _split_tags(project['required_skills'])], 0.3, '技能匹配'),
+        'asset': ([a.strip() for a in _split_tags(project['required_assets'])], 0.4, '资产匹配'),
+    }
+
+    cursor.execute('''
+        SELECT * FROM user_resources
+        WHERE availability = 'available' AND status = 'active'
+    ''')
+
+    matches = []
+    for resource in cursor.fetchall():
+        if resource['resource_type'] not in wanted:
+            continue
+        required, weight, label = wanted[resource['resource_type']]
+        resource_tags = _split_tags(resource['tags'])
+        reasons = [f"{label}: {item}" for item in required if item in resource_tags]
+        match_score = min(weight * len(reasons), 1.0)
+        if match_score <= MIN_MATCH_SCORE:
+            continue
+        matches.append({
+            'project_id': project_id,
+            'user_id': resource['user_id'],
+            'resource_id': resource['id'],
+            'match_score': match_score,
+            'match_reason': ', '.join(reasons)
+        })
+
+    if matches:
+        cursor.executemany('''
+            INSERT INTO resource_matches
+            (project_id, user_id, resource_id, match_score, match_reason)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(m['project_id'], m['user_id'], m['resource_id'], m['match_score'], m['match_reason'])
+              for m in matches])
+
+    matches.sort(key=lambda x: x['match_score'], reverse=True)
+    return matches
+
+
+def join_project(conn, user_id, project_id, resource_id=None, role='participant') -> None:
+    """使用自己的某项资源参与开放中的项目"""
+    if not resource_id:
+        raise V9ServiceError('请指定使用的资源')
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT status FROM projects WHERE id = ?", (project_id,))
+    project = cursor.fetchone()
+    if not project or project['status'] != 'open':
+        raise V9ServiceError('项目不存在或已关闭', 404)
+
+    cursor.execute('''
+        INSERT INTO project_participants
+        (project_id, user_id, role, contribution)
+        VALUES (?, ?, ?, ?)
+    ''', (project_id, user_id, role or 'participant', f'使用资源ID: {resource_id}'))
+
+
+# ============ 数字资产 ============
+
+def create_asset(conn, user_id, asset_type=None, asset_name=None, description='', image_url='',
+                 metadata='{}', rarity='common', value=None) -> Dict[str, Any]:
+    """创建数字资产"""
+    if not asset_type or not asset_name:
+        raise V9ServiceError('资产类型和资产名称不能为空')
+
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO digital_assets
+        (user_id, asset_type, asset_name, description, image_url, metadata, rarity, value)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (user_id, asset_type, asset_name, description, image_url, metadata, rarity, value))
+    return {'asset_id': cursor.lastrowid}
+
+
+def list_assets(conn, user_id) -> List[Dict[str, Any]]:
+    """用户的数字资产"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT * FROM digital_assets
+        WHERE user_id = ?
+        ORDER BY created_at DESC
+    ''', (user_id,))
+    return [dict(ast) for ast in cursor.fetchall()]
@@ -0,0 +1,92 @@
+"""
+手机验证码存储
+
+验证码原先保存在进程内字典中，多 worker 部署（gunicorn）时发送与校验落在不同进程上会校验失败。
+VerificationCodeStore 提供与原字典相同的接口（in / [] / del），数据保存在 SQLite 的 verification_codes 表中：
+
+- 所有 worker 共用同一个数据库文件，发送验证码与校验可以落在不同 worker 上
+- 写入新验证码时顺带删除已过期的记录
+- 删除不存在的手机号不报错（另一个 worker 可能已经校验并删除）
+
+VERIFICATION_CODE_BACKEND=memory 时使用进程内字典，只适用于单进程（开发服务器）；
+gunicorn 多 worker 启动时检查到该配置会直接报错退出。
+"""
+
+import os
+import time
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator
+
+# 存储后端：sqlite / memory
+VERIFICATION_CODE_BACKEND = os.getenv('VERIFICATION_CODE_BACKEND', 'sqlite')
+
+
+def create_verification_tables(cursor) -> None:
+    """验证码表（按手机号覆盖写入）"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS verification_codes (
+            phone VARCHAR(20) PRIMARY KEY,
+            code VARCHAR(10) NOT NULL,
+            expire_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_verification_codes_expire ON verification_codes(expire_at)")
+
+
+class VerificationCodeStore(MutableMapping):
+    """按手机号存取验证码，值为 {'code': ..., 'expire_at': 时间戳}"""
+
+    def __init__(self, get_db: Callable):
+        self.get_db = get_db
+
+    def _execute(self, sql: str, params=()):
+        conn = self.get_db()
+        try:
+            cursor = conn.execute(sql, params)
+            rows = cursor.fetchall()
+            conn.commit()
+            return rows, cursor.rowcount
+        finally:
+            conn.close()
+
+    def __getitem__(self, phone: str) -> Dict:
+        rows, _ = self._execute("SELECT code, expire_at FROM verification_codes WHERE phone = ?", (phone,))
+        if not rows:
+            raise KeyError(phone)
+        return {'code': rows[0][0], 'expire_at': rows[0][1]}
+
+    def __setitem__(self, phone: str, value: Dict) -> None:
+        conn = self.get_db()
+        try:
+            conn.execute("DELETE FROM verification_codes WHERE expire_at < ?", (time.time(),))
+            conn.execute(
+                "INSERT OR REPLACE INTO verification_codes (phone, code, expire_at) VALUES (?, ?, ?)",
+                (phone, value['code'], value['expire_at'])
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def __delitem__(self, phone: str) -> None:
+        self._execute("DELETE FROM verification_codes WHERE phone = ?", (phone,))
+
+    def __contains__(self, phone) -> bool:
+        rows, _ = self._execute("SELECT 1 FROM verification_codes WHERE phone = ?", (phone,))
+        return bool(rows)
+
+    def __iter__(self) -> Iterator[str]:
+        rows, _ = self._execute("SELECT phone FROM verification_codes")
+        return iter([row[0] for row in rows])
+
+    def __len__(self) -> int:
+        rows, _ = self._execute("SELECT COUNT(*) FROM verification_codes")
+        return rows[0][0]
+
+
+def create_verification_store(get_db: Callable, backend: str = VERIFICATION_CODE_BACKEND):
+    """按配置创建验证码存储：sqlite（多 worker 共享）/ memory（仅单进程）"""
+    if backend == 'memory':
+        return {}
+    if backend != 'sqlite':
+        raise ValueError(f"Unknown VERIFICATION_CODE_BACKEND: {backend}")
+    return VerificationCodeStore(get_db)
@@ -0,0 +1,510 @@
+"""
+转账凭证存储
+
+- 上传：multipart 请求体边解析边分片上传到对象存储（S3SyncStorage.trunk_upload_file），不在内存或临时文件中保留完整副本；
+  文件之前的表单字段（如订单号）在写入存储前校验，被拒绝的请求不会留下对象
+- 限制：读取过程中校验大小（超过上限立即中止并放弃分片上传）与类型（按文件头识别 JPG/PNG/PDF，不信任扩展名）
+- 去重：上传时计算 SHA-256，内容相同的凭证复用已有对象，新写入的副本随即删除
+- 后处理：后台线程提取基本元数据（尺寸、PDF 页数）并生成缩略图，不阻塞上传请求；重启后继续处理未完成的凭证
+- 访问：管理员通过预签名 URL 查看原图与缩略图，签名结果在有效期内缓存
+"""
+
+import hashlib
+import io
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from uuid import uuid4
+
+from werkzeug.sansio.multipart import NEED_DATA, Data, Epilogue, Field, File, MultipartDecoder
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# admin-backend 与 src 同仓库部署，对象存储复用 src/storage/s3
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# 单个凭证大小上限（字节）
+MAX_VOUCHER_SIZE = int(os.getenv('VOUCHER_MAX_SIZE', 10 * 1024 * 1024))
+# 普通表单字段大小上限（字节）
+MAX_FIELD_SIZE = 64 * 1024
+# 从请求体读取的块大小
+READ_CHUNK_SIZE = 64 * 1024
+# 缩略图最长边（像素）
+THUMBNAIL_SIZE = 320
+# 预签名 URL 有效期（秒）；缓存比有效期提前 5 分钟失效，避免返回即将过期的链接
+PRESIGN_EXPIRE = 1800
+PRESIGN_CACHE_TTL = PRESIGN_EXPIRE - 300
+# 后处理队列容量
+PROCESS_QUEUE_SIZE = 1000
+
+# 文件头 -> (扩展名, Content-Type)
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'%PDF-', 'pdf', 'application/pdf'),
+)
+ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'pdf'}
+SNIFF_SIZE = max(len(magic) for magic, _, _ in SIGNATURES)
+
+
+class VoucherUploadError(Exception):
+    """上传被拒绝（status 为返回给客户端的 HTTP 状态码）"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def create_voucher_tables(cursor) -> None:
+    """凭证文件表（按 SHA-256 去重）与 transfer_vouchers.file_sha256 字段"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS voucher_files (
+            sha256 CHAR(64) PRIMARY KEY,
+            object_key VARCHAR(500) NOT NULL,
+            content_type VARCHAR(100) NOT NULL,
+            file_size INTEGER NOT NULL,
+            status VARCHAR(20) DEFAULT 'pending',
+            thumbnail_key VARCHAR(500),
+            width INTEGER,
+            height INTEGER,
+            page_count INTEGER,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            processed_at TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_voucher_files_status ON voucher_files(status)")
+    try:
+        cursor.execute("ALTER TABLE transfer_vouchers ADD COLUMN file_sha256 CHAR(64)")
+    except Exception:
+        pass
+
+
+def sniff_type(head: bytes) -> Optional[Tuple[str, str]]:
+    """按文件头识别类型，返回 (扩展名, Content-Type)"""
+    for magic, ext, content_type in SIGNATURES:
+        if head.startswith(magic):
+            return ext, content_type
+    return None
+
+
+def parse_boundary(content_type: Optional[str]) -> bytes:
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    if not content_type or not content_type.startswith('multipart/form-data') or not match:
+        raise VoucherUploadError('请求格式错误，需要 multipart/form-data')
+    return match.group(1).encode('latin-1')
+
+
+class StreamedUpload:
+    """
+    边读边解析的 multipart 上传
+
+    open() 读到文件部分的文件头为止（用于识别类型），随后 chunks() 逐块产出文件内容，
+    同时累计大小与 SHA-256；文件之后的表单字段在 chunks() 结束时收集完毕。
+    """
+
+    def __init__(self, stream, boundary: bytes, file_field: str = 'voucher_file',
+                 max_size: int = MAX_VOUCHER_SIZE):
+        self.stream = stream
+        self.file_field = file_field
+        self.max_size = max_size
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.extension: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.size = 0
+        self.sha256: Optional[str] = None
+        self.object_key: Optional[str] = None
+        self.duplicate = False
+        self._hasher = hashlib.sha256()
+        self._decoder = MultipartDecoder(boundary)
+        self._events = self._iter_events()
+        self._head = b''
+
+    def _iter_events(self) -> Iterator[Tuple[str, bytes]]:
+        """产出 ('file', 数据块)；普通字段直接收集到 self.fields"""
+        field_name = None
+        field_value = bytearray()
+        in_file = False
+        while True:
+            try:
+                event = self._decoder.next_event()
+            except ValueError as e:
+                raise VoucherUploadError(f'请求体不完整: {e}')
+            if event is NEED_DATA:
+                chunk = self.stream.read(READ_CHUNK_SIZE)
+                self._decoder.receive_data(chunk or None)
+                continue
+            if isinstance(event, Field):
+                field_name, in_file = event.name, False
+                field_value.clear()
+            elif isinstance(event, File):
+                field_name = None
+                # 只接收第一个凭证文件，其它文件部分直接丢弃
+                in_file = event.name == self.file_field and self.filename is None
+                if in_file:
+                    self.filename = event.filename
+            elif isinstance(event, Data):
+                if in_file:
+                    if event.data:
+                        yield 'file', event.data
+                elif field_name is not None:
+                    field_value.extend(event.data)
+                    if len(field_value) > MAX_FIELD_SIZE:
+                        raise VoucherUploadError(f'表单字段 {field_name} 过长')
+                    if not event.more_data:
+                        self.fields[field_name] = field_value.decode('utf-8', errors='replace')
+                        field_name = None
+            elif isinstance(event, Epilogue):
+                return
+
+    def _accept(self, data: bytes) -> bytes:
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise VoucherUploadError(f'文件超过 {self.max_size // (1024 * 1024)}MB 限制', 413)
+        self._hasher.update(data)
+        return data
+
+    def open(self) -> 'StreamedUpload':
+        """读到文件头为止并校验文件名与类型"""
+        for _, data in self._events:
+            self._head += self._accept(data)
+            if len(self._head) >= SNIFF_SIZE:
+                break
+        if self.filename is None:
+            raise VoucherUploadError('请上传转账凭证')
+        if not self.filename:
+            raise VoucherUploadError('文件名为空')
+        ext = self.filename.rsplit('.', 1)[-1].lower() if '.' in self.filename else ''
+        if ext not in ALLOWED_EXTENSIONS:
+            raise VoucherUploadError('仅支持JPG、PNG、PDF格式')
+        if not self._head:
+            raise VoucherUploadError('文件内容为空')
+        sniffed = sniff_type(self._head)
+        if sniffed is None:
+            raise VoucherUploadError('文件内容不是有效的JPG、PNG或PDF', 415)
+        self.extension, self.content_type = sniffed
+        return self
+
+    def chunks(self) -> Iterator[bytes]:
+        """产出文件内容（先产出 open() 已读取的文件头）"""
+        if self._head:
+            yield self._head
+            self._head = b''
+        for _, data in self._events:
+            yield self._accept(data)
+        self.sha256 = self._hasher.hexdigest()
+
+
+class PresignedUrlCache:
+    """预签名 URL 缓存（签名需要请求存储代理，列表页每条凭证两个链接）"""
+
+    def __init__(self, sign: Callable[[str], str], ttl: float = PRESIGN_CACHE_TTL):
+        self.sign = sign
+        self.ttl = ttl
+        self._urls: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if not key:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            cached = self._urls.get(key)
+            if cached and cached[1] > now:
+                return cached[0]
+        url = self.sign(key)
+        with self._lock:
+            if len(self._urls) > 10000:
+                self._urls = {k: v for k, v in self._urls.items() if v[1] > now}
+            self._urls[key] = (url, now + self.ttl)
+        return url
+
+
+def extract_metadata(data: bytes, extension: str) -> Dict[str, Optional[int]]:
+    """提取基本元数据（不依赖 Pillow）：图片宽高、PDF 页数"""
+    meta = {'width': None, 'height': None, 'page_count': None}
+    if extension == 'png' and len(data) >= 24:
+        meta['width'] = int.from_bytes(data[16:20], 'big')
+        meta['height'] = int.from_bytes(data[20:24], 'big')
+    elif extension == 'jpg':
+        # 逐段扫描到 SOF 段（C0-CF，排除 C4/C8/CC）
+        pos = 2
+        while pos + 9 <= len(data):
+            if data[pos] != 0xFF:
+                break
+            marker = data[pos + 1]
+            length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                meta['height'] = int.from_bytes(data[pos + 5:pos + 7], 'big')
+                meta['width'] = int.from_bytes(data[pos + 7:pos + 9], 'big')
+                break
+            pos += 2 + length
+    elif extension == 'pdf':
+        meta['page_count'] = len(re.findall(rb'/Type\s*/Page(?!s)', data)) or None
+    return meta
+
+
+def make_thumbnail(data: bytes, extension: str, size: int = THUMBNAIL_SIZE) -> Optional[bytes]:
+    """生成 JPEG 缩略图；未安装 Pillow 或非图片时返回 None"""
+    if Image is None or extension not in ('jpg', 'png'):
+        return None
+    with Image.open(io.BytesIO(data)) as img:
+        # JPEG 在解码阶段按 1/2、1/4、1/8 缩小，避免解码整张大图
+        img.draft('RGB', (size, size))
+        img = img.convert('RGB')
+        img.thumbnail((size, size))
+        out = io.BytesIO()
+        img.save(out, format='JPEG', quality=80, optimize=True)
+        return out.getvalue()
+
+
+class VoucherStore:
+    """凭证上传、去重、后处理与访问"""
+
+    def __init__(self, storage, get_db: Callable, max_size: int = MAX_VOUCHER_SIZE,
+                 thumbnail_size: int = THUMBNAIL_SIZE):
+        self.storage = storage
+        self.get_db = get_db
+        self.max_size = max_size
+        self.thumbnail_size = thumbnail_size
+        self.urls = PresignedUrlCache(
+            lambda key: storage.generate_presigned_url(key=key, expire_time=PRESIGN_EXPIRE)
+        )
+        self._queue: 'queue.Queue[str]' = queue.Queue(maxsize=PROCESS_QUEUE_SIZE)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    # ---------- 上传 ----------
+
+    def receive(self, stream, content_type: Optional[str], content_length: Optional[int],
+                validate: Optional[Callable[[Dict[str, str]], None]] = None) -> StreamedUpload:
+        """
+        解析请求体并把凭证文件流式写入对象存储
+
+        写入的对象尚未登记：调用方校验表单后调用 register() 登记（去重），校验失败调用 discard() 删除。
+
+        Args:
+            validate: 读到文件部分、写入存储之前，用文件之前的表单字段调用；抛出 VoucherUploadError 拒绝请求
+
+        Raises:
+            VoucherUploadError: 请求格式、大小或类型不符合要求，或 validate 拒绝
+        """
+        # 请求体明显超限时不读取直接拒绝（预留表单字段与 multipart 分隔符的空间）
+        if content_length and content_length > self.max_size + MAX_FIELD_SIZE:
+            raise VoucherUploadError(f'文件超过 {self.max_size // (1024 * 1024)}MB 限制', 413)
+        upload = StreamedUpload(stream, parse_boundary(content_type), max_size=self.max_size).open()
+        if validate is not None:
+            validate(upload.fields)
+        upload.object_key = self.storage.trunk_upload_file(
+            chunk_iter=upload.chunks(),
+            file_name=f"voucher_{uuid4().hex}.{upload.extension}",
+            content_type=upload.content_type,
+        )
+        return upload
+
+    def register(self, upload: StreamedUpload) -> str:
+        """按 SHA-256 登记文件；内容已存在时删除本次写入的对象并复用已有对象，返回对象 key"""
+        conn = self.get_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """INSERT OR IGNORE INTO voucher_files (sha256, object_key, content_type, file_size)
+                   VALUES (?, ?, ?, ?)""",
+                (upload.sha256, upload.object_key, upload.content_type, upload.size)
+            )
+            inserted = cursor.rowcount == 1
+            if not inserted:
+                cursor.execute("SELECT object_key FROM voucher_files WHERE sha256 = ?", (upload.sha256,))
+                existing_key = cursor.fetchone()[0]
+            conn.commit()
+        finally:
+            conn.close()
+
+        if inserted:
+            self.schedule(upload.sha256)
+            return upload.object_key
+        self.discard(upload)
+        upload.duplicate = True
+        upload.object_key = existing_key
+        return existing_key
+
+    def discard(self, upload: StreamedUpload) -> None:
+        """删除本次写入但未登记的对象"""
+        if upload.object_key and not upload.duplicate:
+            try:
+                self.storage.delete_file(file_key=upload.object_key)
+            except Exception as e:
+                logger.warning("删除凭证对象失败 %s: %s", upload.object_key, e)
+
+    # ---------- 后处理 ----------
+
+    def start(self) -> None:
+        """启动后处理线程，并重新排队上次未处理完的凭证"""
+        with self._worker_lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name="voucher-processor", daemon=True)
+            self._worker.start()
+        conn = self.get_db()
+        try:
+            rows = conn.execute("SELECT sha256 FROM voucher_files WHERE status = 'pending'").fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            self.schedule(row[0])
+
+    def schedule(self, sha256: str) -> None:
+        """排队后处理（队列满时保留 pending 状态，下次启动时补处理）"""
+        try:
+            self._queue.put_nowait(sha256)
+        except queue.Full:
+            logger.warning("凭证后处理队列已满，稍后补处理: %s", sha256)
+
+    def _run(self) -> None:
+        while True:
+            sha256 = self._queue.get()
+            try:
+                self.process(sha256)
+            except Exception as e:
+                logger.error("凭证后处理失败 %s: %s", sha256, e)
+            finally:
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """等待队列中的后处理完成"""
+        self._queue.join()
+
+    def process(self, sha256: str) -> None:
+        """
+        提取元数据并生成缩略图
+
+        元数据提取失败时标记为 failed；元数据先落库，缩略图生成失败不影响凭证可用
+        （状态仍为 ready，thumbnail_key 为空，错误记入日志与 error 字段）。
+        """
+        conn = self.get_db()
+        try:
+            row = conn.execute(
+                "SELECT object_key, content_type, status FROM voucher_files WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None or row[2] != 'pending':
+                return
+            object_key, content_type = row[0], row[1]
+            extension = next((ext for _, ext, ct in SIGNATURES if ct == content_type), '')
+            try:
+                data = self.storage.read_file(file_key=object_key)
+                meta = extract_metadata(data, extension)
+            except Exception as e:
+                conn.execute(
+                    "UPDATE voucher_files SET status = 'failed', error = ?, processed_at = ? WHERE sha256 = ?",
+                    (str(e)[:500], datetime.now(), sha256)
+                )
+                conn.commit()
+                raise
+            conn.execute(
+                "UPDATE voucher_files SET width = ?, height = ?, page_count = ? WHERE sha256 = ?",
+                (meta['width'], meta['height'], meta['page_count'], sha256)
+            )
+            conn.commit()
+
+            thumbnail_key, error = None, None
+            try:
+                thumbnail = make_thumbnail(data, extension, self.thumbnail_size)
+                if thumbnail is not None:
+                    thumbnail_key = self.storage.upload_file(
+                        file_content=thumbnail,
+                        file_name=f"voucher_thumb_{sha256[:16]}.jpg",
+                        content_type='image/jpeg',
+                    )
+            except Exception as e:
+                error = str(e)[:500]
+                logger.warning("凭证缩略图生成失败 %s: %s", sha256, e)
+            conn.execute(
+                """UPDATE voucher_files SET status = 'ready', thumbnail_key = ?, error = ?, processed_at = ?
+                   WHERE sha256 = ?""",
+                (thumbnail_key, error, datetime.now(), sha256)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---------- 访问 ----------
+
+    def file_urls(self, voucher) -> Dict[str, object]:
+        """
+        凭证的访问链接与元数据（voucher 为关联了 voucher_files 的查询行）
+
+        早期凭证的 image_url 是本地路径（以 / 开头），原样返回。
+        """
+        image_url = voucher['image_url']
+        result = {'image_url': image_url, 'thumbnail_url': None}
+        if voucher['file_sha256'] is None or not image_url or image_url.startswith('/'):
+            return result
+        try:
+            result['image_url'] = self.urls.get(image_url)
+            result['thumbnail_url'] = self.urls.get(voucher['thumbnail_key'])
+        except Exception as e:
+            logger.warning("生成凭证签名链接失败 %s: %s", image_url, e)
+        result['file'] = {
+            'content_type': voucher['content_type'],
+            'size': voucher['file_size'],
+            'width': voucher['width'],
+            'height': voucher['height'],
+            'page_count': voucher['page_count'],
+            'status': voucher['file_status'],
+        }
+        return result
+
+
+# 关联 voucher_files 的查询片段（与 transfer_vouchers 别名 tv 配合使用）
+VOUCHER_FILE_COLUMNS = (
+    "vf.thumbnail_key, vf.content_type, vf.file_size, vf.width, vf.height, vf.page_count, "
+    "vf.status AS file_status"
+)
+VOUCHER_FILE_JOIN = "LEFT JOIN voucher_files vf ON tv.file_sha256 = vf.sha256"
+
+
+_voucher_store: Optional[VoucherStore] = None
+_voucher_store_lock = threading.Lock()
+
+
+def get_voucher_store(get_db: Callable) -> VoucherStore:
+    """获取全局凭证存储（首次调用时连接对象存储并启动后处理线程）"""
+    global _voucher_store
+    if _voucher_store is None:
+        with _voucher_store_lock:
+            if _voucher_store is None:
+                if SRC_DIR not in sys.path:
+                    sys.path.insert(0, SRC_DIR)
+                from storage.s3.s3_storage import S3SyncStorage
+
+                storage = S3SyncStorage(
+                    endpoint_url=os.getenv("COZE_BUCKET_ENDPOINT_URL"),
+                    access_key="",
+                    secret_key="",
+                    bucket_name=os.getenv("COZE_BUCKET_NAME"),
+                    region="cn-beijing",
+                )
+                store = VoucherStore(storage, get_db)
+                store.start()
+                _voucher_store = store
+    return _voucher_store
+
+
+def reset_voucher_store() -> None:
+    """丢弃当前进程的凭证存储（gunicorn worker fork 后调用，后处理线程不会随 fork 复制）"""
+    global _voucher_store
+    with _voucher_store_lock:
+        _voucher_store = None
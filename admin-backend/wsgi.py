@@ -0,0 +1,9 @@
+"""
+WSGI 入口（生产环境）
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+后台服务部署方式基准测试
+
+把 admin-backend 复制到临时目录（含数据库副本，不修改仓库中的文件），分别用两种方式启动：
+1. dev      - Flask 开发服务器（原 app.run(debug=True)，单进程多线程）
+2. gunicorn - gunicorn -c gunicorn.conf.py wsgi:app（多 worker）
+
+--clients 个并发客户端在 --seconds 秒内循环请求：健康检查、管理员登录、系统统计、发送并校验验证码。
+统计吞吐量、各接口延迟，以及验证码校验失败次数（多 worker 下验证码必须跨进程共享）。
+
+用法：
+    python benchmarks/bench_admin_serving.py --clients 32 --seconds 15
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ADMIN_DIR = Path(__file__).resolve().parent.parent / "admin-backend"
+
+DEV_SERVER = (
+    "from app import create_app; "
+    "create_app().run(host='127.0.0.1', port={port}, debug=True, use_reloader=False)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def call(base: str, method: str, path: str, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status, json.loads(resp.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def start_server(mode: str, workdir: Path, port: int) -> subprocess.Popen:
+    env = {**os.environ, "PYTHONUNBUFFERED": "1", "ADMIN_PORT": str(port),
+           "ADMIN_PIDFILE": str(workdir / "gunicorn.pid"), "ADMIN_ACCESS_LOG": "/dev/null"}
+    if mode == "dev":
+        cmd = [sys.executable, "-c", DEV_SERVER.format(port=port)]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            if call(base, "GET", "/api/health")[0] == 200:
+                return proc
+        except OSError:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with code {proc.returncode}")
+        time.sleep(0.1)
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def client(base: str, index: int, deadline: float, latencies, failures, lock):
+    # 每个客户端使用自己的手机号，避免并发发送验证码互相覆盖
+    phone = f"139{index:08d}"
+    call(base, "POST", "/api/register", {"username": f"bench_{index}", "password": "bench123", "phone": phone})
+    _, login = call(base, "POST", "/api/admin/login", {"username": "admin", "password": "admin123"})
+    token = login["data"]["token"]
+    ops = ("health", "login", "stats", "code")
+    i = 0
+    while time.perf_counter() < deadline:
+        op = ops[i % len(ops)]
+        i += 1
+        start = time.perf_counter()
+        if op == "health":
+            status, _ = call(base, "GET", "/api/health")
+        elif op == "login":
+            status, _ = call(base, "POST", "/api/admin/login", {"username": "admin", "password": "admin123"})
+        elif op == "stats":
+            status, _ = call(base, "GET", "/api/admin/stats", token=token)
+        else:
+            status, sent = call(base, "POST", "/api/send-code", {"phone": phone})
+            if status == 200:
+                status, _ = call(base, "POST", "/api/verify-code", {"phone": phone, "code": sent["data"]["code"]})
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies[op].append(elapsed)
+            if status != 200:
+                failures[op] += 1
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+def run(mode: str, clients: int, seconds: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp) / "admin-backend"
+        shutil.copytree(ADMIN_DIR, workdir, ignore=shutil.ignore_patterns("backups", "__pycache__", "admin-backend"))
+        port = free_port()
+        proc = start_server(mode, workdir, port)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            latencies, failures, lock = defaultdict(list), defaultdict(int), threading.Lock()
+            deadline = time.perf_counter() + seconds
+            threads = [threading.Thread(target=client, args=(base, i, deadline, latencies, failures, lock))
+                       for i in range(clients)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            stop_server(proc)
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--modes", default="dev,gunicorn")
+    args = parser.parse_args()
+
+    print(f"clients={args.clients} seconds={args.seconds} cpus={os.cpu_count()}")
+    print(f"{'mode':<10}{'req/s':>9}{'op':>8}{'p50(ms)':>10}{'p99(ms)':>10}{'errors':>8}")
+    for mode in args.modes.split(","):
+        latencies, failures = run(mode, args.clients, args.seconds)
+        total = sum(len(v) for v in latencies.values())
+        for i, op in enumerate(("health", "login", "stats", "code")):
+            values = latencies[op]
+            rps = f"{total / args.seconds:>9.0f}" if i == 0 else " " * 9
+            print(f"{mode if i == 0 else '':<10}{rps}{op:>8}"
+                  f"{percentile(values, 0.5) * 1000:>10.1f}{percentile(values, 0.99) * 1000:>10.1f}{failures[op]:>8}")
+
+
+if __name__ == "__main__":
+    main()
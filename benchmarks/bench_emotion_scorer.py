@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+情绪评分吞吐量基准测试
+
+对比：
+1. legacy   - 原 detect_emotion 的逐关键词 `kw in text` 扫描
+2. single   - EmotionScorer.score 逐条评分
+3. batch    - EmotionScorer.score_batch 单次扫描批量评分
+
+legacy 不处理否定词/程度词，且关键词少时 C 层的 `in` 扫描很快；
+--extra-keywords 可扩充关键词表，观察关键词规模增长时两者的差异。
+
+用法：
+    python benchmarks/bench_emotion_scorer.py --count 20000 --length 80
+    python benchmarks/bench_emotion_scorer.py --extra-keywords 500 --density 0.02
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from utils.emotion import EMOTION_KEYWORDS, EmotionScorer
+
+
+FILLER = "今天工作学习生活朋友家人天气吃饭睡觉周末项目会议计划时间灵值生态"
+
+
+def legacy_score(text: str, table: dict = EMOTION_KEYWORDS) -> dict:
+    """原 detect_emotion 的评分逻辑"""
+    emotion_scores = {emotion: 0.0 for emotion in table}
+    text_lower = text.lower()
+    for emotion, keywords in table.items():
+        for kw in keywords:
+            if kw in text_lower:
+                emotion_scores[emotion] += 0.2
+    return emotion_scores
+
+
+def extend_keywords(extra: int, seed: int = 7) -> dict:
+    """在原关键词表基础上追加随机生成的双字关键词"""
+    rng = random.Random(seed)
+    table = {emotion: list(words) for emotion, words in EMOTION_KEYWORDS.items()}
+    emotions = list(table)
+    for i in range(extra):
+        word = chr(0x4E00 + rng.randrange(0x5000)) + chr(0x4E00 + rng.randrange(0x5000))
+        table[emotions[i % len(emotions)]].append(word)
+    return table
+
+
+def generate_texts(count: int, length: int, density: float = 0.05, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    keywords = [kw for words in EMOTION_KEYWORDS.values() for kw in words]
+    modifiers = ["", "", "", "不", "很", "有点", "非常"]
+    texts = []
+    for _ in range(count):
+        parts = []
+        while sum(len(p) for p in parts) < length:
+            if rng.random() < density:
+                parts.append(rng.choice(modifiers) + rng.choice(keywords))
+            else:
+                parts.append(rng.choice(FILLER))
+        texts.append("".join(parts))
+    return texts
+
+
+def run(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="情绪评分吞吐量基准测试")
+    parser.add_argument("--count", type=int, default=20000, help="文本条数")
+    parser.add_argument("--length", type=int, default=80, help="每条文本长度（字符）")
+    parser.add_argument("--density", type=float, default=0.05, help="每个片段为情绪关键词的概率")
+    parser.add_argument("--extra-keywords", type=int, default=0, help="追加的随机关键词数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最优）")
+    args = parser.parse_args()
+
+    texts = generate_texts(args.count, args.length, args.density)
+    table = extend_keywords(args.extra_keywords)
+    scorer = EmotionScorer(keywords=table)
+
+    results = {
+        "legacy": run(lambda: [legacy_score(t, table) for t in texts], args.repeat),
+        "single": run(lambda: [scorer.score(t) for t in texts], args.repeat),
+        "batch": run(lambda: scorer.score_batch(texts), args.repeat),
+    }
+
+    print(f"文本数: {args.count}  平均长度: {args.length}  关键词数: "
+          f"{sum(len(v) for v in table.values())}")
+    print(f"{'模式':<10}{'耗时(s)':>12}{'吞吐(条/s)':>16}")
+    for name, elapsed in results.items():
+        print(f"{name:<10}{elapsed:>12.4f}{args.count / elapsed:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+/node_run 与 /graph_parameter 重复调用基准测试
+
+构建一个 --nodes 个节点的线性工作流，模拟调试器反复运行同一个节点、反复读取出入参 Schema，对比：
+1. uncached - 每次请求查找节点函数、编译单节点子图、生成 JSON Schema（LangGraphParser 已按图共用，原实现还会每次重新解析）
+2. cached   - GraphArtifactCache（首次编译后复用）
+
+只统计服务端准备开销与一次节点执行，不含 HTTP 与回调。
+
+用法：
+    python benchmarks/bench_node_run.py --nodes 20 --requests 500
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from langgraph.graph import END, StateGraph
+from pydantic import BaseModel, create_model
+
+from utils.helper.graph_cache import GraphArtifactCache, build_inout_schema, compile_node
+
+
+def build_graph(nodes: int):
+    fields = {f"value_{i}": (int, 0) for i in range(nodes + 1)}
+    state_cls = create_model("BenchState", **fields)
+    builder = StateGraph(state_cls)
+    names = []
+    for i in range(nodes):
+        input_cls = create_model(f"Node{i}Input", **{f"value_{i}": (int, 0)})
+        output_cls = create_model(f"Node{i}Output", __base__=BaseModel, **{f"value_{i + 1}": (int, 0)})
+
+        def node(state, _i=i, _out=output_cls):
+            return _out(**{f"value_{_i + 1}": getattr(state, f"value_{_i}") + 1})
+
+        node.__name__ = f"step_{i}"
+        node.__annotations__ = {"state": input_cls, "return": output_cls}
+        builder.add_node(node.__name__, node)
+        names.append(node.__name__)
+    builder.set_entry_point(names[0])
+    for a, b in zip(names, names[1:]):
+        builder.add_edge(a, b)
+    builder.add_edge(names[-1], END)
+    return builder.compile(), names
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(mode: str, graph, node_id: str, requests: int):
+    cache = GraphArtifactCache()
+    node_latencies, schema_latencies = [], []
+    for _ in range(requests):
+        start = time.perf_counter()
+        node = compile_node(graph, node_id) if mode == "uncached" else cache.compiled_node(graph, node_id)
+        await node.graph.ainvoke({"value_0": 1} if node_id == "step_0" else {})
+        node_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        build_inout_schema(graph) if mode == "uncached" else cache.inout_schema(graph)
+        schema_latencies.append(time.perf_counter() - start)
+    return node_latencies, schema_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    graph, names = build_graph(args.nodes)
+    print(f"nodes={args.nodes} requests={args.requests}")
+    print(f"{'mode':<10}{'node p50(ms)':>14}{'node p99(ms)':>14}{'schema p50(ms)':>16}{'schema p99(ms)':>16}")
+    for mode in ("uncached", "cached"):
+        node_latencies, schema_latencies = asyncio.run(run(mode, graph, names[0], args.requests))
+        print(
+            f"{mode:<10}"
+            f"{percentile(node_latencies, 0.5) * 1000:>14.3f}{percentile(node_latencies, 0.99) * 1000:>14.3f}"
+            f"{percentile(schema_latencies, 0.5) * 1000:>16.3f}{percentile(schema_latencies, 0.99) * 1000:>16.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
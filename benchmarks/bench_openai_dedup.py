@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+/v1/chat/completions 请求去重基准测试
+
+模拟 --clients 个客户端在同一时刻发出请求（来自 --distinct 种不同问题，如 FAQ 机器人、健康检查、超时重试），
+每次图运行耗时 --run-ms 毫秒，对比：
+1. direct    - 每个请求各自运行
+2. coalesced - RequestDeduplicator 单飞合并
+3. cached    - 单飞合并 + 响应缓存（temperature=0，第二轮起直接命中）
+
+实际图运行次数即模型调用与工具调用的负载。
+
+用法：
+    python benchmarks/bench_openai_dedup.py --clients 200 --distinct 5 --run-ms 800 --rounds 3
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from utils.openai.dedup import RequestDeduplicator
+
+
+class FakeGraph:
+    """固定耗时的图运行，同时最多 --workers 个（模拟线程池/模型并发上限）"""
+
+    def __init__(self, run_ms: float, workers: int):
+        self.run_seconds = run_ms / 1000
+        self.semaphore = asyncio.Semaphore(workers)
+        self.runs = 0
+
+    async def run(self, question: int) -> dict:
+        async with self.semaphore:
+            self.runs += 1
+            await asyncio.sleep(self.run_seconds)
+            return {"choices": [{"message": {"content": f"answer {question}"}}]}
+
+
+async def one_round(mode: str, graph: FakeGraph, dedup: RequestDeduplicator, clients: int, distinct: int):
+    async def client(index: int) -> float:
+        question = index % distinct
+        start = time.perf_counter()
+        if mode == "direct":
+            await graph.run(question)
+        else:
+            await dedup.run(f"q{question}", lambda: graph.run(question), cacheable=(mode == "cached"))
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(client(i) for i in range(clients)))
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def bench(mode: str, args) -> None:
+    graph = FakeGraph(args.run_ms, args.workers)
+    dedup = RequestDeduplicator(cache_ttl=300 if mode == "cached" else 0)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        latencies.extend(await one_round(mode, graph, dedup, args.clients, args.distinct))
+    elapsed = time.perf_counter() - start
+
+    print(f"{mode:<10} requests={len(latencies):>6}  graph_runs={graph.runs:>6}  "
+          f"p50={percentile(latencies, 0.5) * 1000:>8.1f}ms  p99={percentile(latencies, 0.99) * 1000:>8.1f}ms  "
+          f"wall={elapsed:>6.2f}s")
+    if mode != "direct":
+        totals = dedup.stats()["totals"]
+        print(f"{'':<10} executions={totals['executions']}  coalesced={totals['coalesced']}  "
+              f"cache_hits={totals['cache_hits']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /v1/chat/completions request dedup")
+    parser.add_argument("--clients", type=int, default=200, help="每轮同时发出的请求数")
+    parser.add_argument("--distinct", type=int, default=5, help="不同问题的数量")
+    parser.add_argument("--run-ms", type=float, default=800, help="单次图运行耗时（毫秒）")
+    parser.add_argument("--workers", type=int, default=32, help="同时运行的图数量上限")
+    parser.add_argument("--rounds", type=int, default=3, help="轮数")
+    parser.add_argument("--modes", default="direct,coalesced,cached")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        asyncio.run(bench(mode.strip(), args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+RBAC 权限检查基准测试（移植包 src/auth）
+
+对比：
+1. legacy - User.has_permission 逐角色、逐权限懒加载遍历（每个请求一个新会话）
+2. cached - PermissionResolver 位集 + 按用户缓存（命中时不访问数据库）
+3. miss   - 每次检查前使该用户缓存失效（角色位集已编译），测 selectinload 加载用户角色的代价
+
+在内存 SQLite 中生成数百个权限、若干角色和用户，两种方式的检查结果逐一比对。
+
+用法：
+    python benchmarks/bench_rbac_permissions.py --permissions 500 --roles 20 --roles-per-user 4
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "灵值生态园智能体移植包" / "src" / "auth"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, User, Role, Permission
+from permission_cache import PermissionResolver
+
+
+def build_database(permission_count: int, role_count: int, user_count: int,
+                   roles_per_user: int, seed: int = 42):
+    """生成测试数据，返回 (会话工厂, 用户ID列表, 权限代码列表)"""
+    rng = random.Random(seed)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    permissions = [
+        Permission(code=f"module{i % 20}:action{i}", name=f"权限{i}", module=f"module{i % 20}")
+        for i in range(permission_count)
+    ]
+    db.add_all(permissions)
+    roles = []
+    for i in range(role_count):
+        role = Role(name=f"角色{i}", name_en=f"role{i}", level=4)
+        role.permissions = rng.sample(permissions, rng.randint(1, max(1, permission_count // 4)))
+        roles.append(role)
+    db.add_all(roles)
+
+    users = []
+    for i in range(user_count):
+        user = User(name=f"用户{i}", email=f"user{i}@example.com", password_hash="x")
+        user.roles = rng.sample(roles, min(roles_per_user, role_count))
+        users.append(user)
+    db.add_all(users)
+    db.commit()
+
+    user_ids = [user.id for user in users]
+    codes = [p.code for p in permissions]
+    db.close()
+    return session_factory, user_ids, codes
+
+
+def run(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RBAC 权限检查基准测试")
+    parser.add_argument("--permissions", type=int, default=500, help="权限数")
+    parser.add_argument("--roles", type=int, default=20, help="角色数")
+    parser.add_argument("--users", type=int, default=50, help="用户数")
+    parser.add_argument("--roles-per-user", type=int, default=4, help="每个用户的角色数")
+    parser.add_argument("--checks", type=int, default=2000, help="权限检查次数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最优）")
+    args = parser.parse_args()
+
+    session_factory, user_ids, codes = build_database(
+        args.permissions, args.roles, args.users, args.roles_per_user
+    )
+    rng = random.Random(7)
+    checks = [(rng.choice(user_ids), rng.choice(codes + ["missing:code"])) for _ in range(args.checks)]
+
+    def legacy():
+        results = []
+        for user_id, code in checks:
+            db = session_factory()
+            user = db.get(User, user_id)
+            results.append(user.has_permission(code))
+            db.close()
+        return results
+
+    resolver = PermissionResolver()
+
+    def cached():
+        results = []
+        for user_id, code in checks:
+            db = session_factory()
+            results.append(resolver.has_permission(db, user_id, code))
+            db.close()
+        return results
+
+    def miss():
+        results = []
+        for user_id, code in checks:
+            resolver.invalidate_user(user_id)
+            db = session_factory()
+            results.append(resolver.has_permission(db, user_id, code))
+            db.close()
+        return results
+
+    expected = legacy()
+    assert cached() == expected, "缓存结果与 User.has_permission 不一致"
+    assert miss() == expected, "冷加载结果与 User.has_permission 不一致"
+
+    results = {
+        "legacy": run(legacy, args.repeat),
+        "cached": run(cached, args.repeat),
+        "miss": run(miss, args.repeat),
+    }
+
+    print(f"权限数: {args.permissions}  角色数: {args.roles}  用户数: {args.users}  "
+          f"每用户角色数: {args.roles_per_user}  检查次数: {args.checks}")
+    print(f"{'模式':<10}{'耗时(s)':>12}{'单次(us)':>14}")
+    for name, elapsed in results.items():
+        print(f"{name:<10}{elapsed:>12.4f}{elapsed / args.checks * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+大请求体接收基准测试
+
+构造带长提示词与 base64 附件的 /run 请求体（约 --size-kb KB），经 ASGI 层分片送入，对比：
+1. legacy - 原实现：request.body() 解码为字符串整段写入 JSON 日志，再用 request.json() 解析一次
+2. ingest - RequestIngestionMiddleware：orjson 解析一次，日志只记录大小、哈希与截断内容
+3. gzip   - 同 ingest，客户端以 gzip 发送
+
+日志经生产使用的 JsonFormatter 写入临时文件，统计每个请求的耗时与日志字节数。
+
+用法：
+    python benchmarks/bench_request_ingest.py --size-kb 512 --requests 200
+"""
+
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from utils.ingestion import RequestIngestionMiddleware, body_log_fields, request_payload
+from utils.log.write_log import JsonFormatter
+
+logger = logging.getLogger("bench_request_ingest")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FakeRequest:
+    """处理函数用到的 Request 接口（state、body()、json()）"""
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self._receive = receive
+        self.state = type("State", (), dict(scope.get("state", {})))()
+
+    async def body(self) -> bytes:
+        chunks = []
+        while True:
+            message = await self._receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def json(self):
+        return json.loads(await self.body())
+
+
+async def legacy_app(scope, receive, send):
+    request = FakeRequest(scope, receive)
+    raw_body = await request.body()
+    body_text = raw_body.decode("utf-8")
+    logger.info(f"Received request for /run: run_id=bench, query={{}}, body={body_text}")
+    request._receive = _replay(raw_body)
+    await request.json()
+    await _respond(send)
+
+
+async def ingest_app(scope, receive, send):
+    request = FakeRequest(scope, receive)
+    logger.info(f"Received request for /run: run_id=bench, query={{}}, {body_log_fields(request)}")
+    await request_payload(request)
+    await _respond(send)
+
+
+def _replay(body: bytes):
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    return receive
+
+
+async def _respond(send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def build_body(size_kb: int) -> bytes:
+    attachment = base64.b64encode(os.urandom(size_kb * 1024 * 3 // 8)).decode()
+    prompt = "请根据附件内容总结本季度的用户反馈，并给出改进建议。" * (size_kb * 4)
+    return json.dumps({
+        "session_id": "bench",
+        "messages": [{"role": "user", "content": prompt[: size_kb * 1024 // 6]}],
+        "attachments": [{"name": "report.png", "data": attachment}],
+    }, ensure_ascii=False).encode("utf-8")
+
+
+async def send_request(app, body: bytes, headers):
+    chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+    messages = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "POST", "path": "/run", "headers": headers}
+    await app(scope, receive, send)
+
+
+async def run(mode: str, body: bytes, requests: int):
+    headers = [(b"content-type", b"application/json")]
+    if mode == "legacy":
+        app = legacy_app
+    else:
+        app = RequestIngestionMiddleware(ingest_app)
+    if mode == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+        headers.append((b"content-encoding", b"gzip"))
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await send_request(app, body, headers + [(b"content-length", str(len(body)).encode())])
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    body = build_body(args.size_kb)
+    print(f"body={len(body) / 1024:.0f}KB requests={args.requests}")
+    print(f"{'mode':<8}{'p50(ms)':>10}{'p99(ms)':>10}{'log/req(KB)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("legacy", "ingest", "gzip"):
+            log_path = Path(tmp) / f"{mode}.log"
+            handler = logging.FileHandler(log_path, encoding="utf-8")
+            handler.setFormatter(JsonFormatter())
+            logger.handlers = [handler]
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            latencies = asyncio.run(run(mode, body, args.requests))
+            handler.close()
+            log_kb = log_path.stat().st_size / args.requests / 1024
+            print(
+                f"{mode:<8}{percentile(latencies, 0.5) * 1000:>10.3f}{percentile(latencies, 0.99) * 1000:>10.3f}"
+                f"{log_kb:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
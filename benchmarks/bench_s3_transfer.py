@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+S3 分片上传基准测试（src/storage/s3）
+
+对比：
+1. split-legacy - 原 trunk_upload_file 的切分方式（bytes(buffer[:n]) + buffer = buffer[n:]）
+2. split        - iter_parts（每个分片独立缓冲区，memoryview 拷入）
+3. upload-legacy - 原实现：逐个分片顺序 upload_part
+4. upload        - S3SyncStorage.trunk_upload_file：分片并发上传
+
+上传部分使用 moto 模拟的 S3（需要 pip install boto3 moto），可用 --latency 给每个请求加固定延迟，
+模拟真实网络往返；未安装 moto 时只运行切分对比。
+
+用法：
+    python benchmarks/bench_s3_transfer.py --size-mb 64 --chunk-kb 64 --latency 30 --concurrency 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from storage.s3.transfer import iter_parts
+
+PART_SIZE = 5 * 1024 * 1024
+
+
+def legacy_parts(chunk_iter, part_size):
+    """原 trunk_upload_file 的切分方式"""
+    buffer = bytearray()
+    for chunk in chunk_iter:
+        if not chunk:
+            continue
+        buffer.extend(chunk)
+        while len(buffer) >= part_size:
+            data = bytes(buffer[:part_size])
+            buffer = buffer[part_size:]
+            yield data
+    if len(buffer) > 0:
+        yield bytes(buffer)
+
+
+def run(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_upload(chunks, args, results):
+    try:
+        import boto3
+        try:
+            from moto import mock_aws
+        except ImportError:
+            from moto import mock_s3 as mock_aws
+    except ImportError:
+        print("未安装 boto3/moto，跳过上传对比")
+        return
+
+    from storage.s3.s3_storage import S3SyncStorage
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1",
+                              aws_access_key_id="test", aws_secret_access_key="test")
+        client.create_bucket(Bucket="bench")
+        if args.latency:
+            delay = args.latency / 1000
+
+            def _sleep(**kwargs):
+                time.sleep(delay)
+            client.meta.events.register("before-send.s3", _sleep)
+
+        storage = S3SyncStorage(endpoint_url="http://moto", access_key="test", secret_key="test", bucket_name="bench")
+        storage._client = client
+
+        def upload_legacy():
+            key = "legacy.bin"
+            upload_id = client.create_multipart_upload(Bucket="bench", Key=key)["UploadId"]
+            parts = []
+            for number, data in enumerate(legacy_parts(chunks, PART_SIZE), start=1):
+                resp = client.upload_part(Bucket="bench", Key=key, UploadId=upload_id, PartNumber=number, Body=data)
+                parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+            client.complete_multipart_upload(Bucket="bench", Key=key, UploadId=upload_id,
+                                             MultipartUpload={"Parts": parts})
+
+        def upload():
+            return storage.trunk_upload_file(chunk_iter=chunks, file_name="bench.bin",
+                                             part_size=PART_SIZE, max_concurrency=args.concurrency)
+
+        key = upload()
+        expected = b"".join(chunks)
+        assert storage.read_file(file_key=key) == expected, "上传内容不一致"
+
+        results["upload-legacy"] = run(upload_legacy, args.repeat)
+        results["upload"] = run(upload, args.repeat)
+
+        keys = list(storage.iter_files(page_size=100))
+        assert not storage.delete_files(file_keys=keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="S3 分片上传基准测试")
+    parser.add_argument("--size-mb", type=int, default=64, help="上传数据大小（MB）")
+    parser.add_argument("--chunk-kb", type=int, default=64, help="输入块大小（KB）")
+    parser.add_argument("--latency", type=float, default=0, help="每个 S3 请求附加的延迟（毫秒）")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发分片数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最优）")
+    args = parser.parse_args()
+
+    chunk_size = args.chunk_kb * 1024
+    chunk = os.urandom(chunk_size)
+    chunks = [chunk] * (args.size_mb * 1024 * 1024 // chunk_size)
+
+    assert [bytes(p) for p in iter_parts(chunks, PART_SIZE)] == list(legacy_parts(chunks, PART_SIZE)), \
+        "切分结果不一致"
+
+    results = {
+        "split-legacy": run(lambda: sum(len(p) for p in legacy_parts(chunks, PART_SIZE)), args.repeat),
+        "split": run(lambda: sum(len(p) for p in iter_parts(chunks, PART_SIZE)), args.repeat),
+    }
+    bench_upload(chunks, args, results)
+
+    print(f"数据大小: {args.size_mb}MB  输入块: {args.chunk_kb}KB  分片: {PART_SIZE // 1024 // 1024}MB  "
+          f"延迟: {args.latency}ms  并发: {args.concurrency}")
+    print(f"{'模式':<16}{'耗时(s)':>12}{'吞吐(MB/s)':>14}")
+    for name, elapsed in results.items():
+        print(f"{name:<16}{elapsed:>12.4f}{args.size_mb / elapsed:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+本地 OpenAI 兼容模型服务（压测用）
+
+实现 POST /v1/chat/completions（普通与 stream=true 的 SSE 流式两种返回）和 GET /v1/models，
+按配置的首 token 延迟与逐 token 延迟返回固定内容，不访问任何外部服务。
+压测时把 COZE_INTEGRATION_MODEL_BASE_URL 指向本服务，模型耗时即可控且可复现。
+
+用法：
+    python benchmarks/loadtest/fake_llm.py --port 18080 --first-token-ms 200 --token-ms 20 --tokens 64
+    export COZE_INTEGRATION_MODEL_BASE_URL=http://127.0.0.1:18080/v1
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 逐 token 返回的内容（循环使用）
+TOKENS = ["您好", "，", "我是", "灵值", "智能体", "。", "很高兴", "为您", "服务", "！"]
+
+
+class FakeLLMConfig:
+    """模型服务配置"""
+
+    def __init__(self, first_token_ms: float = 200, token_ms: float = 20, tokens: int = 64,
+                 model: str = "fake-llm"):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.model = model
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """请求处理"""
+
+    protocol_version = "HTTP/1.1"
+    config = FakeLLMConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": self.config.model, "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/health"):
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid json"}})
+            return
+
+        config = self.config
+        count = int(payload.get("max_tokens") or config.tokens)
+        count = max(1, min(count, config.tokens))
+        pieces = [TOKENS[i % len(TOKENS)] for i in range(count)]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = payload.get("model") or config.model
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": count,
+                 "total_tokens": prompt_tokens + count}
+
+        time.sleep(config.first_token_ms / 1000)
+
+        if not payload.get("stream"):
+            time.sleep(config.token_ms * (count - 1) / 1000)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(pieces)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_event(data: str):
+            body = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(body):X}\r\n".encode() + body + b"\r\n")
+            self.wfile.flush()
+
+        for index, piece in enumerate(pieces):
+            if index:
+                time.sleep(config.token_ms / 1000)
+            delta = {"content": piece}
+            if index == 0:
+                delta["role"] = "assistant"
+            send_event(json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+            }, ensure_ascii=False))
+        send_event(json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage
+        }))
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """多线程服务（默认 listen 队列只有 5，高并发建连时会触发 1 秒的 SYN 重传）"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def _make_server(host: str, port: int, config: FakeLLMConfig) -> FakeLLMServer:
+    handler = type("ConfiguredFakeLLMHandler", (FakeLLMHandler,), {"config": config})
+    return FakeLLMServer((host, port), handler)
+
+
+def start_fake_llm(host: str = "127.0.0.1", port: int = 0, config: FakeLLMConfig = None) -> FakeLLMServer:
+    """
+    在后台线程启动模型服务
+
+    Args:
+        host: 监听地址
+        port: 端口（0 表示随机端口）
+        config: 模型服务配置
+
+    Returns:
+        服务对象（server.server_address 为实际地址，server.shutdown() 停止）
+    """
+    server = _make_server(host, port, config or FakeLLMConfig())
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容模型服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=18080, help="端口")
+    parser.add_argument("--first-token-ms", type=float, default=200, help="首 token 延迟（毫秒）")
+    parser.add_argument("--token-ms", type=float, default=20, help="逐 token 延迟（毫秒）")
+    parser.add_argument("--tokens", type=int, default=64, help="每次回复的 token 数")
+    parser.add_argument("--model", default="fake-llm", help="模型名")
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(args.first_token_ms, args.token_ms, args.tokens, args.model)
+    server = _make_server(args.host, args.port, config)
+    print(f"模型服务已启动: http://{args.host}:{args.port}/v1  "
+          f"首token {args.first_token_ms}ms  逐token {args.token_ms}ms  token数 {args.tokens}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
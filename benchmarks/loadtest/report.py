@@ -0,0 +1,193 @@
+"""
+压测报告
+
+- 汇总每个场景的请求数、错误数、吞吐量与延迟分位数（p50/p95/p99）
+- 压测期间按间隔采样被测进程的 RSS（读取 /proc/<pid>/status）
+- 报告带提交哈希，保存为 JSON，可用 run.py compare 对比两次提交的结果
+"""
+
+import json
+import math
+import platform
+import subprocess
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from scenarios import Sample
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """线性插值分位数（sorted_values 已排序）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _latency_summary(values: Iterable[float]) -> Dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "mean": round(sum(values) / len(values) * 1000, 2),
+        "p50": round(percentile(values, 0.50) * 1000, 2),
+        "p95": round(percentile(values, 0.95) * 1000, 2),
+        "p99": round(percentile(values, 0.99) * 1000, 2),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, object]:
+    """汇总一个场景的结果"""
+    ok = [s for s in samples if s.ok]
+    errors: Dict[str, int] = {}
+    for sample in samples:
+        if not sample.ok:
+            errors[sample.error or "unknown"] = errors.get(sample.error or "unknown", 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_types": dict(sorted(errors.items(), key=lambda item: -item[1])[:5]),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": _latency_summary(s.latency for s in ok),
+        "ttfb_ms": _latency_summary(s.ttfb for s in ok if s.ttfb is not None),
+        "bytes_per_request": round(sum(s.bytes for s in ok) / len(ok)) if ok else 0,
+    }
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """读取进程 RSS（MB）；进程不存在时返回 None"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return None
+    return None
+
+
+class RssSampler:
+    """后台线程按间隔采样被测进程 RSS"""
+
+    def __init__(self, pids: Iterable[int], interval: float = 0.5):
+        self.pids = list(pids)
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        values = [read_rss_mb(pid) for pid in self.pids]
+        values = [v for v in values if v is not None]
+        if values:
+            self.samples.append(sum(values))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        if self.pids:
+            self._sample()
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._sample()
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {}
+        return {
+            "start_mb": round(self.samples[0], 1),
+            "end_mb": round(self.samples[-1], 1),
+            "peak_mb": round(max(self.samples), 1),
+            "mean_mb": round(sum(self.samples) / len(self.samples), 1),
+        }
+
+
+def git_commit() -> str:
+    """当前提交哈希（工作区有改动时加 -dirty）"""
+    root = Path(__file__).resolve().parent
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_report(options: Dict[str, object], results: Dict[str, Dict[str, object]]) -> Dict[str, object]:
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "options": options,
+        },
+        "results": results,
+    }
+
+
+def save_report(report: Dict[str, object], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def print_report(report: Dict[str, object]) -> None:
+    meta = report["meta"]
+    print(f"提交: {meta['commit']}  时间: {meta['created_at']}")
+    print(f"{'场景':<14}{'请求':>8}{'错误':>6}{'吞吐(rps)':>11}{'p50(ms)':>10}{'p95(ms)':>10}"
+          f"{'p99(ms)':>10}{'首字节p50':>11}{'RSS峰值(MB)':>13}")
+    for name, result in report["results"].items():
+        latency = result["latency_ms"] or {}
+        ttfb = result["ttfb_ms"] or {}
+        rss = result.get("rss") or {}
+        print(f"{name:<14}{result['requests']:>8}{result['errors']:>6}{result['throughput_rps']:>11.1f}"
+              f"{latency.get('p50', 0):>10.1f}{latency.get('p95', 0):>10.1f}{latency.get('p99', 0):>10.1f}"
+              f"{ttfb.get('p50', 0):>11.1f}{rss.get('peak_mb', 0):>13.1f}")
+        if result["error_types"]:
+            print(f"{'':<14}错误: {result['error_types']}")
+
+
+def compare_reports(base: Dict[str, object], head: Dict[str, object]) -> None:
+    """对比两份报告（head 相对 base 的变化）"""
+    print(f"基线: {base['meta']['commit']}  对比: {head['meta']['commit']}")
+    print(f"{'场景':<14}{'指标':<16}{'基线':>12}{'对比':>12}{'变化':>10}")
+    metrics = [
+        ("throughput_rps", None, "吞吐(rps)"),
+        ("latency_ms", "p50", "p50(ms)"),
+        ("latency_ms", "p95", "p95(ms)"),
+        ("latency_ms", "p99", "p99(ms)"),
+        ("ttfb_ms", "p50", "首字节p50(ms)"),
+        ("rss", "peak_mb", "RSS峰值(MB)"),
+    ]
+    for name in head["results"]:
+        if name not in base["results"]:
+            continue
+        for key, sub, label in metrics:
+            old = base["results"][name].get(key)
+            new = head["results"][name].get(key)
+            if sub is not None:
+                old = (old or {}).get(sub)
+                new = (new or {}).get(sub)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            print(f"{name:<14}{label:<16}{old:>12.1f}{new:>12.1f}{change:>+9.1f}%")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+离线压测入口
+
+在本地起被测服务与假模型服务后运行，全程不访问外部网络：
+
+    # 1. 假模型服务（替代 COZE_INTEGRATION_MODEL_BASE_URL）
+    python benchmarks/loadtest/fake_llm.py --port 18080 --first-token-ms 200 --token-ms 20 &
+    export COZE_INTEGRATION_MODEL_BASE_URL=http://127.0.0.1:18080/v1
+
+    # 2. 生成数据并启动两个后台
+    python benchmarks/loadtest/seed.py --users 10000
+    (cd benchmarks/loadtest/.data && python ../../../admin-backend/app.py) &
+    python src/main.py -p 8000 &
+
+    # 3. 压测（--pid 用于采样被测进程 RSS），报告按提交保存
+    python benchmarks/loadtest/run.py run --scenarios login,checkin,admin_users,admin_search,admin_export \\
+        --concurrency 16 --duration 30 --pid <admin-backend pid> --output benchmarks/loadtest/results/admin.json
+    python benchmarks/loadtest/run.py run --scenarios stream_run,openai_chat --concurrency 8 --duration 30
+
+    # 4. 对比两次提交的结果
+    python benchmarks/loadtest/run.py compare results/base.json results/head.json
+
+场景列表见 python benchmarks/loadtest/run.py list
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from report import RssSampler, build_report, compare_reports, print_report, save_report, summarize
+from scenarios import SCENARIOS, HttpClient, LoadContext
+
+DEFAULT_URLS = {
+    "admin": "http://127.0.0.1:8080",
+    "agent": "http://127.0.0.1:8000",
+    "llm": "http://127.0.0.1:18080/v1",
+}
+
+
+def run_scenario(scenario, ctx: LoadContext, client: HttpClient, concurrency: int,
+                 duration: float, requests: int, warmup: float) -> tuple:
+    """
+    闭环压测：concurrency 个线程各自循环发请求，直到达到时长或总请求数
+
+    Returns:
+        (请求结果列表, 实际耗时)
+    """
+    samples = []
+    lock = threading.Lock()
+    counter = iter(range(10 ** 12))
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = float("inf") if requests else measure_from + duration
+
+    def worker():
+        while True:
+            with lock:
+                index = next(counter)
+            if (requests and index >= requests) or time.perf_counter() >= deadline:
+                return
+            sample = scenario.run(ctx, client, index)
+            if time.perf_counter() >= measure_from:
+                with lock:
+                    samples.append(sample)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - measure_from
+
+
+def cmd_run(args) -> None:
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"未知场景: {', '.join(unknown)}（可用: {', '.join(SCENARIOS)}）")
+
+    urls = dict(DEFAULT_URLS)
+    if args.admin_url:
+        urls["admin"] = args.admin_url
+    if args.agent_url:
+        urls["agent"] = args.agent_url
+    if args.llm_url:
+        urls["llm"] = args.llm_url
+
+    ctx = LoadContext(password=args.password, users=args.users)
+    clients = {target: HttpClient(url, timeout=args.timeout) for target, url in urls.items()}
+    pids = [int(pid) for pid in args.pid.split(",")] if args.pid else []
+
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        client = clients[scenario.target]
+        for setup in scenario.setup:
+            setup(ctx, client)
+        print(f"运行 {name}（{scenario.description}） 并发 {args.concurrency} ...", flush=True)
+        with RssSampler(pids, interval=args.rss_interval) as sampler:
+            samples, elapsed = run_scenario(scenario, ctx, client, args.concurrency,
+                                            args.duration, args.requests, args.warmup)
+        result = summarize(samples, elapsed)
+        result["rss"] = sampler.summary()
+        results[name] = result
+
+    options = {
+        "scenarios": names,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "urls": {target: urls[target] for target in {SCENARIOS[n].target for n in names}},
+    }
+    report = build_report(options, results)
+    print_report(report)
+    if args.output:
+        save_report(report, Path(args.output))
+        print(f"报告已保存: {args.output}")
+
+
+def cmd_compare(args) -> None:
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    head = json.loads(Path(args.head).read_text(encoding="utf-8"))
+    compare_reports(base, head)
+
+
+def cmd_list(args) -> None:
+    for name, scenario in SCENARIOS.items():
+        print(f"{name:<14}{scenario.target:<8}{scenario.description}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线压测")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="运行压测")
+    run.add_argument("--scenarios", default="login", help="场景（逗号分隔）")
+    run.add_argument("--concurrency", type=int, default=8, help="并发数")
+    run.add_argument("--duration", type=float, default=30, help="每个场景的压测时长（秒）")
+    run.add_argument("--requests", type=int, default=0, help="每个场景的总请求数（设置后忽略时长）")
+    run.add_argument("--warmup", type=float, default=2, help="预热时长（秒，不计入结果）")
+    run.add_argument("--timeout", type=float, default=120, help="单个请求超时（秒）")
+    run.add_argument("--admin-url", help=f"admin-backend 地址（默认 {DEFAULT_URLS['admin']}）")
+    run.add_argument("--agent-url", help=f"智能体服务地址（默认 {DEFAULT_URLS['agent']}）")
+    run.add_argument("--llm-url", help=f"假模型服务地址（默认 {DEFAULT_URLS['llm']}）")
+    run.add_argument("--users", type=int, default=10000, help="seed.py 生成的用户数")
+    run.add_argument("--password", default="LoadTest@2026", help="seed.py 使用的密码")
+    run.add_argument("--pid", help="被测进程 PID（逗号分隔，多 worker 时 RSS 取合计）")
+    run.add_argument("--rss-interval", type=float, default=0.5, help="RSS 采样间隔（秒）")
+    run.add_argument("--output", help="报告保存路径（JSON）")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="对比两份报告")
+    compare.add_argument("base", help="基线报告")
+    compare.add_argument("head", help="对比报告")
+    compare.set_defaults(func=cmd_compare)
+
+    listing = sub.add_parser("list", help="列出场景")
+    listing.set_defaults(func=cmd_list)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
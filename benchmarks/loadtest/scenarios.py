@@ -0,0 +1,253 @@
+"""
+压测场景
+
+每个场景是一个 (上下文, 客户端, 序号) -> Sample 的函数，由 run.py 在多个工作线程中循环调用。
+场景按目标服务分组：
+- admin: admin-backend（Flask，默认 http://127.0.0.1:8080）
+- agent: src/main.py（FastAPI，默认 http://127.0.0.1:8000）
+- llm:   fake_llm.py 本身（校准用，衡量压测端与模型服务的基线开销）
+"""
+
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from seed import ADMIN_USERNAME, USER_PREFIX
+
+
+@dataclass
+class Sample:
+    """单次请求结果"""
+    ok: bool
+    status: int
+    latency: float
+    ttfb: Optional[float] = None
+    bytes: int = 0
+    error: Optional[str] = None
+
+
+class HttpClient:
+    """按线程复用 keep-alive 连接的 HTTP 客户端（只依赖标准库）"""
+
+    def __init__(self, base_url: str, timeout: float = 60):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def request(self, method: str, path: str, *, json_body: Any = None, params: Dict[str, Any] = None,
+                headers: Dict[str, str] = None, stream: bool = False,
+                ok_statuses: Tuple[int, ...] = (200,)) -> Tuple[Sample, bytes]:
+        """
+        发送请求
+
+        Args:
+            stream: 为 True 时逐块读取响应并记录首字节时间（SSE 等流式接口）
+
+        Returns:
+            (请求结果, 响应体)
+        """
+        url = self.prefix + path
+        if params:
+            url += "?" + urlencode(params)
+        body = None
+        send_headers = dict(headers or {})
+        if json_body is not None:
+            body = json.dumps(json_body, ensure_ascii=False).encode("utf-8")
+            send_headers["Content-Type"] = "application/json"
+
+        start = time.perf_counter()
+        try:
+            conn = self._connection()
+            conn.request(method, url, body=body, headers=send_headers)
+            resp = conn.getresponse()
+            ttfb = None
+            if stream:
+                chunks = []
+                while True:
+                    chunk = resp.read1(65536) if hasattr(resp, "read1") else resp.read(65536)
+                    if not chunk:
+                        break
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - start
+                    chunks.append(chunk)
+                data = b"".join(chunks)
+            else:
+                data = resp.read()
+                ttfb = None
+            latency = time.perf_counter() - start
+            if resp.getheader("Connection", "").lower() == "close":
+                self._reset()
+            ok = resp.status in ok_statuses
+            return Sample(ok=ok, status=resp.status, latency=latency, ttfb=ttfb, bytes=len(data),
+                          error=None if ok else f"HTTP {resp.status}"), data
+        except Exception as e:
+            self._reset()
+            return Sample(ok=False, status=0, latency=time.perf_counter() - start,
+                          error=f"{type(e).__name__}: {e}"), b""
+
+
+@dataclass
+class LoadContext:
+    """场景共享上下文（setup 阶段准备的 token 等）"""
+    password: str
+    users: int
+    admin_token: Optional[str] = None
+    user_tokens: List[str] = field(default_factory=list)
+    prompt: str = "你好，介绍一下灵值生态园"
+    rng: random.Random = field(default_factory=lambda: random.Random(7))
+
+    def random_user(self) -> str:
+        return f"{USER_PREFIX}{self.rng.randint(1, self.users)}"
+
+    def user_token(self, index: int) -> str:
+        return self.user_tokens[index % len(self.user_tokens)]
+
+    def auth(self, token: Optional[str]) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def _login(client: HttpClient, path: str, username: str, password: str) -> Optional[str]:
+    sample, data = client.request("POST", path, json_body={"username": username, "password": password})
+    if not sample.ok:
+        return None
+    body = json.loads(data or b"{}")
+    token = body.get("token") or (body.get("data") or {}).get("token")
+    return token
+
+
+def setup_admin(ctx: LoadContext, client: HttpClient) -> None:
+    """登录管理员"""
+    ctx.admin_token = _login(client, "/api/admin/login", ADMIN_USERNAME, ctx.password)
+    if not ctx.admin_token:
+        raise RuntimeError(f"管理员 {ADMIN_USERNAME} 登录失败，请先用 seed.py 生成数据并以该数据库启动后台")
+
+
+def setup_users(ctx: LoadContext, client: HttpClient, count: int = 50) -> None:
+    """预先登录一批用户，供签到/对话场景使用"""
+    for i in range(1, min(count, ctx.users) + 1):
+        token = _login(client, "/api/login", f"{USER_PREFIX}{i}", ctx.password)
+        if token:
+            ctx.user_tokens.append(token)
+    if not ctx.user_tokens:
+        raise RuntimeError("用户登录失败，请先用 seed.py 生成数据并以该数据库启动后台")
+
+
+# ---------- admin-backend ----------
+
+def login(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    return client.request("POST", "/api/login",
+                          json_body={"username": ctx.random_user(), "password": ctx.password})[0]
+
+
+def checkin(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    # 同一用户当天重复签到返回 400（已签到），同样是完整的一次请求
+    return client.request("POST", "/api/checkin", headers=ctx.auth(ctx.user_token(index)),
+                          ok_statuses=(200, 400))[0]
+
+
+def admin_users(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    page = ctx.rng.randint(1, max(1, ctx.users // 20))
+    return client.request("GET", "/api/admin/users", params={"page": page, "limit": 20},
+                          headers=ctx.auth(ctx.admin_token))[0]
+
+
+def admin_search(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    keyword = str(ctx.rng.randint(1, ctx.users))
+    return client.request("GET", "/api/admin/users/search", params={"keyword": keyword, "limit": 20},
+                          headers=ctx.auth(ctx.admin_token))[0]
+
+
+def admin_export(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    return client.request("GET", "/api/admin/users/export", headers=ctx.auth(ctx.admin_token), stream=True)[0]
+
+
+def chat(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    return client.request("POST", "/api/chat", json_body={"message": ctx.prompt, "agent_id": 1},
+                          headers=ctx.auth(ctx.user_token(index)))[0]
+
+
+# ---------- src/main.py ----------
+
+def stream_run(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    payload = {
+        "type": "query",
+        "session_id": f"loadtest-{index % 100}",
+        "local_msg_id": uuid.uuid4().hex,
+        "content": {"query": {"prompt": [{"type": "text", "content": {"text": ctx.prompt}}]}},
+    }
+    return client.request("POST", "/stream_run", json_body=payload, stream=True)[0]
+
+
+def openai_chat(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    payload = {
+        "model": "lingzhi-agent",
+        "stream": True,
+        "messages": [{"role": "user", "content": ctx.prompt}],
+        "session_id": f"loadtest-{index % 100}",
+    }
+    return client.request("POST", "/v1/chat/completions", json_body=payload, stream=True)[0]
+
+
+def openai_faq(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    # 不带 session_id 的相同非流式请求，并发时合并为一次图运行
+    payload = {
+        "model": "lingzhi-agent",
+        "temperature": 0,
+        "messages": [{"role": "user", "content": ctx.prompt}],
+    }
+    return client.request("POST", "/v1/chat/completions", json_body=payload)[0]
+
+
+# ---------- fake_llm.py ----------
+
+def fake_llm(ctx: LoadContext, client: HttpClient, index: int) -> Sample:
+    payload = {"model": "fake-llm", "stream": True, "messages": [{"role": "user", "content": ctx.prompt}]}
+    return client.request("POST", "/chat/completions", json_body=payload, stream=True)[0]
+
+
+@dataclass
+class Scenario:
+    """压测场景"""
+    name: str
+    target: str
+    run: Callable[[LoadContext, HttpClient, int], Sample]
+    setup: Tuple[Callable[[LoadContext, HttpClient], None], ...] = ()
+    description: str = ""
+
+
+SCENARIOS: Dict[str, Scenario] = {s.name: s for s in [
+    Scenario("login", "admin", login, (), "用户登录（密码校验 + 生成 token）"),
+    Scenario("checkin", "admin", checkin, (setup_users,), "每日签到"),
+    Scenario("admin_users", "admin", admin_users, (setup_admin,), "管理后台用户列表分页"),
+    Scenario("admin_search", "admin", admin_search, (setup_admin,), "管理后台用户搜索"),
+    Scenario("admin_export", "admin", admin_export, (setup_admin,), "管理后台导出全部用户"),
+    Scenario("chat", "admin", chat, (setup_users,), "/api/chat 智能体对话"),
+    Scenario("stream_run", "agent", stream_run, (), "/stream_run SSE 流式运行"),
+    Scenario("openai_chat", "agent", openai_chat, (), "/v1/chat/completions 流式"),
+    Scenario("openai_faq", "agent", openai_faq, (), "/v1/chat/completions 无会话相同请求（单飞合并/响应缓存）"),
+    Scenario("fake_llm", "llm", fake_llm, (), "直连本地模型服务（基线）"),
+]}
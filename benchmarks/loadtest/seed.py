@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+压测数据生成（admin-backend 的 lingzhi_ecosystem.db）
+
+从 admin-backend/lingzhi_ecosystem.db 复制表结构与少量配置表（智能体、角色权限、会员等级、充值档位等），
+在新的数据库文件中生成指定数量的用户、签到记录、对话和推荐关系，不修改开发库本身。
+
+生成的账号：
+- 管理员 loadtest_admin / 用户 loadtest_user_<n>，密码均为 --password
+- 所有用户共用一个密码哈希（bcrypt 只计算一次），登录时的校验开销与真实账号相同
+- 用户关闭登录短信验证（require_phone_verification=0），登录场景直接走密码校验
+
+用法：
+    python benchmarks/loadtest/seed.py --db benchmarks/loadtest/.data/lingzhi_ecosystem.db \\
+        --users 10000 --checkins 20 --conversations 5000 --referrals 8000
+    # 以生成的数据库启动后台（app.py 使用当前目录下的 lingzhi_ecosystem.db）
+    cd benchmarks/loadtest/.data && python ../../../admin-backend/app.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+SOURCE_DB = REPO_ROOT / "admin-backend" / "lingzhi_ecosystem.db"
+DEFAULT_DB = Path(__file__).resolve().parent / ".data" / "lingzhi_ecosystem.db"
+
+# 原样复制的配置表
+REFERENCE_TABLES = (
+    "agents", "roles", "permissions", "role_permissions",
+    "member_levels", "recharge_tiers", "company_accounts",
+)
+
+ADMIN_USERNAME = "loadtest_admin"
+USER_PREFIX = "loadtest_user_"
+
+# 每次 executemany 的行数
+BATCH_SIZE = 5000
+
+QUESTIONS = ["你好，你是谁？", "怎么获得灵值？", "签到有什么奖励？", "合伙人有哪些权益？", "如何兑换贡献值？"]
+ANSWERS = ["你好呀！我是灵值生态园的智能助手。", "每日签到、参与项目、推荐好友都可以获得灵值。",
+           "每天签到可获得10灵值，连续签到有额外奖励。", "合伙人享有推荐分红、优先参与项目等权益。",
+           "贡献值可按 1:0.1 兑换为人民币。"]
+
+
+def hash_password(password: str, scheme: str) -> str:
+    if scheme == "bcrypt":
+        import bcrypt
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def copy_schema(source: sqlite3.Connection, target: sqlite3.Connection) -> None:
+    """复制表、索引结构与配置表数据"""
+    objects = source.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+        "ORDER BY CASE type WHEN 'table' THEN 0 ELSE 1 END"
+    ).fetchall()
+    for _, _, sql in objects:
+        target.execute(sql)
+
+    for table in REFERENCE_TABLES:
+        rows = source.execute(f"SELECT * FROM {table}").fetchall()
+        if rows:
+            placeholders = ", ".join("?" * len(rows[0]))
+            target.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+    target.commit()
+
+
+def insert_batches(conn: sqlite3.Connection, sql: str, rows) -> int:
+    """分批插入（rows 为生成器，内存中最多保留一批）"""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany(sql, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        total += len(batch)
+    conn.commit()
+    return total
+
+
+def seed(db_path: Path, users: int, checkins: int, conversations: int, referrals: int,
+         password: str, scheme: str, seed_value: int = 42) -> dict:
+    """
+    生成压测数据库
+
+    Returns:
+        各表生成的行数
+    """
+    rng = random.Random(seed_value)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    if db_path.exists():
+        db_path.unlink()
+
+    source = sqlite3.connect(f"file:{SOURCE_DB}?mode=ro", uri=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    copy_schema(source, conn)
+    source.close()
+
+    password_hash = hash_password(password, scheme)
+    now = datetime.now()
+    counts = {}
+
+    conn.execute("INSERT INTO admins (username, password_hash, role) VALUES (?, ?, 'super_admin')",
+                 (ADMIN_USERNAME, password_hash))
+
+    def user_rows():
+        for i in range(1, users + 1):
+            created = now - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86399))
+            yield (f"{USER_PREFIX}{i}", f"{USER_PREFIX}{i}@example.com", f"138{i:08d}"[-11:],
+                   password_hash, rng.randint(0, 50000), created.isoformat(sep=" "), "active", 0)
+
+    counts["users"] = insert_batches(
+        conn,
+        "INSERT INTO users (username, email, phone, password_hash, total_lingzhi, created_at, status, "
+        "require_phone_verification) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        user_rows()
+    )
+    first_id = conn.execute("SELECT MIN(id) FROM users WHERE username LIKE ?", (f"{USER_PREFIX}%",)).fetchone()[0]
+    user_ids = range(first_id, first_id + users)
+
+    # 签到记录从昨天往前排，不占用今天，签到场景仍能走完整的签到流程
+    def checkin_rows():
+        yesterday = date.today() - timedelta(days=1)
+        for user_id in user_ids:
+            for offset in sorted(rng.sample(range(365), min(checkins, 365))):
+                yield user_id, (yesterday - timedelta(days=offset)).isoformat(), 10
+
+    counts["checkin_records"] = insert_batches(
+        conn,
+        "INSERT INTO checkin_records (user_id, checkin_date, lingzhi_earned) VALUES (?, ?, ?)",
+        checkin_rows()
+    )
+
+    def conversation_rows():
+        for i in range(conversations):
+            turns = rng.randint(1, 10)
+            messages = []
+            for _ in range(turns):
+                k = rng.randrange(len(QUESTIONS))
+                messages.append({"role": "user", "content": QUESTIONS[k], "timestamp": now.isoformat()})
+                messages.append({"role": "assistant", "content": ANSWERS[k], "timestamp": now.isoformat()})
+            yield (1, rng.choice(user_ids), f"loadtest-{i}", json.dumps(messages, ensure_ascii=False),
+                   messages[0]["content"])
+
+    counts["conversations"] = insert_batches(
+        conn,
+        "INSERT INTO conversations (agent_id, user_id, conversation_id, messages, title) VALUES (?, ?, ?, ?, ?)",
+        conversation_rows()
+    )
+
+    # 推荐关系：被推荐人唯一，推荐人 ID 小于被推荐人，形成多级推荐链
+    def referral_rows():
+        referees = rng.sample(list(user_ids)[1:], min(referrals, users - 1))
+        for referee in referees:
+            yield rng.randrange(first_id, referee), referee, 1, "active"
+
+    counts["referral_relationships"] = insert_batches(
+        conn,
+        "INSERT INTO referral_relationships (referrer_id, referee_id, level, status) VALUES (?, ?, ?, ?)",
+        referral_rows()
+    )
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="压测数据生成")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="生成的数据库路径（已存在时覆盖）")
+    parser.add_argument("--users", type=int, default=10000, help="用户数")
+    parser.add_argument("--checkins", type=int, default=20, help="每个用户的历史签到数")
+    parser.add_argument("--conversations", type=int, default=5000, help="对话数")
+    parser.add_argument("--referrals", type=int, default=8000, help="推荐关系数")
+    parser.add_argument("--password", default="LoadTest@2026", help="所有账号的密码")
+    parser.add_argument("--hash", choices=["bcrypt", "sha256"], default="bcrypt", help="密码哈希方式")
+    args = parser.parse_args()
+
+    if args.db.resolve() == SOURCE_DB.resolve():
+        sys.exit("不能覆盖开发库 admin-backend/lingzhi_ecosystem.db")
+
+    start = time.perf_counter()
+    counts = seed(args.db, args.users, args.checkins, args.conversations, args.referrals,
+                  args.password, args.hash)
+    print(f"已生成: {args.db}  耗时 {time.perf_counter() - start:.1f}s")
+    for table, count in counts.items():
+        print(f"  {table:<24}{count:>10}")
+    print(f"管理员: {ADMIN_USERNAME}  用户: {USER_PREFIX}1..{args.users}  密码: {args.password}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+-- =====================================================
+-- 灵值智能体 - 审计日志索引
+-- 版本: PostgreSQL
+-- 创建日期: 2026年1月25日
+-- 说明: 异常操作检测按 用户 + 操作类型 + 时间 过滤审计日志，
+--       该组合索引避免审计日志增长后退化为全表扫描
+-- =====================================================
+
+-- 用户 + 操作类型 + 创建时间 组合索引（CONCURRENTLY 不阻塞审计日志写入）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audit_logs_user_id_action_created_at
+    ON audit_logs(user_id, action, created_at);
+
+-- 完成提示
+DO $$
+BEGIN
+    RAISE NOTICE '========================================';
+    RAISE NOTICE '审计日志索引创建完成';
+    RAISE NOTICE '  - ix_audit_logs_user_id_action_created_at';
+    RAISE NOTICE '========================================';
+END $$;
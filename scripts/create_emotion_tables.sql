@@ -20,6 +20,7 @@ CREATE TABLE IF NOT EXISTS emotion_records (
 CREATE INDEX IF NOT EXISTS ix_emotion_records_user_id ON emotion_records(user_id);
 CREATE INDEX IF NOT EXISTS ix_emotion_records_created_at ON emotion_records(created_at);
 CREATE INDEX IF NOT EXISTS ix_emotion_records_emotion ON emotion_records(emotion);
+CREATE INDEX IF NOT EXISTS ix_emotion_records_user_id_created_at ON emotion_records(user_id, created_at);
 
 -- 添加情绪记录表注释
 COMMENT ON TABLE emotion_records IS '情绪记录表';
@@ -62,6 +63,41 @@ COMMENT ON COLUMN emotion_diaries.created_at IS '日记创建时间';
 
 -- =====================================================
 
+-- 创建情绪日汇总表（用户 × 日期 × 情绪，写入情绪记录时增量更新）
+CREATE TABLE IF NOT EXISTS emotion_daily_rollups (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    stat_date DATE NOT NULL,
+    emotion VARCHAR(20) NOT NULL,
+    emotion_name VARCHAR(20) NOT NULL,
+    record_count INTEGER NOT NULL DEFAULT 0,
+    intensity_sum FLOAT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    CONSTRAINT uq_emotion_daily_rollups_user_date_emotion UNIQUE (user_id, stat_date, emotion)
+);
+
+-- 创建情绪日汇总表索引
+CREATE INDEX IF NOT EXISTS ix_emotion_daily_rollups_user_id_stat_date ON emotion_daily_rollups(user_id, stat_date);
+
+-- 添加情绪日汇总表注释
+COMMENT ON TABLE emotion_daily_rollups IS '情绪日汇总表';
+COMMENT ON COLUMN emotion_daily_rollups.stat_date IS '统计日期';
+COMMENT ON COLUMN emotion_daily_rollups.record_count IS '当日记录数';
+COMMENT ON COLUMN emotion_daily_rollups.intensity_sum IS '当日强度总和';
+
+-- 根据已有情绪记录回填日汇总表（可重复执行）
+INSERT INTO emotion_daily_rollups (user_id, stat_date, emotion, emotion_name, record_count, intensity_sum)
+SELECT user_id, DATE(created_at), emotion, MAX(emotion_name), COUNT(*), SUM(intensity)
+FROM emotion_records
+GROUP BY user_id, DATE(created_at), emotion
+ON CONFLICT (user_id, stat_date, emotion) DO UPDATE
+SET record_count = EXCLUDED.record_count,
+    intensity_sum = EXCLUDED.intensity_sum,
+    emotion_name = EXCLUDED.emotion_name,
+    updated_at = now();
+
+-- =====================================================
+
 -- 验证表创建成功
 SELECT
     table_name,
@@ -72,7 +108,7 @@ FROM (
         tablename AS table_name,
         obj_description((schemaname || '.' || tablename)::regclass, 'pg_class') AS table_comment
     FROM pg_tables
-    WHERE tablename IN ('emotion_records', 'emotion_diaries')
+    WHERE tablename IN ('emotion_records', 'emotion_diaries', 'emotion_daily_rollups')
     AND schemaname = 'public'
 ) AS t;
 
@@ -83,7 +119,7 @@ SELECT
     idx_scan AS index_scans,
     idx_tup_read AS tuples_read
 FROM pg_stat_user_indexes
-WHERE tablename IN ('emotion_records', 'emotion_diaries')
+WHERE tablename IN ('emotion_records', 'emotion_diaries', 'emotion_daily_rollups')
 ORDER BY tablename, indexname;
 
 -- =====================================================
@@ -106,5 +142,6 @@ BEGIN
     RAISE NOTICE '已创建的表:';
     RAISE NOTICE '  - emotion_records (情绪记录表)';
     RAISE NOTICE '  - emotion_diaries (情绪日记表)';
+    RAISE NOTICE '  - emotion_daily_rollups (情绪日汇总表)';
     RAISE NOTICE '========================================';
 END $$;
@@ -30,7 +30,18 @@
 5. 资源变现系统：匹配→参与→完成→奖励→分润的完整变现流程
 6. 数字资产系统：NFT管理、交易、收益分析
 
-工具总数：25个（情绪陪伴14个 + 资源生态11个）
+【说明类工具】
+经济模型、兑换规则、新用户权益、合伙人权益、收款方式说明、公司信息等结果只随参数和低频数据变化，
+由 utils.tool_cache 按工具缓存（公司信息在 company_info 表写入后自动失效）
+
+【上下文窗口】
+每次调用模型前由 agents.context_window 按 token 预算整理历史：省略已消费的长工具结果，
+超出预算时把最早的轮次并入滚动摘要；MAX_MESSAGES 仍作为条数上限
+
+【工具执行】
+同一步中的多个工具调用并发执行，agents.tool_execution 按工具限制并发数与超时，并记录每次调用耗时
+
+工具总数：33个（情绪陪伴15个 + 资源生态11个 + 说明类7个）
 """
 
 import os
@@ -43,6 +54,14 @@ from langgraph.graph.message import add_messages
 from langchain_core.messages import AnyMessage
 from coze_coding_utils.runtime_ctx.context import default_headers
 from storage.memory.memory_saver import get_memory_saver
+from agents.context_window import (
+    CONTEXT_SUMMARY_MAX_TOKENS,
+    CONTEXT_SUMMARY_MODE,
+    ContextWindowMiddleware,
+    LLMSummarizer,
+    cap_messages,
+)
+from agents.tool_execution import ToolExecutionMiddleware
 
 # 导入核心工具
 from tools.knowledge_retrieval_tool import retrieve_knowledge
@@ -55,6 +74,7 @@ from tools.emotion_tools import (
     detect_emotion,
     record_emotion,
     get_emotion_statistics,
+    get_emotion_trend,
     create_emotion_diary,
     get_emotion_diaries,
     analyze_emotion_pattern
@@ -85,15 +105,26 @@ from tools.digital_asset_tools import (
     calculate_asset_return
 )
 
+# 导入经济模型与说明类工具（结果由 utils.tool_cache 缓存）
+from tools.economic_model_tool import (
+    get_economic_model_info,
+    get_exchange_info_advanced,
+    get_new_user_bonus_info,
+    compare_investment_options
+)
+from tools.partner_tool import get_partner_privileges
+from tools.payment_method_tool import get_payment_method_notice
+from tools.financial_management_tool import get_company_info
+
 # 配置文件路径
 LLM_CONFIG = "config/agent_llm_config.json"
 
-# 默认保留最近 20 轮对话 (40 条消息)
+# 最多保留 40 条消息（按 token 预算的整理见 ContextWindowMiddleware）
 MAX_MESSAGES = 40
 
 def _windowed_messages(old, new):
-    """滑动窗口: 只保留最近 MAX_MESSAGES 条消息"""
-    return add_messages(old, new)[-MAX_MESSAGES:]  # type: ignore
+    """滑动窗口: 最多保留 MAX_MESSAGES 条消息，截断点对齐到用户消息"""
+    return cap_messages(add_messages(old, new), MAX_MESSAGES)  # type: ignore
 
 class AgentState(MessagesState):
     """Agent状态，使用滑动窗口管理消息"""
@@ -142,7 +173,7 @@ def build_agent(ctx=None):
         default_headers=default_headers(ctx) if ctx else {}
     )
     
-    # 定义工具列表（情绪陪伴14个 + 资源生态11个 = 25个）
+    # 定义工具列表（情绪陪伴16个 + 资源生态11个 + 说明类7个 = 34个）
     tools = [
         # === 情绪陪伴系统工具 ===
         retrieve_knowledge,           # 知识库检索
@@ -150,6 +181,7 @@ def build_agent(ctx=None):
         detect_emotion,               # 情绪识别
         record_emotion,               # 情绪记录
         get_emotion_statistics,       # 情绪统计
+        get_emotion_trend,            # 情绪趋势
         create_emotion_diary,         # 创建情绪日记
         get_emotion_diaries,          # 获取情绪日记
         analyze_emotion_pattern,      # 分析情绪模式
@@ -178,12 +210,39 @@ def build_agent(ctx=None):
         match_project_resources,      # 资源智能匹配
         join_project,                 # 参与项目
         analyze_project_opportunity,  # 分析项目机会
+        
+        # 经济模型与说明（带结果缓存）
+        get_economic_model_info,      # 经济模型核心信息
+        get_exchange_info_advanced,   # 兑换规则详情
+        get_new_user_bonus_info,      # 新用户权益
+        compare_investment_options,   # 即时兑换与锁定增值对比
+        get_partner_privileges,       # 合伙人权益
+        get_payment_method_notice,    # 收款方式设置说明
+        get_company_info,             # 公司信息
     ]
     
+    # 滚动摘要：非流式、关闭深度思考，输出长度受摘要上限限制
+    summarizer = None
+    if CONTEXT_SUMMARY_MODE == "llm":
+        summarizer = LLMSummarizer(ChatOpenAI(
+            model=cfg['config'].get("model"),
+            api_key=api_key,
+            base_url=base_url,
+            temperature=0.3,
+            max_tokens=CONTEXT_SUMMARY_MAX_TOKENS * 2,
+            timeout=cfg['config'].get('max_completion_tokens', 10000) / 10,
+            extra_body={"thinking": {"type": "disabled"}},
+            default_headers=default_headers(ctx) if ctx else {}
+        ))
+    
     return create_agent(
         model=llm,
         system_prompt=cfg.get("sp"),
         tools=tools,
         checkpointer=get_memory_saver(),
         state_schema=AgentState,
+        middleware=[
+            ContextWindowMiddleware(max_messages=MAX_MESSAGES, summarizer=summarizer),
+            ToolExecutionMiddleware(),
+        ],
     )
@@ -0,0 +1,450 @@
+"""
+对话上下文窗口管理
+
+AgentState 的 reducer 只按条数截断（MAX_MESSAGES），一次知识库检索或联网搜索的结果就可能有几千 token，
+40 条消息的窗口既可能远超模型预算，也可能在对话很短时就丢掉早期内容。
+ContextWindowMiddleware 在每次调用模型前按 token 预算整理历史：
+
+- 已消费的工具结果（之前轮次的 ToolMessage）超过 CONTEXT_TOOL_RESULT_MAX_TOKENS 时只保留开头
+- 历史超出 CONTEXT_TOKEN_BUDGET（或条数接近 MAX_MESSAGES）时，从最早的完整轮次开始移出窗口，
+  直到降到预算的 CONTEXT_TARGET_RATIO；移出的轮次与之前的摘要合并成一条滚动摘要消息放在窗口最前面
+- 只在用户消息处切分，不会拆开 AI 的 tool_calls 与对应的 ToolMessage
+- 每次调用记录完整历史与实际发送的 token 数，节省量写入 utils.metrics，并以 context_window 自定义事件写入运行追踪
+
+token 数按字符估算（中日韩字符约 1 token/字，其余约 4 字符/token），不依赖具体模型的分词器。
+整理结果写回会话状态，摘要只在移出轮次时生成一次，之后的调用直接复用。
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+# 历史消息（不含系统提示词）的 token 预算
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+
+# 超出预算时移出旧轮次，直到降到预算的这个比例（留出余量，避免每次调用都重新摘要）
+CONTEXT_TARGET_RATIO = float(os.getenv("CONTEXT_TARGET_RATIO", "0.6"))
+
+# 已消费的工具结果最多保留的 token 数
+CONTEXT_TOOL_RESULT_MAX_TOKENS = int(os.getenv("CONTEXT_TOOL_RESULT_MAX_TOKENS", "300"))
+
+# 滚动摘要的最大 token 数
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "600"))
+
+# 摘要方式：llm（调用模型生成，失败时退回抽取式）或 extractive（不调用模型）
+CONTEXT_SUMMARY_MODE = os.getenv("CONTEXT_SUMMARY_MODE", "llm")
+
+# 每条消息的固定开销（角色、分隔符）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 图片等非文本内容块按固定 token 数计算
+NON_TEXT_BLOCK_TOKENS = 256
+
+# 追踪中的自定义事件名
+TRACE_EVENT_NAME = "context_window"
+
+# 摘要消息与被省略的工具结果在 additional_kwargs 中的标记（不会发送给模型）
+SUMMARY_KEY = "context_summary"
+REPLACED_TOKENS_KEY = "replaced_tokens"
+ELIDED_TOKENS_KEY = "elided_tokens"
+
+SUMMARY_PREFIX = "以下是此前对话的摘要：\n\n"
+
+SUMMARY_PROMPT = """请把下面的对话整理成简洁的中文摘要，供后续对话参考。
+保留：用户的身份与偏好、提到的情绪和重要事件、资源/项目/资产等关键数据、已完成的操作和尚未解决的问题。
+不要寒暄，不要编造内容，不超过 {max_tokens} 字。
+
+已有摘要：
+{previous}
+
+新增对话：
+{conversation}"""
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+Summarizer = Callable[[str, Sequence[AnyMessage]], str]
+
+
+# ---------- token 估算 ----------
+
+def _is_cjk(char: str) -> bool:
+    return _CJK_RE.match(char) is not None
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的 token 数"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content or []:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and block.get("type") == "text":
+            parts.append(block.get("text", ""))
+    return "".join(parts)
+
+
+def message_tokens(message: AnyMessage) -> int:
+    """估算单条消息的 token 数（含工具调用参数）"""
+    content = message.content
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(_content_text(content))
+    if not isinstance(content, str):
+        tokens += NON_TEXT_BLOCK_TOKENS * sum(
+            1 for block in content or [] if isinstance(block, dict) and block.get("type") != "text"
+        )
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(call.get("name", "") + json.dumps(call.get("args", {}), ensure_ascii=False))
+    return tokens
+
+
+def count_tokens(messages: Sequence[AnyMessage]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+def _original_tokens(message: AnyMessage) -> int:
+    """消息整理前的 token 数（被省略的工具结果取省略前的值，摘要取其替代的内容）"""
+    kwargs = message.additional_kwargs
+    if kwargs.get(SUMMARY_KEY):
+        return int(kwargs.get(REPLACED_TOKENS_KEY, 0))
+    if ELIDED_TOKENS_KEY in kwargs:
+        return int(kwargs[ELIDED_TOKENS_KEY])
+    return message_tokens(message)
+
+
+# ---------- 轮次切分 ----------
+
+def is_summary(message: AnyMessage) -> bool:
+    return bool(message.additional_kwargs.get(SUMMARY_KEY))
+
+
+def _is_turn_start(message: AnyMessage) -> bool:
+    return isinstance(message, HumanMessage) and not is_summary(message)
+
+
+def _split_summary(messages: Sequence[AnyMessage]) -> Tuple[Optional[AnyMessage], List[AnyMessage]]:
+    if messages and is_summary(messages[0]):
+        return messages[0], list(messages[1:])
+    return None, list(messages)
+
+
+def cap_messages(messages: Sequence[AnyMessage], max_messages: int) -> List[AnyMessage]:
+    """
+    按条数截断（AgentState 的 reducer 使用）
+
+    保留开头的摘要消息；截断点向后对齐到用户消息，避免窗口以 ToolMessage 或半截工具调用开头。
+    """
+    if len(messages) <= max_messages:
+        return list(messages)
+    summary, body = _split_summary(messages)
+    head = [summary] if summary is not None else []
+    start = len(body) - (max_messages - len(head))
+    for i in range(start, len(body)):
+        if _is_turn_start(body[i]):
+            start = i
+            break
+    else:
+        # 当前轮次本身超出上限：至少不以 ToolMessage 开头
+        while start < len(body) and isinstance(body[start], ToolMessage):
+            start += 1
+    return head + body[start:]
+
+
+# ---------- 工具结果省略 ----------
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    budget = float(max_tokens)
+    for i, char in enumerate(text):
+        budget -= 1 if _is_cjk(char) else 0.25
+        if budget < 0:
+            return text[:i]
+    return text
+
+
+def elide_tool_results(messages: Sequence[AnyMessage], max_tokens: int) -> Tuple[List[AnyMessage], int]:
+    """
+    省略已消费的工具结果（最后一条用户消息之前的 ToolMessage）
+
+    Returns:
+        (新的消息列表, 被省略的工具结果条数)；消息 id 不变，写回状态时原地替换
+    """
+    last_turn = max((i for i, message in enumerate(messages) if _is_turn_start(message)), default=-1)
+    result = list(messages)
+    elided = 0
+    for i in range(last_turn):
+        message = result[i]
+        if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+            continue
+        if ELIDED_TOKENS_KEY in message.additional_kwargs:
+            continue
+        tokens = estimate_tokens(message.content)
+        if tokens <= max_tokens:
+            continue
+        content = _truncate_to_tokens(message.content, max_tokens).rstrip()
+        content += f"\n…（工具结果较长，已省略约 {tokens - estimate_tokens(content)} tokens，需要时请重新调用工具）"
+        result[i] = message.model_copy(update={
+            "content": content,
+            "additional_kwargs": {**message.additional_kwargs, ELIDED_TOKENS_KEY: message_tokens(message)},
+        })
+        elided += 1
+    return result, elided
+
+
+# ---------- 摘要 ----------
+
+def _clip(text: str, max_tokens: int) -> str:
+    text = " ".join(text.split())
+    clipped = _truncate_to_tokens(text, max_tokens)
+    return clipped if clipped == text else clipped + "…"
+
+
+def _previous_summary(summary: Optional[AnyMessage]) -> str:
+    if summary is None:
+        return ""
+    text = _content_text(summary.content)
+    return text[len(SUMMARY_PREFIX):] if text.startswith(SUMMARY_PREFIX) else text
+
+
+def extractive_summary(previous: str, messages: Sequence[AnyMessage],
+                       max_tokens: int = CONTEXT_SUMMARY_MAX_TOKENS) -> str:
+    """不调用模型的摘要：每条用户/助手消息保留开头，记录调用过的工具；超出长度时丢弃最早的行"""
+    lines = previous.splitlines() if previous else []
+    for message in messages:
+        text = _content_text(message.content)
+        if isinstance(message, HumanMessage):
+            lines.append("用户：" + _clip(text, 60))
+        elif isinstance(message, AIMessage):
+            names = [call.get("name", "") for call in message.tool_calls]
+            if names:
+                lines.append("调用工具：" + "、".join(names))
+            if text.strip():
+                lines.append("助手：" + _clip(text, 60))
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def _format_transcript(messages: Sequence[AnyMessage]) -> str:
+    lines = []
+    for message in messages:
+        text = _content_text(message.content)
+        if isinstance(message, HumanMessage):
+            lines.append("用户：" + text)
+        elif isinstance(message, AIMessage):
+            for call in message.tool_calls:
+                lines.append(f"助手调用工具 {call.get('name', '')}：{json.dumps(call.get('args', {}), ensure_ascii=False)}")
+            if text.strip():
+                lines.append("助手：" + text)
+        elif isinstance(message, ToolMessage):
+            lines.append(f"工具 {message.name or ''} 返回：" + _clip(text, 200))
+    return "\n".join(lines)
+
+
+class LLMSummarizer:
+    """用模型生成滚动摘要；调用失败或返回为空时退回抽取式摘要"""
+
+    def __init__(self, model, max_tokens: int = CONTEXT_SUMMARY_MAX_TOKENS):
+        # nostream：摘要调用不进入 stream_mode="messages" 的输出
+        self.model = model.with_config(tags=[TAG_NOSTREAM], run_name="context_summary")
+        self.max_tokens = max_tokens
+
+    def __call__(self, previous: str, messages: Sequence[AnyMessage]) -> str:
+        prompt = SUMMARY_PROMPT.format(
+            max_tokens=self.max_tokens,
+            previous=previous or "（无）",
+            conversation=_format_transcript(messages),
+        )
+        try:
+            response = self.model.invoke([HumanMessage(content=prompt)])
+            text = _content_text(response.content).strip()
+            if text:
+                return text
+        except Exception as e:
+            logger.warning(f"生成对话摘要失败，改用抽取式摘要: {e}")
+        return extractive_summary(previous, messages, self.max_tokens)
+
+
+# ---------- 窗口整理 ----------
+
+@dataclass
+class ContextStats:
+    """一次模型调用前的上下文整理结果"""
+
+    full_tokens: int = 0          # 不做任何整理时的历史 token 数
+    sent_tokens: int = 0          # 实际发送的历史 token 数
+    saved_by_tool_results: int = 0
+    saved_by_summary: int = 0
+    elided_tool_results: int = 0  # 本次新省略的工具结果条数
+    evicted_messages: int = 0     # 本次移入摘要的消息条数
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.full_tokens - self.sent_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "full_tokens": self.full_tokens,
+            "sent_tokens": self.sent_tokens,
+            "saved_tokens": self.saved_tokens,
+            "saved_by_tool_results": self.saved_by_tool_results,
+            "saved_by_summary": self.saved_by_summary,
+            "elided_tool_results": self.elided_tool_results,
+            "evicted_messages": self.evicted_messages,
+        }
+
+
+def _measure(messages: Sequence[AnyMessage], stats: ContextStats) -> None:
+    stats.sent_tokens = stats.full_tokens = 0
+    stats.saved_by_tool_results = stats.saved_by_summary = 0
+    for message in messages:
+        sent = message_tokens(message)
+        original = _original_tokens(message)
+        stats.sent_tokens += sent
+        stats.full_tokens += max(original, sent)
+        if is_summary(message):
+            stats.saved_by_summary += max(original - sent, 0)
+        else:
+            stats.saved_by_tool_results += max(original - sent, 0)
+
+
+@dataclass
+class ContextWindow:
+    """按 token 预算整理消息历史"""
+
+    budget: int = CONTEXT_TOKEN_BUDGET
+    target_ratio: float = CONTEXT_TARGET_RATIO
+    tool_result_max_tokens: int = CONTEXT_TOOL_RESULT_MAX_TOKENS
+    max_messages: int = 40
+    summarizer: Optional[Summarizer] = None
+    summary_max_tokens: int = CONTEXT_SUMMARY_MAX_TOKENS
+
+    def _over(self, messages: Sequence[AnyMessage], tokens: int, ratio: float) -> bool:
+        return tokens > self.budget * ratio or len(messages) > self.max_messages * ratio
+
+    def apply(self, messages: Sequence[AnyMessage]) -> Tuple[Optional[List[AnyMessage]], ContextStats]:
+        """
+        Returns:
+            (整理后的完整消息列表，未改动时为 None, 统计)
+        """
+        stats = ContextStats()
+        result, stats.elided_tool_results = elide_tool_results(messages, self.tool_result_max_tokens)
+        changed = stats.elided_tool_results > 0
+
+        # 条数按 3/4 触发：赶在 reducer 的硬截断之前把旧轮次并入摘要
+        if self._over(result, count_tokens(result), 1.0) or len(result) > self.max_messages * 3 // 4:
+            evicted = self._evict(result)
+            if evicted is not None:
+                result, stats.evicted_messages = evicted
+                changed = True
+
+        _measure(result, stats)
+        return (result if changed else None), stats
+
+    def _evict(self, messages: List[AnyMessage]) -> Optional[Tuple[List[AnyMessage], int]]:
+        """把最早的若干轮次并入摘要，返回 (新的消息列表, 移出的消息条数)"""
+        summary, body = _split_summary(messages)
+        turn_starts = [i for i, message in enumerate(body) if _is_turn_start(message)]
+        if not turn_starts or turn_starts[-1] == 0:
+            return None  # 只有当前一轮，无可移出的内容
+
+        # 从最早的轮次开始移出，直到剩余部分降到目标比例（当前轮次始终保留）
+        summary_reserve = self.summary_max_tokens + MESSAGE_OVERHEAD_TOKENS
+        cut = 0
+        for start in turn_starts:
+            if start == 0:
+                continue
+            cut = start
+            rest = body[cut:]
+            if not self._over(rest, count_tokens(rest) + summary_reserve, self.target_ratio):
+                break
+
+        evicted, kept = body[:cut], body[cut:]
+        previous = _previous_summary(summary)
+        summarize = self.summarizer or (
+            lambda prev, msgs: extractive_summary(prev, msgs, self.summary_max_tokens)
+        )
+        text = summarize(previous, evicted)
+        replaced = (_original_tokens(summary) if summary is not None else 0) + sum(
+            _original_tokens(message) for message in evicted
+        )
+        new_summary = HumanMessage(
+            content=SUMMARY_PREFIX + text,
+            id=str(uuid.uuid4()),
+            additional_kwargs={SUMMARY_KEY: True, REPLACED_TOKENS_KEY: replaced},
+        )
+        return [new_summary] + kept, len(evicted)
+
+
+def _record(stats: ContextStats) -> None:
+    """写入指标与运行追踪（不在运行上下文中时忽略追踪）"""
+    from utils.metrics import CONTEXT_PROMPT_TOKENS, CONTEXT_SUMMARIES, CONTEXT_TOKENS_SAVED
+
+    CONTEXT_PROMPT_TOKENS.observe(stats.full_tokens, "full")
+    CONTEXT_PROMPT_TOKENS.observe(stats.sent_tokens, "sent")
+    if stats.saved_by_tool_results:
+        CONTEXT_TOKENS_SAVED.inc("tool_result", amount=stats.saved_by_tool_results)
+    if stats.saved_by_summary:
+        CONTEXT_TOKENS_SAVED.inc("summary", amount=stats.saved_by_summary)
+    if stats.evicted_messages:
+        CONTEXT_SUMMARIES.inc()
+    try:
+        from langchain_core.callbacks.manager import dispatch_custom_event
+        dispatch_custom_event(TRACE_EVENT_NAME, stats.to_dict())
+    except Exception:
+        pass
+
+
+class ContextWindowMiddleware(AgentMiddleware):
+    """在每次调用模型前按 token 预算整理会话历史，整理结果写回状态"""
+
+    def __init__(self, window: Optional[ContextWindow] = None, **kwargs: Any):
+        super().__init__()
+        self.window = window or ContextWindow(**kwargs)
+
+    def before_model(self, state, runtime) -> Optional[dict]:
+        messages = state["messages"]
+        for message in messages:
+            if message.id is None:
+                message.id = str(uuid.uuid4())
+        new_messages, stats = self.window.apply(messages)
+        _record(stats)
+        if stats.evicted_messages or stats.elided_tool_results:
+            logger.info(f"上下文整理: {stats.to_dict()}")
+        if new_messages is None:
+            return None
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *new_messages]}
+
+
+__all__ = [
+    "CONTEXT_SUMMARY_MAX_TOKENS",
+    "CONTEXT_SUMMARY_MODE",
+    "CONTEXT_TOKEN_BUDGET",
+    "ContextStats",
+    "ContextWindow",
+    "ContextWindowMiddleware",
+    "LLMSummarizer",
+    "cap_messages",
+    "count_tokens",
+    "elide_tool_results",
+    "estimate_tokens",
+    "extractive_summary",
+    "message_tokens",
+]
@@ -0,0 +1,166 @@
+"""
+工具执行层
+
+模型在一步中给出多个工具调用时（如 get_user_resources + get_project_list + retrieve_knowledge），
+create_agent 把每个调用作为同一步内的独立任务并发执行；各工具多是阻塞的 HTTP / 数据库调用，
+需要在并发下有边界。ToolExecutionMiddleware 包装每次工具调用：
+
+- 在有界线程池（TOOL_EXECUTOR_WORKERS）中执行，超过超时时间直接返回错误结果，不让一个慢工具拖住整步
+- 按工具限制同时执行的调用数（全进程共享），保护联网搜索、知识库等有配额的下游服务
+- 排队等待也计入超时；超时的调用在后台执行完后才释放名额
+- 耗时写入 ToolMessage.response_metadata["time_cost_ms"]，随流式输出的工具结果返回
+- ToolMessage 在状态中的顺序与模型给出的调用顺序一致（由 LangGraph 按任务顺序合并写入保证）
+
+超时与并发上限见 TOOL_TIMEOUTS / TOOL_CONCURRENCY，未单独配置的工具使用默认值。
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+
+logger = logging.getLogger(__name__)
+
+# 执行工具调用的线程数（全进程共享）
+TOOL_EXECUTOR_WORKERS = int(os.getenv("TOOL_EXECUTOR_WORKERS", "16"))
+
+# 默认超时（秒，含排队时间）
+TOOL_DEFAULT_TIMEOUT = float(os.getenv("TOOL_DEFAULT_TIMEOUT", "30"))
+
+# 默认每个工具同时执行的调用数
+TOOL_DEFAULT_CONCURRENCY = int(os.getenv("TOOL_DEFAULT_CONCURRENCY", "8"))
+
+# 单独设置超时的工具（秒）
+TOOL_TIMEOUTS: Dict[str, float] = {
+    "search_web": 20,
+    "retrieve_knowledge": 15,
+}
+
+# 单独设置并发上限的工具（依赖外部服务，有调用配额）
+TOOL_CONCURRENCY: Dict[str, int] = {
+    "search_web": 4,
+    "retrieve_knowledge": 4,
+}
+
+# 写入 ToolMessage.response_metadata 的耗时字段
+TIME_COST_KEY = "time_cost_ms"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """工具调用线程池（懒加载单例）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="agent-tool")
+    return _executor
+
+
+def _error_message(request, content: str) -> ToolMessage:
+    call = request.tool_call
+    return ToolMessage(content=content, tool_call_id=call["id"], name=call["name"], status="error")
+
+
+def _with_time_cost(result: Any, started: float) -> Any:
+    if not isinstance(result, ToolMessage):
+        return result  # Command 等其它返回值原样透传
+    time_cost_ms = int((time.perf_counter() - started) * 1000)
+    return result.model_copy(update={"response_metadata": {**result.response_metadata, TIME_COST_KEY: time_cost_ms}})
+
+
+class ToolExecutionMiddleware(AgentMiddleware):
+    """按工具限制并发与超时执行工具调用，并记录耗时"""
+
+    def __init__(
+        self,
+        timeouts: Optional[Dict[str, float]] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+        default_timeout: float = TOOL_DEFAULT_TIMEOUT,
+        default_concurrency: int = TOOL_DEFAULT_CONCURRENCY,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        super().__init__()
+        self.timeouts = TOOL_TIMEOUTS if timeouts is None else timeouts
+        self.concurrency = TOOL_CONCURRENCY if concurrency is None else concurrency
+        self.default_timeout = default_timeout
+        self.default_concurrency = default_concurrency
+        self._executor = executor
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._limits_lock = threading.Lock()
+
+    def _limit(self, tool_name: str) -> threading.BoundedSemaphore:
+        limit = self._limits.get(tool_name)
+        if limit is None:
+            with self._limits_lock:
+                limit = self._limits.get(tool_name)
+                if limit is None:
+                    size = self.concurrency.get(tool_name, self.default_concurrency)
+                    limit = self._limits[tool_name] = threading.BoundedSemaphore(size)
+        return limit
+
+    def _timeout(self, tool_name: str) -> float:
+        return self.timeouts.get(tool_name, self.default_timeout)
+
+    def _record_rejection(self, tool_name: str, reason: str, timeout: float) -> None:
+        from utils.metrics import TOOL_REJECTIONS
+        TOOL_REJECTIONS.inc(tool_name, reason)
+        logger.warning(f"工具 {tool_name} {'排队' if reason == 'busy' else '执行'}超过 {timeout}s，返回超时结果")
+
+    def _busy(self, request, timeout: float) -> ToolMessage:
+        name = request.tool_call["name"]
+        self._record_rejection(name, "busy", timeout)
+        return _error_message(request, f"工具 {name} 当前繁忙，等待超过 {timeout:g} 秒，请稍后重试")
+
+    def _timed_out(self, request, timeout: float) -> ToolMessage:
+        name = request.tool_call["name"]
+        self._record_rejection(name, "timeout", timeout)
+        return _error_message(request, f"工具 {name} 执行超时（{timeout:g} 秒），请稍后重试或换一种方式")
+
+    def wrap_tool_call(self, request, handler: Callable) -> Any:
+        name = request.tool_call["name"]
+        timeout = self._timeout(name)
+        started = time.perf_counter()
+        limit = self._limit(name)
+        if not limit.acquire(timeout=timeout):
+            return _with_time_cost(self._busy(request, timeout), started)
+
+        # 在线程池中执行，保留当前运行上下文（回调、自定义事件、ToolRuntime 依赖 contextvars）
+        context = contextvars.copy_context()
+        future = (self._executor or get_tool_executor()).submit(context.run, handler, request)
+        future.add_done_callback(lambda _: limit.release())
+        try:
+            result = future.result(timeout=max(timeout - (time.perf_counter() - started), 0))
+        except FutureTimeoutError:
+            # 线程无法中断：调用在后台继续执行，结束后释放名额
+            result = self._timed_out(request, timeout)
+        return _with_time_cost(result, started)
+
+    async def awrap_tool_call(self, request, handler: Callable) -> Any:
+        name = request.tool_call["name"]
+        timeout = self._timeout(name)
+        started = time.perf_counter()
+        limit = self._limit(name)
+        loop = asyncio.get_running_loop()
+        if not limit.acquire(blocking=False):
+            acquired = await loop.run_in_executor(None, lambda: limit.acquire(timeout=timeout))
+            if not acquired:
+                return _with_time_cost(self._busy(request, timeout), started)
+
+        task = asyncio.ensure_future(handler(request))
+        task.add_done_callback(lambda _: limit.release())
+        done, _ = await asyncio.wait({task}, timeout=max(timeout - (time.perf_counter() - started), 0))
+        if task in done:
+            return _with_time_cost(task.result(), started)
+        task.cancel()
+        return _with_time_cost(self._timed_out(request, timeout), started)
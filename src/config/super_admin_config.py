@@ -6,7 +6,7 @@
 
 from typing import Dict, Any, Optional, List
 from enum import Enum
-from coze_coding_dev_sdk.database import get_session
+from storage.database.db import get_session
 from storage.database.shared.model import Users
 
 
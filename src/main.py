@@ -10,13 +10,13 @@ import cozeloop
 import uvicorn
 import time
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from langchain_core.runnables import RunnableConfig
-from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
 
 from coze_coding_utils.runtime_ctx.context import new_context, Context
 from utils.helper import graph_helper
+from utils.helper.graph_cache import NODE_RUN_WARMUP, GraphArtifactCache
 from utils.log.node_log import LOG_FILE
 from utils.log.write_log import setup_logging, request_context
 from utils.log.config import LOG_LEVEL
@@ -26,6 +26,18 @@ from utils.messages.server import (
     MESSAGE_END_CODE_CANCELED,
 )
 from utils.error import ErrorClassifier, classify_error
+from utils.run_registry import RunRegistry
+from utils.ingestion import RequestIngestionMiddleware, body_log_fields, request_payload
+from storage.database.db import run_session_scope
+from utils.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    HTTP_FIRST_BYTE,
+    HTTP_REQUEST_DURATION,
+    REGISTRY as METRICS,
+    HttpMetricsMiddleware,
+    render_metrics,
+    track_stream_queue,
+)
 
 setup_logging(
     log_file=LOG_FILE,
@@ -43,7 +55,6 @@ from utils.helper.agent_helper import (
     agent_iter_server_messages,
 )
 from utils.openai.handler import OpenAIChatHandler
-from utils.log.parser import LangGraphParser
 from utils.log.err_trace import extract_core_stack
 from utils.log.loop_trace import init_run_config, init_agent_config
 
@@ -53,11 +64,17 @@ TIMEOUT_SECONDS = 900  # 15分钟
 
 class GraphService:
     def __init__(self):
+        # 单节点子图与出入参 Schema 缓存（/node_run、/graph_parameter）
+        self.graph_cache = GraphArtifactCache()
         if not graph_helper.is_agent_proj():
             self.graph = graph_helper.get_graph_instance("graphs.graph")
+            if NODE_RUN_WARMUP:
+                t0 = time.time()
+                compiled = self.graph_cache.warm_up(self.graph)
+                logger.info(f"Precompiled {compiled} nodes in {time.time() - t0:.2f}s")
 
-        # 用于跟踪正在运行的任务（使用asyncio.Task）
-        self.running_tasks: Dict[str, asyncio.Task] = {}
+        # 正在运行的任务（本进程的 asyncio.Task + 共享存储中的归属与取消标记，/cancel 可跨 worker 生效）
+        self.runs = RunRegistry()
         # 错误分类器
         self.error_classifier = ErrorClassifier()
 
@@ -81,17 +98,18 @@ class GraphService:
         stream_input = to_stream_input(client_msg)
         t0 = time.time()
         try:
-            items = self._get_graph(ctx).stream(stream_input, stream_mode="messages", config=run_config, context=ctx)
-            server_msgs_iter = agent_iter_server_messages(
-                items,
-                session_id=client_msg.session_id,
-                query_msg_id=client_msg.local_msg_id,
-                local_msg_id=client_msg.local_msg_id,
-                run_id=ctx.run_id,
-                log_id=ctx.logid,
-            )
-            for sm in server_msgs_iter:
-                yield sm.dict()
+            with run_session_scope():
+                items = self._get_graph(ctx).stream(stream_input, stream_mode="messages", config=run_config, context=ctx)
+                server_msgs_iter = agent_iter_server_messages(
+                    items,
+                    session_id=client_msg.session_id,
+                    query_msg_id=client_msg.local_msg_id,
+                    local_msg_id=client_msg.local_msg_id,
+                    run_id=ctx.run_id,
+                    log_id=ctx.logid,
+                )
+                for sm in server_msgs_iter:
+                    yield sm.dict()
         except asyncio.CancelledError:
             logger.info(f"Stream cancelled for run_id: {ctx.run_id}")
             end_msg = create_message_end_dict(
@@ -137,7 +155,9 @@ class GraphService:
 
             # 直接调用，LangGraph会在当前任务上下文中执行
             # 如果当前任务被取消，LangGraph的执行也会被取消
-            return await graph.ainvoke(payload, config=run_config, context=ctx)
+            # 本次运行内的工具共用数据库会话范围
+            with run_session_scope():
+                return await graph.ainvoke(payload, config=run_config, context=ctx)
 
         except asyncio.CancelledError:
             logger.info(f"Run {run_id} was cancelled")
@@ -155,7 +175,7 @@ class GraphService:
             raise
         finally:
             # 清理任务记录
-            self.running_tasks.pop(run_id, None)
+            self.runs.unregister(run_id)
 
     # 流式运行（SSE 格式化）：HTTP 路由使用
     async def stream_sse(self, payload: Dict[str, Any], ctx=None) -> AsyncGenerator[str, None]:
@@ -175,7 +195,7 @@ class GraphService:
                 yield self._sse_event(chunk)
         finally:
             # 清理任务记录
-            self.running_tasks.pop(run_id, None)
+            self.runs.unregister(run_id)
             cozeloop.flush()
 
     # 取消执行 - 使用asyncio的标准方式
@@ -185,66 +205,31 @@ class GraphService:
 
         使用asyncio.Task.cancel()来取消任务,这是标准的Python异步取消机制。
         LangGraph会在节点之间检查CancelledError,实现优雅的取消。
+        运行在其它 worker 上时设置共享取消标记，由所属 worker 的监听协程取消对应任务。
         """
         logger.info(f"Attempting to cancel run_id: {run_id}")
-
-        # 查找对应的任务
-        if run_id in self.running_tasks:
-            task = self.running_tasks[run_id]
-            if not task.done():
-                # 使用asyncio的标准取消机制
-                # 这会在下一个await点抛出CancelledError
-                task.cancel()
-                logger.info(f"Cancellation requested for run_id: {run_id}")
-                return {
-                    "status": "success",
-                    "run_id": run_id,
-                    "message": "Cancellation signal sent, task will be cancelled at next await point"
-                }
-            else:
-                logger.info(f"Task already completed for run_id: {run_id}")
-                return {
-                    "status": "already_completed",
-                    "run_id": run_id,
-                    "message": "Task has already completed"
-                }
-        else:
-            logger.warning(f"No active task found for run_id: {run_id}")
-            return {
-                "status": "not_found",
-                "run_id": run_id,
-                "message": "No active task found with this run_id. Task may have already completed or run_id is invalid."
-            }
+        return self.runs.cancel(run_id)
 
     # 运行指定节点：本地/HTTP 通用
     async def run_node(self, node_id: str, payload: Dict[str, Any], ctx=None) -> Any:
         if ctx is None or Context.run_id == "":
             ctx = new_context(method="node_run")
 
-        node_func, input_cls, output_cls = graph_helper.get_graph_node_func_with_inout(self.graph.get_graph(), node_id)
-        if node_func is None or input_cls is None:
-            raise KeyError(f"node_id '{node_id}' not found")
         assert self.graph is not None, "Graph is not initialized"
-        parser = LangGraphParser(self.graph)
-        metadata = parser.get_node_metadata(node_id) or {}
-
-        _g = StateGraph(input_cls, input_schema=input_cls, output_schema=output_cls)
-        _g.add_node("sn", node_func, metadata=metadata)
-        _g.set_entry_point("sn")
-        _g.add_edge("sn", END)
-        _graph = _g.compile()
+        # 单节点子图按 (图版本, node_id) 缓存，只在首次请求时编译
+        node = self.graph_cache.compiled_node(self.graph, node_id)
+        if node is None:
+            raise KeyError(f"node_id '{node_id}' not found")
 
-        run_config = init_run_config(_graph, ctx)
-        return await _graph.ainvoke(payload, config=run_config)
+        run_config = init_run_config(node.graph, ctx)
+        with run_session_scope():
+            return await node.graph.ainvoke(payload, config=run_config)
 
     # 获取工作流的出入参Schema
     def graph_inout_schema(self) -> Any:
         if graph_helper.is_agent_proj():
             return {"input_schema": {}, "output_schema": {}}
-        _graph_input = self.graph.get_input_schema()
-        _graph_output = self.graph.get_output_schema()
-
-        return {"input_schema": _graph_input.model_json_schema(), "output_schema": _graph_output.model_json_schema()}
+        return self.graph_cache.inout_schema(self.graph)
 
     async def astream(self, payload: Dict[str, Any], graph: CompiledStateGraph, run_config: RunnableConfig, ctx=Context) -> AsyncIterable[Any]:
         client_msg, session_id = to_client_message(payload)
@@ -255,6 +240,7 @@ class GraphService:
         # 使用后台线程拉取同步流，并通过事件循环安全地推送到异步队列
         loop = asyncio.get_running_loop()
         q: asyncio.Queue = asyncio.Queue()
+        track_stream_queue(q, "stream_run")
         context = contextvars.copy_context()
         start_time = time.time()
         # 取消标志，用于通知 producer 线程停止
@@ -333,7 +319,12 @@ class GraphService:
             finally:
                 loop.call_soon_threadsafe(q.put_nowait, None)
 
-        threading.Thread(target=lambda: context.run(producer), daemon=True).start()
+        def run_producer():
+            # 本次运行内的工具共用数据库会话范围
+            with run_session_scope():
+                producer()
+
+        threading.Thread(target=lambda: context.run(run_producer), daemon=True).start()
 
         try:
             while True:
@@ -350,22 +341,58 @@ class GraphService:
 
 service = GraphService()
 app = FastAPI()
+# 请求体只在中间件中读取、解压、解析一次；指标中间件在最外层，被拒绝的请求也计入耗时
+app.add_middleware(RequestIngestionMiddleware)
+app.add_middleware(HttpMetricsMiddleware, duration=HTTP_REQUEST_DURATION, first_byte=HTTP_FIRST_BYTE)
 
 # OpenAI 兼容接口处理器
 openai_handler = OpenAIChatHandler(service)
 
 
+def register_service_metrics():
+    """注册采集时取值的指标：运行中的任务、连接池、请求去重、单节点子图缓存与工具缓存"""
+    from storage.database.db import get_pool_stats
+    from storage.memory.memory_saver import get_checkpointer_pool_stats
+    from utils.tool_cache import get_tool_cache_stats
+
+    def db_pool_connections():
+        values = {}
+        for pool, stats in get_pool_stats().items():
+            for state in ("pool_size", "checked_out", "overflow"):
+                values[(pool, state)] = stats[state]
+        return values
+
+    def checkpointer_pool_connections():
+        stats = get_checkpointer_pool_stats()
+        return {(state,): stats[state] for state in ("pool_size", "pool_available", "requests_waiting") if state in stats}
+
+    METRICS.callback("agent_running_tasks", "Runs owned by this worker.", lambda: len(service.runs.tasks))
+    METRICS.callback("agent_db_pool_connections", "SQLAlchemy pool connections by state.",
+                     db_pool_connections, labelnames=("pool", "state"))
+    METRICS.callback("agent_db_pool_checkout_timeouts_total", "SQLAlchemy pool checkout timeouts.",
+                     lambda: {(pool,): stats["timeouts"] for pool, stats in get_pool_stats().items()},
+                     kind="counter", labelnames=("pool",))
+    METRICS.callback("agent_checkpointer_pool_connections", "Checkpointer connection pool usage.",
+                     checkpointer_pool_connections, labelnames=("state",))
+    METRICS.callback("agent_openai_dedup_requests_total", "Stateless chat completion requests by outcome.",
+                     lambda: {(outcome,): count for outcome, count in openai_handler.dedup.stats()["totals"].items()
+                              if outcome != "inflight"},
+                     kind="counter", labelnames=("outcome",))
+    METRICS.callback("agent_node_graph_cache_requests_total", "Compiled single-node graph cache lookups (/node_run).",
+                     lambda: {("hits",): service.graph_cache.hits, ("misses",): service.graph_cache.misses},
+                     kind="counter", labelnames=("result",))
+    METRICS.callback("agent_tool_cache_requests_total", "Tool result cache lookups.",
+                     lambda: {(tool, result): stats[result] for tool, stats in get_tool_cache_stats().items()
+                              for result in ("hits", "misses")},
+                     kind="counter", labelnames=("tool", "result"))
+
+
+register_service_metrics()
+
+
 @app.post("/run")
 async def http_run(request: Request) -> Dict[str, Any]:
     global result
-    raw_body = await request.body()
-    try:
-        body_text = raw_body.decode("utf-8")
-    except Exception as e:
-        body_text = str(raw_body)
-        raise HTTPException(status_code=400,
-                            detail=f"Invalid JSON format: {body_text}, traceback: {traceback.format_exc()}, error: {e}")
-
     ctx = new_context(method="run", headers=request.headers)
     run_id = ctx.run_id
     request_context.set(ctx)
@@ -374,15 +401,15 @@ async def http_run(request: Request) -> Dict[str, Any]:
         f"Received request for /run: "
         f"run_id={run_id}, "
         f"query={dict(request.query_params)}, "
-        f"body={body_text}"
+        f"{body_log_fields(request)}"
     )
 
     try:
-        payload = await request.json()
+        payload = await request_payload(request)
 
         # 创建任务并记录 - 这是关键，让我们可以通过run_id取消任务
         task = asyncio.create_task(service.run(payload, ctx))
-        service.running_tasks[run_id] = task
+        service.runs.register(run_id, task)
 
         try:
             result = await asyncio.wait_for(task, timeout=float(TIMEOUT_SECONDS))
@@ -436,34 +463,26 @@ async def http_run(request: Request) -> Dict[str, Any]:
 async def http_stream_run(request: Request):
     ctx = new_context(method="stream_run", headers=request.headers)
     request_context.set(ctx)
-    raw_body = await request.body()
-    try:
-        body_text = raw_body.decode("utf-8")
-    except Exception as e:
-        body_text = str(raw_body)
-        raise HTTPException(status_code=400,
-                            detail=f"Invalid JSON format: {body_text}, traceback: {extract_core_stack()}, error: {e}")
-
     run_id = ctx.run_id
     logger.info(
         f"Received request for /stream_run: "
         f"run_id={run_id}, "
         f"query={dict(request.query_params)}, "
-        f"body={body_text}"
+        f"{body_log_fields(request)}"
     )
 
     try:
-        payload = await request.json()
+        payload = await request_payload(request)
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in http_stream_run: {e}, traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=400, detail=f"Invalid JSON format:{extract_core_stack()}")
 
     # 包装stream_sse为可取消的任务
     async def cancellable_stream():
-        # 将真正的流式任务登记到 running_tasks，确保 /cancel 能定位到它
+        # 将真正的流式任务登记到运行登记，确保 /cancel 能定位到它（包括落在其它 worker 上的取消请求）
         task = asyncio.current_task()
         if task:
-            service.running_tasks[run_id] = task
+            service.runs.register(run_id, task)
             logger.info(f"Registered streaming task for run_id: {run_id}")
 
         client_msg, _ = to_client_message(payload)
@@ -526,22 +545,16 @@ async def http_cancel(run_id: str, request: Request):
 
 @app.post(path="/node_run/{node_id}")
 async def http_node_run(node_id: str, request: Request):
-    raw_body = await request.body()
-    try:
-        body_text = raw_body.decode("utf-8")
-    except UnicodeDecodeError:
-        body_text = str(raw_body)
-        raise HTTPException(status_code=400, detail=f"Invalid JSON format: {body_text}")
     ctx = new_context(method="node_run", headers=request.headers)
     request_context.set(ctx)
     logger.info(
         f"Received request for /node_run/{node_id}: "
         f"query={dict(request.query_params)}, "
-        f"body={body_text}",
+        f"{body_log_fields(request)}",
     )
 
     try:
-        payload = await request.json()
+        payload = await request_payload(request)
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in http_node_run: {e}, traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=400, detail=f"Invalid JSON format:{extract_core_stack()}")
@@ -575,11 +588,11 @@ async def openai_chat_completions(request: Request):
     ctx = new_context(method="openai_chat", headers=request.headers)
     request_context.set(ctx)
 
-    logger.info(f"Received request for /v1/chat/completions: run_id={ctx.run_id}")
+    logger.info(f"Received request for /v1/chat/completions: run_id={ctx.run_id}, {body_log_fields(request, max_chars=0)}")
 
     try:
-        payload = await request.json()
-        return await openai_handler.handle(payload, ctx)
+        payload = await request_payload(request)
+        return await openai_handler.handle(payload, ctx, request.headers)
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in openai_chat_completions: {e}")
         raise HTTPException(status_code=400, detail="Invalid JSON format")
@@ -599,6 +612,12 @@ async def health_check():
         raise HTTPException(status_code=503, detail=str(e))
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 文本格式的运行指标"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get(path="/graph_parameter")
 async def http_graph_inout_parameter(request: Request):
     return service.graph_inout_schema()
@@ -0,0 +1,341 @@
+"""
+异常操作检测 - 按用户的内存计数器
+
+- 每个用户维护四个计数：今日操作数、今日资金操作数、敏感操作失败数、修改超级管理员尝试数
+- 计数由审计日志管道的事件流实时累加（入队即计数），跨日时今日计数自动归零
+- 首次检测时用一条 GROUP BY 聚合SQL从审计日志表重建，之后按间隔定期重建，
+  覆盖未经管道直接写入审计日志表的记录
+- 重建在审计日志管道的写入线程中执行（两批写入之间，查询期间没有新写入），
+  并补计队列中尚未写入的事件与查询期间新到的事件；定期重建在后台进行，不阻塞检测请求
+- 阈值检查为一次字典查找，不再每次检测执行四条审计日志查询
+- 阈值可通过构造参数或环境变量配置
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, tzinfo
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 计数器定期从数据库重建的间隔（秒），0 表示只在首次检测时重建
+DEFAULT_RESYNC_INTERVAL = 600
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+@dataclass(frozen=True)
+class AnomalyRules:
+    """异常检测规则"""
+    daily_operation_limit: int = 100
+    failed_sensitive_limit: int = 5
+    daily_finance_limit: int = 20
+    sensitive_actions: FrozenSet[str] = frozenset({
+        'delete_user', 'update_user_role', 'assign_lingzhi', 'assign_contribution', 'transfer_super_admin'
+    })
+    finance_actions: FrozenSet[str] = frozenset({
+        'financial_check', 'create_transaction', 'exchange_lingzhi_to_contribution'
+    })
+    super_admin_action: str = 'update_user_role'
+    super_admin_keyword: str = '超级管理员'
+
+    @classmethod
+    def from_env(cls) -> 'AnomalyRules':
+        """从环境变量读取阈值（未设置时使用默认值）"""
+        return cls(
+            daily_operation_limit=_env_int('ANOMALY_DAILY_OPERATION_LIMIT', cls.daily_operation_limit),
+            failed_sensitive_limit=_env_int('ANOMALY_FAILED_SENSITIVE_LIMIT', cls.failed_sensitive_limit),
+            daily_finance_limit=_env_int('ANOMALY_DAILY_FINANCE_LIMIT', cls.daily_finance_limit)
+        )
+
+
+@dataclass
+class UserCounters:
+    """单个用户的计数"""
+    day: Optional[date] = None
+    operations: int = 0
+    finance_operations: int = 0
+    failed_sensitive: int = 0
+    super_admin_attempts: int = 0
+
+
+@dataclass
+class _Snapshot:
+    counters: Dict[int, UserCounters] = field(default_factory=dict)
+    built_at: float = 0.0
+
+
+class AnomalyDetector:
+    """异常操作检测器"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        table=None,
+        rules: Optional[AnomalyRules] = None,
+        timezone: Optional[tzinfo] = None,
+        resync_interval: float = DEFAULT_RESYNC_INTERVAL,
+        pipeline=None
+    ):
+        """
+        Args:
+            session_factory: 会话工厂
+            table: 审计日志表（默认 AuditLogs.__table__）
+            rules: 检测规则
+            timezone: 划分"今日"使用的时区（None 表示本地时间）
+            resync_interval: 定期从数据库重建的间隔（秒）
+            pipeline: 事件来源的审计日志管道（提供时在其写入线程中重建；None 表示在调用线程中重建）
+        """
+        self.session_factory = session_factory
+        self._table = table
+        self.rules = rules or AnomalyRules()
+        self.timezone = timezone
+        self.resync_interval = resync_interval
+        self.pipeline = pipeline
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        # 重建期间观察到的事件（重建结束后补计）
+        self._journal: Optional[List[Dict[str, Any]]] = None
+        self._rebuild_scheduled = False
+
+    @property
+    def table(self):
+        if self._table is None:
+            from storage.database.shared.model import AuditLogs
+            self._table = AuditLogs.__table__
+        return self._table
+
+    def _now(self) -> datetime:
+        return datetime.now(self.timezone)
+
+    def _day_of(self, moment: datetime) -> date:
+        if moment.tzinfo is not None and self.timezone is not None:
+            moment = moment.astimezone(self.timezone)
+        return moment.date()
+
+    @staticmethod
+    def _roll(counters: UserCounters, day: date) -> None:
+        """跨日时今日计数归零"""
+        if counters.day != day:
+            counters.day = day
+            counters.operations = 0
+            counters.finance_operations = 0
+
+    # ---------- 事件流 ----------
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        """
+        累加一条审计事件（注册为审计日志管道的监听）
+
+        Args:
+            event: 审计事件（user_id/action/status/description/created_at）
+        """
+        if event.get('user_id') is None:
+            return
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(event)
+            if self._snapshot is None:
+                # 尚未重建，首次重建时会统计到这条事件
+                return
+            self._count(self._snapshot.counters, event)
+
+    def _count(self, counters_by_user: Dict[int, UserCounters], event: Dict[str, Any]) -> None:
+        """把一条事件计入计数（调用方持有锁）"""
+        rules = self.rules
+        action = event.get('action')
+        day = self._day_of(event.get('created_at') or self._now())
+
+        counters = counters_by_user.setdefault(event['user_id'], UserCounters())
+        if counters.day is not None and day < counters.day:
+            # 跨日前的迟到事件只计入累计计数
+            today = False
+        else:
+            self._roll(counters, day)
+            today = True
+
+        if today:
+            counters.operations += 1
+            if action in rules.finance_actions:
+                counters.finance_operations += 1
+        if action in rules.sensitive_actions and event.get('status') == 'failed':
+            counters.failed_sensitive += 1
+        if action == rules.super_admin_action and rules.super_admin_keyword in (event.get('description') or ''):
+            counters.super_admin_attempts += 1
+
+    # ---------- 重建 ----------
+
+    def rebuild(self) -> int:
+        """
+        从审计日志表重建全部用户的计数（配置了管道时在其写入线程中执行，并等待完成）
+
+        Returns:
+            有计数的用户数
+        """
+        if self.pipeline is None:
+            return self._rebuild()
+        return self.pipeline.call_in_writer(self._rebuild).result()
+
+    def _rebuild(self) -> int:
+        """
+        用一条聚合SQL统计审计日志表，再补计尚未写入的事件
+
+        在管道写入线程中执行时，查询期间不会有新事件写入表中：
+        已写入的事件由查询统计，队列中的事件与查询期间新到的事件（按对象去重）在内存中补计。
+        """
+        from sqlalchemy import and_, case, func, or_, select
+
+        rules = self.rules
+        table = self.table
+        now = self._now()
+        today = now.date()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        is_today = table.c.created_at >= today_start
+
+        def count_if(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+        sensitive_failed = and_(table.c.action.in_(rules.sensitive_actions), table.c.status == 'failed')
+        super_admin = and_(
+            table.c.action == rules.super_admin_action,
+            table.c.description.like(f'%{rules.super_admin_keyword}%')
+        )
+        query = (
+            select(
+                table.c.user_id,
+                count_if(is_today).label('operations'),
+                count_if(and_(is_today, table.c.action.in_(rules.finance_actions))).label('finance_operations'),
+                count_if(sensitive_failed).label('failed_sensitive'),
+                count_if(super_admin).label('super_admin_attempts')
+            )
+            .where(or_(is_today, table.c.action.in_(rules.sensitive_actions | {rules.super_admin_action})))
+            .group_by(table.c.user_id)
+        )
+
+        with self._lock:
+            self._journal = []
+        try:
+            session = self.session_factory()
+            try:
+                rows = session.execute(query).mappings().all()
+            finally:
+                session.close()
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        counters = {
+            row['user_id']: UserCounters(
+                day=today,
+                operations=row['operations'],
+                finance_operations=row['finance_operations'],
+                failed_sensitive=row['failed_sensitive'],
+                super_admin_attempts=row['super_admin_attempts']
+            )
+            for row in rows
+        }
+        with self._lock:
+            pending = self.pipeline.pending_events() if self.pipeline is not None else []
+            journal, self._journal = self._journal, None
+            seen = set()
+            for event in pending + journal:
+                if id(event) not in seen and event.get('user_id') is not None:
+                    seen.add(id(event))
+                    self._count(counters, event)
+            self._snapshot = _Snapshot(counters=counters, built_at=time.monotonic())
+        return len(counters)
+
+    def _schedule_rebuild(self) -> None:
+        """在管道写入线程中后台重建（同一时间只排队一次）"""
+        if self.pipeline is None:
+            self.rebuild()
+            return
+        with self._lock:
+            if self._rebuild_scheduled:
+                return
+            self._rebuild_scheduled = True
+        self.pipeline.call_in_writer(self._rebuild).add_done_callback(self._rebuild_done)
+
+    def _rebuild_done(self, future) -> None:
+        with self._lock:
+            self._rebuild_scheduled = False
+        if future.exception() is not None:
+            logger.error(f"异常检测计数重建失败: {future.exception()}")
+
+    def _ensure_fresh(self) -> None:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.rebuild()
+        elif self.resync_interval and time.monotonic() - snapshot.built_at >= self.resync_interval:
+            self._schedule_rebuild()
+
+    # ---------- 检测 ----------
+
+    def counters(self, user_id: int) -> UserCounters:
+        """获取用户当前计数（副本）"""
+        self._ensure_fresh()
+        today = self._now().date()
+        with self._lock:
+            counters = self._snapshot.counters.get(user_id)
+            if counters is None:
+                return UserCounters(day=today)
+            self._roll(counters, today)
+            return UserCounters(**vars(counters))
+
+    def detect(self, user_id: int) -> Tuple[bool, List[str]]:
+        """
+        检测用户是否存在异常操作（原因文字与原四条查询版本一致）
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            (是否异常, 异常原因列表)
+        """
+        rules = self.rules
+        counters = self.counters(user_id)
+        reasons = []
+
+        if counters.operations > rules.daily_operation_limit:
+            reasons.append(f'今日操作过于频繁：{counters.operations}次')
+        if counters.failed_sensitive > rules.failed_sensitive_limit:
+            reasons.append(f'敏感操作失败次数过多：{counters.failed_sensitive}次')
+        if counters.super_admin_attempts > 0:
+            reasons.append(f'尝试修改超级管理员权限：{counters.super_admin_attempts}次')
+        if counters.finance_operations > rules.daily_finance_limit:
+            reasons.append(f'今日资金操作过于频繁：{counters.finance_operations}次')
+
+        return len(reasons) > 0, reasons
+
+
+_detector: Optional[AnomalyDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """获取全局异常检测器（订阅全局审计日志管道的事件流）"""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                import pytz
+                from storage.database.audit_pipeline import get_audit_pipeline
+
+                pipeline = get_audit_pipeline()
+                detector = AnomalyDetector(
+                    pipeline.session_factory,
+                    rules=AnomalyRules.from_env(),
+                    timezone=pytz.timezone('Asia/Shanghai'),
+                    resync_interval=_env_int('ANOMALY_RESYNC_INTERVAL', DEFAULT_RESYNC_INTERVAL),
+                    pipeline=pipeline
+                )
+                pipeline.add_listener(detector.observe)
+                _detector = detector
+    return _detector
@@ -0,0 +1,364 @@
+"""
+审计日志管道 - 有界队列 + 后台批量写入
+
+- 安全检查只把审计事件放入有界内存队列（不打开会话、不提交），立即返回
+- 后台线程按批次（条数或时间间隔先到为准）一次 executemany 批量插入并提交
+- 队列满时丢弃新事件并计数，不阻塞业务请求
+- 按保留天数分批清理过期日志（滚动保留策略，默认关闭）
+- 提供队列深度、写入数、丢弃数、失败数等指标
+- 可把维护任务交给写入线程在两批之间执行（此时没有正在写入的批次，队列中即全部未写入事件）
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 队列容量（超过后丢弃新事件）
+DEFAULT_QUEUE_SIZE = 10000
+
+# 每批最多写入的事件数
+DEFAULT_BATCH_SIZE = 500
+
+# 攒批的最长等待时间（秒）
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# 审计日志保留天数（环境变量 AUDIT_LOG_RETENTION_DAYS，未设置时不清理）
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv("AUDIT_LOG_RETENTION_DAYS", "0")) or None
+
+# 过期日志清理间隔（秒）与每次删除的行数
+RETENTION_CHECK_INTERVAL = 3600
+RETENTION_DELETE_BATCH = 5000
+
+
+class AuditPipeline:
+    """审计日志管道"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        table=None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        retention_days: Optional[int] = AUDIT_LOG_RETENTION_DAYS
+    ):
+        """
+        Args:
+            session_factory: 会话工厂（如 get_session）
+            table: 审计日志表（默认 AuditLogs.__table__）
+            queue_size: 队列容量
+            batch_size: 每批最多写入的事件数
+            flush_interval: 攒批的最长等待时间（秒）
+            retention_days: 日志保留天数，None 表示不清理
+        """
+        self.session_factory = session_factory
+        self._table = table
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._tasks: "queue.Queue[Tuple[Callable[[], Any], Future]]" = queue.Queue()
+        self._last_purge = 0.0
+
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+        self._purged = 0
+        self._last_flush_at: Optional[datetime] = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            from storage.database.shared.model import AuditLogs
+            self._table = AuditLogs.__table__
+        return self._table
+
+    # ---------- 生产端 ----------
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """注册事件监听（事件入队时同步调用，用于内存统计等）"""
+        self._listeners.append(listener)
+
+    def submit(
+        self,
+        user_id: int,
+        action: str,
+        status: str = 'success',
+        resource_type: Optional[str] = None,
+        resource_id: Optional[int] = None,
+        description: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        **extra
+    ) -> bool:
+        """
+        提交审计事件（非阻塞）
+
+        Args:
+            user_id: 用户ID
+            action: 操作类型
+            status: 状态
+            resource_type: 资源类型
+            resource_id: 资源ID
+            description: 操作描述
+            created_at: 事件时间（默认当前时间）
+            **extra: 其他列（ip_address/user_agent/error_message）
+
+        Returns:
+            是否入队成功（队列已满时返回False，事件被丢弃）
+        """
+        event = dict(
+            user_id=user_id,
+            action=action,
+            status=status,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            description=description,
+            created_at=created_at or datetime.now(),
+            **extra
+        )
+
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"审计事件监听失败: {e}")
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            logger.warning(f"审计队列已满，丢弃事件: user_id={user_id}, action={action}")
+            return False
+
+        with self._lock:
+            self._enqueued += 1
+        return True
+
+    # ---------- 写入端 ----------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        """取出一批事件：阻塞等待第一条，之后最多再等 flush_interval 秒凑满一批"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """批量插入一批事件并提交"""
+        from sqlalchemy import insert
+
+        session = self.session_factory()
+        try:
+            session.execute(insert(self.table), batch)
+            session.commit()
+            with self._lock:
+                self._written += len(batch)
+                self._batches += 1
+                self._last_flush_at = datetime.now()
+        except Exception as e:
+            session.rollback()
+            with self._lock:
+                self._failed += len(batch)
+            logger.error(f"审计日志批量写入失败（{len(batch)}条）: {e}")
+        finally:
+            session.close()
+
+    def call_in_writer(self, fn: Callable[[], Any]) -> Future:
+        """
+        在写入线程中执行 fn（当前批次写完之后、下一批开始之前）
+
+        Args:
+            fn: 无参数的可调用对象
+
+        Returns:
+            fn 的执行结果（Future）
+        """
+        future: Future = Future()
+        self._tasks.put((fn, future))
+        self._ensure_started()
+        return future
+
+    def _run_tasks(self) -> None:
+        while True:
+            try:
+                fn, future = self._tasks.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+
+    def pending_events(self) -> List[Dict[str, Any]]:
+        """队列中尚未写入的事件（在写入线程的任务中调用时，即全部已提交但未写入的事件）"""
+        with self._queue.mutex:
+            return list(self._queue.queue)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._drain()
+            if batch:
+                try:
+                    self._write(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+            self._run_tasks()
+            if not batch and self._stop_event.is_set():
+                return
+
+            if self.retention_days and time.monotonic() - self._last_purge >= RETENTION_CHECK_INTERVAL:
+                self._last_purge = time.monotonic()
+                try:
+                    self.purge_expired()
+                except Exception as e:
+                    logger.error(f"审计日志过期清理失败: {e}")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的事件全部写入
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            是否已全部写入
+        """
+        if self._thread is None:
+            return self._queue.empty()
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """写完剩余事件后停止后台线程"""
+        self.flush(timeout)
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(timeout, self.flush_interval * 2))
+            self._thread = None
+        # 停止后才提交的任务由调用线程执行，避免等待方一直阻塞
+        self._run_tasks()
+
+    # ---------- 保留策略 ----------
+
+    def purge_expired(self, retention_days: Optional[int] = None) -> int:
+        """
+        分批删除超过保留天数的日志（每批单独提交，避免长事务）
+
+        Args:
+            retention_days: 保留天数（默认使用构造参数）
+
+        Returns:
+            删除的行数
+        """
+        from sqlalchemy import delete, select
+
+        retention_days = retention_days or self.retention_days
+        if not retention_days:
+            return 0
+
+        table = self.table
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        purged = 0
+        session = self.session_factory()
+        try:
+            while True:
+                ids = session.execute(
+                    select(table.c.id).where(table.c.created_at < cutoff).limit(RETENTION_DELETE_BATCH)
+                ).scalars().all()
+                if not ids:
+                    break
+                session.execute(delete(table).where(table.c.id.in_(ids)))
+                session.commit()
+                purged += len(ids)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        with self._lock:
+            self._purged += purged
+        return purged
+
+    # ---------- 指标 ----------
+
+    def metrics(self) -> Dict[str, Any]:
+        """获取管道指标"""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "batches": self._batches,
+                "purged": self._purged,
+                "last_flush_at": self._last_flush_at.isoformat() if self._last_flush_at else None,
+                "writer_alive": self._thread is not None and self._thread.is_alive()
+            }
+
+
+_pipeline: Optional[AuditPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_audit_pipeline() -> AuditPipeline:
+    """获取全局审计日志管道（进程退出时写完剩余事件）"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                from storage.database.db import get_session
+                _pipeline = AuditPipeline(get_session)
+                atexit.register(_pipeline.stop)
+    return _pipeline
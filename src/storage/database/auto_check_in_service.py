@@ -5,7 +5,7 @@
 """
 
 from typing import Optional
-from coze_coding_dev_sdk.database import get_session
+from storage.database.db import get_session
 from storage.database.check_in_manager import CheckInManager
 from storage.database.shared.model import Users, AuditLogs
 from datetime import datetime
@@ -118,7 +118,7 @@ class AutoCheckInService:
         Returns:
             str: 格式化的消息
         """
-        from coze_coding_dev_sdk.database import get_session
+        from storage.database.db import get_session
 
         if not result['success']:
             # 签到失败
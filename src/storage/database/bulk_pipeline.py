@@ -0,0 +1,344 @@
+"""
+批量数据管道 - 流式读取、分批写入、分块提交
+
+- CSV / JSON 数组 / JSON Lines 逐条流式读取，内存占用与文件大小无关
+- 按批次处理：每批用一次 IN (...) 查询预取已存在的记录，再用 executemany 批量插入/更新
+- 每批单独提交并回调进度，长任务不会持有一个巨大的事务和 ORM identity map
+- copy_rows 基于 DB-API（fetchmany + executemany），供 sqlite3 迁移脚本复用
+- 中途失败时抛出 BulkPipelineError，错误信息包含已提交的批数与记录数（已提交的批次不会回滚）
+"""
+
+import csv
+import json
+import logging
+from dataclasses import dataclass, asdict
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 默认每批处理的记录数
+DEFAULT_BATCH_SIZE = 1000
+
+# JSON 流式解析每次读取的字符数
+_JSON_READ_SIZE = 64 * 1024
+
+
+@dataclass
+class BulkStats:
+    """批量处理统计"""
+    read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    batches: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class BulkPipelineError(Exception):
+    """批次写入失败（stats 为失败前已提交部分的统计）"""
+
+    def __init__(self, stats: BulkStats, error: Exception):
+        self.stats = stats
+        super().__init__(
+            f"第{stats.batches + 1}批写入失败，此前已提交 {stats.batches} 批"
+            f"（新增 {stats.inserted}，更新 {stats.updated}，跳过 {stats.skipped}）: {error}"
+        )
+
+
+class ProgressReporter:
+    """进度回调：每提交 every 个批次输出一次进度"""
+
+    def __init__(self, label: str, every: int = 1, log: Optional[Callable[[str], None]] = None):
+        self.label = label
+        self.every = max(1, every)
+        self.log = log or logger.info
+
+    def __call__(self, stats: BulkStats) -> None:
+        if stats.batches % self.every == 0:
+            self.log(
+                f"{self.label}: 第{stats.batches}批, 已读取 {stats.read} 条, "
+                f"新增 {stats.inserted}, 更新 {stats.updated}, 跳过 {stats.skipped}"
+            )
+
+
+def iter_batches(iterable: Iterable, size: int = DEFAULT_BATCH_SIZE) -> Iterator[List]:
+    """将可迭代对象切分为固定大小的批次"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_csv_records(path: str, encoding: str = 'utf-8-sig') -> Iterator[Dict[str, str]]:
+    """逐行读取CSV（首行为表头）"""
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def iter_json_records(path: str, encoding: str = 'utf-8') -> Iterator[Dict[str, Any]]:
+    """
+    流式读取JSON记录
+
+    支持两种格式（按首个非空字符自动识别）：
+    - JSON 数组：[{...}, {...}]，逐个对象增量解析，不会一次性载入整个文件
+    - JSON Lines：每行一个对象
+
+    Args:
+        path: 文件路径
+        encoding: 文件编码
+
+    Returns:
+        记录迭代器
+    """
+    with open(path, 'r', encoding=encoding) as f:
+        first = ''
+        while True:
+            ch = f.read(1)
+            if not ch:
+                return
+            if not ch.isspace():
+                first = ch
+                break
+
+        if first != '[':
+            # JSON Lines
+            line = first + f.readline()
+            while line:
+                if line.strip():
+                    yield json.loads(line)
+                line = f.readline()
+            return
+
+        decoder = json.JSONDecoder()
+        buffer = ''
+        pos = 0
+        eof = False
+        while True:
+            # 跳过空白和分隔逗号
+            while True:
+                while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer, pos = f.read(_JSON_READ_SIZE), 0
+                eof = not buffer
+
+            if pos >= len(buffer) or buffer[pos] == ']':
+                return
+
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(_JSON_READ_SIZE)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+
+            yield record
+            pos = end
+
+
+def write_json_array(f, records: Iterable[Dict[str, Any]], indent: int = 2) -> int:
+    """
+    逐条写出JSON数组（格式与 json.dump(list, indent=indent) 一致）
+
+    Args:
+        f: 已打开的文本文件
+        records: 记录迭代器
+        indent: 缩进
+
+    Returns:
+        写出的记录数
+    """
+    pad = ' ' * indent
+    count = 0
+    f.write('[')
+    for record in records:
+        text = json.dumps(record, ensure_ascii=False, indent=indent)
+        f.write(',\n' if count else '\n')
+        f.write(pad + text.replace('\n', '\n' + pad))
+        count += 1
+    f.write('\n]' if count else ']')
+    return count
+
+
+def bulk_upsert(
+    session,
+    table,
+    records: Iterable[Dict[str, Any]],
+    key: str,
+    build_insert: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+    build_update: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]]] = None,
+    update_columns: Sequence[str] = (),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_progress: Optional[Callable[[BulkStats], None]] = None,
+    normalize_key: Callable[[Any], Any] = lambda value: value
+) -> BulkStats:
+    """
+    按唯一键批量插入或更新（SQLAlchemy Core，每批提交一次）
+
+    Args:
+        session: SQLAlchemy 会话或连接
+        table: 目标表（Table 或 ORM 模型的 __table__）
+        records: 输入记录迭代器
+        key: 唯一键列名（如 email）
+        build_insert: 新记录 -> 插入行（返回None表示跳过）
+        build_update: (输入记录, 已有行) -> 更新值（返回None表示跳过）；为None时已存在的记录一律跳过
+        update_columns: 可被更新的列（预取已有行时一并读取）
+        batch_size: 每批记录数
+        on_progress: 每批提交后的进度回调
+        normalize_key: 键值规范化（如 strip）
+
+    Returns:
+        处理统计
+    """
+    # 仅 SQLAlchemy 场景需要，DB-API 迁移脚本无需安装
+    from sqlalchemy import bindparam, insert, select, update
+
+    key_column = table.c[key]
+    pk_column = list(table.primary_key.columns)[0]
+    prefetch_columns = [pk_column, key_column] + [table.c[name] for name in update_columns if name != key]
+    update_stmt = None
+    if build_update is not None and update_columns:
+        update_stmt = update(table).where(pk_column == bindparam('_pk')).values(
+            {name: bindparam(f'_v_{name}') for name in update_columns}
+        )
+
+    stats = BulkStats()
+    committed = BulkStats()
+    for batch in iter_batches(records, batch_size):
+        stats.read += len(batch)
+
+        keyed = []
+        for record in batch:
+            value = normalize_key(record.get(key))
+            if not value:
+                stats.skipped += 1
+                continue
+            keyed.append((value, record))
+
+        # 一次 IN 查询预取本批已存在的记录
+        existing = {}
+        if keyed:
+            rows = session.execute(
+                select(*prefetch_columns).where(key_column.in_({value for value, _ in keyed}))
+            ).mappings()
+            existing = {row[key]: dict(row) for row in rows}
+
+        inserts: Dict[Any, Dict[str, Any]] = {}
+        updates: Dict[Any, Dict[str, Any]] = {}
+        for value, record in keyed:
+            current = existing.get(value)
+            if current is None and value in inserts:
+                current = inserts[value]
+            if current is None:
+                row = build_insert(record)
+                if row is None:
+                    stats.skipped += 1
+                    continue
+                row[key] = value
+                inserts[value] = row
+                stats.inserted += 1
+                continue
+
+            changes = build_update(record, current) if build_update else None
+            if changes is None:
+                stats.skipped += 1
+                continue
+            current.update(changes)
+            if value not in inserts:
+                updates[value] = current
+            stats.updated += 1
+
+        try:
+            if inserts:
+                session.execute(insert(table), list(inserts.values()))
+            if updates and update_stmt is not None:
+                session.execute(update_stmt, [
+                    dict({'_pk': row[pk_column.name]}, **{f'_v_{name}': row[name] for name in update_columns})
+                    for row in updates.values()
+                ])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise BulkPipelineError(committed, e) from e
+
+        stats.batches += 1
+        committed = BulkStats(**stats.as_dict())
+        if on_progress:
+            on_progress(stats)
+
+    return stats
+
+
+def copy_rows(
+    source_cursor,
+    target_conn,
+    insert_sql: str,
+    transform: Optional[Callable[[Sequence[Any]], Optional[Sequence[Any]]]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_progress: Optional[Callable[[BulkStats], None]] = None,
+    on_row_error: Optional[Callable[[Sequence[Any], Exception], None]] = None
+) -> BulkStats:
+    """
+    DB-API 批量复制：从已执行查询的游标 fetchmany，按批 executemany 写入并提交
+
+    Args:
+        source_cursor: 已执行 SELECT 的源游标
+        target_conn: 目标数据库连接
+        insert_sql: 带占位符的 INSERT 语句
+        transform: 行转换（返回None表示跳过该行）
+        batch_size: 每批行数
+        on_progress: 每批提交后的进度回调
+        on_row_error: 提供时，整批写入失败会回滚该批并逐行重试，失败的行交给回调并计为跳过；
+            不提供时抛出 BulkPipelineError
+
+    Returns:
+        处理统计
+    """
+    stats = BulkStats()
+    committed = BulkStats()
+    target_cursor = target_conn.cursor()
+    while True:
+        rows = source_cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        stats.read += len(rows)
+
+        if transform is not None:
+            batch = [converted for converted in map(transform, rows) if converted is not None]
+        else:
+            batch = rows
+        stats.skipped += len(rows) - len(batch)
+
+        if batch:
+            try:
+                target_cursor.executemany(insert_sql, batch)
+                stats.inserted += len(batch)
+            except Exception as e:
+                target_conn.rollback()
+                if on_row_error is None:
+                    raise BulkPipelineError(committed, e) from e
+                for row in batch:
+                    try:
+                        target_cursor.execute(insert_sql, row)
+                        stats.inserted += 1
+                    except Exception as row_error:
+                        stats.skipped += 1
+                        on_row_error(row, row_error)
+        target_conn.commit()
+
+        stats.batches += 1
+        committed = BulkStats(**stats.as_dict())
+        if on_progress:
+            on_progress(stats)
+
+    return stats
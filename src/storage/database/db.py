@@ -1,12 +1,38 @@
+"""
+数据库引擎与会话注册表
+
+- 每个进程一个同步引擎（可选一个异步引擎），连接池按 worker 数与全局连接预算计算，
+  所有 worker 合计不超过 DB_CONNECTION_BUDGET
+- 连接池带统计：已借出连接、溢出连接、借出等待时间、超时次数（get_pool_stats）
+- run_session_scope()：一次智能体运行内，同一线程上嵌套的 get_session() 共用一个会话，
+  工具/服务之间互相调用时不再各自借出连接；运行结束时统一关闭遗留会话
+"""
+
+import math
 import os
+import threading
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import logging
 logger = logging.getLogger(__name__)
 
 MAX_RETRY_TIME = 20  # 连接最大重试时间（秒）
+# 所有 worker 进程合计可用的连接数（应小于数据库 max_connections 减去运维预留）
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", 100))
+# 异步引擎占本进程连接预算的比例（0 表示不预留）
+DB_ASYNC_POOL_RATIO = float(os.getenv("DB_ASYNC_POOL_RATIO", 0.2))
+# 借出连接的超时时间（秒）与连接回收时间（秒）
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
 # Load environment variables from .env if present
 try:
     from dotenv import load_dotenv
@@ -35,26 +61,155 @@ def get_db_url() -> str:
         if url is None or url == "":
             logger.error("PGDATABASE_URL is not set")
     return url
+
+
+def get_worker_count() -> int:
+    """当前部署的 worker 进程数（DB_POOL_WORKERS 优先，其次 WEB_CONCURRENCY）"""
+    value = os.getenv("DB_POOL_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1"
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 1
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """单个引擎的连接池参数"""
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float = DB_POOL_TIMEOUT
+    pool_recycle: int = DB_POOL_RECYCLE
+
+    @property
+    def max_connections(self) -> int:
+        return self.pool_size + self.max_overflow
+
+    @classmethod
+    def for_connections(cls, connections: int) -> "PoolSettings":
+        """常驻一半连接，其余作为溢出连接按需创建、用完即关"""
+        connections = max(1, connections)
+        pool_size = max(1, math.ceil(connections / 2))
+        return cls(pool_size=pool_size, max_overflow=connections - pool_size)
+
+    @classmethod
+    def from_budget(cls, budget: int = None, workers: int = None,
+                    async_ratio: float = None) -> Dict[str, "PoolSettings"]:
+        """
+        按全局预算与 worker 数计算本进程的同步/异步连接池
+
+        Returns:
+            {"sync": PoolSettings, "async": PoolSettings}
+        """
+        budget = DB_CONNECTION_BUDGET if budget is None else budget
+        workers = get_worker_count() if workers is None else workers
+        async_ratio = DB_ASYNC_POOL_RATIO if async_ratio is None else async_ratio
+        per_process = max(2, budget // max(1, workers))
+        async_connections = max(1, round(per_process * async_ratio)) if async_ratio > 0 else 0
+        return {
+            "sync": cls.for_connections(per_process - async_connections),
+            "async": cls.for_connections(async_connections or 1),
+        }
+
+
+class PoolStats:
+    """借出连接的计数与等待时间"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_avg": round(self.wait_total / attempts, 6) if attempts else 0.0,
+                "wait_seconds_max": round(self.wait_max, 6),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """统计借出连接耗时（含排队等待、建连与 pre-ping）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return conn
+
+    def telemetry(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "max_overflow": self._max_overflow,
+            **self.stats.snapshot(),
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
 _engine = None
 _SessionLocal = None
+_async_engine = None
+_AsyncSessionLocal = None
+_engine_lock = threading.Lock()
+
+
+def create_pooled_engine(url: str, settings: PoolSettings, **kwargs):
+    """创建带统计的同步引擎"""
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=settings.pool_recycle,
+        pool_timeout=settings.pool_timeout,
+        **kwargs,
+    )
+
 
 def _create_engine_with_retry():
     url = get_db_url()
     if url is None or url == "":
         logger.error("PGDATABASE_URL is not set")
         raise ValueError("PGDATABASE_URL is not set")
-    size = 100
-    overflow = 100
-    recycle = 1800
-    timeout = 30
-    engine = create_engine(
-        url,
-        pool_size=size,
-        max_overflow=overflow,
-        pool_pre_ping=True,
-        pool_recycle=recycle,
-        pool_timeout=timeout,
+    settings = PoolSettings.from_budget()["sync"]
+    logger.info(
+        f"Database pool: size={settings.pool_size} overflow={settings.max_overflow} "
+        f"(budget={DB_CONNECTION_BUDGET}, workers={get_worker_count()})"
     )
+    engine = create_pooled_engine(url, settings)
     # 验证连接，带重试
     start_time = time.time()
     last_error = None
@@ -74,7 +229,9 @@ def _create_engine_with_retry():
 def get_engine():
     global _engine
     if _engine is None:
-        _engine = _create_engine_with_retry()
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine_with_retry()
     return _engine
 
 def get_sessionmaker():
@@ -83,12 +240,219 @@ def get_sessionmaker():
         _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
     return _SessionLocal
 
+
+def to_async_url(url: str) -> str:
+    """同步驱动 URL 转为异步驱动（postgresql -> postgresql+asyncpg）"""
+    scheme, sep, rest = url.partition("://")
+    driver = scheme.split("+", 1)[0]
+    if driver in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+
+def get_async_engine():
+    """异步引擎（供异步工具使用，连接数计入同一预算）"""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                settings = PoolSettings.from_budget()["async"]
+                _async_engine = create_async_engine(
+                    to_async_url(get_db_url()),
+                    poolclass=InstrumentedAsyncQueuePool,
+                    pool_size=settings.pool_size,
+                    max_overflow=settings.max_overflow,
+                    pool_pre_ping=True,
+                    pool_recycle=settings.pool_recycle,
+                    pool_timeout=settings.pool_timeout,
+                )
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _AsyncSessionLocal = async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+
+def get_async_session():
+    """异步会话（async with get_async_session() as session: ...）"""
+    return get_async_sessionmaker()()
+
+
+class _SharedSession:
+    """
+    运行范围内共享的会话
+
+    行为与普通会话一致，只是 close() 只在最外层调用方关闭时才真正关闭：
+    内层调用方（被其它工具/服务调用时）通过 _NestedSession 复用外层已借出的连接，不再另外借出。
+    """
+
+    def __init__(self, session: Session, scope: "RunSessionScope"):
+        self._session = session
+        self._scope = scope
+        self._depth = 0
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._depth -= 1
+        if self._depth <= 0:
+            self._depth = 0
+            self._session.close()
+
+
+class _NestedSession:
+    """
+    内层调用方使用的会话：在共享会话上开一个 SAVEPOINT
+
+    - commit() 释放 SAVEPOINT 并提交外层事务，与独立会话一样立即持久化（外层尚未提交的改动一并提交），
+      之后的操作进入新的 SAVEPOINT；只释放 SAVEPOINT 的话，外层不再提交就关闭时这些改动会被回滚
+    - rollback() 与未提交就 close() 只回滚到 SAVEPOINT，外层已有的改动不受影响，外层会话仍可继续使用
+    """
+
+    def __init__(self, shared: _SharedSession):
+        self._shared = shared
+        self._session = shared._session
+        self._savepoint = self._session.begin_nested()
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def commit(self) -> None:
+        self._savepoint.commit()
+        self._session.commit()
+        self._savepoint = self._session.begin_nested()
+
+    def rollback(self) -> None:
+        self._savepoint.rollback()
+        self._savepoint = self._session.begin_nested()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            # 未提交（包括出错后没有回滚）的改动回滚到 SAVEPOINT
+            self._savepoint.rollback()
+        except Exception as e:
+            logger.warning(f"Error rolling back nested session: {e}")
+        finally:
+            self._shared.close()
+
+
+class RunSessionScope:
+    """一次智能体运行的会话范围（按线程各一个会话，并行执行的工具之间不共享）"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._sessions: Dict[int, _SharedSession] = {}
+        self._lock = threading.Lock()
+
+    def session(self):
+        """最外层调用方拿到共享会话本身，嵌套的调用方拿到该会话上的 SAVEPOINT"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            shared = self._sessions.get(thread_id)
+            if shared is None:
+                shared = _SharedSession(self._factory(), self)
+                self._sessions[thread_id] = shared
+        shared._depth += 1
+        if shared._depth == 1:
+            return shared
+        try:
+            return _NestedSession(shared)
+        except Exception:
+            shared._depth -= 1
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for shared in sessions:
+            if shared._depth > 0:
+                logger.warning("Session left open by a tool, closing at end of run")
+            try:
+                shared._session.close()
+            except Exception as e:
+                logger.warning(f"Error closing run session: {e}")
+
+
+_run_scope: ContextVar[Optional[RunSessionScope]] = ContextVar("db_run_session_scope", default=None)
+
+
+@contextmanager
+def run_session_scope(factory=None) -> Iterator[RunSessionScope]:
+    """
+    智能体运行范围：范围内（含 copy_context 派生的线程）调用 get_session() 时共用会话
+
+    已处于某个范围内时直接复用外层范围。
+    """
+    current = _run_scope.get()
+    if current is not None:
+        yield current
+        return
+    # 会话工厂在首次 get_session() 时才解析，不访问数据库的运行不会创建引擎
+    scope = RunSessionScope(factory or (lambda: get_sessionmaker()()))
+    token = _run_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _run_scope.reset(token)
+        scope.close()
+
+
 def get_session():
+    scope = _run_scope.get()
+    if scope is not None:
+        return scope.session()
     return get_sessionmaker()()
 
+
+def get_pool_stats() -> Dict[str, Any]:
+    """连接池统计（未创建的引擎不出现在结果中）"""
+    stats = {}
+    if _engine is not None:
+        stats["sync"] = _engine.pool.telemetry()
+    if _async_engine is not None:
+        stats["async"] = _async_engine.sync_engine.pool.telemetry()
+    return stats
+
+
 __all__ = [
+    "PoolSettings",
+    "RunSessionScope",
+    "create_pooled_engine",
+    "get_async_engine",
+    "get_async_session",
+    "get_async_sessionmaker",
     "get_db_url",
     "get_engine",
-    "get_sessionmaker",
+    "get_pool_stats",
     "get_session",
+    "get_sessionmaker",
+    "get_worker_count",
+    "run_session_scope",
 ]
@@ -0,0 +1,287 @@
+"""
+情绪统计引擎 - 基于SQL聚合与日汇总表的情绪统计
+
+- 情绪记录写入时增量更新 emotion_daily_rollups（用户 × 日期 × 情绪）
+- 日/周/月统计、趋势序列直接读取日汇总表，耗时与用户历史记录总量无关
+- 原始记录聚合（GROUP BY emotion / AVG(intensity)）下推到数据库，用于核对和回填
+- 时间统一取数据库时钟：统计日期来自记录的 created_at（数据库默认值），
+  updated_at 使用 now()，"今天"使用 CURRENT_DATE
+"""
+
+from typing import List, Optional, Dict, Any
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert, delete
+
+from storage.database.shared.model import EmotionRecords, EmotionDailyRollups
+
+
+# 统计周期对应的自然日天数（含今天）
+PERIOD_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 30,
+}
+
+
+class EmotionAnalytics:
+    """情绪统计引擎 - 维护日汇总表并提供聚合查询"""
+
+    def today(self, db: Session) -> date:
+        """
+        数据库当前日期（与记录 created_at 的默认值同一时钟）
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            当前日期
+        """
+        return db.scalar(select(func.current_date()))
+
+    def period_start(self, period: str, today: date) -> date:
+        """
+        计算统计周期的起始日期
+
+        Args:
+            period: 统计周期：day/week/month（未知周期按day处理）
+            today: 基准日期（通常为 today(db)）
+
+        Returns:
+            起始日期（含）
+        """
+        days = PERIOD_DAYS.get(period, PERIOD_DAYS["day"])
+        return today - timedelta(days=days - 1)
+
+    def apply_record(self, db: Session, record: EmotionRecords) -> None:
+        """
+        将一条情绪记录累加到日汇总表（不提交事务，由调用方统一提交）
+
+        Args:
+            db: 数据库会话
+            record: 情绪记录（尚未写入时先flush，以取得数据库生成的created_at）
+        """
+        if record.created_at is None:
+            db.flush()
+            db.refresh(record, ['created_at'])
+        stat_date = record.created_at.date()
+        upsert = self._upsert_factory(db)
+
+        if upsert is None:
+            self._apply_record_fallback(db, record, stat_date)
+            return
+
+        stmt = upsert(EmotionDailyRollups).values(
+            user_id=record.user_id,
+            stat_date=stat_date,
+            emotion=record.emotion,
+            emotion_name=record.emotion_name,
+            record_count=1,
+            intensity_sum=record.intensity,
+            updated_at=func.now()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'stat_date', 'emotion'],
+            set_={
+                'record_count': EmotionDailyRollups.record_count + 1,
+                'intensity_sum': EmotionDailyRollups.intensity_sum + stmt.excluded.intensity_sum,
+                'emotion_name': stmt.excluded.emotion_name,
+                'updated_at': func.now()
+            }
+        )
+        db.execute(stmt)
+
+    def get_distribution(self, db: Session, user_id: int, since: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        从日汇总表读取情绪分布
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            since: 起始日期（含），None表示全部历史
+
+        Returns:
+            按记录数降序排列的情绪分布列表
+        """
+        query = db.query(
+            EmotionDailyRollups.emotion,
+            func.max(EmotionDailyRollups.emotion_name).label('emotion_name'),
+            func.sum(EmotionDailyRollups.record_count).label('record_count'),
+            func.sum(EmotionDailyRollups.intensity_sum).label('intensity_sum')
+        ).filter(EmotionDailyRollups.user_id == user_id)
+
+        if since is not None:
+            query = query.filter(EmotionDailyRollups.stat_date >= since)
+
+        rows = query.group_by(EmotionDailyRollups.emotion).order_by(
+            func.sum(EmotionDailyRollups.record_count).desc(),
+            EmotionDailyRollups.emotion
+        ).all()
+
+        return [self._row_to_dict(row) for row in rows]
+
+    def get_trend(self, db: Session, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        从日汇总表读取按天的情绪趋势序列
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            days: 天数（含今天）
+
+        Returns:
+            按日期升序排列的趋势列表，没有记录的日期也会补齐
+        """
+        today = self.today(db)
+        start_date = today - timedelta(days=max(days, 1) - 1)
+
+        rows = db.query(
+            EmotionDailyRollups.stat_date,
+            EmotionDailyRollups.emotion,
+            EmotionDailyRollups.record_count,
+            EmotionDailyRollups.intensity_sum
+        ).filter(
+            EmotionDailyRollups.user_id == user_id,
+            EmotionDailyRollups.stat_date >= start_date
+        ).all()
+
+        series = {}
+        for offset in range((today - start_date).days + 1):
+            series[start_date + timedelta(days=offset)] = [0, 0.0, {}]
+
+        for stat_date, emotion, record_count, intensity_sum in rows:
+            point = series.get(stat_date)
+            if point is None:
+                continue
+            point[0] += record_count
+            point[1] += intensity_sum
+            point[2][emotion] = point[2].get(emotion, 0) + record_count
+
+        trend = []
+        for day, (total, intensity_sum, emotions) in series.items():
+            trend.append({
+                "date": day.isoformat(),
+                "total_records": total,
+                "average_intensity": round(intensity_sum / total, 2) if total else 0.0,
+                "emotions": emotions
+            })
+        return trend
+
+    def aggregate_records(self, db: Session, user_id: int, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        直接在原始记录上做SQL聚合（走 user_id + created_at 复合索引）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            since: 起始时间（含），None表示全部历史
+
+        Returns:
+            按记录数降序排列的情绪分布列表
+        """
+        query = db.query(
+            EmotionRecords.emotion,
+            func.max(EmotionRecords.emotion_name).label('emotion_name'),
+            func.count(EmotionRecords.id).label('record_count'),
+            func.sum(EmotionRecords.intensity).label('intensity_sum')
+        ).filter(EmotionRecords.user_id == user_id)
+
+        if since is not None:
+            query = query.filter(EmotionRecords.created_at >= since)
+
+        rows = query.group_by(EmotionRecords.emotion).order_by(
+            func.count(EmotionRecords.id).desc(),
+            EmotionRecords.emotion
+        ).all()
+
+        return [self._row_to_dict(row) for row in rows]
+
+    def rebuild_rollups(self, db: Session, user_id: Optional[int] = None) -> int:
+        """
+        根据原始记录重建日汇总表（用于首次回填或数据核对后修复）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID，None表示重建所有用户
+
+        Returns:
+            重建后的汇总行数
+        """
+        stat_date = func.date(EmotionRecords.created_at)
+        source = select(
+            EmotionRecords.user_id,
+            stat_date,
+            EmotionRecords.emotion,
+            func.max(EmotionRecords.emotion_name),
+            func.count(EmotionRecords.id),
+            func.sum(EmotionRecords.intensity)
+        ).group_by(EmotionRecords.user_id, stat_date, EmotionRecords.emotion)
+
+        clear = delete(EmotionDailyRollups)
+        if user_id is not None:
+            source = source.where(EmotionRecords.user_id == user_id)
+            clear = clear.where(EmotionDailyRollups.user_id == user_id)
+
+        try:
+            db.execute(clear)
+            result = db.execute(
+                insert(EmotionDailyRollups).from_select(
+                    ['user_id', 'stat_date', 'emotion', 'emotion_name', 'record_count', 'intensity_sum'],
+                    source
+                )
+            )
+            db.commit()
+            return result.rowcount
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    def _upsert_factory(self, db: Session):
+        """按数据库方言返回支持 ON CONFLICT 的 insert 构造器"""
+        dialect = db.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+            return pg_insert
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            return sqlite_insert
+        return None
+
+    def _apply_record_fallback(self, db: Session, record: EmotionRecords, stat_date: date) -> None:
+        """不支持 ON CONFLICT 的数据库：行锁读取后更新"""
+        rollup = db.query(EmotionDailyRollups).filter(
+            EmotionDailyRollups.user_id == record.user_id,
+            EmotionDailyRollups.stat_date == stat_date,
+            EmotionDailyRollups.emotion == record.emotion
+        ).with_for_update().first()
+
+        if rollup is None:
+            db.add(EmotionDailyRollups(
+                user_id=record.user_id,
+                stat_date=stat_date,
+                emotion=record.emotion,
+                emotion_name=record.emotion_name,
+                record_count=1,
+                intensity_sum=record.intensity
+            ))
+        else:
+            rollup.record_count += 1
+            rollup.intensity_sum += record.intensity
+            rollup.emotion_name = record.emotion_name
+            rollup.updated_at = func.now()
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict[str, Any]:
+        record_count = int(row.record_count or 0)
+        intensity_sum = float(row.intensity_sum or 0.0)
+        return {
+            "emotion": row.emotion,
+            "emotion_name": row.emotion_name,
+            "record_count": record_count,
+            "intensity_sum": intensity_sum,
+            "average_intensity": round(intensity_sum / record_count, 2) if record_count else 0.0
+        }
+
+
+# 全局情绪统计引擎实例
+emotion_analytics = EmotionAnalytics()
@@ -4,11 +4,11 @@
 
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
 
 from storage.database.shared.model import EmotionRecords, EmotionDiaries
+from storage.database.emotion_analytics import emotion_analytics
 
 
 # --- Pydantic Models for Validation ---
@@ -80,8 +80,11 @@ class EmotionManager:
         db_record = EmotionRecords(**record_in.model_dump())
         db.add(db_record)
         try:
-            db.commit()
+            db.flush()
             db.refresh(db_record)
+            # 同一事务内累加日汇总，保证统计与明细一致
+            emotion_analytics.apply_record(db, db_record)
+            db.commit()
             return EmotionRecordResponse.model_validate(db_record)
         except Exception as e:
             db.rollback()
@@ -107,59 +110,48 @@ class EmotionManager:
 
     def get_emotion_statistics(self, db: Session, user_id: int, period: str = "day") -> Dict[str, Any]:
         """
-        获取情绪统计数据
+        获取情绪统计数据（读取日汇总表）
 
         Args:
             db: 数据库会话
             user_id: 用户ID
-            period: 统计周期：day/week/month
+            period: 统计周期：day（今天）/week（近7天）/month（近30天）
 
         Returns:
             情绪统计数据
         """
-        # 计算时间范围
-        now = datetime.now()
-        if period == "day":
-            start_time = now - timedelta(days=1)
-        elif period == "week":
-            start_time = now - timedelta(weeks=1)
-        elif period == "month":
-            start_time = now - timedelta(days=30)
-        else:
-            start_time = now - timedelta(days=1)
-
-        # 查询指定时间范围内的记录
-        records = db.query(EmotionRecords).filter(
-            and_(
-                EmotionRecords.user_id == user_id,
-                EmotionRecords.created_at >= start_time
-            )
-        ).all()
-
-        # 统计情绪分布
-        emotion_distribution = {}
-        emotion_distribution_with_names = {}
-        total_records = len(records)
-
-        for record in records:
-            emotion = record.emotion
-            emotion_name = record.emotion_name
-
-            if emotion not in emotion_distribution:
-                emotion_distribution[emotion] = 0
-            if emotion_name not in emotion_distribution_with_names:
-                emotion_distribution_with_names[emotion_name] = 0
+        since = emotion_analytics.period_start(period, emotion_analytics.today(db))
+        distribution = emotion_analytics.get_distribution(db, user_id, since=since)
 
-            emotion_distribution[emotion] += 1
-            emotion_distribution_with_names[emotion_name] += 1
+        total_records = sum(item["record_count"] for item in distribution)
+        total_intensity = sum(item["intensity_sum"] for item in distribution)
 
         return {
             "period": period,
             "total_records": total_records,
-            "emotion_distribution": emotion_distribution,
-            "emotion_distribution_with_names": emotion_distribution_with_names
+            "emotion_distribution": {
+                item["emotion"]: item["record_count"] for item in distribution
+            },
+            "emotion_distribution_with_names": {
+                item["emotion_name"]: item["record_count"] for item in distribution
+            },
+            "average_intensity": round(total_intensity / total_records, 2) if total_records else 0.0
         }
 
+    def get_emotion_trend(self, db: Session, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        获取按天的情绪趋势序列（读取日汇总表）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            days: 天数（含今天）
+
+        Returns:
+            每日情绪分布与平均强度列表
+        """
+        return emotion_analytics.get_trend(db, user_id, days=days)
+
     def create_emotion_diary(self, db: Session, diary_in: EmotionDiaryCreate) -> EmotionDiaryResponse:
         """
         创建情绪日记
@@ -223,7 +215,7 @@ class EmotionManager:
 
     def analyze_emotion_pattern(self, db: Session, user_id: int) -> Dict[str, Any]:
         """
-        分析用户的情绪模式
+        分析用户的情绪模式（读取日汇总表）
 
         Args:
             db: 数据库会话
@@ -232,12 +224,9 @@ class EmotionManager:
         Returns:
             情绪模式分析结果
         """
-        # 获取所有情绪记录
-        records = db.query(EmotionRecords).filter(
-            EmotionRecords.user_id == user_id
-        ).all()
+        distribution = emotion_analytics.get_distribution(db, user_id)
 
-        if not records:
+        if not distribution:
             return {
                 "total_records": 0,
                 "most_common_emotion": None,
@@ -245,33 +234,16 @@ class EmotionManager:
                 "average_intensity": 0.0
             }
 
-        # 统计最常见情绪
-        emotion_counts = {}
-        total_intensity = 0.0
-
-        for record in records:
-            emotion = record.emotion
-            if emotion not in emotion_counts:
-                emotion_counts[emotion] = 0
-            emotion_counts[emotion] += 1
-            total_intensity += record.intensity
-
-        # 找到最常见情绪
-        most_common_emotion = max(emotion_counts, key=emotion_counts.get)
-        most_common_emotion_name = records[0].emotion_name  # 使用第一条记录的情绪名称
-        for r in records:
-            if r.emotion == most_common_emotion:
-                most_common_emotion_name = r.emotion_name
-                break
-
-        # 计算平均强度
-        average_intensity = total_intensity / len(records)
+        # 分布已按记录数降序排列
+        most_common = distribution[0]
+        total_records = sum(item["record_count"] for item in distribution)
+        total_intensity = sum(item["intensity_sum"] for item in distribution)
 
         return {
-            "total_records": len(records),
-            "most_common_emotion": most_common_emotion,
-            "most_common_emotion_name": most_common_emotion_name,
-            "average_intensity": round(average_intensity, 2)
+            "total_records": total_records,
+            "most_common_emotion": most_common["emotion"],
+            "most_common_emotion_name": most_common["emotion_name"],
+            "average_intensity": round(total_intensity / total_records, 2)
         }
 
     def get_user_emotion_count(self, db: Session, user_id: int) -> int:
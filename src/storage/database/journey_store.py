@@ -0,0 +1,233 @@
+"""
+用户旅程状态存储
+
+替代 assets/user_journey_data.json 的整文件读写：
+- 每个用户一行（user_journeys），阶段变化追加到 user_journey_stage_history，不再读出整个列表再写回
+- 灵值、互动次数用 UPDATE ... SET x = x + n 原子累加，并发的智能体运行不会互相覆盖
+- 阶段切换用条件 UPDATE（当前阶段不同才更新），只有更新成功的一方写入阶段历史
+- 进程内读穿缓存（TTL + LRU），本进程写入后直接更新缓存；其它 worker 的写入最多延迟一个 TTL 可见
+- import_json_file 一次性导入旧 JSON 文件（已存在的用户跳过，可重复执行）
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, and_, func, insert, or_,
+    select, update,
+)
+
+from utils.tool_cache import ToolResultCache
+
+logger = logging.getLogger(__name__)
+
+# 读穿缓存的有效期（秒）与容量
+JOURNEY_CACHE_TTL = 30
+JOURNEY_CACHE_SIZE = 10000
+
+metadata = MetaData()
+
+user_journeys = Table(
+    "user_journeys",
+    metadata,
+    Column("user_id", String(128), primary_key=True, comment="用户ID（用户名、手机号或唯一标识）"),
+    Column("first_login", DateTime(timezone=True), nullable=False),
+    Column("total_lingzhi", BigInteger, nullable=False, default=0),
+    Column("interaction_count", Integer, nullable=False, default=0),
+    Column("path_selected", Boolean, nullable=False, default=False),
+    Column("participation_level", String(20), nullable=True),
+    Column("has_consumed", Boolean, nullable=False, default=False),
+    Column("current_stage", String(32), nullable=True),
+    Column("last_updated", DateTime(timezone=True), nullable=False),
+)
+
+user_journey_stage_history = Table(
+    "user_journey_stage_history",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(128), nullable=False),
+    Column("stage", String(32), nullable=False),
+    Column("total_lingzhi", BigInteger, nullable=False, default=0),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Index("ix_user_journey_stage_history_user_id_id", "user_id", "id"),
+)
+
+
+def _insert_ignore(conn, table: Table, row: Dict[str, Any]) -> bool:
+    """插入一行，主键已存在时跳过（PostgreSQL/SQLite 用 ON CONFLICT DO NOTHING），返回是否插入"""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        if conn.execute(select(table.c.user_id).where(table.c.user_id == row["user_id"])).first() is not None:
+            return False
+        conn.execute(insert(table), row)
+        return True
+    return conn.execute(dialect_insert(table).on_conflict_do_nothing(), row).rowcount == 1
+
+
+class JourneyStore:
+    """用户旅程状态存储"""
+
+    def __init__(self, engine=None, stage_of: Callable[[Dict[str, Any]], str] = None,
+                 cache_ttl: float = JOURNEY_CACHE_TTL, cache_size: int = JOURNEY_CACHE_SIZE):
+        """
+        Args:
+            engine: SQLAlchemy 引擎（默认使用 storage.database.db 的主库引擎）
+            stage_of: 由旅程记录计算当前阶段的函数
+        """
+        self._engine = engine
+        self.stage_of = stage_of
+        self.cache = ToolResultCache("user_journey", ttl=cache_ttl, maxsize=cache_size, depends_on=())
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from storage.database.db import get_engine
+            self._engine = get_engine()
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    metadata.create_all(self._engine, checkfirst=True)
+                    self._schema_ready = True
+        return self._engine
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """读取一个用户的旅程记录（不含阶段历史）"""
+        hit, record = self.cache.get(user_id)
+        if hit:
+            return record
+        with self.engine.connect() as conn:
+            row = conn.execute(select(user_journeys).where(user_journeys.c.user_id == user_id)).first()
+        record = dict(row._mapping) if row is not None else None
+        self.cache.put(user_id, record)
+        return record
+
+    def stage_history(self, user_id: str) -> List[Dict[str, Any]]:
+        """阶段历史（按时间顺序）"""
+        table = user_journey_stage_history
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(table.c.stage, table.c.total_lingzhi, table.c.created_at)
+                .where(table.c.user_id == user_id)
+                .order_by(table.c.id)
+            ).all()
+        return [dict(row._mapping) for row in rows]
+
+    def record_progress(self, user_id: str, lingzhi_gained: int = 0, interaction_count: int = 0,
+                        path_selected: str = "", has_consumed: bool = False) -> Dict[str, Any]:
+        """
+        原子地累加进度，并在阶段变化时追加阶段历史
+
+        Returns:
+            更新后的旅程记录
+        """
+        now = datetime.now()
+
+        values: Dict[str, Any] = {
+            "total_lingzhi": user_journeys.c.total_lingzhi + max(0, lingzhi_gained),
+            "interaction_count": user_journeys.c.interaction_count + interaction_count,
+            "last_updated": now,
+        }
+        if path_selected:
+            values["path_selected"] = True
+            values["participation_level"] = path_selected
+        if has_consumed:
+            values["has_consumed"] = True
+
+        with self.engine.begin() as conn:
+            _insert_ignore(conn, user_journeys, {
+                "user_id": user_id,
+                "first_login": now,
+                "total_lingzhi": 0,
+                "interaction_count": 0,
+                "path_selected": False,
+                "has_consumed": False,
+                "last_updated": now,
+            })
+            conn.execute(update(user_journeys).where(user_journeys.c.user_id == user_id).values(**values))
+            row = conn.execute(select(user_journeys).where(user_journeys.c.user_id == user_id)).first()
+            record = dict(row._mapping)
+
+            if self.stage_of is not None:
+                stage = self.stage_of(record)
+                changed = conn.execute(
+                    update(user_journeys)
+                    .where(and_(
+                        user_journeys.c.user_id == user_id,
+                        or_(user_journeys.c.current_stage.is_(None), user_journeys.c.current_stage != stage),
+                    ))
+                    .values(current_stage=stage)
+                ).rowcount
+                if changed:
+                    conn.execute(insert(user_journey_stage_history).values(
+                        user_id=user_id, stage=stage, total_lingzhi=record["total_lingzhi"], created_at=now
+                    ))
+                record["current_stage"] = stage
+
+        self.cache.put(user_id, record)
+        return record
+
+    def import_json_file(self, path: str) -> int:
+        """
+        导入旧的 user_journey_data.json（已存在的用户跳过）
+
+        Returns:
+            新导入的用户数
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        def parse_time(value, default):
+            try:
+                return datetime.fromisoformat(value) if value else default
+            except (TypeError, ValueError):
+                return default
+
+        now = datetime.now()
+        imported = 0
+        with self.engine.begin() as conn:
+            for user_id, item in data.items():
+                if not isinstance(item, dict):
+                    continue
+                last_updated = parse_time(item.get("last_updated"), now)
+                inserted = _insert_ignore(conn, user_journeys, {
+                    "user_id": user_id,
+                    "first_login": parse_time(item.get("first_login"), last_updated),
+                    "total_lingzhi": int(item.get("total_lingzhi", 0)),
+                    "interaction_count": int(item.get("interaction_count", 0)),
+                    "path_selected": bool(item.get("path_selected", False)),
+                    "participation_level": item.get("participation_level"),
+                    "has_consumed": bool(item.get("has_consumed", False)),
+                    "current_stage": item.get("current_stage"),
+                    "last_updated": last_updated,
+                })
+                # 用户已存在（之前导入过或已有新记录）时连同阶段历史一起跳过
+                if not inserted:
+                    continue
+                imported += 1
+                history = [{
+                    "user_id": user_id,
+                    "stage": record.get("stage"),
+                    "total_lingzhi": int(record.get("total_lingzhi", 0)),
+                    "created_at": parse_time(record.get("timestamp"), last_updated),
+                } for record in item.get("stage_history") or [] if record.get("stage")]
+                if history:
+                    conn.execute(insert(user_journey_stage_history), history)
+                self.cache.discard(user_id)
+        logger.info(f"Imported {imported} user journeys from {path}")
+        return imported
+
+    def count(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(user_journeys)).scalar_one()
@@ -13,7 +13,7 @@ import pytz
 import hashlib
 import json
 from typing import Dict, List, Tuple
-from coze_coding_dev_sdk.database import get_session
+from storage.database.db import get_session
 from storage.database.shared.model import AuditLog
 
 
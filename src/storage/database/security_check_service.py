@@ -6,8 +6,10 @@
 """
 
 from typing import Optional, Tuple, Dict, Any, List
-from coze_coding_dev_sdk.database import get_session
-from storage.database.shared.model import Users, AuditLogs
+from storage.database.db import get_session
+from storage.database.shared.model import Users
+from storage.database.audit_pipeline import get_audit_pipeline
+from storage.database.anomaly_detector import get_anomaly_detector
 from datetime import datetime
 import pytz
 
@@ -18,6 +20,16 @@ class SecurityCheckService:
     def __init__(self):
         self.timezone = pytz.timezone('Asia/Shanghai')
 
+    @property
+    def audit_pipeline(self):
+        """审计日志管道（检查结果入队后由后台批量写入，不在检查内提交）"""
+        return get_audit_pipeline()
+
+    @property
+    def anomaly_detector(self):
+        """异常操作检测器（订阅审计日志管道的事件流）"""
+        return get_anomaly_detector()
+
     def check_permission(self, user_id: int, required_role: str, action: str) -> Tuple[bool, str]:
         """检查用户权限
 
@@ -59,7 +71,7 @@ class SecurityCheckService:
                 return False, f'权限不足，需要{required_role}及以上权限，当前角色：{user.role}'
 
             # 记录权限检查日志
-            audit_log = AuditLogs(
+            self.audit_pipeline.submit(
                 user_id=user_id,
                 action='permission_check',
                 resource_type='permission',
@@ -68,14 +80,12 @@ class SecurityCheckService:
                 status='success',
                 created_at=datetime.now(self.timezone)
             )
-            db.add(audit_log)
-            db.commit()
 
             return True, '权限检查通过'
 
         except Exception as e:
             # 记录权限检查失败日志
-            audit_log = AuditLogs(
+            self.audit_pipeline.submit(
                 user_id=user_id,
                 action='permission_check',
                 resource_type='permission',
@@ -84,8 +94,6 @@ class SecurityCheckService:
                 status='failed',
                 created_at=datetime.now(self.timezone)
             )
-            db.add(audit_log)
-            db.commit()
 
             return False, f'权限检查失败：{str(e)}'
 
@@ -196,7 +204,7 @@ class SecurityCheckService:
                         return False, '贡献值数量格式错误'
 
             # 记录操作检查日志
-            audit_log = AuditLogs(
+            self.audit_pipeline.submit(
                 user_id=user_id,
                 action='operation_check',
                 resource_type='operation',
@@ -205,14 +213,12 @@ class SecurityCheckService:
                 status='success',
                 created_at=datetime.now(self.timezone)
             )
-            db.add(audit_log)
-            db.commit()
 
             return True, '操作检查通过'
 
         except Exception as e:
             # 记录操作检查失败日志
-            audit_log = AuditLogs(
+            self.audit_pipeline.submit(
                 user_id=user_id,
                 action='operation_check',
                 resource_type='operation',
@@ -221,8 +227,6 @@ class SecurityCheckService:
                 status='failed',
                 created_at=datetime.now(self.timezone)
             )
-            db.add(audit_log)
-            db.commit()
 
             return False, f'操作检查失败：{str(e)}'
 
@@ -371,7 +375,7 @@ class SecurityCheckService:
                         return False, f'用户贡献值不足，最低需要{min_contribution}贡献值'
 
             # 记录财务安全检查日志
-            audit_log = AuditLogs(
+            self.audit_pipeline.submit(
                 user_id=params.get('user_id', 0),
                 action='financial_check',
                 resource_type='financial',
@@ -380,14 +384,12 @@ class SecurityCheckService:
                 status='success',
                 created_at=datetime.now(self.timezone)
             )
-            db.add(audit_log)
-            db.commit()
 
             return True, '财务安全检查通过'
 
         except Exception as e:
             # 记录财务安全检查失败日志
-            audit_log = AuditLogs(
+            self.audit_pipeline.submit(
                 user_id=params.get('user_id', 0),
                 action='financial_check',
                 resource_type='financial',
@@ -396,8 +398,6 @@ class SecurityCheckService:
                 status='failed',
                 created_at=datetime.now(self.timezone)
             )
-            db.add(audit_log)
-            db.commit()
 
             return False, f'财务安全检查失败：{str(e)}'
 
@@ -413,57 +413,13 @@ class SecurityCheckService:
         Returns:
             Tuple[bool, List[str]]: (是否异常, 异常原因列表)
         """
-        db = get_session()
-
         try:
-            abnormal_reasons = []
-
-            # 1. 检查短时间内频繁操作
-            recent_logs = db.query(AuditLogs).filter(
-                AuditLogs.user_id == user_id,
-                AuditLogs.created_at >= datetime.now(self.timezone).replace(hour=0, minute=0, second=0, microsecond=0)
-            ).all()
-
-            if len(recent_logs) > 100:
-                abnormal_reasons.append(f'今日操作过于频繁：{len(recent_logs)}次')
-
-            # 2. 检查是否有失败的敏感操作
-            sensitive_actions = ['delete_user', 'update_user_role', 'assign_lingzhi', 'assign_contribution', 'transfer_super_admin']
-            failed_sensitive_logs = db.query(AuditLogs).filter(
-                AuditLogs.user_id == user_id,
-                AuditLogs.action.in_(sensitive_actions),
-                AuditLogs.status == 'failed'
-            ).count()
-
-            if failed_sensitive_logs > 5:
-                abnormal_reasons.append(f'敏感操作失败次数过多：{failed_sensitive_logs}次')
-
-            # 3. 检查是否尝试修改超级管理员
-            super_admin_logs = db.query(AuditLogs).filter(
-                AuditLogs.user_id == user_id,
-                AuditLogs.action == 'update_user_role',
-                AuditLogs.description.like('%超级管理员%')
-            ).count()
-
-            if super_admin_logs > 0:
-                abnormal_reasons.append(f'尝试修改超级管理员权限：{super_admin_logs}次')
-
-            # 4. 检查是否有异常的资金操作（使用审计日志）
-            recent_finance_logs = db.query(AuditLogs).filter(
-                AuditLogs.user_id == user_id,
-                AuditLogs.action.in_(['financial_check', 'create_transaction', 'exchange_lingzhi_to_contribution']),
-                AuditLogs.created_at >= datetime.now(self.timezone).replace(hour=0, minute=0, second=0, microsecond=0)
-            ).count()
-
-            if recent_finance_logs > 20:
-                abnormal_reasons.append(f'今日资金操作过于频繁：{recent_finance_logs}次')
-
-            # 判断是否异常
-            is_abnormal = len(abnormal_reasons) > 0
+            # 按用户的内存计数判断（计数随审计事件流累加，定期从审计日志表重建）
+            is_abnormal, abnormal_reasons = self.anomaly_detector.detect(user_id)
 
             if is_abnormal:
                 # 记录异常操作检测日志
-                audit_log = AuditLogs(
+                self.audit_pipeline.submit(
                     user_id=user_id,
                     action='abnormal_operation_detected',
                     resource_type='security',
@@ -472,17 +428,12 @@ class SecurityCheckService:
                     status='warning',
                     created_at=datetime.now(self.timezone)
                 )
-                db.add(audit_log)
-                db.commit()
 
             return is_abnormal, abnormal_reasons
 
         except Exception as e:
             return False, [f'异常操作检测失败：{str(e)}']
 
-        finally:
-            db.close()
-
     def comprehensive_security_check(self, user_id: int, operation: str, params: Dict[str, Any]) -> Tuple[bool, str]:
         """综合安全检查
 
@@ -1,6 +1,6 @@
 from coze_coding_dev_sdk.database import Base
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKeyConstraint, Index, Integer, Numeric, PrimaryKeyConstraint, String, Table, Text, UniqueConstraint, text, JSON, Float
+from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKeyConstraint, Index, Integer, Numeric, PrimaryKeyConstraint, String, Table, Text, UniqueConstraint, text, JSON, Float
 from typing import Optional
 import datetime
 import decimal
@@ -110,7 +110,8 @@ class AuditLogs(Base):
     __table_args__ = (
         ForeignKeyConstraint(['user_id'], ['users.id'], name='audit_logs_user_id_fkey'),
         PrimaryKeyConstraint('id', name='audit_logs_pkey'),
-        Index('ix_audit_logs_id', 'id')
+        Index('ix_audit_logs_id', 'id'),
+        Index('ix_audit_logs_user_id_action_created_at', 'user_id', 'action', 'created_at')
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, comment='日志ID')
@@ -314,6 +315,7 @@ class EmotionRecords(Base):
         Index('ix_emotion_records_user_id', 'user_id'),
         Index('ix_emotion_records_created_at', 'created_at'),
         Index('ix_emotion_records_emotion', 'emotion'),
+        Index('ix_emotion_records_user_id_created_at', 'user_id', 'created_at'),
         {'comment': '情绪记录表'}
     )
 
@@ -349,3 +351,24 @@ class EmotionDiaries(Base):
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, server_default=text('now()'), comment='创建时间')
 
     user: Mapped['Users'] = relationship('Users', backref='emotion_diaries')
+
+
+class EmotionDailyRollups(Base):
+    """情绪日汇总表 - 按用户、日期、情绪类型预聚合的统计数据"""
+    __tablename__ = 'emotion_daily_rollups'
+    __table_args__ = (
+        ForeignKeyConstraint(['user_id'], ['users.id'], name='emotion_daily_rollups_user_id_fkey'),
+        PrimaryKeyConstraint('id', name='emotion_daily_rollups_pkey'),
+        UniqueConstraint('user_id', 'stat_date', 'emotion', name='uq_emotion_daily_rollups_user_date_emotion'),
+        Index('ix_emotion_daily_rollups_user_id_stat_date', 'user_id', 'stat_date'),
+        {'comment': '情绪日汇总表'}
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, comment='汇总ID')
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, comment='用户ID')
+    stat_date: Mapped[datetime.date] = mapped_column(Date, nullable=False, comment='统计日期')
+    emotion: Mapped[str] = mapped_column(String(20), nullable=False, comment='情绪类型：happy/sad/angry/anxious/surprised/calm')
+    emotion_name: Mapped[str] = mapped_column(String(20), nullable=False, comment='情绪名称：开心/悲伤/愤怒/焦虑/惊讶/平静')
+    record_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text('0'), comment='当日记录数')
+    intensity_sum: Mapped[float] = mapped_column(Float, nullable=False, server_default=text('0'), comment='当日强度总和')
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, server_default=text('now()'), comment='更新时间')
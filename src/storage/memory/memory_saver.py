@@ -131,4 +131,11 @@ def get_memory_saver() -> BaseCheckpointSaver:
     global _memory_manager
     if _memory_manager is None:
         _memory_manager = MemoryManager()
-    return _memory_manager.get_checkpointer()
\ No newline at end of file
+    return _memory_manager.get_checkpointer()
+
+def get_checkpointer_pool_stats() -> dict:
+    """checkpointer 连接池统计（使用 MemorySaver 或尚未创建连接池时为空）"""
+    pool = _memory_manager._pool if _memory_manager is not None else None
+    if pool is None:
+        return {}
+    return pool.get_stats()
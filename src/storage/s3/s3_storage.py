@@ -1,13 +1,15 @@
 import os
 import re
 from pathlib import Path
-from typing import Optional, Any, Dict, List, TypedDict, Iterable
+from typing import Optional, Any, Dict, List, TypedDict, Iterable, Iterator
 from uuid import uuid4
 
 import boto3
 from botocore.exceptions import ClientError
 from boto3.s3.transfer import TransferConfig
 import logging
+
+from storage.s3.transfer import DEFAULT_MAX_CONCURRENCY, TransferEngine, iter_parts
 logger = logging.getLogger(__name__)
 
 # 允许的文件名字符集（面向用户输入的约束）
@@ -230,6 +232,37 @@ class S3SyncStorage:
             logger.error(self._error_msg("Error listing files in S3", e))
             raise e
 
+    def iter_files(self, *, prefix: Optional[str] = None, bucket: Optional[str] = None, page_size: int = 1000) -> Iterator[str]:
+        """逐个产出对象 key，自动跟随 continuation token 翻页（只在内存中保留当前一页）。"""
+        continuation_token: Optional[str] = None
+        while True:
+            page = self.list_files(prefix=prefix, bucket=bucket, max_keys=page_size, continuation_token=continuation_token)
+            yield from page["keys"]
+            continuation_token = page["next_continuation_token"]
+            if not page["is_truncated"] or not continuation_token:
+                return
+
+    def read_files(self, *, file_keys: Iterable[str], bucket: Optional[str] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Dict[str, bytes]:
+        """并发读取多个对象，返回 {key: 内容}；任一对象失败时抛出异常。"""
+        try:
+            engine = TransferEngine(self._get_client(), max_concurrency=max_concurrency)
+            return engine.download_many(bucket=self._resolve_bucket(bucket), keys=file_keys)
+        except Exception as e:
+            logger.error(self._error_msg("Error reading files from S3", e))
+            raise e
+
+    def delete_files(self, *, file_keys: Iterable[str], bucket: Optional[str] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> List[str]:
+        """批量删除多个对象，返回删除失败的 key 列表。"""
+        try:
+            engine = TransferEngine(self._get_client(), max_concurrency=max_concurrency)
+            errors = engine.delete_many(bucket=self._resolve_bucket(bucket), keys=file_keys)
+        except Exception as e:
+            logger.error(self._error_msg("Error deleting files from S3", e))
+            raise e
+        for error in errors:
+            logger.error("Error deleting %s from S3: %s %s", error.get("Key"), error.get("Code"), error.get("Message"))
+        return [error.get("Key") for error in errors]
+
     def generate_presigned_url(self, *, key: str, bucket: Optional[str] = None, expire_time: int = 1800) -> str:
         """通过 S3 Proxy 生成签名 URL。"""
         import json
@@ -297,8 +330,8 @@ class S3SyncStorage:
             bucket: Optional[str] = None,
             multipart_chunksize: int = 5 * 1024 * 1024,
             multipart_threshold: int = 5 * 1024 * 1024,
-            max_concurrency: int = 1,
-            use_threads: bool = False,
+            max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+            use_threads: bool = True,
     ) -> str:
         """流式上传（文件对象）
         - fileobj: 任何带有 read() 方法的文件对象（如 open(..., 'rb') 返回的对象、io.BytesIO 等）
@@ -307,8 +340,8 @@ class S3SyncStorage:
         - bucket: 目标桶；为空时取环境变量或实例默认值
         - multipart_chunksize: 分片大小（默认 5MB，以适配代理层限制）
         - multipart_threshold: 触发分片上传的阈值（默认 5MB）
-        - max_concurrency: 并发分片上传的并发数（默认 1，避免代理层节流影响）
-        - use_threads: 是否启用线程并发（默认 False）
+        - max_concurrency: 并发分片上传的并发数（默认 4；代理层节流时可传 1）
+        - use_threads: 是否启用线程并发（默认 True；为 False 时 max_concurrency 不生效）
         返回：最终写入的对象 key
         """
         try:
@@ -364,13 +397,15 @@ class S3SyncStorage:
 
     def trunk_upload_file(self, *, chunk_iter: Iterable[bytes], file_name: str,
                            content_type: str = "application/octet-stream", bucket: Optional[str] = None,
-                           part_size: int = 5 * 1024 * 1024) -> str:
+                           part_size: int = 5 * 1024 * 1024,
+                           max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> str:
         """流式上传（字节迭代器，显式分片 Multipart Upload）
         - chunk_iter: 可迭代对象，逐块产生 bytes；每块大小可变（内部累积到 part_size 再上传），最后一块可小于 5MB
         - file_name: 原始文件名，用于生成唯一 key
         - content_type: MIME 类型
         - bucket: 目标桶；为空时取环境或实例默认值
         - part_size: 每个 part 的最小大小（除最后一个）；默认 5MB
+        - max_concurrency: 并发上传的分片数（默认 4，单个分片失败会单独重试）
         返回：最终写入的对象 key
         """
         client = self._get_client()
@@ -385,27 +420,14 @@ class S3SyncStorage:
             logger.error(self._error_msg("create_multipart_upload failed", e))
             raise e
 
-        parts = []
-        part_number = 1
-        buffer = bytearray()
+        engine = TransferEngine(client, max_concurrency=max_concurrency)
         try:
-            for chunk in chunk_iter:
-                if not chunk:
-                    continue
-                buffer.extend(chunk)
-                while len(buffer) >= part_size:
-                    data = bytes(buffer[:part_size])
-                    buffer = buffer[part_size:]
-                    resp = client.upload_part(Bucket=target_bucket, Key=key, UploadId=upload_id, PartNumber=part_number,
-                                              Body=data)
-                    parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
-                    part_number += 1
-
-            # 上传最后不足 part_size 的余量
-            if len(buffer) > 0:
-                resp = client.upload_part(Bucket=target_bucket, Key=key, UploadId=upload_id, PartNumber=part_number,
-                                          Body=bytes(buffer))
-                parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
+            parts = engine.upload_parts(
+                bucket=target_bucket,
+                key=key,
+                upload_id=upload_id,
+                parts=iter_parts(chunk_iter, part_size),
+            )
 
             # 完成分片
             client.complete_multipart_upload(
@@ -0,0 +1,206 @@
+"""S3 并发传输引擎
+
+- 分片切分：每个分片一块独立缓冲区，输入块通过 memoryview 直接拷入，每个字节只拷贝一次
+  （原实现每切一个分片都要 bytes(buffer[:n]) 并重新分配剩余缓冲区，总拷贝量随文件大小平方增长）
+- 分片并发上传：有界线程池，最多 max_concurrency * 2 个分片在途，内存占用有上限；
+  结果按分片号排序，complete_multipart_upload 顺序正确
+- 单个分片失败时按指数退避重试，不重传整个文件
+- 多个对象并发下载、批量删除（delete_objects 每次最多 1000 个 key，多批并发）
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# 默认并发数
+DEFAULT_MAX_CONCURRENCY = 4
+
+# 单个分片/对象的最大重试次数
+DEFAULT_MAX_RETRIES = 3
+
+# 重试退避基数（秒），第 n 次重试等待 base * 2^(n-1)
+DEFAULT_RETRY_BACKOFF = 0.5
+
+# delete_objects 单次请求最多的 key 数（S3 限制）
+DELETE_BATCH_SIZE = 1000
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def iter_parts(chunk_iter: Iterable[BytesLike], part_size: int) -> Iterator[BytesLike]:
+    """
+    把任意大小的字节块重新切分为固定大小的分片（最后一个分片可以更小）
+
+    每个完整分片使用一块新分配的 bytearray，已产出的分片不会再被改写，可以安全地交给其他线程上传。
+
+    Args:
+        chunk_iter: 字节块迭代器
+        part_size: 分片大小
+
+    Yields:
+        分片数据（完整分片为 bytearray，最后一个不足 part_size 的分片为 bytes）
+    """
+    if part_size <= 0:
+        raise ValueError("part_size 必须大于 0")
+
+    buffer = bytearray(part_size)
+    view = memoryview(buffer)
+    filled = 0
+    for chunk in chunk_iter:
+        if not chunk:
+            continue
+        data = memoryview(chunk).cast("B")
+        offset = 0
+        while offset < len(data):
+            n = min(part_size - filled, len(data) - offset)
+            view[filled:filled + n] = data[offset:offset + n]
+            filled += n
+            offset += n
+            if filled == part_size:
+                view.release()
+                yield buffer
+                buffer = bytearray(part_size)
+                view = memoryview(buffer)
+                filled = 0
+
+    if filled:
+        yield bytes(view[:filled])
+    view.release()
+
+
+def call_with_retry(func: Callable[[], Any], *, max_retries: int = DEFAULT_MAX_RETRIES,
+                    retry_backoff: float = DEFAULT_RETRY_BACKOFF, description: str = "S3 request") -> Any:
+    """执行请求，失败时按指数退避重试（共执行最多 max_retries + 1 次）"""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            attempt += 1
+            delay = retry_backoff * (2 ** (attempt - 1))
+            logger.warning("%s failed (attempt %d/%d), retrying in %.1fs: %s",
+                           description, attempt, max_retries + 1, delay, e)
+            time.sleep(delay)
+
+
+class TransferEngine:
+    """基于 boto3 client 的并发传输"""
+
+    def __init__(self, client, *, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_retries: int = DEFAULT_MAX_RETRIES, retry_backoff: float = DEFAULT_RETRY_BACKOFF):
+        """
+        Args:
+            client: boto3 S3 client（线程安全，可在线程间共享）
+            max_concurrency: 并发数
+            max_retries: 单个分片/对象的最大重试次数
+            retry_backoff: 重试退避基数（秒）
+        """
+        self.client = client
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    def _retry(self, func: Callable[[], Any], description: str) -> Any:
+        return call_with_retry(func, max_retries=self.max_retries,
+                               retry_backoff=self.retry_backoff, description=description)
+
+    def upload_parts(self, *, bucket: str, key: str, upload_id: str,
+                     parts: Iterable[BytesLike]) -> List[Dict[str, Any]]:
+        """
+        并发上传分片
+
+        Args:
+            bucket: 桶名
+            key: 对象 key
+            upload_id: create_multipart_upload 返回的 UploadId
+            parts: 分片数据迭代器（按顺序编号，从 1 开始）
+
+        Returns:
+            按分片号排序的 [{"PartNumber": n, "ETag": etag}]，可直接用于 complete_multipart_upload
+        """
+        def upload(part_number: int, body: BytesLike) -> Dict[str, Any]:
+            resp = self._retry(
+                lambda: self.client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                                PartNumber=part_number, Body=body),
+                description=f"upload_part #{part_number}"
+            )
+            return {"PartNumber": part_number, "ETag": resp["ETag"]}
+
+        if self.max_concurrency == 1:
+            return [upload(n, body) for n, body in enumerate(parts, start=1)]
+
+        completed: List[Dict[str, Any]] = []
+        max_in_flight = self.max_concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="s3-part") as pool:
+            pending = set()
+            try:
+                for part_number, body in enumerate(parts, start=1):
+                    if len(pending) >= max_in_flight:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        completed.extend(f.result() for f in done)
+                    pending.add(pool.submit(upload, part_number, body))
+                done, pending = wait(pending)
+                completed.extend(f.result() for f in done)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        completed.sort(key=lambda part: part["PartNumber"])
+        return completed
+
+    def _map(self, func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        """并发执行并按输入顺序返回结果"""
+        if self.max_concurrency == 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items)),
+                                thread_name_prefix="s3-transfer") as pool:
+            return list(pool.map(func, items))
+
+    def download_many(self, *, bucket: str, keys: Iterable[str]) -> Dict[str, bytes]:
+        """
+        并发下载多个对象
+
+        Returns:
+            {key: 内容}（任一对象失败时抛出异常）
+        """
+        def download(key: str) -> Tuple[str, bytes]:
+            def get():
+                body = self.client.get_object(Bucket=bucket, Key=key)["Body"]
+                try:
+                    return body.read()
+                finally:
+                    body.close()
+            return key, self._retry(get, description=f"get_object {key}")
+
+        return dict(self._map(download, list(dict.fromkeys(keys))))
+
+    def delete_many(self, *, bucket: str, keys: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        批量删除多个对象（每批 1000 个 key，多批并发）
+
+        Returns:
+            删除失败的条目 [{"Key": key, "Code": code, "Message": message}]
+        """
+        keys = list(dict.fromkeys(keys))
+        batches = [keys[i:i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+
+        def delete(batch: List[str]) -> List[Dict[str, Any]]:
+            resp = self._retry(
+                lambda: self.client.delete_objects(
+                    Bucket=bucket,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+                ),
+                description=f"delete_objects ({len(batch)} keys)"
+            )
+            return resp.get("Errors", []) or []
+
+        errors: List[Dict[str, Any]] = []
+        for batch_errors in self._map(delete, batches):
+            errors.extend(batch_errors)
+        return errors
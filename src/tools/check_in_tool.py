@@ -17,7 +17,7 @@ def check_in(runtime: ToolRuntime = None) -> str:
     Returns:
         str: 签到结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.check_in_manager import CheckInManager
     ctx = runtime.context
 
@@ -88,7 +88,7 @@ def get_check_in_history(
     Returns:
         str: 签到历史记录
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.check_in_manager import CheckInManager
     ctx = runtime.context
 
@@ -133,7 +133,7 @@ def get_today_check_in_status(runtime: ToolRuntime = None) -> str:
     Returns:
         str: 今天的签到状态
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.check_in_manager import CheckInManager
     ctx = runtime.context
 
@@ -191,7 +191,7 @@ def get_today_check_in_statistics(runtime: ToolRuntime = None) -> str:
     Returns:
         str: 今天的签到统计
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.check_in_manager import CheckInManager
 
     # 获取数据库会话
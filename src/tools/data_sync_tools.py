@@ -4,14 +4,113 @@
 """
 import json
 import csv
+import hashlib
 import os
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from langchain.tools import tool, ToolRuntime
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from storage.database.shared.model import Users, Roles
-from coze_coding_dev_sdk.database import get_session
+from storage.database.bulk_pipeline import (
+    DEFAULT_BATCH_SIZE, ProgressReporter, bulk_upsert,
+    iter_csv_records, iter_json_records, write_json_array
+)
+from storage.database.db import get_session
+
+
+# 导出时每次从数据库拉取的行数
+EXPORT_YIELD_PER = 1000
+
+# 导出字段
+EXPORT_FIELDS = [
+    'id', 'name', 'email', 'status', 'is_superuser', 'is_ceo',
+    'two_factor_enabled', 'phone', 'wechat', 'department', 'position',
+    'created_at', 'last_login'
+]
+
+# 导入时允许更新的字段
+IMPORT_UPDATE_FIELDS = ['name', 'phone', 'wechat', 'department', 'position']
+
+# 导入用户的默认密码
+DEFAULT_IMPORT_PASSWORD = "123456"
+
+
+def _iter_export_users(db: Session, status_filter: Optional[str] = None):
+    """按主键顺序流式读取导出字段（yield_per 分批拉取，不构建ORM对象）"""
+    stmt = select(*[getattr(Users, field) for field in EXPORT_FIELDS]).order_by(Users.id)
+    if status_filter:
+        stmt = stmt.where(Users.status == status_filter)
+    return db.execute(stmt.execution_options(yield_per=EXPORT_YIELD_PER))
+
+
+def _format_time(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def _import_users(
+    records,
+    is_test_data: bool,
+    update_existing: bool,
+    batch_size: int,
+    label: str
+) -> str:
+    """按email批量导入用户（每批预取已存在用户、批量插入/更新并提交）"""
+    password_hash = hashlib.sha256(DEFAULT_IMPORT_PASSWORD.encode()).hexdigest()
+
+    def build_insert(row: Dict[str, Any]) -> Dict[str, Any]:
+        # 标记测试数据
+        name = (row.get('name') or '').strip()
+        if is_test_data:
+            name = f"[测试] {name}"
+
+        return {
+            'name': name,
+            'password_hash': password_hash,
+            'status': 'inactive' if is_test_data else 'active',
+            'is_superuser': False,
+            'is_ceo': False,
+            'two_factor_enabled': False,
+            'phone': row.get('phone') or None,
+            'wechat': row.get('wechat') or None,
+            'department': row.get('department') or None,
+            'position': row.get('position') or None
+        }
+
+    def build_update(row: Dict[str, Any], existing: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'name': row.get('name', existing['name']),
+            'phone': row.get('phone') or existing['phone'],
+            'wechat': row.get('wechat') or existing['wechat'],
+            'department': row.get('department') or existing['department'],
+            'position': row.get('position') or existing['position']
+        }
+
+    db = get_session()
+    try:
+        stats = bulk_upsert(
+            db,
+            Users.__table__,
+            records,
+            key='email',
+            build_insert=build_insert,
+            build_update=build_update if update_existing else None,
+            update_columns=IMPORT_UPDATE_FIELDS,
+            batch_size=batch_size,
+            on_progress=ProgressReporter(label),
+            normalize_key=lambda value: (value or '').strip()
+        )
+    finally:
+        db.close()
+
+    result = f"✅ 导入完成:\n"
+    result += f"  - 新增用户: {stats.inserted} 条\n"
+    result += f"  - 更新用户: {stats.updated} 条\n"
+    result += f"  - 跳过用户: {stats.skipped} 条"
+    if stats.batches > 1:
+        result += f"\n  - 分批提交: {stats.batches} 批（每批 {batch_size} 条）"
+    return result
 
 
 @tool
@@ -28,28 +127,18 @@ def export_users_to_csv(runtime: ToolRuntime, output_file: str = "assets/users_e
     """
     db = get_session()
     try:
-        query = db.query(Users)
-        
-        if status_filter:
-            query = query.filter(Users.status == status_filter)
-        
-        users = query.all()
-        
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
+        count = 0
         with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
             writer = csv.writer(f)
             
             # 写入表头
-            writer.writerow([
-                'id', 'name', 'email', 'status', 'is_superuser', 'is_ceo',
-                'two_factor_enabled', 'phone', 'wechat', 'department', 'position',
-                'created_at', 'last_login'
-            ])
+            writer.writerow(EXPORT_FIELDS)
             
-            # 写入数据
-            for user in users:
+            # 流式写入数据
+            for user in _iter_export_users(db, status_filter):
                 writer.writerow([
                     user.id,
                     user.name,
@@ -62,11 +151,12 @@ def export_users_to_csv(runtime: ToolRuntime, output_file: str = "assets/users_e
                     user.wechat or '',
                     user.department or '',
                     user.position or '',
-                    user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else '',
-                    user.last_login.strftime('%Y-%m-%d %H:%M:%S') if user.last_login else ''
+                    _format_time(user.created_at) or '',
+                    _format_time(user.last_login) or ''
                 ])
+                count += 1
         
-        return f"✅ 成功导出 {len(users)} 条用户数据到 {output_file}"
+        return f"✅ 成功导出 {count} 条用户数据到 {output_file}"
     
     except Exception as e:
         return f"❌ 导出失败: {str(e)}"
@@ -75,7 +165,7 @@ def export_users_to_csv(runtime: ToolRuntime, output_file: str = "assets/users_e
 
 
 @tool
-def import_users_from_csv(runtime: ToolRuntime, input_file: str, is_test_data: bool = False, update_existing: bool = False) -> str:
+def import_users_from_csv(runtime: ToolRuntime, input_file: str, is_test_data: bool = False, update_existing: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> str:
     """
     从CSV文件导入用户数据
     
@@ -83,79 +173,22 @@ def import_users_from_csv(runtime: ToolRuntime, input_file: str, is_test_data: b
         input_file: 输入CSV文件路径
         is_test_data: 是否标记为测试数据（如果是，会在name前添加[测试]标记）
         update_existing: 是否更新已存在的用户（根据email匹配）
+        batch_size: 每批处理并提交的记录数
     
     Returns:
         导入结果信息
     """
-    db = get_session()
     try:
         if not os.path.exists(input_file):
             return f"❌ 文件不存在: {input_file}"
         
-        imported_count = 0
-        updated_count = 0
-        skipped_count = 0
-        
-        with open(input_file, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            
-            for row in reader:
-                email = row.get('email', '').strip()
-                if not email:
-                    skipped_count += 1
-                    continue
-                
-                # 检查用户是否已存在
-                existing_user = db.query(Users).filter(Users.email == email).first()
-                
-                if existing_user:
-                    if update_existing:
-                        # 更新现有用户
-                        existing_user.name = row.get('name', existing_user.name)
-                        existing_user.phone = row.get('phone') or existing_user.phone
-                        existing_user.wechat = row.get('wechat') or existing_user.wechat
-                        existing_user.department = row.get('department') or existing_user.department
-                        existing_user.position = row.get('position') or existing_user.position
-                        updated_count += 1
-                    else:
-                        skipped_count += 1
-                        continue
-                else:
-                    # 创建新用户
-                    import hashlib
-                    default_password = "123456"  # 默认密码
-                    
-                    # 标记测试数据
-                    name = row.get('name', '').strip()
-                    if is_test_data:
-                        name = f"[测试] {name}"
-                    
-                    # 创建密码哈希
-                    password_hash = hashlib.sha256(default_password.encode()).hexdigest()
-                    
-                    user = Users(
-                        name=name,
-                        email=email,
-                        password_hash=password_hash,
-                        status='inactive' if is_test_data else 'active',
-                        is_superuser=False,
-                        is_ceo=False,
-                        two_factor_enabled=False,
-                        phone=row.get('phone') or None,
-                        wechat=row.get('wechat') or None,
-                        department=row.get('department') or None,
-                        position=row.get('position') or None
-                    )
-                    
-                    db.add(user)
-                    imported_count += 1
-        
-        db.commit()
-        
-        result = f"✅ 导入完成:\n"
-        result += f"  - 新增用户: {imported_count} 条\n"
-        result += f"  - 更新用户: {updated_count} 条\n"
-        result += f"  - 跳过用户: {skipped_count} 条"
+        result = _import_users(
+            iter_csv_records(input_file),
+            is_test_data,
+            update_existing,
+            batch_size,
+            label=f"导入CSV {input_file}"
+        )
         
         if is_test_data:
             result += f"\n\n💡 提示: 测试数据已标记，所有测试用户的name都带有'[测试]'前缀，默认状态为'inactive'，默认密码为'123456'"
@@ -163,16 +196,13 @@ def import_users_from_csv(runtime: ToolRuntime, input_file: str, is_test_data: b
         return result
     
     except Exception as e:
-        db.rollback()
         return f"❌ 导入失败: {str(e)}"
-    finally:
-        db.close()
 
 
 @tool
 def export_users_to_json(runtime: ToolRuntime, output_file: str = "assets/users_export.json", status_filter: Optional[str] = None) -> str:
     """
-    导出用户数据到JSON文件
+    导出用户数据到JSON文件（文件名以 .jsonl 结尾时导出为 JSON Lines）
     
     Args:
         output_file: 输出文件路径，默认为 assets/users_export.json
@@ -183,19 +213,11 @@ def export_users_to_json(runtime: ToolRuntime, output_file: str = "assets/users_
     """
     db = get_session()
     try:
-        query = db.query(Users)
-        
-        if status_filter:
-            query = query.filter(Users.status == status_filter)
-        
-        users = query.all()
-        
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        data = []
-        for user in users:
-            user_data = {
+        records = (
+            {
                 'id': user.id,
                 'name': user.name,
                 'email': user.email,
@@ -207,15 +229,22 @@ def export_users_to_json(runtime: ToolRuntime, output_file: str = "assets/users_
                 'wechat': user.wechat,
                 'department': user.department,
                 'position': user.position,
-                'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else None,
-                'last_login': user.last_login.strftime('%Y-%m-%d %H:%M:%S') if user.last_login else None
+                'created_at': _format_time(user.created_at),
+                'last_login': _format_time(user.last_login)
             }
-            data.append(user_data)
+            for user in _iter_export_users(db, status_filter)
+        )
         
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            if output_file.endswith('.jsonl'):
+                count = 0
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    count += 1
+            else:
+                count = write_json_array(f, records)
         
-        return f"✅ 成功导出 {len(users)} 条用户数据到 {output_file}"
+        return f"✅ 成功导出 {count} 条用户数据到 {output_file}"
     
     except Exception as e:
         return f"❌ 导出失败: {str(e)}"
@@ -224,83 +253,30 @@ def export_users_to_json(runtime: ToolRuntime, output_file: str = "assets/users_
 
 
 @tool
-def import_users_from_json(runtime: ToolRuntime, input_file: str, is_test_data: bool = False, update_existing: bool = False) -> str:
+def import_users_from_json(runtime: ToolRuntime, input_file: str, is_test_data: bool = False, update_existing: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> str:
     """
-    从JSON文件导入用户数据
+    从JSON文件导入用户数据（支持 JSON 数组和 JSON Lines）
     
     Args:
         input_file: 输入JSON文件路径
         is_test_data: 是否标记为测试数据
         update_existing: 是否更新已存在的用户
+        batch_size: 每批处理并提交的记录数
     
     Returns:
         导入结果信息
     """
-    db = get_session()
     try:
         if not os.path.exists(input_file):
             return f"❌ 文件不存在: {input_file}"
         
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        imported_count = 0
-        updated_count = 0
-        skipped_count = 0
-        
-        for row in data:
-            email = row.get('email', '').strip()
-            if not email:
-                skipped_count += 1
-                continue
-            
-            # 检查用户是否已存在
-            existing_user = db.query(Users).filter(Users.email == email).first()
-            
-            if existing_user:
-                if update_existing:
-                    existing_user.name = row.get('name', existing_user.name)
-                    existing_user.phone = row.get('phone') or existing_user.phone
-                    existing_user.wechat = row.get('wechat') or existing_user.wechat
-                    existing_user.department = row.get('department') or existing_user.department
-                    existing_user.position = row.get('position') or existing_user.position
-                    updated_count += 1
-                else:
-                    skipped_count += 1
-                    continue
-            else:
-                # 创建新用户
-                import hashlib
-                default_password = "123456"
-                password_hash = hashlib.sha256(default_password.encode()).hexdigest()
-                
-                name = row.get('name', '').strip()
-                if is_test_data:
-                    name = f"[测试] {name}"
-                
-                user = Users(
-                    name=name,
-                    email=email,
-                    password_hash=password_hash,
-                    status='inactive' if is_test_data else 'active',
-                    is_superuser=False,
-                    is_ceo=False,
-                    two_factor_enabled=False,
-                    phone=row.get('phone') or None,
-                    wechat=row.get('wechat') or None,
-                    department=row.get('department') or None,
-                    position=row.get('position') or None
-                )
-                
-                db.add(user)
-                imported_count += 1
-        
-        db.commit()
-        
-        result = f"✅ 导入完成:\n"
-        result += f"  - 新增用户: {imported_count} 条\n"
-        result += f"  - 更新用户: {updated_count} 条\n"
-        result += f"  - 跳过用户: {skipped_count} 条"
+        result = _import_users(
+            iter_json_records(input_file),
+            is_test_data,
+            update_existing,
+            batch_size,
+            label=f"导入JSON {input_file}"
+        )
         
         if is_test_data:
             result += f"\n\n💡 提示: 测试数据已标记，默认密码为'123456'"
@@ -308,10 +284,7 @@ def import_users_from_json(runtime: ToolRuntime, input_file: str, is_test_data:
         return result
     
     except Exception as e:
-        db.rollback()
         return f"❌ 导入失败: {str(e)}"
-    finally:
-        db.close()
 
 
 @tool
@@ -433,7 +406,7 @@ def get_data_sync_guide(runtime: ToolRuntime) -> str:
 ```
 使用: export_users_to_json
 参数:
-  - output_file: 输出文件路径（默认: assets/users_export.json）
+  - output_file: 输出文件路径（默认: assets/users_export.json，以 .jsonl 结尾时导出为 JSON Lines）
   - status_filter: 可选的状态过滤
 ```
 
@@ -446,15 +419,17 @@ def get_data_sync_guide(runtime: ToolRuntime) -> str:
   - input_file: 输入CSV文件路径
   - is_test_data: 是否标记为测试数据（默认: false）
   - update_existing: 是否更新已存在用户（默认: false）
+  - batch_size: 每批处理并提交的记录数（默认: 1000）
 ```
 
 #### 从JSON导入
 ```
 使用: import_users_from_json
 参数:
-  - input_file: 输入JSON文件路径
+  - input_file: 输入JSON文件路径（JSON 数组或 JSON Lines）
   - is_test_data: 是否标记为测试数据（默认: false）
   - update_existing: 是否更新已存在用户（默认: false）
+  - batch_size: 每批处理并提交的记录数（默认: 1000）
 ```
 
 ### 3. 批量创建测试用户
@@ -494,6 +469,7 @@ def get_data_sync_guide(runtime: ToolRuntime) -> str:
 3. **数据安全**: 删除测试用户需要二次确认
 4. **邮箱唯一性**: 同一邮箱不会重复导入，除非设置 `update_existing=true`
 5. **生产环境**: 谨慎在生产环境创建测试数据
+6. **大批量导入**: 导入按批次流式处理并逐批提交，中途失败时已提交的批次会保留，修正数据后重新导入即可（已存在的邮箱会被跳过或更新）
 
 ## 📊 CSV文件格式示例
 
@@ -6,7 +6,7 @@
 
 from langchain.tools import tool
 from typing import Optional
-from coze_coding_dev_sdk.database import get_session
+from storage.database.db import get_session
 from storage.database.shared.model import Base, Users, Roles, Permissions, AuditLogs, CheckIns, Sessions
 from sqlalchemy import inspect, text
 import datetime
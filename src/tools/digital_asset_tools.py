@@ -4,9 +4,10 @@
 
 from langchain.tools import tool
 from typing import Optional, Dict, Any
-import requests
 import json
 
+from utils.v9_client import get_v9_client
+
 
 @tool
 def create_digital_asset(
@@ -36,24 +37,16 @@ def create_digital_asset(
         JSON格式的创建结果
     """
     try:
-        url = "http://localhost:8080/api/v9/assets"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'asset_type': asset_type,
-            'asset_name': asset_name,
-            'description': description,
-            'image_url': image_url,
-            'metadata': metadata,
-            'rarity': rarity,
-            'value': value
-        }
-        
-        response = requests.post(url, headers=headers, json=data)
-        result = response.json()
+        result = get_v9_client().call(
+            'create_asset', token,
+            asset_type=asset_type,
+            asset_name=asset_name,
+            description=description,
+            image_url=image_url,
+            metadata=metadata,
+            rarity=rarity,
+            value=value,
+        )
         
         if result.get('success'):
             return json.dumps({
@@ -85,14 +78,7 @@ def get_user_assets(token: str) -> str:
         JSON格式的资产列表
     """
     try:
-        url = "http://localhost:8080/api/v9/assets"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.get(url, headers=headers)
-        result = response.json()
+        result = get_v9_client().call('list_assets', token)
         
         if result.get('success'):
             assets = result.get('data', [])
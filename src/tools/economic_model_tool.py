@@ -6,6 +6,7 @@
 
 from langchain.tools import tool
 from langchain.tools import ToolRuntime
+from utils.tool_cache import cached_tool
 
 # 经济模型常量
 EXCHANGE_RATE = 0.1  # 1贡献值 = 0.1元
@@ -86,6 +87,7 @@ def calculate_total_value(contribution: int, lock_period: str = None) -> dict:
 
 
 @tool
+@cached_tool()
 def get_economic_model_info(runtime: ToolRuntime) -> str:
     """
     获取经济模型核心信息
@@ -395,6 +397,7 @@ def get_income_projection_advanced(
 
 
 @tool
+@cached_tool()
 def get_exchange_info_advanced(runtime: ToolRuntime) -> str:
     """
     获取详细的兑换信息（基于经济模型）
@@ -513,6 +516,7 @@ def get_exchange_info_advanced(runtime: ToolRuntime) -> str:
 
 
 @tool
+@cached_tool()
 def get_new_user_bonus_info(runtime: ToolRuntime) -> str:
     """
     获取新用户权益信息（基于经济模型）
@@ -622,6 +626,7 @@ def get_new_user_bonus_info(runtime: ToolRuntime) -> str:
 
 
 @tool
+@cached_tool(maxsize=512)
 def compare_investment_options(
     contribution: int,
     runtime: ToolRuntime
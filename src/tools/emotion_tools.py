@@ -13,22 +13,15 @@
 
 from typing import Optional
 import json
-from datetime import datetime, timedelta
 from langchain.tools import tool
 
 # 导入数据库相关模块
-from coze_coding_dev_sdk.database import get_session
+from storage.database.db import get_session
 from storage.database.emotion_manager import EmotionManager, EmotionRecordCreate, EmotionDiaryCreate
+from utils.emotion import EMOTION_TYPES, emotion_scorer, build_emotion_result
 
-# 情绪类型定义
-EMOTION_TYPES = {
-    'happy': {'name': '开心', 'icon': '😊', 'color': '#FFD700'},
-    'sad': {'name': '悲伤', 'icon': '😢', 'color': '#87CEEB'},
-    'angry': {'name': '愤怒', 'icon': '😠', 'color': '#FF6347'},
-    'anxious': {'name': '焦虑', 'icon': '😰', 'color': '#DDA0DD'},
-    'surprised': {'name': '惊讶', 'icon': '😲', 'color': '#FFA500'},
-    'calm': {'name': '平静', 'icon': '😌', 'color': '#98FB98'}
-}
+# 情绪趋势最多查询的天数
+MAX_TREND_DAYS = 90
 
 
 @tool
@@ -43,48 +36,8 @@ def detect_emotion(text: str, user_id: Optional[str] = None) -> str:
     Returns:
         情绪识别结果的JSON字符串
     """
-    emotion_scores = {
-        'happy': 0.0, 'sad': 0.0, 'angry': 0.0,
-        'anxious': 0.0, 'surprised': 0.0, 'calm': 0.0
-    }
-
-    happy_keywords = ['开心', '高兴', '快乐', '兴奋', '幸福', '棒', '赞', '哈哈', '笑']
-    sad_keywords = ['难过', '悲伤', '伤心', '哭', '丧', '难受', '痛苦', '失落', '沮丧']
-    angry_keywords = ['生气', '愤怒', '讨厌', '烦', '恨', '气死', '烦死']
-    anxious_keywords = ['担心', '焦虑', '害怕', '紧张', '不安', '慌', '怕']
-    surprised_keywords = ['惊讶', '哇', '天啊', '什么', '不敢相信', '意外']
-    calm_keywords = ['平静', '安静', '舒服', '放松', '宁静']
-
-    text_lower = text.lower()
-    for kw in happy_keywords:
-        if kw in text_lower: emotion_scores['happy'] += 0.2
-    for kw in sad_keywords:
-        if kw in text_lower: emotion_scores['sad'] += 0.2
-    for kw in angry_keywords:
-        if kw in text_lower: emotion_scores['angry'] += 0.2
-    for kw in anxious_keywords:
-        if kw in text_lower: emotion_scores['anxious'] += 0.2
-    for kw in surprised_keywords:
-        if kw in text_lower: emotion_scores['surprised'] += 0.2
-    for kw in calm_keywords:
-        if kw in text_lower: emotion_scores['calm'] += 0.2
-
-    max_score = max(emotion_scores.values())
-    primary_emotion = [k for k, v in emotion_scores.items() if v == max_score][0]
-    total_score = sum(emotion_scores.values())
-    confidence = (max_score / total_score) if total_score > 0 else 0.5
-    intensity = min(1.0, max_score * 2)
-
-    result = {
-        "primary_emotion": {
-            "type": primary_emotion,
-            "name": EMOTION_TYPES[primary_emotion]['name'],
-            "confidence": round(confidence, 2),
-            "intensity": round(intensity, 2)
-        },
-        "all_emotions": emotion_scores,
-        "timestamp": datetime.now().isoformat()
-    }
+    emotion_scores = emotion_scorer.score(text)
+    result = build_emotion_result(emotion_scores)
     return json.dumps(result, ensure_ascii=False)
 
 
@@ -180,6 +133,51 @@ def get_emotion_statistics(user_id: str, period: str = "week") -> str:
         db.close()
 
 
+@tool
+def get_emotion_trend(user_id: str, days: int = 7) -> str:
+    """
+    获取用户近几天的情绪趋势（每天的记录数、平均强度与情绪分布）
+
+    Args:
+        user_id: 用户ID（字符串或整数）
+        days: 天数（含今天，最多90天）
+
+    Returns:
+        趋势结果的JSON字符串
+    """
+    db = get_session()
+    try:
+        mgr = EmotionManager()
+
+        # 转换user_id为整数
+        try:
+            user_id_int = int(user_id)
+        except (ValueError, TypeError):
+            user_id_int = 1
+
+        days = max(1, min(int(days), MAX_TREND_DAYS))
+        trend = mgr.get_emotion_trend(db, user_id_int, days)
+
+        # 添加中文名称映射
+        for point in trend:
+            point["emotions_with_names"] = {
+                EMOTION_TYPES.get(k, {}).get('name', k): v
+                for k, v in point["emotions"].items()
+            }
+
+        return json.dumps({
+            "days": days,
+            "trend": trend
+        }, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "message": f"获取趋势失败: {str(e)}"
+        }, ensure_ascii=False)
+    finally:
+        db.close()
+
+
 @tool
 def create_emotion_diary(user_id: str, content: str, emotion: str, intensity: float, tags: Optional[list] = None) -> str:
     """
@@ -10,11 +10,13 @@
 
 from langchain.tools import tool
 from langchain.tools import ToolRuntime
+from utils.tool_cache import cached_tool
 from datetime import datetime
 import pytz
 
 
 @tool
+@cached_tool(ttl=300, depends_on=("company_info",), should_cache=lambda result: "查询失败" not in result)
 def get_company_info(
     runtime: ToolRuntime = None
 ) -> str:
@@ -25,7 +27,7 @@ def get_company_info(
     Returns:
         str: 公司信息
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from sqlalchemy import text
 
     db = get_session()
@@ -103,7 +105,7 @@ def submit_withdrawal_request(
     Returns:
         str: 提现申请结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users, AuditLogs
     from sqlalchemy import text
 
@@ -382,7 +384,7 @@ def approve_withdrawal_request(
     Returns:
         str: 审核结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users, AuditLogs
     from sqlalchemy import text
 
@@ -631,7 +633,7 @@ def get_withdrawal_requests(
     Returns:
         str: 提现申请列表
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users
     from sqlalchemy import text
 
@@ -736,7 +738,7 @@ def get_financial_report(
     Returns:
         str: 财务报表
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from sqlalchemy import text
 
     db = get_session()
@@ -7,7 +7,7 @@
 from langchain.tools import tool
 from langchain.tools import ToolRuntime
 from typing import Optional, Dict, Any
-from coze_coding_dev_sdk.database import get_session
+from storage.database.db import get_session
 from storage.database.shared.model import Users, AuditLogs
 from datetime import datetime
 import pytz
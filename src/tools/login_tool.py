@@ -31,7 +31,7 @@ def user_auto_register_login(
     Returns:
         str: 登录结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users, AuditLogs
     from storage.database.auto_check_in_service import AutoCheckInService
     import hashlib
@@ -258,7 +258,7 @@ def get_login_status(runtime: ToolRuntime = None) -> str:
 使用 user_login 工具进行登录。
 """
 
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users
 
     # 获取数据库会话
@@ -318,7 +318,7 @@ def user_login(
     Returns:
         str: 登录结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users
     from storage.database.auto_check_in_service import AutoCheckInService
     import hashlib
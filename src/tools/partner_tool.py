@@ -14,6 +14,7 @@ import os
 from datetime import datetime
 from langchain.tools import tool
 from langchain.tools import ToolRuntime
+from utils.tool_cache import cached_tool
 
 # 合伙人资格常量
 PARTNER_QUALIFICATION_LINGZHI = 10000  # 成为合伙人需要的灵值
@@ -466,6 +467,7 @@ def get_partner_application_status(user_id: str, runtime: ToolRuntime) -> str:
 
 
 @tool
+@cached_tool()
 def get_partner_privileges(level: str, runtime: ToolRuntime) -> str:
     """
     获取合伙人权益详情
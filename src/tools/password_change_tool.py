@@ -33,7 +33,7 @@ def change_password(
     Returns:
         str: 密码修改结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users, AuditLogs
     import hashlib
     import re
@@ -266,7 +266,7 @@ def force_change_user_password(
     Returns:
         str: 密码修改结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users, AuditLogs
     import hashlib
     import re
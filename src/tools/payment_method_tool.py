@@ -7,12 +7,14 @@
 
 from langchain.tools import tool
 from langchain.tools import ToolRuntime
+from utils.tool_cache import cached_tool
 from datetime import datetime
 import pytz
 import re
 
 
 @tool
+@cached_tool()
 def get_payment_method_notice(
     runtime: ToolRuntime = None
 ) -> str:
@@ -375,7 +377,7 @@ def submit_payment_method(
     Returns:
         str: 收款方式设置结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users, AuditLogs
 
     # 获取数据库会话
@@ -639,7 +641,7 @@ def get_user_payment_method(
     Returns:
         str: 用户收款方式信息
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users
 
     # 获取数据库会话
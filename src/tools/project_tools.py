@@ -4,9 +4,10 @@
 
 from langchain.tools import tool
 from typing import Optional, Dict, Any
-import requests
 import json
 
+from utils.v9_client import get_v9_client
+
 
 @tool
 def create_project(
@@ -38,25 +39,17 @@ def create_project(
         JSON格式的创建结果
     """
     try:
-        url = "http://localhost:8080/api/v9/projects"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'title': title,
-            'description': description,
-            'project_type': project_type,
-            'budget': budget,
-            'required_skills': required_skills,
-            'required_assets': required_assets,
-            'duration': duration,
-            'location': location
-        }
-        
-        response = requests.post(url, headers=headers, json=data)
-        result = response.json()
+        result = get_v9_client().call(
+            'create_project', token,
+            title=title,
+            description=description,
+            project_type=project_type,
+            budget=budget,
+            required_skills=required_skills,
+            required_assets=required_assets,
+            duration=duration,
+            location=location,
+        )
         
         if result.get('success'):
             return json.dumps({
@@ -94,14 +87,7 @@ def get_project_list(
         JSON格式的项目列表
     """
     try:
-        url = f"http://localhost:8080/api/v9/projects?project_type={project_type}&status={status}"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.get(url, headers=headers)
-        result = response.json()
+        result = get_v9_client().call('list_projects', token, project_type=project_type, status=status)
         
         if result.get('success'):
             projects = result.get('data', [])
@@ -138,14 +124,7 @@ def match_project_resources(
         JSON格式的匹配结果
     """
     try:
-        url = f"http://localhost:8080/api/v9/projects/{project_id}/match"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(url, headers=headers)
-        result = response.json()
+        result = get_v9_client().call('match_resources', token, project_id=project_id)
         
         if result.get('success'):
             matches = result.get('data', [])
@@ -186,19 +165,12 @@ def join_project(
         JSON格式的参与结果
     """
     try:
-        url = f"http://localhost:8080/api/v9/projects/{project_id}/join"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'resource_id': resource_id,
-            'role': role
-        }
-        
-        response = requests.post(url, headers=headers, json=data)
-        result = response.json()
+        result = get_v9_client().call(
+            'join_project', token,
+            project_id=project_id,
+            resource_id=resource_id,
+            role=role,
+        )
         
         if result.get('success'):
             return json.dumps({
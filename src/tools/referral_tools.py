@@ -4,9 +4,10 @@
 
 from langchain.tools import tool
 from typing import Optional, Dict, Any
-import requests
 import json
 
+from utils.v9_client import get_v9_client
+
 
 @tool
 def get_user_referrals(token: str) -> str:
@@ -20,14 +21,7 @@ def get_user_referrals(token: str) -> str:
         JSON格式的推荐列表和分润统计
     """
     try:
-        url = "http://localhost:8080/api/v9/referrals"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.get(url, headers=headers)
-        result = response.json()
+        result = get_v9_client().call('list_referrals', token)
         
         if result.get('success'):
             return json.dumps({
@@ -59,14 +53,7 @@ def get_commission_records(token: str) -> str:
         JSON格式的分润记录列表
     """
     try:
-        url = "http://localhost:8080/api/v9/commissions"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.get(url, headers=headers)
-        result = response.json()
+        result = get_v9_client().call('list_commissions', token)
         
         if result.get('success'):
             return json.dumps({
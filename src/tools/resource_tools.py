@@ -4,9 +4,10 @@
 
 from langchain.tools import tool
 from typing import Optional, Dict, Any
-import requests
 import json
 
+from utils.v9_client import get_v9_client
+
 
 @tool
 def add_user_resource(
@@ -32,22 +33,14 @@ def add_user_resource(
         JSON格式的添加结果
     """
     try:
-        url = "http://localhost:8080/api/v9/resources"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'resource_type': resource_type,
-            'resource_name': resource_name,
-            'description': description,
-            'estimated_value': estimated_value,
-            'tags': tags
-        }
-        
-        response = requests.post(url, headers=headers, json=data)
-        result = response.json()
+        result = get_v9_client().call(
+            'add_resource', token,
+            resource_type=resource_type,
+            resource_name=resource_name,
+            description=description,
+            estimated_value=estimated_value,
+            tags=tags,
+        )
         
         if result.get('success'):
             return json.dumps({
@@ -79,14 +72,7 @@ def get_user_resources(token: str) -> str:
         JSON格式的资源列表
     """
     try:
-        url = "http://localhost:8080/api/v9/resources"
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.get(url, headers=headers)
-        result = response.json()
+        result = get_v9_client().call('list_resources', token)
         
         if result.get('success'):
             resources = result.get('data', [])
@@ -23,7 +23,7 @@ def get_today_registration_count(
     Returns:
         str: 今日注册用户数量信息
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users
 
     # 获取数据库会话
@@ -96,7 +96,7 @@ def get_today_active_users(
     Returns:
         str: 今日活跃用户数量信息
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users
     from datetime import timedelta
 
@@ -158,7 +158,7 @@ def get_platform_statistics(
     Returns:
         str: 平台综合统计信息
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users, CheckIns
     from datetime import timedelta
 
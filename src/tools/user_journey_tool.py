@@ -5,12 +5,16 @@
 支持从新用户到合伙人的完整旅程管理。
 """
 
-import json
+import logging
 import os
-from datetime import datetime, timedelta
+import threading
 from langchain.tools import tool
 from langchain.tools import ToolRuntime
 
+from storage.database.journey_store import JourneyStore
+
+logger = logging.getLogger(__name__)
+
 # 用户旅程阶段常量
 STAGE_LOGIN_REGISTER = "login_register"  # 登录/注册
 STAGE_SYSTEM_EXPERIENCE = "system_experience"  # 系统体验
@@ -25,80 +29,86 @@ LEVEL_LIGHT = "light"  # 轻度参与
 LEVEL_MEDIUM = "medium"  # 中度参与
 LEVEL_DEEP = "deep"  # 深度参与
 
-# 用户旅程数据文件路径
+# 旧版用户旅程数据文件（首次使用时导入数据库，导入后重命名为 .imported）
 USER_JOURNEY_FILE = "assets/user_journey_data.json"
 
-
-def _load_journey_data():
-    """加载用户旅程数据"""
-    try:
-        if os.path.exists(USER_JOURNEY_FILE):
-            with open(USER_JOURNEY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    except Exception as e:
-        return {}
-
-
-def _save_journey_data(data):
-    """保存用户旅程数据"""
-    try:
-        # 确保assets目录存在
-        os.makedirs(os.path.dirname(USER_JOURNEY_FILE), exist_ok=True)
-        
-        with open(USER_JOURNEY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        return False
-
-
-def _get_user_stage(user_id: str) -> str:
+_journey_store = None
+_journey_store_lock = threading.Lock()
+
+
+def get_journey_store() -> JourneyStore:
+    """获取用户旅程存储（首次调用时导入旧 JSON 文件）"""
+    global _journey_store
+    if _journey_store is None:
+        with _journey_store_lock:
+            if _journey_store is None:
+                store = JourneyStore(stage_of=_stage_of_record)
+                if os.path.exists(USER_JOURNEY_FILE):
+                    # 多个 worker 可能同时导入（已存在的用户会跳过），先完成的一方重命名文件
+                    try:
+                        store.import_json_file(USER_JOURNEY_FILE)
+                        os.replace(USER_JOURNEY_FILE, USER_JOURNEY_FILE + ".imported")
+                    except FileNotFoundError:
+                        logger.info("旧版用户旅程数据已由其他进程导入")
+                _journey_store = store
+    return _journey_store
+
+
+def _stage_of_record(user_data: dict) -> str:
     """
-    根据用户信息判断当前所处的旅程阶段
-    
+    根据旅程记录判断当前所处的旅程阶段
+
     Args:
-        user_id: 用户ID
-    
+        user_data: 用户旅程记录
+
     Returns:
         当前旅程阶段
     """
-    data = _load_journey_data()
-    
-    if user_id not in data:
-        return STAGE_LOGIN_REGISTER
-    
-    user_data = data[user_id]
-    
     # 检查是否达到合伙人资格
     total_lingzhi = user_data.get("total_lingzhi", 0)
     if total_lingzhi >= 10000:
         return STAGE_PARTNER
-    
+
     # 检查是否有兑换/消费记录
     if user_data.get("has_consumed", False):
         return STAGE_CONSUME_LINGZHI
-    
+
     # 检查是否开始获得灵值
     if user_data.get("total_lingzhi", 0) > 10:
         return STAGE_GAIN_LINGZHI
-    
+
     # 检查是否已选择路径
     if user_data.get("path_selected", False):
         return STAGE_GAIN_LINGZHI
-    
+
     # 检查是否了解系统
     interaction_count = user_data.get("interaction_count", 0)
     if interaction_count >= 3:
         return STAGE_SYSTEM_UNDERSTANDING
-    
+
     # 检查是否已体验系统
     if interaction_count >= 1:
         return STAGE_SYSTEM_EXPERIENCE
-    
+
     return STAGE_LOGIN_REGISTER
 
 
+def _get_user_stage(user_id: str) -> str:
+    """
+    判断用户当前所处的旅程阶段（只读取该用户一行）
+
+    Args:
+        user_id: 用户ID
+
+    Returns:
+        当前旅程阶段
+    """
+    user_data = get_journey_store().get(user_id)
+    if user_data is None:
+        return STAGE_LOGIN_REGISTER
+    return _stage_of_record(user_data)
+
+
 def _get_participation_level(avg_daily_lingzhi: float) -> str:
     """
     根据日均灵值获取参与级别
@@ -252,60 +262,41 @@ def update_user_journey_progress(
     Returns:
         更新结果及当前进度
     """
-    data = _load_journey_data()
-    
-    # 初始化用户数据
-    if user_id not in data:
-        data[user_id] = {
-            "user_id": user_id,
-            "first_login": datetime.now().isoformat(),
-            "total_lingzhi": 0,
-            "interaction_count": 0,
-            "path_selected": False,
-            "has_consumed": False,
-            "stage_history": []
-        }
-    
-    user_data = data[user_id]
-    
-    # 更新数据
-    if lingzhi_gained > 0:
-        user_data["total_lingzhi"] += lingzhi_gained
-    
-    user_data["interaction_count"] += interaction_count
-    
-    if path_selected:
-        user_data["path_selected"] = True
-        user_data["participation_level"] = path_selected
-    
-    if has_consumed:
-        user_data["has_consumed"] = has_consumed
-    
-    # 更新阶段
-    current_stage = _get_user_stage(user_id)
-    if current_stage != user_data.get("current_stage"):
-        user_data["stage_history"].append({
-            "stage": current_stage,
-            "timestamp": datetime.now().isoformat(),
-            "total_lingzhi": user_data["total_lingzhi"]
-        })
-    
-    user_data["current_stage"] = current_stage
-    user_data["last_updated"] = datetime.now().isoformat()
-    
-    # 保存数据
-    if _save_journey_data(data):
-        stage_names = {
-            STAGE_LOGIN_REGISTER: "登录/注册",
-            STAGE_SYSTEM_EXPERIENCE: "系统体验",
-            STAGE_SYSTEM_UNDERSTANDING: "系统了解",
-            STAGE_PATH_SELECTION: "选择路径",
-            STAGE_GAIN_LINGZHI: "获得灵值",
-            STAGE_CONSUME_LINGZHI: "兑换/消费灵值",
-            STAGE_PARTNER: "成为合伙人"
-        }
-        
-        return f"""
+    return _record_progress(user_id, lingzhi_gained, interaction_count, path_selected, has_consumed)
+
+
+def _record_progress(
+    user_id: str,
+    lingzhi_gained: int = 0,
+    interaction_count: int = 1,
+    path_selected: str = "",
+    has_consumed: bool = False
+) -> str:
+    """更新用户旅程进度（工具之间直接调用此函数）"""
+    try:
+        user_data = get_journey_store().record_progress(
+            user_id,
+            lingzhi_gained=lingzhi_gained,
+            interaction_count=interaction_count,
+            path_selected=path_selected,
+            has_consumed=has_consumed,
+        )
+    except Exception as e:
+        logger.error(f"更新用户旅程失败: {e}")
+        return "❌ 更新失败，请重试。"
+
+    current_stage = user_data["current_stage"]
+    stage_names = {
+        STAGE_LOGIN_REGISTER: "登录/注册",
+        STAGE_SYSTEM_EXPERIENCE: "系统体验",
+        STAGE_SYSTEM_UNDERSTANDING: "系统了解",
+        STAGE_PATH_SELECTION: "选择路径",
+        STAGE_GAIN_LINGZHI: "获得灵值",
+        STAGE_CONSUME_LINGZHI: "兑换/消费灵值",
+        STAGE_PARTNER: "成为合伙人"
+    }
+
+    return f"""
 ✅ 用户旅程进度已更新！
 
 👤 用户ID：{user_id}
@@ -313,11 +304,9 @@ def update_user_journey_progress(
 💰 总灵值：{user_data['total_lingzhi']}灵值
 💵 当前价值：{user_data['total_lingzhi'] * 0.1}元
 🔄 互动次数：{user_data['interaction_count']}次
-🎯 参与级别：{user_data.get('participation_level', '未选择')}
-⏰ 最后更新：{datetime.fromisoformat(user_data['last_updated']).strftime('%Y-%m-%d %H:%M:%S')}
+🎯 参与级别：{user_data.get('participation_level') or '未选择'}
+⏰ 最后更新：{user_data['last_updated'].strftime('%Y-%m-%d %H:%M:%S')}
 """
-    else:
-        return "❌ 更新失败，请重试。"
 
 
 @tool
@@ -406,7 +395,7 @@ def get_journey_recommended_path(
 """
     
     # 自动更新用户路径选择
-    update_user_journey_progress(
+    _record_progress(
         user_id=user_id,
         lingzhi_gained=0,
         interaction_count=0,
@@ -428,9 +417,9 @@ def get_journey_milestone(user_id: str, runtime: ToolRuntime) -> str:
     Returns:
         用户里程碑和成就信息
     """
-    data = _load_journey_data()
+    user_data = get_journey_store().get(user_id)
     
-    if user_id not in data:
+    if user_data is None:
         return """
 📍 您还没有开始您的旅程！
 
@@ -441,7 +430,6 @@ def get_journey_milestone(user_id: str, runtime: ToolRuntime) -> str:
 - 🎯 里程碑4：累计获得10000灵值（1000元）- 成为合伙人
 """
     
-    user_data = data[user_id]
     total_lingzhi = user_data.get("total_lingzhi", 0)
     
     milestones = [
@@ -459,7 +447,7 @@ def get_journey_milestone(user_id: str, runtime: ToolRuntime) -> str:
 📊 当前进度：
 💰 总灵值：{total_lingzhi}灵值
 💵 当前价值：{total_lingzhi * 0.1}元
-🎯 参与级别：{user_data.get('participation_level', '未选择')}
+🎯 参与级别：{user_data.get('participation_level') or '未选择'}
 
 ---
 
@@ -479,7 +467,8 @@ def get_journey_milestone(user_id: str, runtime: ToolRuntime) -> str:
             result += f"⬜ {name}（{lingzhi}灵值）- 距离还有{remaining}灵值\n   奖励：{reward}\n\n"
     
     # 添加阶段历史
-    if "stage_history" in user_data and user_data["stage_history"]:
+    stage_history = get_journey_store().stage_history(user_id)
+    if stage_history:
         stage_names = {
             STAGE_LOGIN_REGISTER: "登录/注册",
             STAGE_SYSTEM_EXPERIENCE: "系统体验",
@@ -491,11 +480,10 @@ def get_journey_milestone(user_id: str, runtime: ToolRuntime) -> str:
         }
         
         result += "---\n## 📈 旅程历程\n\n"
-        for stage_record in user_data["stage_history"]:
+        for stage_record in stage_history:
             stage = stage_record["stage"]
-            timestamp = stage_record["timestamp"]
             lingzhi_at_stage = stage_record["total_lingzhi"]
-            formatted_time = datetime.fromisoformat(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            formatted_time = stage_record["created_at"].strftime('%Y-%m-%d %H:%M:%S')
             
             result += f"⏰ {formatted_time}\n"
             result += f"   阶段：{stage_names.get(stage, stage)}\n"
@@ -642,7 +630,7 @@ def get_new_user_guide(user_id: str, runtime: ToolRuntime) -> str:
 """
     
     # 自动记录用户开始旅程
-    update_user_journey_progress(
+    _record_progress(
         user_id=user_id,
         lingzhi_gained=0,
         interaction_count=1,
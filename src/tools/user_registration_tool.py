@@ -269,7 +269,7 @@ def submit_real_name_authentication(
     Returns:
         str: 实名认证结果
     """
-    from coze_coding_dev_sdk.database import get_session
+    from storage.database.db import get_session
     from storage.database.shared.model import Users, AuditLogs, ReferralRelations
 
     # 获取数据库会话
@@ -0,0 +1,23 @@
+"""
+情绪识别模块
+
+关键词表在导入时编译为首字索引 + 首字字符类正则（见 scorer），支持否定词/程度词修饰和批量评分。
+"""
+
+from .scorer import (
+    EMOTION_TYPES,
+    EMOTION_KEYWORDS,
+    EmotionScorer,
+    emotion_scorer,
+    build_emotion_result,
+    detect_emotions_batch,
+)
+
+__all__ = [
+    "EMOTION_TYPES",
+    "EMOTION_KEYWORDS",
+    "EmotionScorer",
+    "emotion_scorer",
+    "build_emotion_result",
+    "detect_emotions_batch",
+]
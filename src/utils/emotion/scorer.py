@@ -0,0 +1,214 @@
+"""
+情绪评分器 - 关键词表一次性编译为首字索引 + 首字字符类正则
+
+- 所有关键词的首字合并为一个字符类正则，由 re 在 C 层定位候选位置，再按首字索引核对关键词；
+  每个位置都会被检查，因此能得到全部命中（包括重叠命中，如"害怕"中的"怕"、"不安静"中的"安静"）
+- 扫描耗时只与文本长度和候选位置数相关，不随关键词表规模线性增长
+- 命中前的否定词（不/没有/别...）使该关键词不计分，程度词（非常/有点...）按权重缩放
+- 批量评分时将所有文本用分隔符拼接后只扫描一遍，再按偏移量归属到各文本
+"""
+
+import re
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+# 情绪类型定义
+EMOTION_TYPES = {
+    'happy': {'name': '开心', 'icon': '😊', 'color': '#FFD700'},
+    'sad': {'name': '悲伤', 'icon': '😢', 'color': '#87CEEB'},
+    'angry': {'name': '愤怒', 'icon': '😠', 'color': '#FF6347'},
+    'anxious': {'name': '焦虑', 'icon': '😰', 'color': '#DDA0DD'},
+    'surprised': {'name': '惊讶', 'icon': '😲', 'color': '#FFA500'},
+    'calm': {'name': '平静', 'icon': '😌', 'color': '#98FB98'}
+}
+
+# 情绪关键词表（顺序决定同分时的主情绪）
+EMOTION_KEYWORDS = {
+    'happy': ['开心', '高兴', '快乐', '兴奋', '幸福', '棒', '赞', '哈哈', '笑'],
+    'sad': ['难过', '悲伤', '伤心', '哭', '丧', '难受', '痛苦', '失落', '沮丧'],
+    'angry': ['生气', '愤怒', '讨厌', '烦', '恨', '气死', '烦死'],
+    'anxious': ['担心', '焦虑', '害怕', '紧张', '不安', '慌', '怕'],
+    'surprised': ['惊讶', '哇', '天啊', '什么', '不敢相信', '意外'],
+    'calm': ['平静', '安静', '舒服', '放松', '宁静']
+}
+
+# 否定词：命中后该关键词不计分
+NEGATION_WORDS = ['不', '没', '没有', '别', '不是', '并不', '毫不', '从不', '一点也不']
+
+# 程度词及权重
+INTENSITY_MODIFIERS = {
+    '非常': 1.5, '特别': 1.5, '十分': 1.5, '极其': 1.8, '超级': 1.5, '超': 1.3,
+    '很': 1.3, '太': 1.3, '好': 1.2, '真': 1.2, '挺': 1.1,
+    '有点': 0.6, '有些': 0.6, '稍微': 0.5, '略': 0.5, '一点': 0.5,
+}
+
+# 每个关键词的基础分
+KEYWORD_WEIGHT = 0.2
+
+# 关键词前最多回看的修饰词个数（如"不太开心"为两个）
+MAX_MODIFIER_CHAIN = 2
+
+# 批量评分时拼接文本用的分隔符（不会出现在任何关键词/修饰词中）
+_BATCH_SEPARATOR = '\x00'
+
+_NEGATE = None
+
+
+class EmotionScorer:
+    """情绪评分器"""
+
+    def __init__(
+        self,
+        keywords: Optional[Dict[str, List[str]]] = None,
+        negations: Optional[List[str]] = None,
+        modifiers: Optional[Dict[str, float]] = None,
+    ):
+        self.keywords = keywords or EMOTION_KEYWORDS
+        self.emotions = list(self.keywords.keys())
+
+        self._keyword_emotions: Dict[str, List[str]] = {}
+        for emotion, words in self.keywords.items():
+            for word in words:
+                self._keyword_emotions.setdefault(word, []).append(emotion)
+
+        # 首字 -> 以该字开头的关键词（长的在前）
+        self._first_char_keywords: Dict[str, List[str]] = {}
+        for word in sorted(self._keyword_emotions, key=len, reverse=True):
+            self._first_char_keywords.setdefault(word[0], []).append(word)
+        self._candidate_pattern = re.compile(
+            '[' + ''.join(re.escape(ch) for ch in self._first_char_keywords) + ']'
+        )
+
+        # 修饰词合并为以 $ 结尾的正则，在关键词前的窗口内取最长修饰词
+        self._modifier_table = {word: _NEGATE for word in (negations or NEGATION_WORDS)}
+        self._modifier_table.update(modifiers or INTENSITY_MODIFIERS)
+        self._modifier_max_len = max(len(word) for word in self._modifier_table)
+        self._modifier_pattern = re.compile(
+            '(?:' + '|'.join(re.escape(word) for word in self._modifier_table) + ')$'
+        )
+        # 修饰词的结尾字符，关键词前一个字符不在其中时可直接跳过回看
+        self._modifier_tails = frozenset(word[-1] for word in self._modifier_table)
+
+    def score(self, text: str) -> Dict[str, float]:
+        """
+        计算单条文本的各情绪分数
+
+        Args:
+            text: 待识别文本
+
+        Returns:
+            {情绪类型: 分数}
+        """
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """
+        批量计算情绪分数（所有文本拼接后只扫描一遍）
+
+        Args:
+            texts: 待识别文本列表
+
+        Returns:
+            与输入顺序一致的分数列表
+        """
+        lowered = [(text or '').lower() for text in texts]
+        joined = _BATCH_SEPARATOR.join(lowered)
+
+        offsets = []
+        cursor = 0
+        for text in lowered:
+            offsets.append(cursor)
+            cursor += len(text) + 1
+
+        # 每条文本：关键词 -> 最大权重（同一关键词只计一次）
+        hits: List[Dict[str, float]] = [{} for _ in texts]
+        first_char_keywords = self._first_char_keywords
+        for match in self._candidate_pattern.finditer(joined):
+            start = match.start()
+            words = [word for word in first_char_keywords[match.group()] if joined.startswith(word, start)]
+            if not words:
+                continue
+            doc_hits = hits[bisect_right(offsets, start) - 1]
+            weight = self._modifier_weight(joined, start)
+            for word in words:
+                if weight > doc_hits.get(word, -1.0):
+                    doc_hits[word] = weight
+
+        results = []
+        for doc_hits in hits:
+            scores = {emotion: 0.0 for emotion in self.emotions}
+            for word, weight in doc_hits.items():
+                for emotion in self._keyword_emotions[word]:
+                    scores[emotion] += KEYWORD_WEIGHT * weight
+            results.append({emotion: round(value, 2) for emotion, value in scores.items()})
+        return results
+
+    def _modifier_weight(self, text: str, start: int) -> float:
+        """回看关键词之前的修饰词，返回权重（被否定时为0）"""
+        weight = 1.0
+        pos = start
+        tails = self._modifier_tails
+        for _ in range(MAX_MODIFIER_CHAIN):
+            if pos == 0 or text[pos - 1] not in tails:
+                break
+            match = self._modifier_pattern.search(text, max(0, pos - self._modifier_max_len), pos)
+            if match is None:
+                break
+            factor = self._modifier_table[match.group()]
+            if factor is _NEGATE:
+                return 0.0
+            weight *= factor
+            pos = match.start()
+        return weight
+
+
+def build_emotion_result(scores: Dict[str, float], timestamp: Optional[str] = None) -> Dict:
+    """
+    根据分数构建 detect_emotion 的结果结构
+
+    Args:
+        scores: {情绪类型: 分数}
+        timestamp: 时间戳（默认当前时间）
+
+    Returns:
+        包含 primary_emotion / all_emotions / timestamp 的结果
+    """
+    max_score = max(scores.values())
+    primary_emotion = [k for k, v in scores.items() if v == max_score][0]
+    total_score = sum(scores.values())
+    confidence = (max_score / total_score) if total_score > 0 else 0.5
+    intensity = min(1.0, max_score * 2)
+
+    return {
+        "primary_emotion": {
+            "type": primary_emotion,
+            "name": EMOTION_TYPES[primary_emotion]['name'],
+            "confidence": round(confidence, 2),
+            "intensity": round(intensity, 2)
+        },
+        "all_emotions": scores,
+        "timestamp": timestamp or datetime.now().isoformat()
+    }
+
+
+# 全局情绪评分器实例（模块导入时编译一次）
+emotion_scorer = EmotionScorer()
+
+
+def detect_emotions_batch(texts: List[str]) -> List[Dict]:
+    """
+    批量识别情绪（用于历史消息回填等场景）
+
+    Args:
+        texts: 待识别文本列表
+
+    Returns:
+        与 detect_emotion 结构一致的结果列表
+    """
+    timestamp = datetime.now().isoformat()
+    return [
+        build_emotion_result(scores, timestamp)
+        for scores in emotion_scorer.score_batch(texts)
+    ]
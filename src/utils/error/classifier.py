@@ -11,6 +11,7 @@ from typing import Optional, Dict, Any, List
 from .codes import ErrorCategory, get_error_description
 from .exceptions import VibeCodingError, classify_error
 from ..log.err_trace import extract_core_stack
+from ..metrics import ERRORS
 
 logger = logging.getLogger(__name__)
 
@@ -183,6 +184,7 @@ class ErrorClassifier:
         node_name = ctx.get("node_name", "unknown")
         if node_name:
             self._stats.by_node[node_name] += 1
+        ERRORS.inc(str(error.code), error.category.name, node_name or "unknown")
 
         # 记录最近的错误
         error_info = ErrorInfo(
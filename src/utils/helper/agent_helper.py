@@ -407,6 +407,7 @@ def _iter_body_to_server_messages(
                     code="0",
                     message="",
                     result=str(full_result),
+                    time_cost_ms=(getattr(chunk, "response_metadata", None) or {}).get("time_cost_ms"),
                 )
                 content = ServerMessageContent(tool_response=detail)
                 msgs_to_yield.append(
@@ -0,0 +1,139 @@
+"""
+工作流图编译与 Schema 缓存
+
+/node_run/{node_id} 每次请求都要查找节点函数、解析出入参类型、构建 LangGraphParser 取节点元数据并编译单节点子图，
+/graph_parameter 每次都重新生成出入参 JSON Schema。工作流调试时这两个接口会被反复调用，而这些结果只随图变化：
+
+- 单节点子图按 (图版本, node_id) 缓存编译结果与节点元数据
+- 出入参 JSON Schema 按图版本缓存（返回的 dict 为共享对象，调用方不要修改）
+- 图版本由节点 id 与节点函数（模块、限定名、代码对象）计算，热加载后节点函数变化即得到新版本
+- warm_up() 预编译全部节点与 Schema（NODE_RUN_WARMUP=1 时在服务启动时执行）
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.state import CompiledStateGraph
+
+from utils.helper.graph_helper import get_graph_node_func_with_inout
+from utils.log.parser import get_graph_parser
+
+logger = logging.getLogger(__name__)
+
+# 服务启动时是否预编译全部节点
+NODE_RUN_WARMUP = os.getenv("NODE_RUN_WARMUP", "0") == "1"
+
+# 单节点子图中的节点名
+SINGLE_NODE_NAME = "sn"
+
+_versions: "weakref.WeakKeyDictionary[CompiledStateGraph, str]" = weakref.WeakKeyDictionary()
+_versions_lock = threading.Lock()
+
+
+def graph_version(graph: CompiledStateGraph) -> str:
+    """图版本（每个图对象只计算一次）"""
+    version = _versions.get(graph)
+    if version is None:
+        digest = hashlib.sha1()
+        for node_id, node in sorted(graph.get_graph().nodes.items()):
+            func = getattr(node.data, "func", None)
+            code = getattr(func, "__code__", None)
+            digest.update(
+                f"{node_id}|{getattr(func, '__module__', '')}|{getattr(func, '__qualname__', '')}|{id(code)}\n".encode()
+            )
+        version = digest.hexdigest()[:16]
+        with _versions_lock:
+            _versions[graph] = version
+    return version
+
+
+@dataclass(frozen=True)
+class CompiledNode:
+    """编译好的单节点子图"""
+
+    node_id: str
+    graph: CompiledStateGraph
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def compile_node(graph: CompiledStateGraph, node_id: str) -> Optional[CompiledNode]:
+    """把工作流中的一个节点编译为单节点子图；节点不存在或无法确定入参类型时返回 None"""
+    node_func, input_cls, output_cls = get_graph_node_func_with_inout(graph.get_graph(), node_id)
+    if node_func is None or input_cls is None:
+        return None
+    metadata = get_graph_parser(graph).get_node_metadata(node_id) or {}
+
+    builder = StateGraph(input_cls, input_schema=input_cls, output_schema=output_cls)
+    builder.add_node(SINGLE_NODE_NAME, node_func, metadata=metadata)
+    builder.set_entry_point(SINGLE_NODE_NAME)
+    builder.add_edge(SINGLE_NODE_NAME, END)
+    return CompiledNode(node_id=node_id, graph=builder.compile(), metadata=metadata)
+
+
+def build_inout_schema(graph: CompiledStateGraph) -> Dict[str, Any]:
+    return {
+        "input_schema": graph.get_input_schema().model_json_schema(),
+        "output_schema": graph.get_output_schema().model_json_schema(),
+    }
+
+
+class GraphArtifactCache:
+    """单节点子图与出入参 Schema 缓存（线程安全，同一键并发未命中时可能重复编译一次）"""
+
+    def __init__(self):
+        self._nodes: Dict[Tuple[str, str], CompiledNode] = {}
+        self._schemas: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compiled_node(self, graph: CompiledStateGraph, node_id: str) -> Optional[CompiledNode]:
+        key = (graph_version(graph), node_id)
+        node = self._nodes.get(key)
+        if node is not None:
+            self.hits += 1
+            return node
+        self.misses += 1
+        node = compile_node(graph, node_id)
+        if node is None:
+            return None
+        with self._lock:
+            return self._nodes.setdefault(key, node)
+
+    def inout_schema(self, graph: CompiledStateGraph) -> Dict[str, Any]:
+        version = graph_version(graph)
+        schema = self._schemas.get(version)
+        if schema is None:
+            schema = build_inout_schema(graph)
+            with self._lock:
+                schema = self._schemas.setdefault(version, schema)
+        return schema
+
+    def warm_up(self, graph: CompiledStateGraph) -> int:
+        """预编译全部节点与出入参 Schema，返回编译成功的节点数"""
+        compiled = 0
+        for node_id, node in graph.get_graph().nodes.items():
+            func = getattr(node.data, "func", None)
+            if node_id in (START, END) or func is None:
+                continue
+            try:
+                if self.compiled_node(graph, func.__name__) is not None:
+                    compiled += 1
+            except Exception as e:
+                logger.warning(f"预编译节点 {node_id} 失败: {e}")
+        self.inout_schema(graph)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._nodes.clear()
+            self._schemas.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"nodes": len(self._nodes), "schemas": len(self._schemas), "hits": self.hits, "misses": self.misses}
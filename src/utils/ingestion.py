@@ -0,0 +1,213 @@
+"""
+请求体接收中间件（ASGI）
+
+/run、/stream_run、/node_run、/v1/chat/completions 的请求体只在这里读取和解析一次：
+
+- 按 Content-Length 与实际读取的字节数限制请求体大小（REQUEST_MAX_BODY_BYTES），超出返回 413
+- 支持 Content-Encoding: gzip，解压后大小同样受限（REQUEST_MAX_DECODED_BYTES），防止压缩炸弹
+- 使用 orjson 解析（未安装时退化为标准库 json），解析失败返回 400
+- 解析结果放在 request.state.ingested，处理函数通过 request_payload(request) 取用；
+  解压后的请求体仍可通过 request.body() 读取
+- body_log_fields() 生成请求日志中的请求体字段：总是记录大小与哈希，请求体内容按采样率记录且截断，
+  生产环境（COZE_PROJECT_ENV=PROD）默认只采样 10%、最多 512 个字符
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import zlib
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from utils.log.common import is_prod
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+# 请求体大小上限（字节，压缩时为压缩后大小）
+REQUEST_MAX_BODY_BYTES = int(os.getenv("REQUEST_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+
+# 解压后请求体大小上限（字节）
+REQUEST_MAX_DECODED_BYTES = int(os.getenv("REQUEST_MAX_DECODED_BYTES", str(64 * 1024 * 1024)))
+
+# 日志中记录的请求体最大字符数（0 表示不记录内容，只记录大小与哈希）
+REQUEST_LOG_BODY_CHARS = int(os.getenv("REQUEST_LOG_BODY_CHARS", "512" if is_prod() else "4096"))
+
+# 记录请求体内容的采样率（0~1）
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.1" if is_prod() else "1"))
+
+# 由中间件接收请求体的路径（/node_run/ 为前缀匹配）
+INGEST_PATHS = ("/run", "/stream_run", "/v1/chat/completions")
+INGEST_PATH_PREFIXES = ("/node_run/",)
+
+
+@dataclass
+class IngestedBody:
+    """已接收并解析的请求体"""
+
+    payload: Any
+    raw: bytes
+    encoded_size: int
+    _sha1: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.raw)
+
+    @property
+    def sha1(self) -> str:
+        if self._sha1 is None:
+            self._sha1 = hashlib.sha1(self.raw).hexdigest()[:16]
+        return self._sha1
+
+
+class IngestionError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def loads(data: bytes) -> Any:
+    """解析 JSON（失败时抛出 json.JSONDecodeError 或其子类）"""
+    return _loads(data)
+
+
+def decode_body(raw: bytes, encoding: str, max_decoded: int = REQUEST_MAX_DECODED_BYTES) -> bytes:
+    """按 Content-Encoding 解码请求体"""
+    if encoding in ("", "identity"):
+        return raw
+    if encoding not in ("gzip", "x-gzip"):
+        raise IngestionError(415, f"Unsupported Content-Encoding: {encoding}")
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        decoded = decompressor.decompress(raw, max_decoded + 1)
+    except zlib.error as e:
+        raise IngestionError(400, f"Invalid gzip body: {e}")
+    if len(decoded) > max_decoded or decompressor.unconsumed_tail:
+        raise IngestionError(413, f"Decompressed request body exceeds {max_decoded} bytes")
+    if not decompressor.eof:
+        raise IngestionError(400, "Invalid gzip body: truncated stream")
+    return decoded
+
+
+def parse_body(raw: bytes, encoding: str = "", max_decoded: int = REQUEST_MAX_DECODED_BYTES) -> IngestedBody:
+    """解码并解析请求体"""
+    body = decode_body(raw, encoding, max_decoded)
+    try:
+        payload = loads(body)
+    except json.JSONDecodeError as e:
+        raise IngestionError(400, f"Invalid JSON format: {e}")
+    return IngestedBody(payload=payload, raw=body, encoded_size=len(raw))
+
+
+async def request_payload(request) -> Any:
+    """处理函数取请求体：优先使用中间件的解析结果，未经中间件时自行解析"""
+    ingested = getattr(request.state, "ingested", None)
+    if ingested is not None:
+        return ingested.payload
+    return loads(await request.body())
+
+
+def body_log_fields(request, sample_rate: float = REQUEST_LOG_SAMPLE_RATE,
+                    max_chars: int = REQUEST_LOG_BODY_CHARS) -> str:
+    """请求日志中的请求体字段：大小、哈希，采样命中时附带截断后的内容"""
+    ingested: Optional[IngestedBody] = getattr(request.state, "ingested", None)
+    if ingested is None:
+        return "body=<not ingested>"
+    fields = f"body_size={ingested.size}, body_sha1={ingested.sha1}"
+    if ingested.encoded_size != ingested.size:
+        fields += f", encoded_size={ingested.encoded_size}"
+    if max_chars > 0 and sample_rate > 0 and (sample_rate >= 1 or random.random() < sample_rate):
+        # 只解码需要记录的前缀，不把整个请求体转成字符串
+        prefix = ingested.raw[:max_chars * 4].decode("utf-8", errors="replace")
+        text = prefix[:max_chars]
+        if len(prefix) > max_chars or ingested.size > max_chars * 4:
+            text += f"...(truncated, {ingested.size} bytes)"
+        fields += f", body={text}"
+    return fields
+
+
+def _should_ingest(scope) -> bool:
+    if scope["type"] != "http" or scope["method"] != "POST":
+        return False
+    path = scope["path"]
+    return path in INGEST_PATHS or path.startswith(INGEST_PATH_PREFIXES)
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1").strip().lower()
+    return ""
+
+
+async def _send_error(send, status_code: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RequestIngestionMiddleware:
+    def __init__(self, app, max_body: int = REQUEST_MAX_BODY_BYTES, max_decoded: int = REQUEST_MAX_DECODED_BYTES):
+        self.app = app
+        self.max_body = max_body
+        self.max_decoded = max_decoded
+
+    async def _read(self, scope, receive) -> Tuple[bytes, bool]:
+        """读取完整请求体，返回 (请求体, 客户端是否已断开)"""
+        length = _header(scope, b"content-length")
+        if length.isdigit() and int(length) > self.max_body:
+            raise IngestionError(413, f"Request body exceeds {self.max_body} bytes")
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return b"", True
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body:
+                raise IngestionError(413, f"Request body exceeds {self.max_body} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return chunks[0] if len(chunks) == 1 else b"".join(chunks), False
+
+    async def __call__(self, scope, receive, send):
+        if not _should_ingest(scope):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            raw, disconnected = await self._read(scope, receive)
+            if disconnected:
+                return
+            ingested = parse_body(raw, _header(scope, b"content-encoding"), self.max_decoded)
+        except IngestionError as e:
+            logger.warning(f"Rejected request body for {scope['path']}: [{e.status_code}] {e.detail}")
+            await _send_error(send, e.status_code, e.detail)
+            return
+
+        scope.setdefault("state", {})["ingested"] = ingested
+        replayed = False
+
+        # 下游仍可读取（解压后的）请求体；之后的 receive（如断开通知）交给原始通道
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": ingested.raw, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay_receive, send)
@@ -4,6 +4,7 @@ from cozeloop.integration.langchain.trace_callback import LoopTracer
 from langchain_core.runnables import RunnableConfig
 from utils.log.common import get_execute_mode
 from utils.log.node_log import Logger
+from utils.metrics import get_metrics_callback
 
 space_id = os.getenv("COZE_PROJECT_SPACE_ID", "YOUR_SPACE_ID")
 api_token = os.getenv("COZE_LOOP_API_TOKEN", "YOUR_LOOP_API_TOKEN")
@@ -36,7 +37,8 @@ def init_run_config(graph, ctx):
     config = RunnableConfig(
         callbacks=[
             tracer,
-            trace_callback_handler
+            trace_callback_handler,
+            get_metrics_callback(),
         ],
     )
     return config
@@ -53,7 +55,8 @@ def init_agent_config(graph, ctx):
                     "log_id": ctx.logid,
                     "commit_hash": commit_hash,
                 }
-                )
+                ),
+            get_metrics_callback(),
         ]
     )
     print("config", config)
@@ -12,7 +12,7 @@ import sys
 import json
 from typing import Dict, Optional, Any
 from pydantic import BaseModel
-from utils.log.parser import LangGraphParser
+from utils.log.parser import get_graph_parser
 import asyncio
 
 
@@ -234,7 +234,7 @@ class Logger(BaseCallbackHandler):
         self.graph = graph
         self.runtime_ctx = ctx
         self.start_time = time.time()
-        self.parser = LangGraphParser(graph)
+        self.parser = get_graph_parser(graph)
 
     run_id_map: Dict[uuid.UUID, str] = {}
 
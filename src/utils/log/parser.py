@@ -1,4 +1,6 @@
 import inspect
+import threading
+import weakref
 from dataclasses import dataclass
 from typing import Dict, Optional, Any, Callable, cast
 from langgraph.graph.state import CompiledStateGraph
@@ -253,3 +255,18 @@ class LangGraphParser:
                 conditional_funcs[check_func_name] = {
                     "cond_node_name": "cond_" + parent_id} # 拼成前端的条件节点名
         return conditional_funcs
+
+
+# 已解析的图（解析结果构建后只读，按图对象共用）
+_parsers: "weakref.WeakKeyDictionary[CompiledStateGraph, LangGraphParser]" = weakref.WeakKeyDictionary()
+_parsers_lock = threading.Lock()
+
+
+def get_graph_parser(app: CompiledStateGraph) -> LangGraphParser:
+    """获取图的 LangGraphParser（每个图对象只解析一次）"""
+    parser = _parsers.get(app)
+    if parser is None:
+        parser = LangGraphParser(app)
+        with _parsers_lock:
+            parser = _parsers.setdefault(app, parser)
+    return parser
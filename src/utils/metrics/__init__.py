@@ -0,0 +1,152 @@
+"""
+运行指标
+
+- 直方图：HTTP 请求耗时与首字节时间、节点耗时、工具耗时、模型调用耗时、首 token 时间、token 数
+- 状态量：正在运行的任务、流式队列积压、数据库与 checkpointer 连接池占用（采集时取值，由 main.py 注册）
+- 计数：按错误码统计的错误（ErrorClassifier 分类时累加）、因排队或执行超时未返回正常结果的工具调用
+- 上下文窗口：每次调用模型时完整历史与实际发送的 token 数、按原因累计节省的 token 数、滚动摘要次数
+- render_metrics() 输出 Prometheus 文本格式，供 /metrics 使用
+
+记录路径按线程分片累加，不加锁，见 registry.py。
+"""
+
+import threading
+import weakref
+from typing import Optional
+
+from utils.metrics.http import HttpMetricsMiddleware
+from utils.metrics.registry import (
+    CONTENT_TYPE,
+    LATENCY_BUCKETS,
+    TOKEN_BUCKETS,
+    CallbackMetric,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+)
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "agent_http_request_duration_seconds", "HTTP request latency until the response body is fully sent.",
+    ("method", "path", "status"),
+)
+HTTP_FIRST_BYTE = REGISTRY.histogram(
+    "agent_http_first_byte_seconds", "Time until the first response body chunk (first SSE event for streams).",
+    ("path",),
+)
+NODE_DURATION = REGISTRY.histogram(
+    "agent_node_duration_seconds", "Graph node execution time.", ("node", "status"),
+)
+TOOL_DURATION = REGISTRY.histogram(
+    "agent_tool_duration_seconds", "Tool execution time.", ("tool", "status"),
+)
+LLM_DURATION = REGISTRY.histogram(
+    "agent_llm_call_duration_seconds", "LLM call duration.", ("model", "status"),
+)
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "agent_llm_time_to_first_token_seconds", "Time from LLM call start to the first streamed token.", ("model",),
+)
+LLM_TOKENS = REGISTRY.histogram(
+    "agent_llm_tokens", "Tokens per LLM call.", ("model", "type"), buckets=TOKEN_BUCKETS,
+)
+ERRORS = REGISTRY.counter(
+    "agent_errors_total", "Classified errors by error code.", ("code", "category", "node"),
+)
+TOOL_REJECTIONS = REGISTRY.counter(
+    "agent_tool_rejections_total", "Tool calls answered with an error because of queueing (busy) or timeout.",
+    ("tool", "reason"),
+)
+CONTEXT_PROMPT_TOKENS = REGISTRY.histogram(
+    "agent_context_prompt_tokens", "Estimated history tokens per model call, untrimmed (full) and actually sent.",
+    ("stage",), buckets=TOKEN_BUCKETS,
+)
+CONTEXT_TOKENS_SAVED = REGISTRY.counter(
+    "agent_context_tokens_saved_total", "Estimated prompt tokens saved by the context window.", ("reason",),
+)
+CONTEXT_SUMMARIES = REGISTRY.counter(
+    "agent_context_summaries_total", "Rolling summaries created when evicting old turns.",
+)
+
+# 正在使用的流式队列（弱引用，流结束后自动移除）
+_stream_queues: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_stream_queues_lock = threading.Lock()
+
+_callback_handler = None
+_callback_handler_lock = threading.Lock()
+
+
+def track_stream_queue(queue, stream: str) -> None:
+    """登记一个流式输出队列，采集时统计其积压（queue 需要有 qsize()）"""
+    with _stream_queues_lock:
+        _stream_queues[queue] = stream
+
+
+def _stream_queue_depth():
+    with _stream_queues_lock:
+        queues = list(_stream_queues.items())
+    depth = {}
+    for queue, stream in queues:
+        depth[(stream,)] = depth.get((stream,), 0) + queue.qsize()
+    return depth
+
+
+def _active_streams():
+    with _stream_queues_lock:
+        streams = list(_stream_queues.values())
+    counts = {}
+    for stream in streams:
+        counts[(stream,)] = counts.get((stream,), 0) + 1
+    return counts
+
+
+REGISTRY.callback(
+    "agent_stream_queue_depth", "Items waiting in active stream queues.", _stream_queue_depth, labelnames=("stream",),
+)
+REGISTRY.callback(
+    "agent_active_streams", "Active stream queues.", _active_streams, labelnames=("stream",),
+)
+
+
+def get_metrics_callback():
+    """记录节点/工具/模型耗时的回调（全局共用一个实例）"""
+    global _callback_handler
+    if _callback_handler is None:
+        with _callback_handler_lock:
+            if _callback_handler is None:
+                from utils.metrics.callback import MetricsCallbackHandler
+                _callback_handler = MetricsCallbackHandler(
+                    node_duration=NODE_DURATION,
+                    tool_duration=TOOL_DURATION,
+                    llm_duration=LLM_DURATION,
+                    llm_ttft=LLM_TIME_TO_FIRST_TOKEN,
+                    llm_tokens=LLM_TOKENS,
+                )
+    return _callback_handler
+
+
+def render_metrics(registry: Optional[MetricsRegistry] = None) -> str:
+    return (registry or REGISTRY).render()
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "CONTEXT_PROMPT_TOKENS",
+    "CONTEXT_SUMMARIES",
+    "CONTEXT_TOKENS_SAVED",
+    "ERRORS",
+    "HTTP_FIRST_BYTE",
+    "HTTP_REQUEST_DURATION",
+    "HttpMetricsMiddleware",
+    "LATENCY_BUCKETS",
+    "REGISTRY",
+    "TOKEN_BUCKETS",
+    "TOOL_REJECTIONS",
+    "CallbackMetric",
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "get_metrics_callback",
+    "render_metrics",
+    "track_stream_queue",
+]
@@ -0,0 +1,136 @@
+"""
+记录图运行分阶段耗时的 LangChain 回调
+
+- 节点：只统计节点本身的 chain（name 与 metadata.langgraph_node 相同），不重复统计节点内部的子 runnable
+- 工具：按工具名统计耗时与成功/失败
+- 模型：调用耗时、首 token 时间（流式输出时）、输入/输出 token 数
+
+回调在运行线程中同步执行（run_inline），只做字典读写与一次分片累加。
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+def _model_name(serialized: Optional[Dict[str, Any]], metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+    metadata = metadata or {}
+    name = metadata.get("ls_model_name")
+    if not name:
+        params = kwargs.get("invocation_params") or {}
+        name = params.get("model") or params.get("model_name")
+    if not name and serialized:
+        init_kwargs = serialized.get("kwargs") or {}
+        name = init_kwargs.get("model") or init_kwargs.get("model_name")
+    return str(name or "unknown")
+
+
+def token_usage(response: Any) -> Tuple[int, int]:
+    """从 LLMResult 取 (输入 token, 输出 token)，取不到时为 0"""
+    llm_output = getattr(response, "llm_output", None) or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    if usage:
+        return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+    prompt_tokens = completion_tokens = 0
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += int(metadata.get("input_tokens") or 0)
+            completion_tokens += int(metadata.get("output_tokens") or 0)
+    return prompt_tokens, completion_tokens
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """把节点、工具、模型调用的耗时写入指标（所有运行共用一个实例）"""
+
+    run_inline = True
+    ignore_retriever = True
+
+    def __init__(self, node_duration, tool_duration, llm_duration, llm_ttft, llm_tokens):
+        self.node_duration = node_duration
+        self.tool_duration = tool_duration
+        self.llm_duration = llm_duration
+        self.llm_ttft = llm_ttft
+        self.llm_tokens = llm_tokens
+        # run_id -> (标签, 开始时间)；各 run_id 只由其所在线程读写
+        self._nodes: Dict[UUID, Tuple[str, float]] = {}
+        self._tools: Dict[UUID, Tuple[str, float]] = {}
+        self._llms: Dict[UUID, Tuple[str, float]] = {}
+        self._awaiting_first_token: Dict[UUID, float] = {}
+
+    # ---------- 节点 ----------
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._nodes[run_id] = (node, time.perf_counter())
+
+    def _end_node(self, run_id: UUID, status: str) -> None:
+        started = self._nodes.pop(run_id, None)
+        if started is not None:
+            self.node_duration.observe(time.perf_counter() - started[1], started[0], status)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_node(run_id, "ok")
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_node(run_id, "error")
+
+    # ---------- 工具 ----------
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "unknown"
+        self._tools[run_id] = (name, time.perf_counter())
+
+    def _end_tool(self, run_id: UUID, status: str) -> None:
+        started = self._tools.pop(run_id, None)
+        if started is not None:
+            self.tool_duration.observe(time.perf_counter() - started[1], started[0], status)
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool(run_id, "error")
+
+    # ---------- 模型 ----------
+
+    def _start_llm(self, serialized, run_id: UUID, metadata, kwargs) -> None:
+        now = time.perf_counter()
+        self._llms[run_id] = (_model_name(serialized, metadata, kwargs), now)
+        self._awaiting_first_token[run_id] = now
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, metadata, kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, metadata, kwargs)
+
+    def on_llm_new_token(self, token, *, run_id: UUID, chunk=None, **kwargs: Any) -> None:
+        if not token and chunk is None:
+            return
+        started = self._awaiting_first_token.pop(run_id, None)
+        if started is not None:
+            model = self._llms.get(run_id, ("unknown",))[0]
+            self.llm_ttft.observe(time.perf_counter() - started, model)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        self._awaiting_first_token.pop(run_id, None)
+        started = self._llms.pop(run_id, None)
+        if started is None:
+            return
+        model = started[0]
+        self.llm_duration.observe(time.perf_counter() - started[1], model, "ok")
+        prompt_tokens, completion_tokens = token_usage(response)
+        if prompt_tokens:
+            self.llm_tokens.observe(prompt_tokens, model, "prompt")
+        if completion_tokens:
+            self.llm_tokens.observe(completion_tokens, model, "completion")
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._awaiting_first_token.pop(run_id, None)
+        started = self._llms.pop(run_id, None)
+        if started is not None:
+            self.llm_duration.observe(time.perf_counter() - started[1], started[0], "error")
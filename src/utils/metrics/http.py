@@ -0,0 +1,42 @@
+"""
+HTTP 请求耗时中间件（ASGI）
+
+耗时记到响应体发送完毕为止，流式接口（SSE）统计的是整个流的时长；同时记录首个响应体分片的时间。
+path 标签使用路由模板（如 /cancel/{run_id}），未匹配路由的请求归为 "other"，避免标签数量失控。
+"""
+
+import time
+
+
+class HttpMetricsMiddleware:
+    def __init__(self, app, duration, first_byte):
+        self.app = app
+        self.duration = duration
+        self.first_byte = first_byte
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": "500", "first_byte": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = str(message["status"])
+            elif message["type"] == "http.response.body":
+                if not state["first_byte"] and message.get("body"):
+                    state["first_byte"] = True
+                    self.first_byte.observe(time.perf_counter() - start, _route_path(scope))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.duration.observe(time.perf_counter() - start, scope["method"], _route_path(scope), state["status"])
+
+
+def _route_path(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "other"
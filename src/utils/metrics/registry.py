@@ -0,0 +1,228 @@
+"""
+指标注册表与 Prometheus 文本格式输出
+
+- Counter / Histogram 按线程分片累加：记录时只写当前线程自己的分片，不加锁；
+  采集时合并所有分片，已退出线程的分片并入汇总后释放（每次运行一个生产者线程也不会无限增长）
+- CallbackMetric 在采集时调用函数取值，用于正在运行的任务数、队列深度、连接池占用等状态量
+- render() 输出 Prometheus text format 0.0.4
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 默认耗时分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# token 数分桶
+TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ShardedCells:
+    """
+    按线程分片的累加单元（每个标签组合一个 list）
+
+    记录线程只修改自己分片中的 list；采集线程读取时复制，最多看到一次正在进行的累加之前的值。
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, Dict[LabelValues, list]]] = []
+        self._retired: Dict[LabelValues, list] = {}
+
+    def cell(self, labels: LabelValues) -> list:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = [0.0] * self._size
+        return cell
+
+    @staticmethod
+    def _merge(into: Dict[LabelValues, list], shard: Dict[LabelValues, list]) -> None:
+        for labels, cell in list(shard.items()):
+            values = list(cell)
+            total = into.get(labels)
+            if total is None:
+                into[labels] = values
+            else:
+                for i, value in enumerate(values):
+                    total[i] += value
+
+    def collect(self) -> Dict[LabelValues, list]:
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = alive
+            merged = {labels: list(cell) for labels, cell in self._retired.items()}
+            for _, shard in alive:
+                self._merge(merged, shard)
+        return merged
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """只增计数"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._cells = _ShardedCells(1)
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._cells.cell(labelvalues)[0] += amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        return {labels: cell[0] for labels, cell in self._cells.collect().items()}
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """分桶直方图（单元布局：各桶计数..., 总和, 总数）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._cells = _ShardedCells(len(self.buckets) + 3)
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        cell = self._cells.cell(labelvalues)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def snapshot(self) -> Dict[LabelValues, Dict[str, float]]:
+        result = {}
+        for labels, cell in self._cells.collect().items():
+            result[labels] = {"count": cell[-1], "sum": cell[-2]}
+        return result
+
+    def samples(self) -> Iterable[str]:
+        for labels, cell in sorted(self._cells.collect().items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), cell):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(cell[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {_format_value(cell[-1])}"
+
+
+class CallbackMetric(Metric):
+    """采集时调用 fn 取值；fn 返回 {标签值元组: 值}，无标签时可直接返回数值"""
+
+    def __init__(self, name: str, documentation: str, kind: str, fn: Callable[[], object],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self) -> Iterable[str]:
+        values = self.fn()
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(float(value))}"
+
+
+class MetricsRegistry:
+    """指标注册表（同名指标只注册一次）"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, fn: Callable[[], object], kind: str = "gauge",
+                 labelnames: Sequence[str] = ()) -> CallbackMetric:
+        """注册采集时取值的指标（重复注册时替换取值函数）"""
+        metric = CallbackMetric(name, documentation, kind, fn, labelnames)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        blocks = []
+        for metric in metrics:
+            try:
+                blocks.append(metric.render())
+            except Exception as e:
+                # 某个取值函数失败不影响其它指标
+                blocks.append(f"# {metric.name} collection failed: {_escape(str(e))}")
+        return "\n".join(blocks) + "\n"
@@ -245,6 +245,7 @@ class ResponseConverter:
                         role="tool",
                         tool_call_id=tool_call_id,
                         content=str(result),
+                        time_cost_ms=(getattr(chunk, "response_metadata", None) or {}).get("time_cost_ms"),
                     )
                 )
             )
@@ -287,6 +288,9 @@ class ResponseConverter:
         current_tool_calls: List[Dict[str, Any]] = []
         accumulated_tool_calls: Dict[int, Dict[str, Any]] = {}
         has_assistant_content = False
+        # 各次模型调用的 token 用量（来自消息的 usage_metadata）
+        prompt_tokens = 0
+        completion_tokens = 0
 
         def _flush_assistant_message():
             """将累积的 assistant 消息写入 all_messages"""
@@ -332,6 +336,10 @@ class ResponseConverter:
                     continue
 
             if chunk_type in ("AIMessageChunk", "AIMessage"):
+                usage_metadata = getattr(chunk, "usage_metadata", None) or {}
+                prompt_tokens += int(usage_metadata.get("input_tokens") or 0)
+                completion_tokens += int(usage_metadata.get("output_tokens") or 0)
+
                 # 收集文本内容
                 text = getattr(chunk, "content", "")
                 if text:
@@ -460,8 +468,8 @@ class ResponseConverter:
             model=self.model,
             choices=choices,
             usage=Usage(
-                prompt_tokens=0,
-                completion_tokens=0,
-                total_tokens=0,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
             ),
         )
@@ -0,0 +1,161 @@
+"""
+OpenAI 兼容接口的请求去重
+
+- 单飞（single-flight）：同时到达的相同请求只执行一次图运行，其余请求等待并共享结果；
+  发起请求的客户端断开不会取消共享的运行，等待者照常拿到结果
+- 响应缓存（可选，OPENAI_RESPONSE_CACHE_TTL > 0 时启用）：temperature 为 0 的确定性请求在 TTL 内直接返回上次结果
+- 只用于不带 session_id 的非流式请求；带 session_id 的请求依赖并写入会话历史，不参与去重
+- 请求键由规范化后的 messages、model、temperature 与调用方身份计算（SHA-256）；
+  工具按用户读写数据（签到、加入项目等），不同调用方的请求不会共享运行或缓存
+- 按键统计请求、实际执行、合并与缓存命中次数（只保留最近活跃的键）
+
+单飞按进程生效：多 worker 部署时每个 worker 各自合并。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+from utils.openai.types.request import ChatCompletionRequest
+from utils.tool_cache import ToolResultCache
+
+# 响应缓存有效期（秒），0 表示只做单飞合并
+OPENAI_RESPONSE_CACHE_TTL = float(os.getenv("OPENAI_RESPONSE_CACHE_TTL", 0))
+# 响应缓存容量
+OPENAI_RESPONSE_CACHE_SIZE = int(os.getenv("OPENAI_RESPONSE_CACHE_SIZE", 1024))
+# 按键统计最多保留的键数
+DEDUP_TRACKED_KEYS = 256
+# 统计中展示的键前缀长度
+KEY_DISPLAY_LENGTH = 16
+# 标识调用方的请求头
+IDENTITY_HEADERS = ("authorization", "cookie", "x-user-id", "x-api-key")
+
+
+def _normalize_content(content: Any) -> Any:
+    if isinstance(content, str):
+        return content.strip()
+    if isinstance(content, list):
+        return [_normalize_content(part) for part in content]
+    if isinstance(content, dict):
+        return {key: _normalize_content(value) for key, value in content.items()}
+    return content
+
+
+def caller_identity(ctx: Any, headers: Optional[Mapping[str, str]] = None) -> str:
+    """调用方身份：上下文中的 user_id 与鉴权相关请求头（只参与哈希，不会出现在统计中）"""
+    parts = []
+    get = getattr(ctx, "get", None)
+    user_id = get("user_id") if callable(get) else None
+    if user_id:
+        parts.append(f"user_id={user_id}")
+    for name in IDENTITY_HEADERS:
+        value = headers.get(name) if headers is not None else None
+        if value:
+            parts.append(f"{name}={value}")
+    return "\n".join(parts)
+
+
+def request_key(request: ChatCompletionRequest, caller: str = "") -> str:
+    """由规范化后的 messages、model、temperature 与调用方身份计算请求键"""
+    messages = [{
+        "role": message.role,
+        "content": _normalize_content(message.content),
+        "tool_calls": message.tool_calls,
+        "tool_call_id": message.tool_call_id,
+    } for message in request.messages]
+    temperature = float(request.temperature) if request.temperature is not None else None
+    raw = json.dumps(
+        {"messages": messages, "model": request.model, "temperature": temperature, "caller": caller},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(request: ChatCompletionRequest) -> bool:
+    """temperature 显式为 0 的请求结果可以缓存"""
+    return request.temperature is not None and float(request.temperature) == 0.0
+
+
+class RequestDeduplicator:
+    """单飞合并 + 可选 TTL 响应缓存"""
+
+    def __init__(self, cache_ttl: float = OPENAI_RESPONSE_CACHE_TTL,
+                 cache_size: int = OPENAI_RESPONSE_CACHE_SIZE, tracked_keys: int = DEDUP_TRACKED_KEYS):
+        self.cache: Optional[ToolResultCache] = (
+            ToolResultCache("openai_response", ttl=cache_ttl, maxsize=cache_size, depends_on=())
+            if cache_ttl > 0 else None
+        )
+        self.tracked_keys = tracked_keys
+        # 请求键 -> 进行中的运行（只在事件循环线程中访问）
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats_lock = threading.Lock()
+        self._key_stats: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._totals = {"requests": 0, "executions": 0, "coalesced": 0, "cache_hits": 0, "errors": 0}
+
+    def _count(self, key: str, field: str) -> None:
+        with self._stats_lock:
+            self._totals[field] += 1
+            stats = self._key_stats.get(key)
+            if stats is None:
+                stats = self._key_stats[key] = dict.fromkeys(self._totals, 0)
+            self._key_stats.move_to_end(key)
+            stats[field] += 1
+            while len(self._key_stats) > self.tracked_keys:
+                self._key_stats.popitem(last=False)
+
+    async def run(self, key: str, execute: Callable[[], Awaitable[Dict[str, Any]]],
+                  cacheable: bool = False) -> Dict[str, Any]:
+        """
+        执行请求，相同键的并发请求共享同一次执行
+
+        Args:
+            key: 请求键（request_key）
+            execute: 实际执行请求的协程函数
+            cacheable: 结果是否可以写入响应缓存
+        """
+        self._count(key, "requests")
+        use_cache = cacheable and self.cache is not None
+        if use_cache:
+            hit, value = self.cache.get(key)
+            if hit:
+                self._count(key, "cache_hits")
+                return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(key, "coalesced")
+        else:
+            self._count(key, "executions")
+            task = asyncio.ensure_future(execute())
+            self._inflight[key] = task
+
+            def finished(done: asyncio.Task) -> None:
+                self._inflight.pop(key, None)
+                if done.cancelled():
+                    return
+                if done.exception() is not None:
+                    self._count(key, "errors")
+                elif use_cache:
+                    self.cache.put(key, done.result())
+
+            task.add_done_callback(finished)
+
+        # shield：某个等待者被取消（客户端断开）不影响共享的运行
+        return await asyncio.shield(task)
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        """总计与请求数最多的若干个键的统计"""
+        with self._stats_lock:
+            totals = dict(self._totals)
+            keys = sorted(self._key_stats.items(), key=lambda item: item[1]["requests"], reverse=True)[:top]
+            per_key = [{"key": key[:KEY_DISPLAY_LENGTH], **stats} for key, stats in keys]
+        totals["inflight"] = len(self._inflight)
+        return {
+            "totals": totals,
+            "keys": per_key,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
@@ -4,15 +4,18 @@ import asyncio
 import logging
 import threading
 import contextvars
-from typing import Dict, Any, Union, AsyncGenerator
+from typing import Dict, Any, Mapping, Optional, Union, AsyncGenerator
 
 from fastapi.responses import StreamingResponse, JSONResponse
 
 from coze_coding_utils.runtime_ctx.context import Context
+from utils.openai.types.request import ChatCompletionRequest
 from utils.openai.types.response import OpenAIError, OpenAIErrorResponse
 from utils.openai.converter.request_converter import RequestConverter
 from utils.openai.converter.response_converter import ResponseConverter
+from utils.openai.dedup import RequestDeduplicator, caller_identity, is_deterministic, request_key
 from utils.error import classify_error
+from utils.metrics import track_stream_queue
 
 logger = logging.getLogger(__name__)
 
@@ -29,11 +32,13 @@ class OpenAIChatHandler:
         """
         self.graph_service = graph_service
         self.request_converter = RequestConverter()
+        self.dedup = RequestDeduplicator()
 
     async def handle(
         self,
         payload: Dict[str, Any],
         ctx: Context,
+        headers: Optional[Mapping[str, str]] = None,
     ) -> Union[StreamingResponse, JSONResponse]:
         """
         处理请求，根据 stream 参数返回流式或非流式响应
@@ -41,6 +46,7 @@ class OpenAIChatHandler:
         Args:
             payload: 请求体
             ctx: 上下文
+            headers: 请求头（无会话请求去重时用于区分调用方）
 
         Returns:
             StreamingResponse 或 JSONResponse
@@ -50,7 +56,8 @@ class OpenAIChatHandler:
             request = self.request_converter.parse(payload)
             session_id = self.request_converter.get_session_id(request)
 
-            if not session_id:
+            # 不带 session_id 的非流式请求按无状态请求处理，流式请求仍需要会话
+            if not session_id and request.stream:
                 return self._error_response(
                     message="session_id is required",
                     error_type="invalid_request_error",
@@ -83,13 +90,21 @@ class OpenAIChatHandler:
                     response_converter,
                     ctx,
                 )
-            else:
+            elif session_id:
                 return await self._handle_non_stream(
                     stream_input,
                     session_id,
                     response_converter,
                     ctx,
                 )
+            else:
+                return await self._handle_stateless(
+                    request,
+                    stream_input,
+                    response_converter,
+                    ctx,
+                    headers,
+                )
 
         except Exception as e:
             logger.error(f"Error in OpenAIChatHandler.handle: {e}", exc_info=True)
@@ -108,6 +123,7 @@ class OpenAIChatHandler:
             """异步流式生成器"""
             loop = asyncio.get_running_loop()
             queue: asyncio.Queue = asyncio.Queue()
+            track_stream_queue(queue, "openai")
             context = contextvars.copy_context()
 
             def producer():
@@ -180,12 +196,54 @@ class OpenAIChatHandler:
         ctx: Context,
     ) -> JSONResponse:
         """非流式响应处理"""
+        try:
+            result = await self._run_non_stream(stream_input, session_id, response_converter, ctx)
+            return JSONResponse(content=result)
+        except Exception as e:
+            return self._handle_error(e)
+
+    async def _handle_stateless(
+        self,
+        request: ChatCompletionRequest,
+        stream_input: Dict[str, Any],
+        response_converter: ResponseConverter,
+        ctx: Context,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> JSONResponse:
+        """
+        无会话的非流式请求：同一调用方相同的并发请求合并为一次运行，确定性请求可走响应缓存
+
+        运行使用临时会话，结束后删除其检查点；共享的运行使用首个请求的 ctx，
+        因此请求键包含调用方身份，不同用户的请求不会拿到彼此的结果
+        """
+        thread_id = f"stateless-{ctx.run_id}"
+        try:
+            result = await self.dedup.run(
+                request_key(request, caller_identity(ctx, headers)),
+                lambda: self._run_non_stream(stream_input, thread_id, response_converter, ctx, ephemeral=True),
+                cacheable=is_deterministic(request),
+            )
+            # 共享的结果沿用首个请求的 id，这里换成本请求自己的
+            return JSONResponse(content=dict(result, id=response_converter.request_id))
+        except Exception as e:
+            return self._handle_error(e)
+
+    async def _run_non_stream(
+        self,
+        stream_input: Dict[str, Any],
+        session_id: str,
+        response_converter: ResponseConverter,
+        ctx: Context,
+        ephemeral: bool = False,
+    ) -> Dict[str, Any]:
+        """在后台线程中运行图并收集为完整响应"""
         loop = asyncio.get_running_loop()
         context = contextvars.copy_context()
         result_future: asyncio.Future = loop.create_future()
 
         def producer():
             """后台线程生产者"""
+            graph = None
             try:
                 # 获取 graph 并配置
                 from utils.helper import graph_helper
@@ -222,15 +280,25 @@ class OpenAIChatHandler:
                     result_future.set_exception,
                     ex
                 )
+            finally:
+                if ephemeral and graph is not None:
+                    self._delete_thread(graph, session_id)
 
         # 启动后台线程
         threading.Thread(target=lambda: context.run(producer), daemon=True).start()
 
+        return await result_future
+
+    @staticmethod
+    def _delete_thread(graph: Any, thread_id: str) -> None:
+        """删除临时会话的检查点"""
+        delete_thread = getattr(getattr(graph, "checkpointer", None), "delete_thread", None)
+        if delete_thread is None:
+            return
         try:
-            result = await result_future
-            return JSONResponse(content=result)
-        except Exception as e:
-            return self._handle_error(e)
+            delete_thread(thread_id)
+        except Exception as ex:
+            logger.warning(f"Failed to delete checkpoints of {thread_id}: {ex}")
 
     def _handle_error(self, error: Exception) -> JSONResponse:
         """错误处理，返回 OpenAI 标准错误格式"""
@@ -38,6 +38,7 @@ class Delta:
     content: Optional[str] = None
     tool_calls: Optional[List[ToolCallChunk]] = None
     tool_call_id: Optional[str] = None  # role=tool 时使用
+    time_cost_ms: Optional[int] = None  # role=tool 时使用，工具执行耗时（毫秒）
 
     def to_dict(self) -> Dict[str, Any]:
         result: Dict[str, Any] = {}
@@ -49,6 +50,8 @@ class Delta:
             result["tool_calls"] = [tc.to_dict() for tc in self.tool_calls]
         if self.tool_call_id is not None:
             result["tool_call_id"] = self.tool_call_id
+        if self.time_cost_ms is not None:
+            result["time_cost_ms"] = self.time_cost_ms
         return result
 
 
@@ -0,0 +1,369 @@
+"""
+运行登记与跨进程取消
+
+多个 uvicorn worker（或多个副本）部署时，/cancel/{run_id} 往往落在不持有该运行的进程上。
+运行的归属与取消标记记录在共享存储中：
+
+- register/unregister：运行开始时登记 (run_id, 所属 worker, 过期时间)，结束时删除
+- cancel：本进程持有的运行直接 task.cancel()；否则在共享存储中设置取消标记
+- 每个 worker 在事件循环上运行一个监听协程（首次登记时启动），每 RUN_REGISTRY_POLL_INTERVAL 秒用一次查询取出
+  本 worker 被标记取消的运行并取消对应任务；本 worker 没有运行时不查询，不在流式输出的每个分片上轮询
+- 登记项在 RUN_REGISTRY_TTL 后过期（运行最长 15 分钟，worker 异常退出时遗留的登记项也会被清理），
+  watcher 定期删除过期项，存储大小有上限
+
+存储后端（RUN_REGISTRY_BACKEND）：
+- sqlite（默认）：同一主机的多个 worker 共用一个 SQLite 文件（默认放在 /dev/shm 下）
+- memory：进程内字典，只适用于单 worker
+- "模块:工厂"：自定义后端（如 Redis），工厂无参调用，返回 RunRegistryBackend 实例
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 存储后端：sqlite / memory / 模块:工厂
+RUN_REGISTRY_BACKEND = os.getenv("RUN_REGISTRY_BACKEND", "sqlite")
+
+# SQLite 文件路径（默认放在共享内存文件系统中）
+RUN_REGISTRY_PATH = os.getenv(
+    "RUN_REGISTRY_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "agent_run_registry.db"),
+)
+
+# 登记项有效期（秒），需大于运行超时时间（15 分钟）
+RUN_REGISTRY_TTL = float(os.getenv("RUN_REGISTRY_TTL", "960"))
+
+# 检查取消标记的间隔（秒）
+RUN_REGISTRY_POLL_INTERVAL = float(os.getenv("RUN_REGISTRY_POLL_INTERVAL", "0.5"))
+
+# 清理过期登记项的间隔（秒）
+RUN_REGISTRY_PURGE_INTERVAL = 60.0
+
+
+@dataclass
+class RunRecord:
+    run_id: str
+    owner: str
+    cancel_requested: bool
+    created_at: float
+    expires_at: float
+
+
+class RunRegistryBackend(ABC):
+    """运行登记存储接口（方法均为同步调用，应在毫秒级返回）"""
+
+    @abstractmethod
+    def register(self, run_id: str, owner: str, ttl: float) -> None:
+        """登记运行（已存在时覆盖并清除取消标记）"""
+
+    @abstractmethod
+    def unregister(self, run_id: str, owner: str) -> None:
+        """删除登记（只删除 owner 自己的登记项）"""
+
+    @abstractmethod
+    def get(self, run_id: str) -> Optional[RunRecord]:
+        """未过期的登记项"""
+
+    @abstractmethod
+    def request_cancel(self, run_id: str) -> Optional[RunRecord]:
+        """设置取消标记，返回登记项；不存在或已过期时返回 None"""
+
+    @abstractmethod
+    def cancel_requested(self, owner: str) -> List[str]:
+        """owner 持有的、已被标记取消的运行"""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """删除过期登记项，返回删除条数"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """未过期的登记项数"""
+
+
+class MemoryRunRegistry(RunRegistryBackend):
+    """进程内登记（单 worker 或测试使用）"""
+
+    def __init__(self):
+        self._records: Dict[str, RunRecord] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, run_id: str) -> Optional[RunRecord]:
+        record = self._records.get(run_id)
+        if record is not None and record.expires_at <= time.time():
+            return None
+        return record
+
+    def register(self, run_id: str, owner: str, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._records[run_id] = RunRecord(run_id, owner, False, now, now + ttl)
+
+    def unregister(self, run_id: str, owner: str) -> None:
+        with self._lock:
+            record = self._records.get(run_id)
+            if record is not None and record.owner == owner:
+                del self._records[run_id]
+
+    def get(self, run_id: str) -> Optional[RunRecord]:
+        with self._lock:
+            return self._live(run_id)
+
+    def request_cancel(self, run_id: str) -> Optional[RunRecord]:
+        with self._lock:
+            record = self._live(run_id)
+            if record is not None:
+                record.cancel_requested = True
+            return record
+
+    def cancel_requested(self, owner: str) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return [r.run_id for r in self._records.values()
+                    if r.owner == owner and r.cancel_requested and r.expires_at > now]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [run_id for run_id, r in self._records.items() if r.expires_at <= now]
+            for run_id in expired:
+                del self._records[run_id]
+        return len(expired)
+
+    def count(self) -> int:
+        now = time.time()
+        with self._lock:
+            return sum(1 for r in self._records.values() if r.expires_at > now)
+
+
+class SQLiteRunRegistry(RunRegistryBackend):
+    """同一主机多个 worker 共用的 SQLite 登记（WAL 模式，每个线程一个连接）"""
+
+    def __init__(self, path: str = RUN_REGISTRY_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS agent_runs ("
+            "run_id TEXT PRIMARY KEY, owner TEXT NOT NULL, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_agent_runs_owner_cancel ON agent_runs (owner, cancel_requested)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_agent_runs_expires_at ON agent_runs (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _record(row) -> Optional[RunRecord]:
+        if row is None:
+            return None
+        return RunRecord(row[0], row[1], bool(row[2]), row[3], row[4])
+
+    def register(self, run_id: str, owner: str, ttl: float) -> None:
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO agent_runs (run_id, owner, cancel_requested, created_at, expires_at) "
+            "VALUES (?, ?, 0, ?, ?)",
+            (run_id, owner, now, now + ttl),
+        )
+
+    def unregister(self, run_id: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM agent_runs WHERE run_id = ? AND owner = ?", (run_id, owner))
+
+    def get(self, run_id: str) -> Optional[RunRecord]:
+        row = self._conn().execute(
+            "SELECT run_id, owner, cancel_requested, created_at, expires_at FROM agent_runs "
+            "WHERE run_id = ? AND expires_at > ?",
+            (run_id, time.time()),
+        ).fetchone()
+        return self._record(row)
+
+    def request_cancel(self, run_id: str) -> Optional[RunRecord]:
+        conn = self._conn()
+        updated = conn.execute(
+            "UPDATE agent_runs SET cancel_requested = 1 WHERE run_id = ? AND expires_at > ?",
+            (run_id, time.time()),
+        ).rowcount
+        return self.get(run_id) if updated else None
+
+    def cancel_requested(self, owner: str) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT run_id FROM agent_runs WHERE owner = ? AND cancel_requested = 1 AND expires_at > ?",
+            (owner, time.time()),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge_expired(self) -> int:
+        return self._conn().execute("DELETE FROM agent_runs WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def count(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM agent_runs WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+def create_backend(spec: str = RUN_REGISTRY_BACKEND) -> RunRegistryBackend:
+    """按配置创建后端：sqlite / memory / 模块:工厂"""
+    if spec == "sqlite":
+        return SQLiteRunRegistry()
+    if spec == "memory":
+        return MemoryRunRegistry()
+    module_name, _, factory = spec.partition(":")
+    if not factory:
+        raise ValueError(f"Unknown RUN_REGISTRY_BACKEND: {spec}")
+    return getattr(importlib.import_module(module_name), factory)()
+
+
+def _default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class RunRegistry:
+    """
+    本 worker 的运行登记
+
+    tasks 保存本进程持有的 asyncio.Task；共享存储只保存归属与取消标记。
+    存储不可用时退化为进程内取消（记录警告，不影响运行本身）。
+    """
+
+    def __init__(self, backend: Optional[RunRegistryBackend] = None, owner: Optional[str] = None,
+                 ttl: float = RUN_REGISTRY_TTL, poll_interval: float = RUN_REGISTRY_POLL_INTERVAL):
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+        self.owner = owner or _default_owner()
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # 已按共享标记取消、尚未结束的运行（避免重复 cancel 打断任务的清理逻辑）
+        self._cancelling: Set[str] = set()
+        self._watcher: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    @property
+    def backend(self) -> Optional[RunRegistryBackend]:
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    try:
+                        self._backend = create_backend()
+                    except Exception as e:
+                        logger.warning(f"Run registry backend unavailable, cancel only works in-process: {e}")
+                        self._backend = MemoryRunRegistry()
+        return self._backend
+
+    def _call(self, method: str, *args: Any) -> Any:
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            logger.warning(f"Run registry {method} failed: {e}")
+            return None
+
+    # ---------- 登记 ----------
+
+    def register(self, run_id: str, task: asyncio.Task) -> None:
+        self.tasks[run_id] = task
+        self._call("register", run_id, self.owner, self.ttl)
+        self._ensure_watcher()
+
+    def unregister(self, run_id: str) -> None:
+        self._cancelling.discard(run_id)
+        if self.tasks.pop(run_id, None) is not None:
+            self._call("unregister", run_id, self.owner)
+
+    # ---------- 取消 ----------
+
+    def cancel(self, run_id: str) -> Dict[str, Any]:
+        """取消运行：本进程持有则直接取消，否则设置共享取消标记由所属 worker 取消"""
+        task = self.tasks.get(run_id)
+        if task is not None:
+            if task.done():
+                logger.info(f"Task already completed for run_id: {run_id}")
+                return {
+                    "status": "already_completed",
+                    "run_id": run_id,
+                    "message": "Task has already completed"
+                }
+            # 这会在下一个await点抛出CancelledError
+            task.cancel()
+            logger.info(f"Cancellation requested for run_id: {run_id}")
+            return {
+                "status": "success",
+                "run_id": run_id,
+                "message": "Cancellation signal sent, task will be cancelled at next await point"
+            }
+
+        record = self._call("request_cancel", run_id)
+        if record is not None:
+            logger.info(f"Cancellation flag set for run_id: {run_id}, owner: {record.owner}")
+            return {
+                "status": "success",
+                "run_id": run_id,
+                "message": f"Cancellation signal sent to the owning worker, "
+                           f"task will be cancelled within {self.poll_interval:g}s"
+            }
+
+        logger.warning(f"No active task found for run_id: {run_id}")
+        return {
+            "status": "not_found",
+            "run_id": run_id,
+            "message": "No active task found with this run_id. Task may have already completed or run_id is invalid."
+        }
+
+    # ---------- 取消标记监听 ----------
+
+    def _ensure_watcher(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        watcher = self._watcher
+        if watcher is None or watcher.done() or watcher.get_loop() is not loop:
+            self._watcher = loop.create_task(self._watch(), name="run-registry-watcher")
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if time.monotonic() - self._last_purge >= RUN_REGISTRY_PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    await loop.run_in_executor(None, self._call, "purge_expired")
+                if not self.tasks:
+                    continue
+                run_ids = await loop.run_in_executor(None, self._call, "cancel_requested", self.owner)
+                self.apply_cancellations(run_ids or [])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Run registry watcher error: {e}")
+
+    def apply_cancellations(self, run_ids: List[str]) -> int:
+        """取消本进程中被标记的运行，返回取消的任务数"""
+        cancelled = 0
+        for run_id in run_ids:
+            task = self.tasks.get(run_id)
+            if task is not None and not task.done() and run_id not in self._cancelling:
+                self._cancelling.add(run_id)
+                task.cancel()
+                cancelled += 1
+                logger.info(f"Cancelled run_id: {run_id} by shared cancellation flag")
+        return cancelled
@@ -10,7 +10,7 @@ import logging
 from datetime import datetime
 from typing import Callable, Any, Dict, List, Optional
 from functools import wraps
-from collections import defaultdict
+from collections import defaultdict, deque
 import hashlib
 
 # 配置日志
@@ -223,11 +223,16 @@ class PermissionManager:
 
 # ========== 审计日志系统 ==========
 
+# 内存中保留的审计日志条数（持久化由 storage.database.audit_pipeline 负责）
+AUDIT_HISTORY_SIZE = 10000
+
+
 class AuditLogger:
     """审计日志记录器"""
     
-    def __init__(self):
-        self.operation_log = defaultdict(list)
+    def __init__(self, max_entries: int = AUDIT_HISTORY_SIZE):
+        # 环形缓冲区，只保留最近的 max_entries 条，长期运行不再无限增长
+        self.operation_log = deque(maxlen=max_entries)
     
     def log_operation(
         self,
@@ -252,13 +257,10 @@ class AuditLogger:
         }
         
         # 记录到内存
-        self.operation_log[action].append(log_entry)
+        self.operation_log.append(log_entry)
         
         # 记录到文件
-        logger.info(f"Audit: {json.dumps(log_entry, ensure_ascii=False)}")
-        
-        # 记录到数据库（如果需要）
-        # TODO: 实现数据库日志记录
+        logger.info(f"Audit: {json.dumps(log_entry, ensure_ascii=False, default=str)}")
     
     def get_operation_history(
         self,
@@ -269,18 +271,19 @@ class AuditLogger:
         """获取操作历史"""
         logs = []
         
-        if action:
-            logs = self.operation_log.get(action, [])
-        else:
-            for action_logs in self.operation_log.values():
-                logs.extend(action_logs)
-        
-        # 过滤用户
-        if user_id:
-            logs = [log for log in logs if log.get('user_id') == user_id]
+        # 从最新的记录往前扫描，取满 limit 条即停止
+        for log in reversed(self.operation_log):
+            if action and log['action'] != action:
+                continue
+            if user_id and log.get('user_id') != user_id:
+                continue
+            logs.append(log)
+            if len(logs) >= limit:
+                break
         
-        # 限制数量
-        return logs[-limit:]
+        # 按时间正序返回
+        logs.reverse()
+        return logs
 
 
 # ========== 限流系统 ==========
@@ -0,0 +1,260 @@
+"""
+工具结果缓存
+
+用于返回结果只依赖参数与常量/低频变化数据表的工具（经济模型说明、合伙人权益、公司信息等）：
+
+    @tool
+    @cached_tool(ttl=300, depends_on=("company_info",))
+    def get_company_info(runtime: ToolRuntime = None) -> str:
+        ...
+
+- 缓存键由参数规范化得到（绑定默认值、去除 runtime、字符串去首尾空白），位置参数与关键字参数命中同一项
+- 每个工具单独的 TTL 与 LRU 容量；scope="session" 时按会话（thread_id）隔离
+- 依赖的数据表通过 ORM 提交后自动失效，也可调用 invalidate_tool_cache 手动失效
+- 命中/未命中计数可通过 get_tool_cache_stats 获取，并以 tool_cache 自定义事件写入运行追踪
+"""
+
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认缓存时间（秒）
+DEFAULT_TOOL_CACHE_TTL = 600
+
+# 每个工具默认最多缓存的条目数
+DEFAULT_TOOL_CACHE_SIZE = 256
+
+# 追踪中的自定义事件名
+TRACE_EVENT_NAME = "tool_cache"
+
+
+class ToolResultCache:
+    """单个工具的 TTL + LRU 缓存"""
+
+    def __init__(self, name: str, ttl: float, maxsize: int, depends_on: Tuple[str, ...]):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.depends_on = depends_on
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+                "depends_on": list(self.depends_on)
+            }
+
+
+# 工具名 -> 缓存
+_caches: Dict[str, ToolResultCache] = {}
+_orm_hook_installed = False
+_orm_hook_lock = threading.Lock()
+
+
+def _normalize(value: Any) -> Any:
+    """把参数值转为可哈希且稳定的形式"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalize(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def _session_id(runtime: Any) -> Optional[str]:
+    """从 ToolRuntime 中取会话ID（thread_id）"""
+    config = getattr(runtime, "config", None) or {}
+    configurable = config.get("configurable", {}) if isinstance(config, dict) else {}
+    thread_id = configurable.get("thread_id")
+    return str(thread_id) if thread_id is not None else None
+
+
+def _emit_trace(tool_name: str, hit: bool, cache: ToolResultCache) -> None:
+    """把命中情况写入运行追踪（不在运行上下文中时忽略）"""
+    try:
+        from langchain_core.callbacks.manager import dispatch_custom_event
+        dispatch_custom_event(TRACE_EVENT_NAME, {
+            "tool": tool_name,
+            "hit": hit,
+            "hits": cache.hits,
+            "misses": cache.misses
+        })
+    except Exception:
+        pass
+
+
+def cached_tool(
+    ttl: float = DEFAULT_TOOL_CACHE_TTL,
+    maxsize: int = DEFAULT_TOOL_CACHE_SIZE,
+    scope: str = "global",
+    depends_on: Iterable[str] = (),
+    should_cache: Optional[Callable[[Any], bool]] = None
+):
+    """
+    工具结果缓存装饰器（放在 @tool 下面）
+
+    Args:
+        ttl: 缓存时间（秒）
+        maxsize: 最多缓存的条目数
+        scope: "global" 所有会话共享；"session" 按会话隔离
+        depends_on: 依赖的数据表名，这些表经 ORM 提交写入后缓存失效
+        should_cache: 判断结果是否缓存（如错误提示不缓存），默认全部缓存
+    """
+    if scope not in ("global", "session"):
+        raise ValueError(f"不支持的缓存范围: {scope}")
+    depends_on = tuple(depends_on)
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(func)
+        cache = ToolResultCache(func.__name__, ttl, maxsize, depends_on)
+        _caches[func.__name__] = cache
+        if depends_on:
+            install_orm_invalidation()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind_partial(*args, **kwargs)
+            bound.apply_defaults()
+            runtime = bound.arguments.get("runtime")
+            key = tuple(
+                (name, _normalize(value))
+                for name, value in bound.arguments.items()
+                if name != "runtime"
+            )
+            if scope == "session":
+                key = (_session_id(runtime),) + key
+
+            hit, value = cache.get(key)
+            _emit_trace(func.__name__, hit, cache)
+            if hit:
+                return value
+
+            value = func(*args, **kwargs)
+            if should_cache is None or should_cache(value):
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def invalidate_tool_cache(*tables: str) -> int:
+    """
+    使依赖指定数据表的工具缓存失效（不传参数时清空全部）
+
+    Returns:
+        清空的工具缓存数
+    """
+    cleared = 0
+    for cache in list(_caches.values()):
+        if not tables or set(tables) & set(cache.depends_on):
+            cache.clear()
+            cleared += 1
+    return cleared
+
+
+def get_tool_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """获取各工具的缓存统计"""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def _dependent_tables() -> set:
+    tables = set()
+    for cache in _caches.values():
+        tables.update(cache.depends_on)
+    return tables
+
+
+def _collect_written_tables(session, flush_context) -> None:
+    """after_flush：记录本事务写过的、被工具缓存依赖的表"""
+    watched = _dependent_tables()
+    written = session.info.setdefault("tool_cache_tables", set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        table_name = getattr(instance, "__tablename__", None)
+        if table_name in watched:
+            written.add(table_name)
+
+
+def _invalidate_after_commit(session) -> None:
+    """after_commit：事务提交后使相关工具缓存失效"""
+    written = session.info.pop("tool_cache_tables", None)
+    if written:
+        invalidate_tool_cache(*written)
+        logger.debug("工具缓存失效: %s", ", ".join(sorted(written)))
+
+
+def _discard_after_rollback(session) -> None:
+    session.info.pop("tool_cache_tables", None)
+
+
+def install_orm_invalidation() -> None:
+    """在所有 ORM 会话上注册写入监听（只注册一次）"""
+    global _orm_hook_installed
+    if _orm_hook_installed:
+        return
+    with _orm_hook_lock:
+        if _orm_hook_installed:
+            return
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+
+        event.listen(Session, "after_flush", _collect_written_tables)
+        event.listen(Session, "after_commit", _invalidate_after_commit)
+        event.listen(Session, "after_rollback", _discard_after_rollback)
+        _orm_hook_installed = True
+
@@ -0,0 +1,165 @@
+"""
+v9.0 生态系统接口客户端
+
+供 referral/resource/project/digital_asset 工具调用推荐分润、资源库、项目与数字资产接口：
+
+    result = get_v9_client().call("list_projects", token, project_type="design")
+
+- 同机部署（默认）：直接调用 admin-backend/v9_services 中的业务函数，不经过本机 HTTP 回环，
+  省去两次 JSON 编解码与一次请求处理；令牌用与后台相同的 JWT_SECRET 校验
+- 远程部署（设置 V9_API_BASE_URL，如 https://admin.example.com/api/v9）：复用连接池的 requests.Session，
+  请求带连接/读取超时，幂等的 GET 在连接失败或 502/503/504 时自动重试，后台卡住不会无限阻塞智能体
+- 两种方式返回相同结构：{"success": bool, "data": ..., "message": ...}
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# admin-backend 与 src 同仓库部署，业务逻辑复用 admin-backend/v9_services
+ADMIN_BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'admin-backend')
+
+# 操作名 -> (HTTP 方法, 接口路径)；操作名同时是 v9_services 中的函数名
+OPERATIONS = {
+    "list_referrals": ("GET", "/referrals"),
+    "list_commissions": ("GET", "/commissions"),
+    "add_resource": ("POST", "/resources"),
+    "list_resources": ("GET", "/resources"),
+    "create_project": ("POST", "/projects"),
+    "list_projects": ("GET", "/projects"),
+    "match_resources": ("POST", "/projects/{project_id}/match"),
+    "join_project": ("POST", "/projects/{project_id}/join"),
+    "create_asset": ("POST", "/assets"),
+    "list_assets": ("GET", "/assets"),
+}
+
+# 远程接口的连接超时与读取超时（秒）
+V9_HTTP_CONNECT_TIMEOUT = float(os.getenv("V9_HTTP_CONNECT_TIMEOUT", 3))
+V9_HTTP_READ_TIMEOUT = float(os.getenv("V9_HTTP_READ_TIMEOUT", 15))
+# GET 请求的最大重试次数
+V9_HTTP_RETRIES = int(os.getenv("V9_HTTP_RETRIES", 2))
+# 每个主机保持的连接数
+V9_HTTP_POOL_SIZE = int(os.getenv("V9_HTTP_POOL_SIZE", 20))
+
+
+class LocalV9Client:
+    """进程内调用 v9_services"""
+
+    def __init__(self, database: str, jwt_secret: str, authenticate=None):
+        """
+        Args:
+            database: admin-backend 的 SQLite 数据库文件
+            jwt_secret: 校验令牌的密钥（与 admin-backend 的 JWT_SECRET 一致）
+            authenticate: 由令牌得到用户ID的函数（默认按 HS256 校验 JWT）
+        """
+        if ADMIN_BACKEND_DIR not in sys.path:
+            sys.path.insert(0, ADMIN_BACKEND_DIR)
+        import v9_services
+
+        self.services = v9_services
+        self.database = database
+        self.jwt_secret = jwt_secret
+        self.authenticate = authenticate or self._verify_jwt
+
+    def _verify_jwt(self, token: str) -> Optional[int]:
+        import jwt
+
+        try:
+            return jwt.decode(token, self.jwt_secret, algorithms=["HS256"])["user_id"]
+        except Exception:
+            return None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def call(self, operation: str, token: str, **params) -> Dict[str, Any]:
+        if operation not in OPERATIONS:
+            raise ValueError(f"unknown v9 operation: {operation}")
+        user_id = self.authenticate(token)
+        if not user_id:
+            return {"success": False, "message": "未授权"}
+
+        conn = self._connect()
+        try:
+            data = getattr(self.services, operation)(conn, user_id, **params)
+            conn.commit()
+        except self.services.V9ServiceError as e:
+            return {"success": False, "message": e.message}
+        finally:
+            conn.close()
+        return {"success": True, "data": data}
+
+
+class HttpV9Client:
+    """通过带连接池、超时与重试的 HTTP 会话调用远程 /api/v9 接口"""
+
+    def __init__(self, base_url: str, connect_timeout: float = V9_HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = V9_HTTP_READ_TIMEOUT, retries: int = V9_HTTP_RETRIES,
+                 pool_size: int = V9_HTTP_POOL_SIZE):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        # 只重试幂等的 GET；POST（创建资源、参与项目等）重试可能重复写入
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def call(self, operation: str, token: str, **params) -> Dict[str, Any]:
+        if operation not in OPERATIONS:
+            raise ValueError(f"unknown v9 operation: {operation}")
+        method, path = OPERATIONS[operation]
+        if "{project_id}" in path:
+            path = path.format(project_id=params.pop("project_id"))
+
+        request_args = {"params": params} if method == "GET" else {"json": params}
+        response = self.session.request(
+            method,
+            f"{self.base_url}{path}",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=self.timeout,
+            **request_args,
+        )
+        try:
+            return response.json()
+        except ValueError:
+            return {"success": False, "message": f"HTTP {response.status_code}"}
+
+
+_v9_client = None
+_v9_client_lock = threading.Lock()
+
+
+def get_v9_client():
+    """获取全局 v9 客户端（设置了 V9_API_BASE_URL 时走远程 HTTP，否则进程内调用）"""
+    global _v9_client
+    if _v9_client is None:
+        with _v9_client_lock:
+            if _v9_client is None:
+                base_url = os.getenv("V9_API_BASE_URL")
+                if base_url:
+                    logger.info(f"v9 tools use remote API at {base_url}")
+                    _v9_client = HttpV9Client(base_url)
+                else:
+                    _v9_client = LocalV9Client(
+                        database=os.getenv("V9_DATABASE_PATH", os.path.join(ADMIN_BACKEND_DIR, "lingzhi_ecosystem.db")),
+                        jwt_secret=os.getenv("JWT_SECRET", "lingzhi-jwt-secret-key"),
+                    )
+    return _v9_client
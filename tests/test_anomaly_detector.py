@@ -0,0 +1,153 @@
+"""
+测试异常操作检测计数器
+
+测试包括：
+1. 从审计日志表重建计数，与原四条查询的统计口径一致
+2. 审计事件流实时累加计数
+3. 阈值可配置、跨日后今日计数归零
+4. 在管道写入线程中重建：补计队列中尚未写入的事件，定期重建在后台进行
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# 添加src目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, create_engine
+from sqlalchemy.orm import sessionmaker
+
+from storage.database.anomaly_detector import AnomalyDetector, AnomalyRules
+from storage.database.audit_pipeline import AuditPipeline
+
+
+def _audit_table(tmp_path):
+    metadata = MetaData()
+    table = Table(
+        'audit_logs', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('user_id', Integer, nullable=False),
+        Column('action', String(50), nullable=False),
+        Column('status', String(20), nullable=False),
+        Column('created_at', DateTime, nullable=False),
+        Column('resource_type', String(50)),
+        Column('resource_id', Integer),
+        Column('description', Text),
+    )
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    metadata.create_all(engine)
+    return sessionmaker(bind=engine), table
+
+
+def _row(user_id, action, status='success', description=None, days_ago=0):
+    return {
+        'user_id': user_id, 'action': action, 'status': status,
+        'description': description, 'created_at': datetime.now() - timedelta(days=days_ago)
+    }
+
+
+def test_rebuild_matches_legacy_rules(tmp_path):
+    """测试从审计日志表重建计数"""
+    session_factory, table = _audit_table(tmp_path)
+    rows = [_row(1, 'login') for _ in range(101)]
+    rows += [_row(1, 'financial_check', days_ago=1) for _ in range(30)]
+    rows += [_row(2, 'create_transaction') for _ in range(21)]
+    rows += [_row(2, 'delete_user', status='failed', days_ago=10) for _ in range(6)]
+    rows += [_row(3, 'update_user_role', description='设置为超级管理员', days_ago=100)]
+    rows += [_row(3, 'update_user_role', description='设置为部门经理')]
+    with session_factory() as session:
+        session.execute(table.insert(), rows)
+        session.commit()
+
+    detector = AnomalyDetector(session_factory, table=table)
+    assert detector.rebuild() == 3
+
+    assert detector.detect(1) == (True, ['今日操作过于频繁：101次'])
+    assert detector.detect(2) == (True, ['敏感操作失败次数过多：6次', '今日资金操作过于频繁：21次'])
+    assert detector.detect(3) == (True, ['尝试修改超级管理员权限：1次'])
+    assert detector.detect(4) == (False, [])
+
+    counters = detector.counters(2)
+    assert (counters.operations, counters.finance_operations, counters.failed_sensitive) == (21, 21, 6)
+
+    relaxed = AnomalyDetector(session_factory, table=table, rules=AnomalyRules(daily_operation_limit=200))
+    assert relaxed.detect(1) == (False, [])
+
+
+def test_counters_follow_audit_stream(tmp_path):
+    """测试事件流累加与跨日归零"""
+    session_factory, table = _audit_table(tmp_path)
+    detector = AnomalyDetector(session_factory, table=table, resync_interval=0)
+    pipeline = AuditPipeline(session_factory, table=table, flush_interval=0.05)
+    pipeline.add_listener(detector.observe)
+    assert detector.detect(7) == (False, [])
+
+    for _ in range(21):
+        pipeline.submit(user_id=7, action='exchange_lingzhi_to_contribution')
+    for _ in range(6):
+        pipeline.submit(user_id=7, action='assign_lingzhi', status='failed')
+    assert detector.detect(7) == (True, [
+        '敏感操作失败次数过多：6次', '今日资金操作过于频繁：21次'
+    ])
+
+    # 事件流计数与写入后重建的结果一致
+    assert pipeline.flush(timeout=5)
+    streamed = detector.counters(7)
+    detector.rebuild()
+    assert detector.counters(7) == streamed
+    pipeline.stop()
+
+    # 跨日后今日计数归零，累计计数保留
+    detector._snapshot.counters[7].day -= timedelta(days=1)
+    counters = detector.counters(7)
+    assert (counters.operations, counters.finance_operations, counters.failed_sensitive) == (0, 0, 6)
+
+
+def test_rebuild_keeps_unwritten_events(tmp_path):
+    """测试重建时补计队列中尚未写入的事件"""
+    session_factory, table = _audit_table(tmp_path)
+    pipeline = AuditPipeline(session_factory, table=table, batch_size=5, flush_interval=0.05)
+    detector = AnomalyDetector(session_factory, table=table, resync_interval=0, pipeline=pipeline)
+    pipeline.add_listener(detector.observe)
+
+    # 首次重建前提交的事件：部分已写入，部分仍在队列中
+    for _ in range(30):
+        pipeline.submit(user_id=8, action='create_transaction')
+    assert detector.rebuild() == 1
+    assert detector.counters(8).finance_operations == 30
+
+    for _ in range(12):
+        pipeline.submit(user_id=8, action='create_transaction')
+    detector.rebuild()
+    assert detector.counters(8).finance_operations == 42
+
+    assert pipeline.flush(timeout=5)
+    detector.rebuild()
+    assert detector.counters(8).finance_operations == 42
+    pipeline.stop()
+
+
+def test_periodic_rebuild_runs_in_background(tmp_path):
+    """测试定期重建不阻塞检测请求"""
+    session_factory, table = _audit_table(tmp_path)
+    pipeline = AuditPipeline(session_factory, table=table, flush_interval=0.05)
+    detector = AnomalyDetector(session_factory, table=table, resync_interval=60, pipeline=pipeline)
+    pipeline.add_listener(detector.observe)
+    detector.rebuild()
+    built_at = detector._snapshot.built_at
+
+    # 绕过管道直接写表，过期后下一次检测触发后台重建
+    with session_factory() as session:
+        session.execute(table.insert(), [_row(9, 'login') for _ in range(3)])
+        session.commit()
+    detector._snapshot.built_at -= 60
+    detector.counters(9)
+
+    deadline = time.monotonic() + 5
+    while detector._snapshot.built_at <= built_at - 60 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert detector.counters(9).operations == 3
+    pipeline.stop()
@@ -0,0 +1,108 @@
+"""
+测试审计日志管道
+
+测试包括：
+1. 事件入队后由后台线程批量写入
+2. 队列已满时丢弃并计数
+3. 按保留天数清理过期日志
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# 添加src目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from storage.database import audit_pipeline
+from storage.database.audit_pipeline import AuditPipeline
+
+
+def _audit_table(tmp_path):
+    metadata = MetaData()
+    table = Table(
+        'audit_logs', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('user_id', Integer, nullable=False),
+        Column('action', String(50), nullable=False),
+        Column('status', String(20), nullable=False),
+        Column('created_at', DateTime, nullable=False),
+        Column('resource_type', String(50)),
+        Column('resource_id', Integer),
+        Column('description', Text),
+        Column('error_message', Text),
+    )
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    metadata.create_all(engine)
+    return sessionmaker(bind=engine), table
+
+
+def _count(session_factory, table):
+    with session_factory() as session:
+        return session.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_submit_writes_in_batches(tmp_path):
+    """测试事件批量写入与指标"""
+    session_factory, table = _audit_table(tmp_path)
+    pipeline = AuditPipeline(session_factory, table=table, batch_size=10, flush_interval=0.05)
+    seen = []
+    pipeline.add_listener(seen.append)
+
+    for i in range(25):
+        assert pipeline.submit(user_id=i % 3, action='permission_check', status='success', description=f'检查{i}')
+    assert pipeline.flush(timeout=5)
+
+    metrics = pipeline.metrics()
+    assert (metrics['enqueued'], metrics['written'], metrics['dropped'], metrics['failed']) == (25, 25, 0, 0)
+    assert metrics['batches'] >= 3
+    assert metrics['queue_depth'] == 0
+    assert len(seen) == 25
+    assert _count(session_factory, table) == 25
+
+    # 写入失败（缺少必填列）只计数，不影响后续事件
+    pipeline.submit(user_id=None, action='permission_check')
+    assert pipeline.flush(timeout=5)
+    pipeline.submit(user_id=1, action='permission_check')
+    pipeline.stop()
+    metrics = pipeline.metrics()
+    assert (metrics['failed'], metrics['written'], metrics['writer_alive']) == (1, 26, False)
+
+
+def test_submit_drops_when_queue_full(tmp_path, monkeypatch):
+    """测试队列已满时丢弃事件"""
+    session_factory, table = _audit_table(tmp_path)
+    pipeline = AuditPipeline(session_factory, table=table, queue_size=2)
+    # 不启动后台线程，模拟写入跟不上
+    monkeypatch.setattr(pipeline, '_ensure_started', lambda: None)
+
+    results = [pipeline.submit(user_id=1, action='financial_check') for _ in range(5)]
+    assert results == [True, True, False, False, False]
+    metrics = pipeline.metrics()
+    assert (metrics['enqueued'], metrics['dropped'], metrics['queue_depth']) == (2, 3, 2)
+
+
+def test_purge_expired(tmp_path, monkeypatch):
+    """测试分批清理过期日志"""
+    session_factory, table = _audit_table(tmp_path)
+    monkeypatch.setattr(audit_pipeline, 'RETENTION_DELETE_BATCH', 4)
+    now = datetime.now()
+    with session_factory() as session:
+        session.execute(table.insert(), [
+            {'user_id': 1, 'action': 'a', 'status': 'success', 'created_at': now - timedelta(days=40 + i)}
+            for i in range(10)
+        ] + [
+            {'user_id': 1, 'action': 'a', 'status': 'success', 'created_at': now - timedelta(days=i)}
+            for i in range(3)
+        ])
+        session.commit()
+
+    pipeline = AuditPipeline(session_factory, table=table)
+    assert pipeline.purge_expired() == 0
+    assert pipeline.purge_expired(retention_days=30) == 10
+    assert _count(session_factory, table) == 3
+    assert pipeline.metrics()['purged'] == 10
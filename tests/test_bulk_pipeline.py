@@ -0,0 +1,167 @@
+"""
+测试批量数据管道
+
+测试包括：
+1. JSON 数组 / JSON Lines 流式读取
+2. 流式写出的JSON数组与 json.dump 格式一致
+3. 按唯一键分批插入/更新（含批内重复键）
+4. DB-API 分批复制与逐行容错
+5. 中途失败时报告已提交的批数
+"""
+
+import sys
+import os
+import json
+import sqlite3
+
+import pytest
+
+# 添加src目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.orm import Session
+
+from storage.database import bulk_pipeline
+from storage.database.bulk_pipeline import (
+    BulkPipelineError,
+    bulk_upsert,
+    copy_rows,
+    iter_json_records,
+    write_json_array,
+)
+
+
+def test_iter_json_records(tmp_path, monkeypatch):
+    """测试JSON数组与JSON Lines流式读取"""
+    records = [{'email': f'u{i}@x.cn', 'name': '张三' * (i % 7)} for i in range(200)]
+
+    array_file = tmp_path / 'users.json'
+    array_file.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding='utf-8')
+    lines_file = tmp_path / 'users.jsonl'
+    lines_file.write_text('\n'.join(json.dumps(r, ensure_ascii=False) for r in records) + '\n', encoding='utf-8')
+
+    # 使用很小的读取块，确保对象跨块时也能正确解析
+    monkeypatch.setattr(bulk_pipeline, '_JSON_READ_SIZE', 7)
+    assert list(iter_json_records(str(array_file))) == records
+    assert list(iter_json_records(str(lines_file))) == records
+
+    empty_file = tmp_path / 'empty.json'
+    empty_file.write_text('[]', encoding='utf-8')
+    assert list(iter_json_records(str(empty_file))) == []
+
+
+def test_write_json_array_matches_json_dump(tmp_path):
+    """测试流式写出与 json.dump 输出一致"""
+    records = [{'id': 1, 'name': '李四', 'tags': ['a', 'b']}, {'id': 2, 'name': None}]
+    for data in (records, []):
+        path = tmp_path / 'out.json'
+        with open(path, 'w', encoding='utf-8') as f:
+            assert write_json_array(f, iter(data)) == len(data)
+        assert path.read_text(encoding='utf-8') == json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def _users_table():
+    metadata = MetaData()
+    table = Table(
+        'users', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('email', String(100), unique=True, nullable=False),
+        Column('name', String(50)),
+        Column('phone', String(20)),
+    )
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    return engine, table
+
+
+def test_bulk_upsert_inserts_and_updates():
+    """测试分批插入/更新及批内重复键"""
+    engine, table = _users_table()
+    progress = []
+
+    with Session(engine) as session:
+        session.execute(table.insert(), [{'email': 'old@x.cn', 'name': '旧', 'phone': '1'}])
+        session.commit()
+
+        records = [{'email': f' u{i}@x.cn ', 'name': f'用户{i}'} for i in range(5)]
+        records += [
+            {'email': 'old@x.cn', 'name': '新'},
+            {'email': 'u1@x.cn', 'name': '重复', 'phone': '9'},
+            {'email': '', 'name': '无邮箱'},
+        ]
+
+        stats = bulk_upsert(
+            session, table, records, key='email',
+            build_insert=lambda r: {'name': r['name'], 'phone': r.get('phone')},
+            build_update=lambda r, existing: {'name': r['name'], 'phone': r.get('phone') or existing['phone']},
+            update_columns=['name', 'phone'],
+            batch_size=3,
+            on_progress=lambda s: progress.append(s.batches),
+            normalize_key=lambda v: (v or '').strip()
+        )
+
+        assert (stats.read, stats.inserted, stats.updated, stats.skipped) == (8, 5, 2, 1)
+        assert progress == [1, 2, 3]
+
+        rows = {r.email: r for r in session.execute(select(table)).all()}
+        assert len(rows) == 6
+        assert (rows['old@x.cn'].name, rows['old@x.cn'].phone) == ('新', '1')
+        assert (rows['u1@x.cn'].name, rows['u1@x.cn'].phone) == ('重复', '9')
+
+        stats = bulk_upsert(
+            session, table, [{'email': 'u2@x.cn', 'name': 'x'}], key='email',
+            build_insert=lambda r: {'name': r['name']}
+        )
+        assert (stats.inserted, stats.skipped) == (0, 1)
+
+
+def test_copy_rows_with_row_fallback():
+    """测试DB-API分批复制，失败批次逐行重试"""
+    source = sqlite3.connect(':memory:')
+    source.execute('CREATE TABLE t (id INTEGER, v TEXT)')
+    source.executemany('INSERT INTO t VALUES (?, ?)', [(i, f'v{i}') for i in range(10)] + [(3, 'dup')])
+    target = sqlite3.connect(':memory:')
+    target.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)')
+
+    failed = []
+    cursor = source.execute('SELECT id, v FROM t ORDER BY rowid')
+    stats = copy_rows(
+        cursor, target, 'INSERT INTO t VALUES (?, ?)',
+        transform=lambda row: None if row[0] == 5 else row,
+        batch_size=4,
+        on_row_error=lambda row, e: failed.append(row)
+    )
+
+    assert (stats.read, stats.inserted, stats.skipped, stats.batches) == (11, 9, 2, 3)
+    assert failed == [(3, 'dup')]
+    assert target.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 9
+
+
+def test_failure_reports_committed_batches():
+    """测试中途失败时错误信息包含已提交的批数"""
+    engine, table = _users_table()
+    records = [{'email': f'u{i}@x.cn', 'name': f'用户{i}'} for i in range(5)] + [{'email': 'bad@x.cn', 'id': 1}]
+
+    with Session(engine) as session:
+        with pytest.raises(BulkPipelineError) as exc_info:
+            bulk_upsert(
+                session, table, records, key='email',
+                build_insert=lambda r: {'id': r['id']} if 'id' in r else {'name': r['name']},
+                batch_size=2
+            )
+        assert '已提交 2 批' in str(exc_info.value)
+        assert (exc_info.value.stats.batches, exc_info.value.stats.inserted) == (2, 4)
+        assert len(session.execute(select(table)).all()) == 4
+
+    source = sqlite3.connect(':memory:')
+    source.execute('CREATE TABLE t (id INTEGER, v TEXT)')
+    source.executemany('INSERT INTO t VALUES (?, ?)', [(i, f'v{i}') for i in range(6)] + [(1, 'dup')])
+    target = sqlite3.connect(':memory:')
+    target.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)')
+
+    with pytest.raises(BulkPipelineError) as exc_info:
+        copy_rows(source.execute('SELECT id, v FROM t ORDER BY rowid'), target, 'INSERT INTO t VALUES (?, ?)', batch_size=3)
+    assert '第3批写入失败，此前已提交 2 批' in str(exc_info.value)
+    assert target.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 6
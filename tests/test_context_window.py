@@ -0,0 +1,129 @@
+"""
+上下文窗口测试
+
+测试包括：
+1. token 估算（中文按字、其余按 4 字符）
+2. 已消费的长工具结果被省略，当前轮次的工具结果保留
+3. 超出预算时最早的轮次并入滚动摘要，不拆开工具调用，节省量可统计
+4. reducer 的条数上限对齐到用户消息并保留摘要
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("langchain.agents.middleware")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+
+from agents.context_window import (  # noqa: E402
+    ContextWindow,
+    ContextWindowMiddleware,
+    cap_messages,
+    count_tokens,
+    elide_tool_results,
+    estimate_tokens,
+    is_summary,
+)
+
+
+def _turn(i, tool_result="结果"):
+    call_id = f"call-{i}"
+    return [
+        HumanMessage(content=f"第{i}个问题", id=f"h{i}"),
+        AIMessage(content="", id=f"a{i}", tool_calls=[{"name": "search_web", "args": {"q": str(i)}, "id": call_id}]),
+        ToolMessage(content=tool_result, tool_call_id=call_id, name="search_web", id=f"t{i}"),
+        AIMessage(content=f"第{i}个回答", id=f"r{i}"),
+    ]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("你好世界") == 4
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("你好abcd") == 3
+
+
+def test_elide_consumed_tool_results():
+    long_result = "资料" * 1000
+    messages = _turn(1, long_result) + _turn(2, long_result)[:3]
+    result, elided = elide_tool_results(messages, max_tokens=50)
+
+    assert elided == 1
+    assert result[2].id == "t1"
+    assert len(result[2].content) < 200
+    assert "已省略" in result[2].content
+    # 当前轮次的工具结果模型还没看过，不省略
+    assert result[6].content == long_result
+    # 再次整理不重复处理
+    assert elide_tool_results(result, max_tokens=50)[1] == 0
+
+
+def test_evicts_old_turns_into_summary():
+    calls = []
+
+    def summarizer(previous, messages):
+        calls.append((previous, [m.id for m in messages]))
+        return "用户问了几个问题"
+
+    messages = []
+    for i in range(8):
+        messages += _turn(i, "数据" * 40)
+    window = ContextWindow(budget=300, target_ratio=0.6, tool_result_max_tokens=1000,
+                           max_messages=40, summarizer=summarizer, summary_max_tokens=20)
+    result, stats = window.apply(messages)
+
+    assert is_summary(result[0])
+    assert result[1].id.startswith("h")
+    assert len(calls) == 1 and calls[0][0] == ""
+    assert calls[0][1] == [m.id for m in messages[:stats.evicted_messages]]
+    assert count_tokens(result) <= 300
+    assert stats.sent_tokens == count_tokens(result)
+    assert stats.full_tokens == count_tokens(messages)
+    assert stats.saved_by_summary == stats.saved_tokens > 0
+    # 工具调用与工具结果始终成对
+    ids = [m.id for m in result]
+    for i in range(8):
+        assert (f"a{i}" in ids) == (f"t{i}" in ids)
+
+    # 再追加轮次后，摘要在原摘要基础上滚动更新，节省量累计
+    more = result + _turn(8, "数据" * 40) + _turn(9, "数据" * 40)
+    rolled, rolled_stats = window.apply(more)
+    assert calls[-1][0] == "用户问了几个问题"
+    assert sum(is_summary(m) for m in rolled) == 1
+    assert rolled_stats.full_tokens == count_tokens(messages + _turn(8, "数据" * 40) + _turn(9, "数据" * 40))
+
+
+def test_within_budget_is_untouched():
+    messages = _turn(1) + _turn(2)
+    result, stats = ContextWindow(budget=10000).apply(messages)
+    assert result is None
+    assert stats.saved_tokens == 0
+
+
+def test_middleware_returns_state_update():
+    messages = []
+    for i in range(12):
+        messages += _turn(i)
+    middleware = ContextWindowMiddleware(budget=100000, max_messages=40)
+    update = middleware.before_model({"messages": messages}, None)
+
+    new_messages = update["messages"][1:]
+    assert update["messages"][0].id == "__remove_all__"
+    # 条数接近上限时提前并入摘要（抽取式）
+    assert is_summary(new_messages[0])
+    assert "第0个问题" in new_messages[0].content
+    assert len(new_messages) <= 40 * 0.6 + 1
+
+
+def test_cap_messages_aligns_to_turn():
+    messages = []
+    for i in range(5):
+        messages += _turn(i)
+    capped = cap_messages(messages, 10)
+    assert capped[0].id == "h3"
+    assert len(capped) == 8
+    assert cap_messages(messages, 40) == messages
@@ -0,0 +1,101 @@
+"""
+贡献值排行榜测试
+
+测试包括：
+1. 排名与 Top-N 与数据库一致，对账修正直接写表造成的偏差
+2. 对账读取快照期间的增量更新不会被旧快照覆盖
+3. 获取排行榜不启动对账线程，start_reconciler 显式启动且不重复启动
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '灵值生态园智能体移植包', 'src', 'auth'))
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+import contribution_leaderboard  # noqa: E402
+from contribution_leaderboard import get_leaderboard, start_reconciler, stop_reconcilers  # noqa: E402
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE user_contributions_v2 (
+                user_id INTEGER PRIMARY KEY, cumulative_contribution FLOAT, project_contribution FLOAT,
+                remaining_contribution FLOAT, updated_at DATETIME
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO user_contributions_v2 (user_id, cumulative_contribution, project_contribution,
+                                               remaining_contribution)
+            VALUES (1, 30, 0, 30), (2, 20, 0, 20), (3, 10, 0, 10)
+        """))
+    yield engine
+    stop_reconcilers()
+    engine.dispose()
+
+
+def _contribution(user_id, value):
+    return {
+        "user_id": user_id,
+        "cumulative_contribution": value,
+        "project_contribution": 0.0,
+        "remaining_contribution": value
+    }
+
+
+def test_reconcile_corrects_drift(engine):
+    with sessionmaker(bind=engine)() as session:
+        leaderboard = get_leaderboard(session)
+        assert [leaderboard.get_rank(session, user_id) for user_id in (1, 2, 3)] == [1, 2, 3]
+
+        session.execute(text("UPDATE user_contributions_v2 SET cumulative_contribution = 50 WHERE user_id = 3"))
+        session.commit()
+        assert leaderboard.get_rank(session, 3) == 3
+        assert leaderboard.reconcile(session) == 1
+        assert leaderboard.get_rank(session, 3) == 1
+
+
+def test_reconcile_keeps_updates_made_during_snapshot(engine):
+    with sessionmaker(bind=engine)() as session:
+        leaderboard = get_leaderboard(session)
+        leaderboard.ensure_loaded(session)
+
+        # 对账的全表查询返回后、替换内存排名前，另一个请求增量更新了用户 3
+        @event.listens_for(engine, "after_cursor_execute")
+        def _concurrent_update(conn, cursor, statement, parameters, context, executemany):
+            if "FROM user_contributions_v2" in statement and "WHERE" not in statement:
+                leaderboard.update_user(_contribution(3, 100.0))
+
+        try:
+            leaderboard.reconcile(session)
+        finally:
+            event.remove(engine, "after_cursor_execute", _concurrent_update)
+        assert leaderboard.get_rank(session, 3) == 1
+
+        # 下一次对账以数据库为准
+        assert leaderboard.reconcile(session) == 1
+        assert leaderboard.get_rank(session, 3) == 3
+
+
+def test_reconciler_started_explicitly(engine):
+    with sessionmaker(bind=engine)() as session:
+        get_leaderboard(session)
+    assert engine not in contribution_leaderboard._reconcilers
+
+    assert start_reconciler(engine, interval=0) is None
+    reconciler = start_reconciler(engine, interval=3600)
+    assert start_reconciler(engine, interval=3600) is reconciler
+    assert reconciler.reconcile_once() == 0
+
+    stop_reconcilers()
+    assert contribution_leaderboard._reconcilers == {}
@@ -0,0 +1,164 @@
+"""
+数据库引擎注册表测试
+
+测试包括：
+1. 按全局预算与 worker 数计算连接池
+2. 运行范围内嵌套的 get_session() 共用会话与连接，范围结束后全部归还
+3. 内层调用方出错未回滚时只回滚自己的 SAVEPOINT，外层随后仍可提交
+4. 内层调用方提交后立即持久化，外层不再提交就关闭也不会丢失
+5. 连接池统计（借出、等待超时）
+"""
+
+import contextvars
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage.database.db import (  # noqa: E402
+    PoolSettings, create_pooled_engine, get_session, run_session_scope
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_pooled_engine(f"sqlite:///{tmp_path / 'registry.db'}", PoolSettings(pool_size=2, max_overflow=1))
+    yield engine
+    engine.dispose()
+
+
+def test_pool_settings_from_budget():
+    pools = PoolSettings.from_budget(budget=100, workers=4, async_ratio=0.2)
+    assert (pools["sync"].pool_size, pools["sync"].max_overflow) == (10, 10)
+    assert pools["async"].max_connections == 5
+    # 所有 worker 的同步 + 异步连接合计不超过预算
+    assert 4 * (pools["sync"].max_connections + pools["async"].max_connections) <= 100
+
+    no_async = PoolSettings.from_budget(budget=10, workers=1, async_ratio=0)
+    assert no_async["sync"].max_connections == 10
+
+
+def test_run_scope_shares_session_per_thread(engine):
+    factory = sessionmaker(bind=engine)
+    with run_session_scope(factory):
+        outer = get_session()
+        outer.execute(text("SELECT 1"))
+        inner = get_session()
+        inner.execute(text("SELECT 1"))
+        assert inner._session is outer._session
+        assert engine.pool.telemetry()["checked_out"] == 1
+        # 内层关闭不影响外层
+        inner.close()
+        assert engine.pool.telemetry()["checked_out"] == 1
+
+        # 复制上下文的线程（并行执行的工具）仍在范围内，但各自一个会话
+        other = []
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=lambda: context.run(lambda: other.append(get_session())))
+        worker.start()
+        worker.join()
+        assert other[0]._session is not outer._session
+
+        # 工具忘记关闭的会话在运行结束时统一关闭
+        leaked = get_session()
+        leaked.execute(text("SELECT 1"))
+    assert engine.pool.telemetry()["checked_out"] == 0
+
+
+@pytest.fixture
+def events_engine(engine):
+    # pysqlite 需要显式 BEGIN 才能正确支持 SAVEPOINT
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE events (name TEXT UNIQUE)"))
+    return engine
+
+
+def _event_names(engine):
+    with engine.connect() as conn:
+        return sorted(row[0] for row in conn.execute(text("SELECT name FROM events")))
+
+
+def test_nested_failure_does_not_poison_outer(events_engine):
+    engine = events_engine
+    factory = sessionmaker(bind=engine)
+    with run_session_scope(factory):
+        outer = get_session()
+        outer.execute(text("INSERT INTO events VALUES ('login')"))
+
+        # 内层服务：先提交一条，再违反唯一约束后捕获异常，既不回滚也不提交
+        inner = get_session()
+        inner.execute(text("INSERT INTO events VALUES ('check_in')"))
+        inner.commit()
+        try:
+            inner.execute(text("INSERT INTO events VALUES ('check_in')"))
+        except Exception:
+            pass
+        inner.close()
+
+        outer.execute(text("INSERT INTO events VALUES ('audit')"))
+        outer.commit()
+        outer.close()
+
+    assert _event_names(engine) == ["audit", "check_in", "login"]
+
+    with run_session_scope(factory):
+        outer = get_session()
+        outer.execute(text("INSERT INTO events VALUES ('outer')"))
+        inner = get_session()
+        inner.execute(text("INSERT INTO events VALUES ('discarded')"))
+        inner.close()
+        outer.commit()
+        outer.close()
+
+    names = _event_names(engine)
+    assert "outer" in names and "discarded" not in names
+
+
+def test_nested_commit_survives_outer_close(events_engine):
+    engine = events_engine
+    factory = sessionmaker(bind=engine)
+    with run_session_scope(factory):
+        outer = get_session()
+        outer.execute(text("INSERT INTO events VALUES ('login')"))
+        outer.commit()
+
+        # 内层服务（如登录后的自动签到）自行提交后关闭
+        inner = get_session()
+        inner.execute(text("INSERT INTO events VALUES ('check_in')"))
+        inner.commit()
+        inner.close()
+
+        # 外层随后不再提交，直接关闭
+        outer.close()
+
+    assert _event_names(engine) == ["check_in", "login"]
+
+
+def test_pool_telemetry_counts_timeouts(tmp_path):
+    engine = create_pooled_engine(
+        f"sqlite:///{tmp_path / 'timeout.db'}",
+        PoolSettings(pool_size=1, max_overflow=0, pool_timeout=0.05),
+    )
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        stats = engine.pool.telemetry()
+        assert stats["checked_out"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0.05
+    assert engine.pool.telemetry()["checkouts"] == 1
+    engine.dispose()
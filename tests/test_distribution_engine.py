@@ -0,0 +1,120 @@
+"""
+批量分配引擎测试
+
+测试包括：
+1. allocate_shares 按最大余额法分配，合计严格等于总额
+2. 预演只返回分配表，不写入任何数据
+3. 中途失败后从上次提交的位置续跑，收款人变化时拒绝续跑
+4. add_contributions_bulk 跳过没有活跃会员级别的用户，且不为其写审计日志
+"""
+
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '灵值生态园智能体移植包'))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from src.auth.distribution_engine import (  # noqa: E402
+    DistributionEngine, DistributionError, Payee, allocate_shares
+)
+from src.auth.models_extended import AuditLog, Base, UserMemberLevel  # noqa: E402
+from src.auth.my_user import MyUser, TransactionType  # noqa: E402
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE payouts (payee_key INTEGER PRIMARY KEY, amount NUMERIC)"))
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _payouts(session):
+    return dict(session.execute(text("SELECT payee_key, amount FROM payouts")).fetchall())
+
+
+def _write_payouts(session, lines, round_no):
+    session.execute(
+        text("INSERT INTO payouts (payee_key, amount) VALUES (:key, :amount)"),
+        [{"key": line.payee.key, "amount": str(line.amount)} for line in lines]
+    )
+
+
+def test_allocate_shares_sums_to_total():
+    amounts = allocate_shares(Decimal("100.00"), [Decimal(1)] * 3)
+    assert amounts == [Decimal("33.34"), Decimal("33.33"), Decimal("33.33")]
+    assert sum(amounts) == Decimal("100.00")
+
+    amounts = allocate_shares(Decimal("10.005"), [Decimal("0.5"), Decimal("0.3"), Decimal("0.2")])
+    assert sum(amounts) == Decimal("10.00")
+    assert allocate_shares(Decimal("5"), []) == []
+
+    with pytest.raises(DistributionError):
+        allocate_shares(Decimal("5"), [Decimal(0), Decimal(0)])
+    with pytest.raises(DistributionError):
+        allocate_shares(Decimal("5"), [Decimal(2), Decimal(-1)])
+
+
+def test_dry_run_writes_nothing(session):
+    payees = [Payee(key=k, weight=Decimal(k)) for k in (3, 1, 2)]
+    engine = DistributionEngine(session)
+    result = engine.run("test", 1, 1, Decimal("60"), payees, _write_payouts, lambda s, r: None, dry_run=True)
+    assert result.dry_run
+    assert [row["key"] for row in result.payout_table()] == [1, 2, 3]
+    assert result.allocated_amount == Decimal("60")
+    assert _payouts(session) == {}
+    assert engine.get_open_run("test", 1) is None
+
+
+def test_resume_after_failure(session):
+    payees = [Payee(key=k, weight=Decimal(1)) for k in range(1, 6)]
+    calls = []
+
+    def failing_write(session, lines, round_no):
+        calls.append([line.payee.key for line in lines])
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        _write_payouts(session, lines, round_no)
+
+    engine = DistributionEngine(session, chunk_size=2)
+    with pytest.raises(RuntimeError):
+        engine.run("test", 1, 1, Decimal("50"), payees, failing_write, lambda s, r: None)
+    assert sorted(_payouts(session)) == [1, 2]
+    assert engine.get_open_run("test", 1)["status"] == "failed"
+
+    with pytest.raises(DistributionError):
+        engine.run("test", 1, 1, Decimal("50"), payees[:4], _write_payouts, lambda s, r: None)
+
+    result = engine.run("test", 1, 1, Decimal("50"), payees, _write_payouts, lambda s, r: None)
+    assert result.resumed and result.chunks_committed == 2
+    assert _payouts(session) == {k: 10 for k in range(1, 6)}
+    assert engine.get_open_run("test", 1) is None
+
+
+def test_add_contributions_bulk_skips_missing_levels(session):
+    session.add_all([
+        UserMemberLevel(user_id=1, level_id=1, contribution_value=10.0, status="active"),
+        UserMemberLevel(user_id=2, level_id=1, contribution_value=0.0, status="suspended"),
+    ])
+    session.commit()
+
+    updated = MyUser(session).add_contributions_bulk(
+        [(1, 5.0), (1, 2.5), (2, 1.0), (3, 1.0)], TransactionType.DIVIDEND
+    )
+    session.commit()
+
+    assert updated == 1
+    levels = {row.user_id: row.contribution_value for row in session.query(UserMemberLevel)}
+    assert levels == {1: 17.5, 2: 0.0}
+    assert [log.user_id for log in session.query(AuditLog)] == [1]
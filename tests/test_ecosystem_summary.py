@@ -0,0 +1,95 @@
+"""
+生态机制汇总快照测试
+
+测试包括：
+1. 新增佣金、分红后增量更新快照
+2. 修改佣金状态（pending -> paid）与金额后按差值更新快照
+3. 全量重建修正绕过管理器直接写表造成的偏差
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '灵值生态园智能体移植包', 'src', 'auth'))
+
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from models import Base, Commission  # noqa: E402
+from ecosystem_summary import (  # noqa: E402
+    ecosystem_summary_snapshot, rebuild_snapshot, record_commission, record_commission_change, record_dividends
+)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    rebuild_snapshot(session)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _snapshot(session):
+    row = session.execute(select(ecosystem_summary_snapshot)).mappings().one()
+    return row['commission_count'], row['pending_commission_count'], row['commission_amount']
+
+
+def _add_commission(session, amount, status='pending'):
+    commission = Commission(partner_id=1, amount=amount, status=status)
+    session.add(commission)
+    record_commission(session, amount, pending=status == 'pending')
+    session.commit()
+    return commission
+
+
+def test_create_updates_snapshot(session):
+    _add_commission(session, 100.0)
+    _add_commission(session, 50.5)
+    assert _snapshot(session) == (2, 2, 150.5)
+
+    record_dividends(session, 3, 30.0)
+    session.commit()
+    row = session.execute(select(ecosystem_summary_snapshot)).mappings().one()
+    assert (row['dividend_count'], row['dividend_amount']) == (3, 30.0)
+
+
+def test_update_applies_delta(session):
+    commission = _add_commission(session, 100.0)
+    _add_commission(session, 20.0)
+
+    old_amount, old_status = commission.amount, commission.status
+    commission.status = 'paid'
+    record_commission_change(session, old_amount, old_status, commission.amount, commission.status)
+    session.commit()
+    assert _snapshot(session) == (2, 1, 120.0)
+
+    old_amount, old_status = commission.amount, commission.status
+    commission.amount = 80.0
+    record_commission_change(session, old_amount, old_status, commission.amount, commission.status)
+    session.commit()
+    assert _snapshot(session) == (2, 1, 100.0)
+
+    # 增量结果与全量重建一致
+    snapshot = _snapshot(session)
+    rebuild_snapshot(session)
+    assert _snapshot(session) == snapshot
+
+
+def test_rebuild_corrects_drift(session):
+    _add_commission(session, 100.0)
+    # 绕过管理器直接写表
+    session.add(Commission(partner_id=1, amount=40.0, status='paid'))
+    session.commit()
+    assert _snapshot(session) == (1, 1, 100.0)
+
+    values = rebuild_snapshot(session)
+    session.commit()
+    assert _snapshot(session) == (2, 1, 140.0)
+    assert values['rebuilt_at'] is not None
@@ -0,0 +1,134 @@
+"""
+情绪日汇总测试
+
+测试包括：
+1. 同一天同一情绪的记录累加到已有汇总行，不同情绪分行
+2. 分布、趋势的聚合计算（平均强度、缺失日期补齐）与原始记录聚合、重建结果一致
+3. 统计日期与"今天"都取数据库时钟
+4. 情绪趋势工具从日汇总表返回按天序列
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, time, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("coze_coding_dev_sdk")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from storage.database.db import run_session_scope  # noqa: E402
+from storage.database.emotion_analytics import EmotionAnalytics  # noqa: E402
+from storage.database.shared.model import EmotionDailyRollups, EmotionRecords  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    # 模型的默认值是 PostgreSQL 语法，测试库按相同的列手工建表
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE emotion_records (
+                id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, emotion VARCHAR(20) NOT NULL,
+                emotion_name VARCHAR(20) NOT NULL, intensity FLOAT NOT NULL, context TEXT,
+                created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE emotion_daily_rollups (
+                id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, stat_date DATE NOT NULL,
+                emotion VARCHAR(20) NOT NULL, emotion_name VARCHAR(20) NOT NULL,
+                record_count INTEGER NOT NULL DEFAULT 0, intensity_sum FLOAT NOT NULL DEFAULT 0,
+                updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (user_id, stat_date, emotion)
+            )
+        """))
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _record(db, analytics, emotion, intensity, created_at=None, user_id=1):
+    record = EmotionRecords(
+        user_id=user_id, emotion=emotion, emotion_name=emotion.upper(), intensity=intensity, created_at=created_at
+    )
+    db.add(record)
+    analytics.apply_record(db, record)
+    db.commit()
+    return record
+
+
+def test_upsert_into_existing_day(db):
+    analytics = EmotionAnalytics()
+    today = analytics.today(db)
+    first = _record(db, analytics, "happy", 0.5)
+    assert first.created_at.date() == today
+
+    _record(db, analytics, "happy", 0.75)
+    _record(db, analytics, "sad", 0.25)
+
+    rows = {
+        row.emotion: (row.stat_date, row.record_count, row.intensity_sum)
+        for row in db.query(EmotionDailyRollups)
+    }
+    assert rows == {"happy": (today, 2, 1.25), "sad": (today, 1, 0.25)}
+    assert all(row.updated_at is not None for row in db.query(EmotionDailyRollups))
+
+
+def test_aggregation_maths(db):
+    analytics = EmotionAnalytics()
+    today = analytics.today(db)
+    two_days_ago = datetime.combine(today - timedelta(days=2), time(12))
+    _record(db, analytics, "happy", 0.9)
+    _record(db, analytics, "happy", 0.6)
+    _record(db, analytics, "calm", 0.3)
+    _record(db, analytics, "sad", 0.2, created_at=two_days_ago)
+    _record(db, analytics, "sad", 0.4, created_at=two_days_ago)
+    _record(db, analytics, "sad", 0.9, created_at=two_days_ago)
+    _record(db, analytics, "happy", 1.0, user_id=2)
+
+    distribution = analytics.get_distribution(db, 1)
+    assert [(d["emotion"], d["record_count"], d["average_intensity"]) for d in distribution] == [
+        ("sad", 3, 0.5), ("happy", 2, 0.75), ("calm", 1, 0.3)
+    ]
+
+    since = analytics.period_start("day", today)
+    assert since == today
+    assert [d["emotion"] for d in analytics.get_distribution(db, 1, since=since)] == ["happy", "calm"]
+    assert analytics.period_start("week", today) == today - timedelta(days=6)
+
+    trend = analytics.get_trend(db, 1, days=3)
+    assert [point["date"] for point in trend] == [(today - timedelta(days=n)).isoformat() for n in (2, 1, 0)]
+    assert [point["total_records"] for point in trend] == [3, 0, 3]
+    assert [point["average_intensity"] for point in trend] == [0.5, 0.0, 0.6]
+    assert trend[2]["emotions"] == {"happy": 2, "calm": 1}
+
+    # 增量汇总、原始记录聚合、重建后的汇总三者一致
+    assert analytics.aggregate_records(db, 1) == distribution
+    assert analytics.rebuild_rollups(db) == 4
+    assert analytics.get_distribution(db, 1) == distribution
+
+
+def test_trend_tool(db):
+    pytest.importorskip("langchain")
+    from tools.emotion_tools import get_emotion_trend
+
+    analytics = EmotionAnalytics()
+    _record(db, analytics, "happy", 0.5)
+    _record(db, analytics, "happy", 0.7)
+
+    with run_session_scope(sessionmaker(bind=db.get_bind())):
+        result = json.loads(get_emotion_trend.invoke({"user_id": "1", "days": 500}))
+    assert result["days"] == 90 and len(result["trend"]) == 90
+    today = result["trend"][-1]
+    assert (today["date"], today["total_records"], today["average_intensity"]) == (
+        analytics.today(db).isoformat(), 2, 0.6
+    )
+    assert today["emotions"] == {"happy": 2}
+    assert sum(point["total_records"] for point in result["trend"]) == 2
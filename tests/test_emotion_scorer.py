@@ -0,0 +1,92 @@
+"""
+测试情绪评分器
+
+测试包括：
+1. 无修饰词时与原 detect_emotion 评分一致
+2. 否定词/程度词修饰
+3. 重叠关键词命中
+4. 批量评分与逐条评分一致
+"""
+
+import sys
+import os
+
+# 添加src目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from utils.emotion import (
+    EMOTION_KEYWORDS,
+    emotion_scorer,
+    build_emotion_result,
+    detect_emotions_batch,
+)
+
+
+def legacy_scores(text):
+    """原 detect_emotion 的逐关键词评分"""
+    scores = {emotion: 0.0 for emotion in EMOTION_KEYWORDS}
+    for emotion, keywords in EMOTION_KEYWORDS.items():
+        for kw in keywords:
+            if kw in text.lower():
+                scores[emotion] += 0.2
+    return {emotion: round(value, 2) for emotion, value in scores.items()}
+
+
+def test_matches_legacy_without_modifiers():
+    """测试无修饰词时与原评分一致"""
+    texts = [
+        '今天下班了',
+        '开心开心，哈哈哈',
+        '气死我了，烦死了',
+        '担心考试，害怕挂科',
+        '天啊，什么情况，意外',
+        '在海边放松，安静舒服',
+    ]
+    for text in texts:
+        assert emotion_scorer.score(text) == legacy_scores(text), text
+
+
+def test_negation_and_intensity():
+    """测试否定词和程度词"""
+    assert emotion_scorer.score('我不开心')['happy'] == 0.0
+    assert emotion_scorer.score('没有难过')['sad'] == 0.0
+    assert emotion_scorer.score('不太开心')['happy'] == 0.0
+    assert emotion_scorer.score('非常开心')['happy'] > emotion_scorer.score('开心')['happy']
+    assert emotion_scorer.score('有点开心')['happy'] < emotion_scorer.score('开心')['happy']
+    # 同一关键词既有否定又有肯定时取肯定
+    assert emotion_scorer.score('不开心？其实开心')['happy'] == 0.2
+
+
+def test_overlapping_keywords():
+    """测试重叠命中（前缀、包含、跨越）"""
+    assert emotion_scorer.score('烦死')['angry'] == 0.4
+    assert emotion_scorer.score('害怕')['anxious'] == 0.4
+    scores = emotion_scorer.score('不安静')
+    assert scores['anxious'] == 0.2
+    assert scores['calm'] == 0.0
+
+
+def test_batch_matches_single():
+    """测试批量评分与逐条评分一致"""
+    texts = ['开心', '', '非常生气', '不怕', '哇，天啊', None, '平静']
+    batch = emotion_scorer.score_batch(texts)
+    assert batch == [emotion_scorer.score(text) for text in texts]
+
+    results = detect_emotions_batch(texts)
+    assert len(results) == len(texts)
+    assert results[2]['primary_emotion']['type'] == 'angry'
+    assert results[4]['primary_emotion']['type'] == 'surprised'
+
+
+def test_result_schema():
+    """测试结果结构与 detect_emotion 一致"""
+    result = build_emotion_result(emotion_scorer.score('哈哈，好开心'))
+    assert set(result) == {'primary_emotion', 'all_emotions', 'timestamp'}
+    assert set(result['primary_emotion']) == {'type', 'name', 'confidence', 'intensity'}
+    assert result['primary_emotion']['type'] == 'happy'
+    assert result['primary_emotion']['name'] == '开心'
+
+    empty = build_emotion_result(emotion_scorer.score(''))
+    assert empty['primary_emotion']['confidence'] == 0.5
+    assert empty['primary_emotion']['intensity'] == 0.0
@@ -0,0 +1,94 @@
+"""
+工作流图编译缓存测试
+
+测试包括：
+1. 单节点子图只编译一次，缓存结果可正常运行
+2. 出入参 Schema 按图版本缓存
+3. 预编译全部节点；不存在的节点返回 None
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("langgraph")
+
+from langgraph.graph import END, StateGraph  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from utils.helper.graph_cache import GraphArtifactCache, graph_version  # noqa: E402
+
+
+class GraphInput(BaseModel):
+    text: str = ""
+
+
+class GraphOutput(BaseModel):
+    length: int = 0
+
+
+class State(BaseModel):
+    text: str = ""
+    upper: str = ""
+    length: int = 0
+
+
+class UpperOutput(BaseModel):
+    upper: str = ""
+
+
+def to_upper(state: GraphInput) -> UpperOutput:
+    return UpperOutput(upper=state.text.upper())
+
+
+def count_length(state: State) -> GraphOutput:
+    return GraphOutput(length=len(state.upper))
+
+
+def _build_graph():
+    builder = StateGraph(State, input_schema=GraphInput, output_schema=GraphOutput)
+    builder.add_node("to_upper", to_upper, metadata={"type": "task"})
+    builder.add_node("count_length", count_length)
+    builder.set_entry_point("to_upper")
+    builder.add_edge("to_upper", "count_length")
+    builder.add_edge("count_length", END)
+    return builder.compile()
+
+
+def test_compiled_node_is_cached_and_runs():
+    graph = _build_graph()
+    cache = GraphArtifactCache()
+
+    first = cache.compiled_node(graph, "to_upper")
+    second = cache.compiled_node(graph, "to_upper")
+    assert first is second
+    assert first.metadata == {"type": "task"}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    result = asyncio.run(first.graph.ainvoke({"text": "abc"}))
+    assert result == {"upper": "ABC"}
+
+
+def test_schema_is_cached_per_graph_version():
+    graph = _build_graph()
+    cache = GraphArtifactCache()
+
+    schema = cache.inout_schema(graph)
+    assert cache.inout_schema(graph) is schema
+    assert "text" in schema["input_schema"]["properties"]
+    assert "length" in schema["output_schema"]["properties"]
+    # 同样的节点函数重新构建得到同一版本
+    assert graph_version(_build_graph()) == graph_version(graph)
+
+
+def test_warm_up_and_missing_node():
+    graph = _build_graph()
+    cache = GraphArtifactCache()
+
+    assert cache.warm_up(graph) == 2
+    assert cache.stats()["nodes"] == 2 and cache.stats()["schemas"] == 1
+    assert cache.compiled_node(graph, "missing") is None
@@ -0,0 +1,94 @@
+"""
+请求体接收中间件测试
+
+测试包括：
+1. 请求体只解析一次，结果放入 request.state，下游仍可读取请求体
+2. gzip 请求体解压，压缩炸弹与超大请求体返回 413
+3. 非法 JSON 返回 400，未配置的路径原样透传
+4. 日志字段：大小与哈希、截断、采样
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.ingestion import IngestedBody, RequestIngestionMiddleware, body_log_fields  # noqa: E402
+
+
+def _call(body: bytes, path="/run", headers=(), chunk_size=None, **kwargs):
+    """通过中间件发送一次请求，返回 (响应状态, 响应体, 下游收到的 scope 与请求体)"""
+    chunk_size = chunk_size or max(len(body), 1)
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["scope"] = scope
+        seen["body"] = (await receive())["body"]
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": list(headers)}
+    asyncio.run(RequestIngestionMiddleware(app, **kwargs)(scope, receive, send))
+    return sent[0]["status"], sent[1]["body"], seen
+
+
+def test_parses_once_and_replays_body():
+    status, _, seen = _call(b'{"text": "\xe4\xbd\xa0\xe5\xa5\xbd"}', chunk_size=4)
+    assert status == 200
+    ingested = seen["scope"]["state"]["ingested"]
+    assert ingested.payload == {"text": "你好"}
+    assert seen["body"] == b'{"text": "\xe4\xbd\xa0\xe5\xa5\xbd"}'
+
+
+def test_gzip_body():
+    raw = json.dumps({"text": "x" * 1000}).encode()
+    status, _, seen = _call(gzip.compress(raw), path="/node_run/step", headers=[(b"content-encoding", b"gzip")])
+    assert status == 200
+    ingested = seen["scope"]["state"]["ingested"]
+    assert ingested.payload["text"] == "x" * 1000
+    assert ingested.size == len(raw) and ingested.encoded_size < len(raw)
+
+
+def test_size_limits():
+    body = json.dumps({"text": "x" * 2000}).encode()
+    assert _call(body, headers=[(b"content-length", str(len(body)).encode())], max_body=1000)[0] == 413
+    assert _call(body, chunk_size=100, max_body=1000)[0] == 413
+    bomb = gzip.compress(b"0" * 100000)
+    assert _call(bomb, headers=[(b"content-encoding", b"gzip")], max_decoded=10000)[0] == 413
+    assert _call(body, headers=[(b"content-encoding", b"br")])[0] == 415
+
+
+def test_invalid_json_and_passthrough():
+    status, body, seen = _call(b"{not json")
+    assert status == 400 and "Invalid JSON format" in json.loads(body)["detail"]
+    assert "scope" not in seen
+
+    status, _, seen = _call(b"{not json", path="/cancel/abc")
+    assert status == 200
+    assert "state" not in seen["scope"]
+
+
+def test_body_log_fields():
+    raw = json.dumps({"text": "长" * 200}, ensure_ascii=False).encode()
+    request = SimpleNamespace(state=SimpleNamespace(ingested=IngestedBody(payload=None, raw=raw, encoded_size=len(raw))))
+
+    fields = body_log_fields(request, sample_rate=1, max_chars=50)
+    assert f"body_size={len(raw)}" in fields and "body_sha1=" in fields
+    assert "truncated" in fields and "长" * 60 not in fields
+
+    assert ", body=" not in body_log_fields(request, sample_rate=0, max_chars=50)
+    assert body_log_fields(SimpleNamespace(state=SimpleNamespace())) == "body=<not ingested>"
@@ -0,0 +1,92 @@
+"""
+用户旅程存储测试
+
+测试包括：
+1. 并发累加进度不丢失更新，阶段变化只记录一次历史
+2. 读穿缓存
+3. 旧 JSON 文件导入（重复导入跳过）
+"""
+
+import json
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage.database.journey_store import JourneyStore  # noqa: E402
+
+
+def stage_of(record):
+    if record["total_lingzhi"] >= 100:
+        return "gain_lingzhi"
+    return "system_experience" if record["interaction_count"] >= 1 else "login_register"
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'journey.db'}", connect_args={"timeout": 30})
+    yield JourneyStore(engine, stage_of=stage_of)
+    engine.dispose()
+
+
+def test_concurrent_progress_is_atomic(store):
+    def worker():
+        for _ in range(5):
+            store.record_progress("u1", lingzhi_gained=1, interaction_count=1)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    store.cache.clear()
+    record = store.get("u1")
+    assert record["total_lingzhi"] == 20
+    assert record["interaction_count"] == 20
+    assert [h["stage"] for h in store.stage_history("u1")] == ["system_experience"]
+
+    record = store.record_progress("u1", lingzhi_gained=100, path_selected="light")
+    assert record["current_stage"] == "gain_lingzhi"
+    assert record["participation_level"] == "light"
+    assert [h["stage"] for h in store.stage_history("u1")] == ["system_experience", "gain_lingzhi"]
+
+
+def test_reads_go_through_cache(store):
+    assert store.get("nobody") is None
+    store.record_progress("u2", interaction_count=1)
+    # 本进程写入后缓存即为最新值
+    assert store.get("u2")["interaction_count"] == 1
+    hits = store.cache.hits
+    store.get("u2")
+    assert store.cache.hits == hits + 1
+
+
+def test_import_json_file(store, tmp_path):
+    path = tmp_path / "user_journey_data.json"
+    path.write_text(json.dumps({
+        "新用户": {
+            "user_id": "新用户",
+            "first_login": "2026-01-28T02:24:22.762009",
+            "total_lingzhi": 25,
+            "interaction_count": 3,
+            "path_selected": False,
+            "has_consumed": False,
+            "stage_history": [
+                {"stage": "login_register", "timestamp": "2026-01-28T02:24:22.762112", "total_lingzhi": 0},
+                {"stage": "system_experience", "timestamp": "2026-01-28T02:32:03.217929", "total_lingzhi": 10},
+            ],
+            "current_stage": "system_experience",
+            "last_updated": "2026-01-28T02:33:59.991729",
+        }
+    }, ensure_ascii=False), encoding="utf-8")
+
+    assert store.import_json_file(str(path)) == 1
+    assert store.import_json_file(str(path)) == 0
+    record = store.get("新用户")
+    assert (record["total_lingzhi"], record["interaction_count"]) == (25, 3)
+    assert len(store.stage_history("新用户")) == 2
@@ -0,0 +1,85 @@
+"""
+登录自动签到测试
+
+测试包括：
+1. 运行范围内登录工具调用自动签到服务（内层会话自行提交），工具返回后签到记录、审计日志都已持久化
+2. 同一天再次登录不重复签到
+3. 自动注册登录的新用户同样完成签到
+"""
+
+import hashlib
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pytz")
+pytest.importorskip("langchain")
+pytest.importorskip("coze_coding_dev_sdk")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import event, func, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from storage.database.db import PoolSettings, create_pooled_engine, run_session_scope  # noqa: E402
+from storage.database.shared.model import AuditLogs, CheckIns, Users  # noqa: E402
+from tools.login_tool import user_auto_register_login, user_login  # noqa: E402
+
+
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_pooled_engine(f"sqlite:///{tmp_path / 'login.db'}", PoolSettings(pool_size=2, max_overflow=1))
+
+    # pysqlite 需要显式 BEGIN 才能正确支持 SAVEPOINT
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+        # 模型的 server_default 使用 PostgreSQL 的 now()
+        dbapi_conn.create_function("now", 0, lambda: datetime.now().isoformat(" "))
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Users.metadata.create_all(engine, tables=[Users.__table__, CheckIns.__table__, AuditLogs.__table__])
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(Users(
+            id=1, name="张三", email="zhangsan@example.com", password_hash=hashlib.sha256(b"secret").hexdigest(),
+            status="active", is_superuser=False, is_ceo=False, two_factor_enabled=False, is_registered=False
+        ))
+        session.commit()
+    yield factory
+    engine.dispose()
+
+
+def _check_in_state(factory, user_id):
+    with factory() as session:
+        check_ins = session.scalar(select(func.count()).select_from(CheckIns).where(CheckIns.user_id == user_id))
+        actions = sorted(session.scalars(select(AuditLogs.action).where(AuditLogs.user_id == user_id)))
+    return check_ins, actions
+
+
+def test_login_check_in_is_persisted(factory):
+    with run_session_scope(factory):
+        result = user_login.invoke({"email": "zhangsan@example.com", "password": "secret"})
+    assert "登录成功" in result and "自动签到成功" in result
+    assert _check_in_state(factory, 1) == (1, ["auto_check_in", "check_in"])
+
+    with run_session_scope(factory):
+        result = user_login.invoke({"email": "zhangsan@example.com", "password": "secret"})
+    assert "今天已经签到过了" in result
+    assert _check_in_state(factory, 1) == (1, ["auto_check_in", "check_in"])
+
+
+def test_register_login_check_in_is_persisted(factory):
+    with run_session_scope(factory):
+        result = user_auto_register_login.invoke({"email": "lisi@example.com", "coze_uid": "coze-2"})
+    assert "欢迎加入灵值生态园" in result and "自动签到成功" in result
+
+    with factory() as session:
+        user_id = session.scalar(select(Users.id).where(Users.coze_id == "coze-2"))
+    assert _check_in_state(factory, user_id) == (1, ["auto_check_in", "check_in", "user_register"])
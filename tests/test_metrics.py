@@ -0,0 +1,117 @@
+"""
+运行指标测试
+
+测试包括：
+1. 多线程累加（含已退出线程的分片合并）与 Prometheus 文本输出
+2. HTTP 中间件按路由模板记录耗时与首字节时间
+3. 回调记录节点、工具、模型耗时与 token 数
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.metrics import HttpMetricsMiddleware, MetricsRegistry  # noqa: E402
+
+
+def test_sharded_counters_and_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_events_total", "Events.", ("kind",))
+    histogram = registry.histogram("test_latency_seconds", "Latency.", ("op",), buckets=(0.1, 1.0))
+    registry.callback("test_running", "Running.", lambda: 3)
+
+    def worker():
+        for _ in range(1000):
+            counter.inc("a")
+        histogram.observe(0.05, "x")
+        histogram.observe(0.5, "x")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 线程退出后的分片并入汇总，再次采集结果不变
+    assert counter.values() == {("a",): 8000}
+    counter.inc("b\"q", amount=2)
+    assert counter.values() == {("a",): 8000, ('b"q',): 2}
+
+    text = registry.render()
+    assert '# TYPE test_events_total counter' in text
+    assert 'test_events_total{kind="a"} 8000' in text
+    assert 'test_events_total{kind="b\\"q"} 2' in text
+    assert 'test_latency_seconds_bucket{op="x",le="0.1"} 8' in text
+    assert 'test_latency_seconds_bucket{op="x",le="1"} 16' in text
+    assert 'test_latency_seconds_bucket{op="x",le="+Inf"} 16' in text
+    assert 'test_latency_seconds_count{op="x"} 16' in text
+    assert 'test_running 3' in text
+
+
+class FakeRoute:
+    path = "/cancel/{run_id}"
+
+
+def test_http_middleware_uses_route_template():
+    registry = MetricsRegistry()
+    duration = registry.histogram("http_seconds", "", ("method", "path", "status"))
+    first_byte = registry.histogram("first_byte_seconds", "", ("path",))
+
+    async def app(scope, receive, send):
+        scope["route"] = FakeRoute()
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b"data: 1\n\n", "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def send(message):
+        pass
+
+    middleware = HttpMetricsMiddleware(app, duration, first_byte)
+    asyncio.run(middleware({"type": "http", "method": "POST", "path": "/cancel/abc"}, None, send))
+
+    assert duration.snapshot()[("POST", "/cancel/{run_id}", "200")]["count"] == 1
+    assert first_byte.snapshot()[("/cancel/{run_id}",)]["count"] == 1
+
+
+def test_callback_records_stages():
+    pytest.importorskip("langchain_core")
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, LLMResult
+
+    from utils.metrics.callback import MetricsCallbackHandler
+
+    registry = MetricsRegistry()
+    handler = MetricsCallbackHandler(
+        node_duration=registry.histogram("node", "", ("node", "status")),
+        tool_duration=registry.histogram("tool", "", ("tool", "status")),
+        llm_duration=registry.histogram("llm", "", ("model", "status")),
+        llm_ttft=registry.histogram("ttft", "", ("model",)),
+        llm_tokens=registry.histogram("tokens", "", ("model", "type"), buckets=(100, 1000)),
+    )
+
+    node_run, inner_run, tool_run, llm_run = (uuid.uuid4() for _ in range(4))
+    handler.on_chain_start({}, {}, run_id=node_run, name="model", metadata={"langgraph_node": "model"})
+    # 节点内部的子 runnable 不单独计入
+    handler.on_chain_start({}, {}, run_id=inner_run, name="RunnableSequence", metadata={"langgraph_node": "model"})
+    handler.on_chain_end({}, run_id=inner_run)
+    handler.on_chat_model_start({}, [], run_id=llm_run, metadata={"ls_model_name": "doubao"})
+    handler.on_llm_new_token("你", run_id=llm_run)
+    handler.on_llm_new_token("好", run_id=llm_run)
+    message = AIMessage(content="你好", usage_metadata={"input_tokens": 120, "output_tokens": 2, "total_tokens": 122})
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=llm_run)
+    handler.on_chain_end({}, run_id=node_run)
+    handler.on_tool_start({"name": "get_user_assets"}, "{}", run_id=tool_run)
+    handler.on_tool_error(RuntimeError("boom"), run_id=tool_run)
+
+    assert list(registry.get("node").snapshot()) == [("model", "ok")]
+    assert list(registry.get("tool").snapshot()) == [("get_user_assets", "error")]
+    assert registry.get("llm").snapshot()[("doubao", "ok")]["count"] == 1
+    assert registry.get("ttft").snapshot()[("doubao",)]["count"] == 1
+    tokens = registry.get("tokens").snapshot()
+    assert tokens[("doubao", "prompt")]["sum"] == 120
+    assert tokens[("doubao", "completion")]["sum"] == 2
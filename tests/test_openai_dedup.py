@@ -0,0 +1,124 @@
+"""
+OpenAI 兼容接口请求去重测试
+
+测试包括：
+1. 请求键：空白与字段顺序不影响，temperature、model 不同则不同
+2. 并发的相同请求只执行一次，发起者取消不影响其余等待者
+3. 确定性请求的响应缓存，执行失败不缓存
+4. 不同调用方的相同请求不共享运行与缓存
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("coze_coding_utils")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.openai.converter.request_converter import RequestConverter  # noqa: E402
+from utils.openai.dedup import RequestDeduplicator, caller_identity, is_deterministic, request_key  # noqa: E402
+
+
+def parse(content, **extra):
+    return RequestConverter.parse({"messages": [{"role": "user", "content": content}], **extra})
+
+
+def test_request_key_normalization():
+    assert request_key(parse("你好 ")) == request_key(parse("你好"))
+    assert request_key(parse("你好", temperature=0)) == request_key(parse("你好", temperature=0.0))
+    assert request_key(parse("你好", temperature=0)) != request_key(parse("你好"))
+    assert request_key(parse("你好", model="a")) != request_key(parse("你好", model="b"))
+    assert is_deterministic(parse("你好", temperature=0))
+    assert not is_deterministic(parse("你好"))
+
+
+def test_concurrent_requests_share_one_execution():
+    dedup = RequestDeduplicator(cache_ttl=0)
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    async def main():
+        leader = asyncio.ensure_future(dedup.run("k", execute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(dedup.run("k", execute)) for _ in range(9)]
+        await asyncio.sleep(0.01)
+        # 发起请求的客户端断开
+        leader.cancel()
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(main())
+    assert results == [{"answer": 42}] * 9
+    assert len(calls) == 1
+    stats = dedup.stats()
+    assert stats["totals"]["executions"] == 1
+    assert stats["totals"]["coalesced"] == 9
+    assert stats["keys"][0]["requests"] == 10
+
+
+def test_response_cache_for_deterministic_requests():
+    dedup = RequestDeduplicator(cache_ttl=60)
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("model unavailable")
+        return {"answer": len(calls)}
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await dedup.run("k", execute, cacheable=True)
+        first = await dedup.run("k", execute, cacheable=True)
+        second = await dedup.run("k", execute, cacheable=True)
+        uncached = await dedup.run("k", execute, cacheable=False)
+        return first, second, uncached
+
+    first, second, uncached = asyncio.run(main())
+    assert first == second == {"answer": 2}
+    assert uncached == {"answer": 3}
+    assert dedup.stats()["totals"]["cache_hits"] == 1
+    assert dedup.stats()["totals"]["errors"] == 1
+
+
+class FakeContext(dict):
+    """只提供 get 的运行上下文"""
+
+
+def test_different_callers_do_not_share_runs():
+    request = parse("今天签到", temperature=0)
+    alice = caller_identity(FakeContext(user_id=1), {"authorization": "Bearer a"})
+    bob = caller_identity(FakeContext(user_id=2), {"authorization": "Bearer b"})
+    assert alice != bob
+    assert caller_identity(FakeContext(user_id=1), {"authorization": "Bearer a"}) == alice
+    assert caller_identity(None) == ""
+
+    dedup = RequestDeduplicator(cache_ttl=60)
+    calls = []
+
+    def execute(user):
+        async def run():
+            calls.append(user)
+            await asyncio.sleep(0.02)
+            return {"user": user}
+        return run
+
+    async def main():
+        concurrent = await asyncio.gather(
+            dedup.run(request_key(request, alice), execute("alice"), cacheable=True),
+            dedup.run(request_key(request, bob), execute("bob"), cacheable=True),
+        )
+        cached = await dedup.run(request_key(request, bob), execute("bob"), cacheable=True)
+        return concurrent, cached
+
+    concurrent, cached = asyncio.run(main())
+    assert concurrent == [{"user": "alice"}, {"user": "bob"}]
+    assert cached == {"user": "bob"}
+    assert sorted(calls) == ["alice", "bob"]
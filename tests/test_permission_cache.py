@@ -0,0 +1,88 @@
+"""
+权限解析缓存测试
+
+测试包括：
+1. 用户有效权限为其角色权限的并集，超级管理员拥有全部权限
+2. 通过 ORM 修改角色权限，提交后立即生效，回滚时缓存不失效
+3. 用户对象已脱离会话时使用新会话解析
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '灵值生态园智能体移植包', 'src', 'auth'))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from models import Base, Permission, Role, User  # noqa: E402
+from permission_cache import permission_resolver, user_has_permission, user_permissions  # noqa: E402
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        view, edit = Permission(code="user:view", name="查看"), Permission(code="user:edit", name="编辑")
+        session.add_all([
+            User(id=1, name="staff", email="staff@example.com", password_hash="x",
+                 roles=[Role(id=1, name="staff", permissions=[view])]),
+            User(id=2, name="admin", email="admin@example.com", password_hash="x", is_superuser=True),
+            edit,
+        ])
+        session.commit()
+    monkeypatch.setattr(permission_resolver, "session_factory", factory)
+    permission_resolver.clear()
+    yield factory
+    permission_resolver.clear()
+
+
+def test_resolves_role_permissions(factory):
+    with factory() as session:
+        staff, admin = session.get(User, 1), session.get(User, 2)
+        assert user_has_permission(staff, "user:view")
+        assert not user_has_permission(staff, "user:edit")
+        assert user_permissions(staff) == ["user:view"]
+        assert user_has_permission(admin, "anything")
+        assert user_permissions(admin) == ["all"]
+
+
+def test_role_permission_changes_apply_after_commit(factory):
+    with factory() as session:
+        staff = session.get(User, 1)
+        assert not user_has_permission(staff, "user:edit")
+        version = permission_resolver.role_version
+
+        with factory() as admin_session:
+            role = admin_session.get(Role, 1)
+            role.permissions.append(admin_session.query(Permission).filter_by(code="user:edit").one())
+            admin_session.rollback()
+        assert permission_resolver.role_version == version
+
+        with factory() as admin_session:
+            role = admin_session.get(Role, 1)
+            role.permissions.append(admin_session.query(Permission).filter_by(code="user:edit").one())
+            admin_session.commit()
+        assert permission_resolver.role_version > version
+        assert user_has_permission(staff, "user:edit")
+
+        with factory() as admin_session:
+            role = admin_session.get(Role, 1)
+            role.permissions = []
+            admin_session.commit()
+        assert user_permissions(staff) == []
+
+
+def test_detached_user_uses_new_session(factory):
+    with factory() as session:
+        staff = session.get(User, 1)
+        session.expunge(staff)
+    assert user_has_permission(staff, "user:view")
+    assert user_permissions(staff) == ["user:view"]
@@ -0,0 +1,101 @@
+"""
+运行登记与跨进程取消测试
+
+测试包括：
+1. 本进程持有的运行直接取消，未知 run_id 返回 not_found
+2. 两个 worker 共用 SQLite 登记：在非所属 worker 上取消，所属 worker 的监听协程取消任务
+3. 登记项过期与清理
+4. 后端配置解析（memory / 模块:工厂）
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.run_registry import (  # noqa: E402
+    MemoryRunRegistry,
+    RunRegistry,
+    SQLiteRunRegistry,
+    create_backend,
+)
+
+
+def test_local_cancel_and_not_found():
+    runs = RunRegistry(backend=MemoryRunRegistry(), owner="a")
+
+    async def main():
+        task = asyncio.create_task(asyncio.sleep(10))
+        runs.register("r1", task)
+        result = runs.cancel("r1")
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        runs.unregister("r1")
+        return result
+
+    assert asyncio.run(main())["status"] == "success"
+    assert runs.cancel("r1")["status"] == "not_found"
+    assert runs.backend.count() == 0
+
+
+def test_cancel_from_another_worker(tmp_path):
+    path = str(tmp_path / "runs.db")
+    owner = RunRegistry(backend=SQLiteRunRegistry(path), owner="a", poll_interval=0.05)
+    other = RunRegistry(backend=SQLiteRunRegistry(path), owner="b", poll_interval=0.05)
+
+    async def main():
+        task = asyncio.create_task(asyncio.sleep(10))
+        owner.register("r1", task)
+        result = other.cancel("r1")
+        started = time.perf_counter()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        owner.unregister("r1")
+        return result, time.perf_counter() - started
+
+    result, elapsed = asyncio.run(main())
+    assert result["status"] == "success"
+    assert elapsed < 1
+    assert other.cancel("r1")["status"] == "not_found"
+
+
+def test_apply_cancellations_once():
+    backend = MemoryRunRegistry()
+    owner = RunRegistry(backend=backend, owner="a")
+
+    async def main():
+        task = asyncio.create_task(asyncio.sleep(10))
+        owner.register("r1", task)
+        backend.request_cancel("r1")
+        run_ids = backend.cancel_requested("a")
+        cancelled = [owner.apply_cancellations(run_ids), owner.apply_cancellations(run_ids)]
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return cancelled
+
+    assert asyncio.run(main()) == [1, 0]
+
+
+@pytest.mark.parametrize("backend_cls", [MemoryRunRegistry, SQLiteRunRegistry])
+def test_expiry_and_purge(tmp_path, backend_cls):
+    backend = backend_cls() if backend_cls is MemoryRunRegistry else backend_cls(str(tmp_path / "runs.db"))
+    backend.register("old", "a", ttl=0.01)
+    backend.register("new", "a", ttl=60)
+    time.sleep(0.05)
+    assert backend.get("old") is None
+    assert backend.request_cancel("old") is None
+    assert backend.count() == 1
+    assert backend.purge_expired() == 1
+    backend.unregister("new", "b")
+    assert backend.get("new").owner == "a"
+
+
+def test_create_backend():
+    assert isinstance(create_backend("memory"), MemoryRunRegistry)
+    assert isinstance(create_backend("utils.run_registry:MemoryRunRegistry"), MemoryRunRegistry)
+    with pytest.raises(ValueError):
+        create_backend("redis")
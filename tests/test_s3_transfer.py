@@ -0,0 +1,124 @@
+"""
+测试 S3 并发传输引擎
+
+测试包括：
+1. 分片切分结果与原 bytearray 切片实现一致
+2. 分片并发上传按分片号排序，单个分片失败时重试
+3. 多对象并发下载与分批删除
+"""
+
+import sys
+import os
+import threading
+
+# 添加src目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+import pytest
+
+from storage.s3 import transfer
+from storage.s3.transfer import TransferEngine, iter_parts
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+    def close(self):
+        pass
+
+
+class FakeS3Client:
+    """只实现传输引擎用到的接口的内存客户端"""
+
+    def __init__(self, objects=None, fail_parts=None):
+        self.objects = dict(objects or {})
+        self.parts = {}
+        self.fail_parts = dict(fail_parts or {})
+        self.delete_calls = []
+        self.lock = threading.Lock()
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self.lock:
+            if self.fail_parts.get(PartNumber, 0) > 0:
+                self.fail_parts[PartNumber] -= 1
+                raise ConnectionError(f"part {PartNumber} failed")
+            self.parts[PartNumber] = bytes(Body)
+        return {"ETag": f'"etag-{PartNumber}"'}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": FakeBody(self.objects[Key])}
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [item["Key"] for item in Delete["Objects"]]
+        with self.lock:
+            self.delete_calls.append(len(keys))
+            errors = [{"Key": k, "Code": "AccessDenied", "Message": "denied"} for k in keys if k.startswith("locked/")]
+            for k in keys:
+                if not k.startswith("locked/"):
+                    self.objects.pop(k, None)
+        return {"Errors": errors} if errors else {}
+
+
+def _legacy_parts(chunks, part_size):
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer.extend(chunk)
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            buffer = buffer[part_size:]
+    if buffer:
+        yield bytes(buffer)
+
+
+@pytest.mark.parametrize("sizes", [[], [10], [3, 0, 7, 13, 1, 26], [5] * 8, [1] * 11])
+def test_iter_parts_matches_legacy(sizes):
+    """测试分片切分结果"""
+    chunks = [bytes((i + j) % 256 for j in range(size)) for i, size in enumerate(sizes)]
+    assert [bytes(p) for p in iter_parts(chunks, 5)] == list(_legacy_parts(chunks, 5))
+
+    with pytest.raises(ValueError):
+        list(iter_parts(chunks, 0))
+
+
+def test_upload_parts_ordered_with_retry(monkeypatch):
+    """测试分片并发上传与单分片重试"""
+    monkeypatch.setattr(transfer.time, "sleep", lambda seconds: None)
+    data = os.urandom(10_000)
+    client = FakeS3Client(fail_parts={3: 2, 7: 1})
+    engine = TransferEngine(client, max_concurrency=4)
+
+    parts = engine.upload_parts(bucket="b", key="k", upload_id="u",
+                                parts=iter_parts((data[i:i + 333] for i in range(0, len(data), 333)), 1000))
+    assert [p["PartNumber"] for p in parts] == list(range(1, 11))
+    assert parts[2]["ETag"] == '"etag-3"'
+    assert b"".join(client.parts[n] for n in sorted(client.parts)) == data
+
+    # 超过最大重试次数时抛出异常
+    client = FakeS3Client(fail_parts={2: 10})
+    with pytest.raises(ConnectionError):
+        TransferEngine(client, max_concurrency=2, max_retries=2).upload_parts(
+            bucket="b", key="k", upload_id="u", parts=[b"a", b"b", b"c"])
+
+
+def test_download_and_delete_many(monkeypatch):
+    """测试多对象并发下载与分批删除"""
+    monkeypatch.setattr(transfer, "DELETE_BATCH_SIZE", 3)
+    objects = {f"files/{i}.txt": f"内容{i}".encode() for i in range(8)}
+    objects["locked/a.txt"] = b"x"
+    client = FakeS3Client(objects)
+    engine = TransferEngine(client, max_concurrency=3)
+
+    keys = ["files/3.txt", "files/1.txt", "files/3.txt"]
+    assert engine.download_many(bucket="b", keys=keys) == {
+        "files/3.txt": "内容3".encode(), "files/1.txt": "内容1".encode()
+    }
+
+    errors = engine.delete_many(bucket="b", keys=list(objects))
+    assert [e["Key"] for e in errors] == ["locked/a.txt"]
+    assert sorted(client.delete_calls) == [3, 3, 3]
+    assert list(client.objects) == ["locked/a.txt"]
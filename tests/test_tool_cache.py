@@ -0,0 +1,113 @@
+"""
+测试工具结果缓存
+
+测试包括：
+1. 参数规范化后命中同一缓存项，runtime 不参与缓存键
+2. TTL 过期、LRU 淘汰与按会话隔离
+3. 依赖表经 ORM 提交写入后失效，回滚不失效
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# 添加src目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from sqlalchemy import Integer, String, create_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from utils import tool_cache
+from utils.tool_cache import cached_tool, get_tool_cache_stats, invalidate_tool_cache
+
+
+def _runtime(thread_id):
+    return SimpleNamespace(config={"configurable": {"thread_id": thread_id}})
+
+
+def test_normalized_keys_and_lru():
+    """测试参数规范化与LRU淘汰"""
+    calls = []
+
+    @cached_tool(maxsize=2)
+    def privileges(level: str, runtime=None, detail: bool = False) -> str:
+        calls.append(level)
+        return f"{level}:{detail}"
+
+    assert privileges("gold", _runtime("a")) == "gold:False"
+    assert privileges(" gold ", runtime=_runtime("b")) == "gold:False"
+    assert privileges(level="gold", detail=False) == "gold:False"
+    assert calls == ["gold"]
+
+    privileges("silver")
+    privileges("bronze")
+    privileges("gold")
+    assert calls == ["gold", "silver", "bronze", "gold"]
+
+    stats = get_tool_cache_stats()["privileges"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 4, 2)
+
+
+def test_ttl_session_scope_and_should_cache(monkeypatch):
+    """测试TTL过期、会话隔离与结果过滤"""
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache.time, "monotonic", lambda: now[0])
+    calls = []
+
+    @cached_tool(ttl=10, scope="session", should_cache=lambda result: result != "失败")
+    def notice(runtime=None) -> str:
+        calls.append(runtime.config["configurable"]["thread_id"])
+        return "失败" if len(calls) == 1 else "通知"
+
+    assert notice(_runtime("a")) == "失败"
+    assert notice(_runtime("a")) == "通知"
+    assert notice(_runtime("a")) == "通知"
+    assert notice(_runtime("b")) == "通知"
+    assert calls == ["a", "a", "b"]
+
+    now[0] += 11
+    notice(_runtime("a"))
+    assert calls == ["a", "a", "b", "a"]
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class _CompanyInfo(_Base):
+    __tablename__ = "company_info"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    company_name: Mapped[str] = mapped_column(String(200))
+
+
+def test_invalidated_by_orm_commit():
+    """测试依赖表提交写入后失效"""
+    engine = create_engine("sqlite://")
+    _Base.metadata.create_all(engine)
+    calls = []
+
+    @cached_tool(depends_on=("company_info",))
+    def company(runtime=None) -> str:
+        with Session(engine) as session:
+            calls.append(1)
+            return ",".join(row.company_name for row in session.query(_CompanyInfo).order_by(_CompanyInfo.id))
+
+    assert company() == ""
+    with Session(engine) as session:
+        session.add(_CompanyInfo(company_name="甲"))
+        session.flush()
+        session.rollback()
+    assert company() == ""
+    assert len(calls) == 1
+
+    with Session(engine) as session:
+        session.add(_CompanyInfo(company_name="乙"))
+        session.commit()
+    assert company() == "乙"
+    assert len(calls) == 2
+
+    assert invalidate_tool_cache("other_table") == 0
+    assert invalidate_tool_cache("company_info") == 1
+    company()
+    assert len(calls) == 3
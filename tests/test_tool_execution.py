@@ -0,0 +1,96 @@
+"""
+工具执行层测试
+
+测试包括：
+1. 多个工具调用并发执行，耗时写入 response_metadata
+2. 按工具限制同时执行的调用数
+3. 超时返回错误结果（同步与异步）
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("langchain.agents.middleware")
+
+from langchain_core.messages import ToolMessage  # noqa: E402
+
+from agents.tool_execution import TIME_COST_KEY, ToolExecutionMiddleware  # noqa: E402
+
+
+def _request(name, call_id):
+    return SimpleNamespace(tool_call={"name": name, "args": {}, "id": call_id})
+
+
+def _sleeping_handler(seconds, active=None, peak=None, lock=threading.Lock()):
+    def handler(request):
+        if active is not None:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+        time.sleep(seconds)
+        if active is not None:
+            with lock:
+                active[0] -= 1
+        return ToolMessage(content="ok", tool_call_id=request.tool_call["id"], name=request.tool_call["name"])
+    return handler
+
+
+def test_parallel_calls_record_time_cost():
+    middleware = ToolExecutionMiddleware(executor=ThreadPoolExecutor(8))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(3) as pool:
+        results = list(pool.map(
+            lambda i: middleware.wrap_tool_call(_request(f"tool_{i}", f"c{i}"), _sleeping_handler(0.2)), range(3)
+        ))
+    assert time.perf_counter() - started < 0.5
+    assert [r.tool_call_id for r in results] == ["c0", "c1", "c2"]
+    assert all(r.response_metadata[TIME_COST_KEY] >= 200 for r in results)
+
+
+def test_per_tool_concurrency_limit():
+    middleware = ToolExecutionMiddleware(concurrency={"search_web": 2}, executor=ThreadPoolExecutor(8))
+    active, peak = [0], [0]
+    handler = _sleeping_handler(0.1, active, peak)
+    with ThreadPoolExecutor(6) as pool:
+        results = list(pool.map(lambda i: middleware.wrap_tool_call(_request("search_web", f"c{i}"), handler), range(6)))
+    assert peak[0] == 2
+    assert all(r.status == "success" for r in results)
+
+
+def test_timeout_returns_error_message():
+    middleware = ToolExecutionMiddleware(timeouts={"slow": 0.1}, executor=ThreadPoolExecutor(2))
+    result = middleware.wrap_tool_call(_request("slow", "c1"), _sleeping_handler(0.5))
+    assert result.status == "error"
+    assert result.tool_call_id == "c1"
+    assert "超时" in result.content
+    assert result.response_metadata[TIME_COST_KEY] < 400
+
+
+def test_async_timeout_and_success():
+    middleware = ToolExecutionMiddleware(timeouts={"slow": 0.1})
+
+    def handler(seconds):
+        async def run(request):
+            await asyncio.sleep(seconds)
+            return ToolMessage(content="ok", tool_call_id=request.tool_call["id"])
+        return run
+
+    async def main():
+        return await asyncio.gather(
+            middleware.awrap_tool_call(_request("slow", "c1"), handler(0.5)),
+            middleware.awrap_tool_call(_request("fast", "c2"), handler(0.05)),
+        )
+
+    slow, fast = asyncio.run(main())
+    assert slow.status == "error"
+    assert fast.content == "ok"
+    assert TIME_COST_KEY in fast.response_metadata
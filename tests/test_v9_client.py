@@ -0,0 +1,127 @@
+"""
+v9.0 生态系统接口客户端测试
+
+测试包括：
+1. 进程内调用 v9_services：未授权、参数校验、项目资源匹配并写入匹配记录
+2. 三级推荐分润计算与结算
+3. 远程 HTTP 客户端的连接池、超时与重试配置（只重试 GET）
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.v9_client import HttpV9Client, LocalV9Client  # noqa: E402
+
+SCHEMA = '''
+CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT, phone TEXT,
+                    total_lingzhi INTEGER DEFAULT 0, status TEXT DEFAULT 'active',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE referral_relationships (id INTEGER PRIMARY KEY AUTOINCREMENT, referrer_id INTEGER NOT NULL,
+                    referee_id INTEGER NOT NULL UNIQUE, level INTEGER NOT NULL DEFAULT 1,
+                    status TEXT DEFAULT 'active', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE referral_commissions (id INTEGER PRIMARY KEY AUTOINCREMENT, referrer_id INTEGER NOT NULL,
+                    referee_id INTEGER NOT NULL, level INTEGER NOT NULL, transaction_id INTEGER,
+                    transaction_type TEXT NOT NULL, original_amount REAL NOT NULL, commission_rate REAL NOT NULL,
+                    commission_amount REAL NOT NULL, status TEXT DEFAULT 'pending', settled_at TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE user_resources (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                    resource_type TEXT NOT NULL, resource_name TEXT NOT NULL, description TEXT,
+                    availability TEXT DEFAULT 'available', estimated_value REAL, status TEXT DEFAULT 'active',
+                    tags TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE resource_matches (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL, resource_id INTEGER NOT NULL, match_score REAL NOT NULL,
+                    match_reason TEXT, status TEXT DEFAULT 'pending', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE projects (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, description TEXT,
+                    project_type TEXT NOT NULL, budget REAL, required_skills TEXT, required_assets TEXT,
+                    duration INTEGER, location TEXT, status TEXT DEFAULT 'open', creator_id INTEGER,
+                    deadline TIMESTAMP, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE project_participants (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL, role TEXT NOT NULL, contribution TEXT,
+                    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE(project_id, user_id));
+CREATE TABLE digital_assets (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                    asset_type TEXT NOT NULL, asset_name TEXT NOT NULL, description TEXT, image_url TEXT,
+                    metadata TEXT, rarity TEXT DEFAULT 'common', value REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+'''
+
+TOKENS = {'alice-token': 1, 'bob-token': 2, 'carol-token': 3, 'dave-token': 4}
+
+
+@pytest.fixture
+def client(tmp_path):
+    database = str(tmp_path / 'v9.db')
+    conn = sqlite3.connect(database)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO users (id, username) VALUES (?, ?)",
+                     [(1, 'alice'), (2, 'bob'), (3, 'carol'), (4, 'dave')])
+    conn.commit()
+    conn.close()
+    return LocalV9Client(database, jwt_secret='unused', authenticate=TOKENS.get)
+
+
+def test_local_calls_services(client):
+    assert client.call('list_assets', 'bad-token') == {'success': False, 'message': '未授权'}
+    assert client.call('create_project', 'alice-token', project_type='design') == {
+        'success': False, 'message': '项目标题和项目类型不能为空'
+    }
+
+    project = client.call('create_project', 'alice-token', title='品牌设计', project_type='design',
+                          required_skills='设计, 插画', required_assets='相机')
+    project_id = project['data']['project_id']
+    client.call('add_resource', 'bob-token', resource_type='skill', resource_name='设计', tags='设计,插画')
+    client.call('add_resource', 'carol-token', resource_type='asset', resource_name='相机', tags='相机')
+    client.call('add_resource', 'dave-token', resource_type='skill', resource_name='写作', tags='设计')
+
+    matches = client.call('match_resources', 'alice-token', project_id=project_id)['data']
+    assert [(m['user_id'], m['match_score']) for m in matches] == [(2, 0.6), (3, 0.4)]
+    # 只有项目创建者可以匹配
+    assert client.call('match_resources', 'bob-token', project_id=project_id)['message'] == '项目不存在或无权操作'
+
+    conn = client._connect()
+    assert conn.execute("SELECT COUNT(*) FROM resource_matches").fetchone()[0] == 2
+    conn.close()
+
+    assert client.call('join_project', 'bob-token', project_id=project_id, resource_id=1)['success']
+    assert client.call('join_project', 'bob-token', project_id=999, resource_id=1)['message'] == '项目不存在或已关闭'
+    assert [p['title'] for p in client.call('list_projects', 'bob-token', project_type='design')['data']] == ['品牌设计']
+
+
+def test_commission_chain(client):
+    services = client.services
+    conn = client._connect()
+    # alice -> bob -> carol -> dave
+    conn.executemany("INSERT INTO referral_relationships (referrer_id, referee_id) VALUES (?, ?)",
+                     [(1, 2), (2, 3), (3, 4)])
+    commissions = services.calculate_commission(conn, 4, 1000, 'recharge')
+    assert [(c['referrer_id'], c['level'], c['commission_amount']) for c in commissions] == [
+        (3, 1, 50.0), (2, 2, 30.0), (1, 3, 20.0)
+    ]
+    assert services.settle_commission(conn, 3)
+    assert not services.settle_commission(conn, 3)
+    conn.commit()
+    conn.close()
+
+    referrals = client.call('list_referrals', 'alice-token')['data']
+    assert [r['username'] for r in referrals['referrals']] == ['bob']
+    assert (referrals['total_count'], referrals['total_commission']) == (1, 20.0)
+    assert len(client.call('list_commissions', 'carol-token')['data']) == 1
+
+
+def test_http_client_pool_and_retry_config():
+    pytest.importorskip("requests")
+    client = HttpV9Client('http://admin.example.com/api/v9/', connect_timeout=1, read_timeout=5,
+                          retries=3, pool_size=8)
+    adapter = client.session.get_adapter('http://admin.example.com/api/v9/assets')
+    assert client.base_url == 'http://admin.example.com/api/v9'
+    assert client.timeout == (1, 5)
+    assert adapter._pool_maxsize == 8
+    assert adapter.max_retries.total == 3
+    assert adapter.max_retries.is_retry('GET', 503)
+    assert not adapter.max_retries.is_retry('POST', 503)
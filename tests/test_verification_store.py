@@ -0,0 +1,78 @@
+"""
+手机验证码存储测试
+
+测试包括：
+1. 与原字典相同的用法（in / [] / del）
+2. 两个进程各自的连接共享同一份验证码（发送与校验落在不同 worker 上）
+3. 写入时清理过期记录，删除不存在的手机号不报错
+4. 后端配置解析
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'admin-backend'))
+
+from verification_store import (  # noqa: E402
+    VerificationCodeStore, create_verification_store, create_verification_tables
+)
+
+
+@pytest.fixture
+def get_db(tmp_path):
+    path = str(tmp_path / "codes.db")
+    conn = sqlite3.connect(path)
+    create_verification_tables(conn.cursor())
+    conn.commit()
+    conn.close()
+
+    def connect():
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return connect
+
+
+def test_dict_interface(get_db):
+    codes = VerificationCodeStore(get_db)
+    assert '13800138000' not in codes
+    codes['13800138000'] = {'code': '123456', 'expire_at': time.time() + 300}
+    assert '13800138000' in codes
+    assert codes['13800138000']['code'] == '123456'
+    assert list(codes) == ['13800138000'] and len(codes) == 1
+
+    codes['13800138000'] = {'code': '654321', 'expire_at': time.time() + 300}
+    assert codes['13800138000']['code'] == '654321'
+
+    del codes['13800138000']
+    assert '13800138000' not in codes
+    with pytest.raises(KeyError):
+        codes['13800138000']
+    del codes['13800138000']
+
+
+def test_shared_between_workers(get_db):
+    sender, verifier = VerificationCodeStore(get_db), VerificationCodeStore(get_db)
+    sender['13800138001'] = {'code': '111111', 'expire_at': time.time() + 300}
+    assert verifier['13800138001']['code'] == '111111'
+    del verifier['13800138001']
+    assert '13800138001' not in sender
+
+
+def test_expired_codes_purged_on_write(get_db):
+    codes = VerificationCodeStore(get_db)
+    codes['13800138002'] = {'code': '222222', 'expire_at': time.time() - 1}
+    assert '13800138002' in codes  # 过期判断由调用方完成
+    codes['13800138003'] = {'code': '333333', 'expire_at': time.time() + 300}
+    assert list(codes) == ['13800138003']
+
+
+def test_create_verification_store(get_db):
+    assert isinstance(create_verification_store(get_db), VerificationCodeStore)
+    assert create_verification_store(get_db, 'memory') == {}
+    with pytest.raises(ValueError):
+        create_verification_store(get_db, 'redis')
@@ -0,0 +1,196 @@
+"""
+转账凭证存储测试
+
+测试包括：
+1. multipart 请求体流式写入存储，表单字段在文件前后都能收集，内容重复时复用已有对象
+2. 上传过程中的大小与类型限制
+3. 文件之前的表单字段在写入存储前校验，被拒绝时不写入对象
+4. 后处理提取元数据并更新状态，缩略图生成失败不影响凭证可用
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+import struct
+import sys
+import zlib
+
+import pytest
+
+pytest.importorskip("werkzeug")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'admin-backend'))
+
+import voucher_storage  # noqa: E402
+from voucher_storage import (  # noqa: E402
+    READ_CHUNK_SIZE, VoucherStore, VoucherUploadError, create_voucher_tables
+)
+
+BOUNDARY = "----voucherboundary"
+
+
+def png_image(width, height):
+    """生成一张可以被 Pillow 正常解码的纯色 RGB PNG"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\x00' + b'\x80\x40\x20' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+
+PNG = png_image(640, 480)
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects = {}
+        self.chunk_sizes = []
+        self.deleted = []
+
+    def trunk_upload_file(self, *, chunk_iter, file_name, content_type):
+        data = bytearray()
+        for chunk in chunk_iter:
+            self.chunk_sizes.append(len(chunk))
+            data.extend(chunk)
+        self.objects[file_name] = bytes(data)
+        return file_name
+
+    def upload_file(self, *, file_content, file_name, content_type):
+        self.objects[file_name] = file_content
+        return file_name
+
+    def read_file(self, *, file_key):
+        return self.objects[file_key]
+
+    def delete_file(self, *, file_key):
+        self.deleted.append(file_key)
+        return self.objects.pop(file_key, None) is not None
+
+    def generate_presigned_url(self, *, key, expire_time):
+        return f"https://signed/{key}"
+
+
+def multipart(before, filename, content, after):
+    parts = []
+    for name, value in before.items():
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="voucher_file"; '
+                 f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n')
+    for name, value in after.items():
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{BOUNDARY}--\r\n'.encode())
+    body = b''.join(parts)
+    return io.BytesIO(body), f'multipart/form-data; boundary={BOUNDARY}', len(body)
+
+
+@pytest.fixture
+def store(tmp_path):
+    db_path = tmp_path / "vouchers.db"
+
+    def get_db():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = get_db()
+    conn.execute("CREATE TABLE transfer_vouchers (id INTEGER PRIMARY KEY, image_url VARCHAR(500))")
+    create_voucher_tables(conn.cursor())
+    conn.commit()
+    conn.close()
+    return VoucherStore(FakeStorage(), get_db, max_size=1024 * 1024)
+
+
+def test_streams_file_and_dedupes(store):
+    content = PNG + os.urandom(300 * 1024)
+    upload = store.receive(*multipart({'order_no': 'R1'}, 'a.png', content, {'transfer_amount': '100.00'}))
+
+    assert upload.fields == {'order_no': 'R1', 'transfer_amount': '100.00'}
+    assert upload.content_type == 'image/png'
+    assert upload.size == len(content)
+    assert upload.sha256 == hashlib.sha256(content).hexdigest()
+    assert store.storage.objects[upload.object_key] == content
+    # 文件内容按读取块逐段交给存储（解析器保留分隔符长度的尾部），没有拼成完整副本
+    assert len(store.storage.chunk_sizes) > 1
+    assert max(store.storage.chunk_sizes) < 2 * READ_CHUNK_SIZE
+
+    first_key = store.register(upload)
+    duplicate = store.receive(*multipart({'order_no': 'R2'}, 'b.png', content, {}))
+    assert store.register(duplicate) == first_key
+    assert duplicate.duplicate
+    assert len(store.storage.deleted) == 1
+    assert list(store.storage.objects) == [first_key]
+
+
+def test_rejects_oversized_and_wrong_type(store):
+    with pytest.raises(VoucherUploadError) as exc:
+        store.receive(*multipart({}, 'big.png', PNG + b'\x00' * (2 * 1024 * 1024), {}))
+    assert exc.value.status == 413
+
+    stream, content_type, _ = multipart({}, 'big.png', PNG + b'\x00' * (2 * 1024 * 1024), {})
+    with pytest.raises(VoucherUploadError) as exc:
+        # 没有 Content-Length 时在读取过程中截断
+        store.receive(stream, content_type, None)
+    assert exc.value.status == 413
+
+    with pytest.raises(VoucherUploadError) as exc:
+        store.receive(*multipart({}, 'fake.png', b'MZ\x90\x00not an image', {}))
+    assert exc.value.status == 415
+
+    with pytest.raises(VoucherUploadError):
+        store.receive(*multipart({}, 'note.txt', PNG, {}))
+
+
+def test_validate_before_writing(store):
+    seen = []
+
+    def reject(fields):
+        seen.append(dict(fields))
+        raise VoucherUploadError('无权操作此订单', 403)
+
+    with pytest.raises(VoucherUploadError) as exc:
+        store.receive(*multipart({'order_no': 'R1'}, 'a.png', PNG, {'transfer_amount': '100.00'}), validate=reject)
+    assert exc.value.status == 403
+    # 只看到文件之前的字段，存储中没有写入任何对象
+    assert seen == [{'order_no': 'R1'}]
+    assert store.storage.objects == {} and store.storage.deleted == []
+
+    upload = store.receive(*multipart({'order_no': 'R1'}, 'a.png', PNG, {}), validate=seen.append)
+    assert store.storage.objects[upload.object_key] == PNG
+
+
+def _voucher_row(store, sha256):
+    conn = store.get_db()
+    row = conn.execute("SELECT * FROM voucher_files WHERE sha256 = ?", (sha256,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_process_extracts_metadata(store):
+    upload = store.receive(*multipart({}, 'a.png', PNG, {}))
+    store.register(upload)
+    store.process(upload.sha256)
+
+    row = _voucher_row(store, upload.sha256)
+    assert row['status'] == 'ready'
+    assert (row['width'], row['height']) == (640, 480)
+    if voucher_storage.Image is not None:
+        assert row['thumbnail_key'] in store.storage.objects
+
+
+def test_thumbnail_failure_is_not_fatal(store, monkeypatch):
+    def broken_thumbnail(data, extension, size):
+        raise OSError("cannot identify image file")
+    monkeypatch.setattr(voucher_storage, 'make_thumbnail', broken_thumbnail)
+
+    upload = store.receive(*multipart({}, 'a.png', PNG, {}))
+    store.register(upload)
+    store.process(upload.sha256)
+
+    row = _voucher_row(store, upload.sha256)
+    assert row['status'] == 'ready'
+    assert row['thumbnail_key'] is None
+    assert (row['width'], row['height']) == (640, 480)
+    assert 'cannot identify' in row['error']
@@ -20,6 +20,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from models import Base, User, Role, Permission, AuditLog, Session
 from init_data import engine, SessionLocal, init_database
+from permission_cache import permission_resolver, user_has_permission, user_permissions
 
 # FastAPI应用
 app = FastAPI(
@@ -85,7 +86,7 @@ async def get_current_user(
 def check_permission(permission_code: str):
     """检查用户是否有指定权限"""
     def permission_checker(current_user: User = Depends(get_current_user)) -> User:
-        if not current_user.has_permission(permission_code):
+        if not user_has_permission(current_user, permission_code):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"缺少权限：{permission_code}"
@@ -96,7 +97,7 @@ def check_permission(permission_code: str):
 
 def require_permission(user: User, permission_code: str):
     """检查用户是否有指定权限（非依赖注入版本）"""
-    if not user.has_permission(permission_code):
+    if not user_has_permission(user, permission_code):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"缺少权限：{permission_code}"
@@ -351,6 +352,7 @@ async def create_user(
         roles = db.query(Role).filter(Role.id.in_(user_data.role_ids)).all()
         new_user.roles = roles
         db.commit()
+    permission_resolver.invalidate_user(new_user.id)
 
     # 记录日志
     create_audit_log(
@@ -399,6 +401,7 @@ async def update_user(
         user.roles = roles
 
     db.commit()
+    permission_resolver.invalidate_user(user.id)
 
     # 记录日志
     create_audit_log(
@@ -438,6 +441,7 @@ async def delete_user(
     user_name = user.name
     db.delete(user)
     db.commit()
+    permission_resolver.invalidate_user(user_id)
 
     # 记录日志
     create_audit_log(
@@ -487,7 +491,7 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 @app.get("/api/me/permissions")
 async def get_my_permissions(current_user: User = Depends(get_current_user)):
     """获取当前用户的权限"""
-    permissions = current_user.get_all_permissions()
+    permissions = user_permissions(current_user)
     return {
         "permissions": permissions,
         "is_superuser": current_user.is_superuser
@@ -511,6 +515,17 @@ async def startup_event():
     """应用启动时初始化数据库"""
     print("正在初始化数据库...")
     init_database()
+    permission_resolver.clear()
+
+    from contribution_leaderboard import start_reconciler
+    start_reconciler(engine)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止排行榜对账线程"""
+    from contribution_leaderboard import stop_reconcilers
+    stop_reconcilers()
 
 # 导入访客管理API
 try:
@@ -5,7 +5,7 @@ V2.0 融合版 - 系统自动运营管理器
 1. 新用户注册奖励（1000初始灵值）
 2. 活跃用户勋章（30天连续登录+5%收益）
 3. 沉睡用户唤醒（60天未登录+200唤醒奖励）
-4. 项目自动分配
+4. 项目自动分配（含夜间批量预计算推荐）
 5. 项目超时惩罚（7天-100灵值）
 """
 
@@ -14,6 +14,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from contribution_manager_v2 import ContributionManagerV2, ContributionType
+from project_recommender import DEFAULT_TOP_K, ProjectRecommender, profile_score
 
 
 class AutoOperationManager:
@@ -22,6 +23,7 @@ class AutoOperationManager:
     def __init__(self, session: Session):
         self.session = session
         self.contribution_manager = ContributionManagerV2(session)
+        self.recommender = ProjectRecommender(session)
     
     def handle_new_user_registration(self, user_id: int) -> Dict:
         """
@@ -288,114 +290,37 @@ class AutoOperationManager:
             "rewards_granted": rewards_granted
         }
     
-    def auto_assign_projects(self, user_id: int) -> List[Dict]:
+    def auto_assign_projects(self, user_id: int, limit: int = DEFAULT_TOP_K) -> List[Dict]:
         """
         自动分配项目给用户
         
-        匹配因子：
-        - 用户职称
-        - 历史项目经验
-        - 灵值等级
+        匹配因子（见 project_recommender）：
+        - 用户职称、灵值等级、历史项目经验
+        - 历史参与的项目类型
+        - 项目金额档位与用户档位的接近程度
+        - 项目剩余名额
         
         Returns:
             推荐项目列表（最多5个）
         """
-        # 获取用户画像
-        user_profile = self.session.execute(
-            text("""
-                SELECT 
-                    u.id,
-                    u.name,
-                    u.position,
-                    u.partner_level,
-                    uc.cumulative_contribution,
-                    uc.project_contribution,
-                    COUNT(pp.id) as project_count
-                FROM users u
-                LEFT JOIN user_contributions_v2 uc ON u.id = uc.user_id
-                LEFT JOIN project_participations pp ON u.id = pp.partner_id
-                WHERE u.id = :user_id
-                GROUP BY u.id
-            """),
-            {"user_id": user_id}
-        ).fetchone()
-        
-        if not user_profile:
-            return []
-        
-        user_id, name, position, partner_level, cumulative_contribution, project_contribution, project_count = user_profile
-        
-        # 获取适合的项目
-        suitable_projects = self.session.execute(
-            text("""
-                SELECT 
-                    p.id,
-                    p.name,
-                    p.project_code,
-                    p.description,
-                    p.min_participation_amount,
-                    p.current_participants,
-                    p.max_participants,
-                    p.status
-                FROM projects p
-                WHERE p.status = 'active'
-                AND p.current_participants < p.max_participants
-                AND (p.min_participation_amount IS NULL OR p.min_participation_amount <= :contribution)
-                ORDER BY RANDOM()
-                LIMIT 10
-            """),
-            {"contribution": cumulative_contribution or 0}
-        ).fetchall()
-        
-        # 计算匹配分数并排序
-        ranked_projects = []
-        for project in suitable_projects:
-            match_score = self._calculate_project_match_score(
-                position=position,
-                contribution_level=partner_level,
-                project_experience=project_count
-            )
-            
-            ranked_projects.append({
-                "project_id": project[0],
-                "project_name": project[1],
-                "project_code": project[2],
-                "description": project[3],
-                "min_amount": project[4],
-                "current_participants": project[5],
-                "max_participants": project[6],
-                "match_score": match_score
-            })
-        
-        # 按匹配分数排序
-        ranked_projects.sort(key=lambda x: x["match_score"], reverse=True)
-        
-        # 返回前5个
-        recommended_projects = ranked_projects[:5]
-        
-        # 记录分配记录
-        for project in recommended_projects:
-            self.session.execute(
-                text("""
-                    INSERT INTO project_assignments (
-                        user_id, project_id, assignment_type, match_score,
-                        assigned_at, status
-                    ) VALUES (
-                        :user_id, :project_id, 'auto', :match_score,
-                        datetime('now'), 'pending'
-                    )
-                """),
-                {
-                    "user_id": user_id,
-                    "project_id": project["project_id"],
-                    "match_score": project["match_score"]
-                }
-            )
+        recommended_projects = self.recommender.recommend(user_id, k=limit)
         
+        # 批量记录分配记录
+        self.recommender.save_assignments({user_id: recommended_projects}, assignment_type='auto')
         self.session.commit()
         
         return recommended_projects
     
+    def precompute_project_recommendations(self, limit: int = DEFAULT_TOP_K) -> Dict:
+        """
+        为所有用户预计算项目推荐（每天夜间定时执行）
+        
+        规则：
+        - 候选项目只加载一次，按用户分批矩阵打分
+        - 替换每个用户上一次未处理的批量推荐（assignment_type='batch'）
+        """
+        return self.recommender.recommend_all(k=limit, assignment_type='batch')
+    
     def _calculate_project_match_score(
         self,
         position: str,
@@ -403,41 +328,9 @@ class AutoOperationManager:
         project_experience: int
     ) -> float:
         """
-        计算项目匹配分数
+        计算项目匹配分数（用户画像分）
         """
-        score = 0.0
-        
-        # 职称匹配
-        if position:
-            if "总监" in position or "经理" in position:
-                score += 0.4
-            elif "专家" in position:
-                score += 0.5
-            else:
-                score += 0.3
-        
-        # 贡献值等级匹配
-        if contribution_level:
-            if "founding" in contribution_level:
-                score += 0.4
-            elif "senior" in contribution_level:
-                score += 0.3
-            elif "regular" in contribution_level:
-                score += 0.2
-            else:
-                score += 0.1
-        
-        # 项目经验匹配
-        if project_experience > 10:
-            score += 0.2
-        elif project_experience > 5:
-            score += 0.15
-        elif project_experience > 2:
-            score += 0.1
-        else:
-            score += 0.05
-        
-        return score
+        return profile_score(position, contribution_level, project_experience)
     
     def check_project_timeout(self) -> Dict:
         """
@@ -0,0 +1,400 @@
+"""
+V2.0 融合版 - 贡献值排行榜服务
+
+功能：
+1. 为三个排名维度（累计/项目/剩余贡献值）维护内存有序数组，
+   Top-N 与用户排名通过二分查找完成，不再每次全表排序/计数
+2. ContributionManagerV2 增减贡献值后增量更新排行榜
+3. 为排名列建立覆盖索引（冷启动加载与对账走索引）
+4. 定期与数据库对账，修正绕过管理器直接写表造成的偏差
+   （应用启动时调用 start_reconciler 启动后台对账线程，进程退出或应用关闭时停止；
+   对账读取期间增量更新过的用户保留内存中的新值，不会被旧快照覆盖）
+"""
+
+import atexit
+import os
+import threading
+import weakref
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+
+# 排名维度 -> 贡献值列
+RANKING_COLUMNS = {
+    "cumulative": "cumulative_contribution",
+    "project": "project_contribution",
+    "remaining": "remaining_contribution"
+}
+
+# 排名列覆盖索引（按贡献值降序，附带 user_id/updated_at，排行查询无需回表）
+LEADERBOARD_INDEXES = {
+    dimension: (
+        f"idx_user_contributions_v2_rank_{dimension}",
+        f"{column} DESC, user_id, updated_at"
+    )
+    for dimension, column in RANKING_COLUMNS.items()
+}
+
+# 默认对账间隔（秒）；LEADERBOARD_RECONCILE_INTERVAL=0 时不启动后台对账
+DEFAULT_RECONCILE_INTERVAL = 300
+RECONCILE_INTERVAL = int(os.getenv("LEADERBOARD_RECONCILE_INTERVAL", str(DEFAULT_RECONCILE_INTERVAL)))
+
+
+def ensure_leaderboard_indexes(bind) -> None:
+    """
+    创建排名列覆盖索引（已存在时跳过）
+
+    Args:
+        bind: 数据库引擎或连接
+    """
+    statements = [
+        f"CREATE INDEX IF NOT EXISTS {name} ON user_contributions_v2({columns})"
+        for name, columns in LEADERBOARD_INDEXES.values()
+    ]
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    else:
+        for statement in statements:
+            bind.execute(text(statement))
+
+
+class RankingIndex:
+    """单个排名维度的有序数组（按分数降序、user_id 升序）"""
+
+    def __init__(self):
+        self._entries: List[Tuple[float, int]] = []  # (-分数, 用户ID)
+        self._scores: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, scores: Dict[int, float]) -> None:
+        """整体替换排名数据"""
+        self._scores = dict(scores)
+        self._entries = sorted((-score, user_id) for user_id, score in self._scores.items())
+
+    def update(self, user_id: int, score: float) -> None:
+        """更新用户分数"""
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._entries.pop(bisect_left(self._entries, (-old, user_id)))
+        self._scores[user_id] = score
+        insort(self._entries, (-score, user_id))
+
+    def score(self, user_id: int) -> Optional[float]:
+        return self._scores.get(user_id)
+
+    def user_ids(self):
+        return self._scores.keys()
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """用户排名（分数严格高于该用户的人数 + 1，同分同名次）"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._entries, (-score,)) + 1
+
+    def slice(self, start: int, stop: int) -> List[Tuple[int, float]]:
+        """按名次区间取 [(用户ID, 分数)]"""
+        return [(user_id, -neg_score) for neg_score, user_id in self._entries[start:stop]]
+
+
+class ContributionLeaderboard:
+    """贡献值排行榜（同一数据库共用一个实例）"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indexes = {dimension: RankingIndex() for dimension in RANKING_COLUMNS}
+        self._loaded = False
+        # 增量更新序号：对账读取快照期间更新过的用户不被快照覆盖
+        self._update_seq = 0
+        self._updated_users: Dict[int, int] = {}
+        self.last_reconciled_at: Optional[datetime] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def ensure_loaded(self, session: Session) -> None:
+        """首次使用时从数据库加载排名数据"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    ensure_leaderboard_indexes(session.connection())
+                    self.reconcile(session)
+
+    def reconcile(self, session: Session) -> int:
+        """
+        与数据库对账：重新加载全部贡献值并替换内存排名
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            与内存数据不一致（含新增/删除）的用户数
+        """
+        with self._lock:
+            snapshot_seq = self._update_seq
+        rows = session.execute(
+            text("""
+                SELECT
+                    user_id,
+                    cumulative_contribution,
+                    project_contribution,
+                    remaining_contribution
+                FROM user_contributions_v2
+            """)
+        ).fetchall()
+
+        fresh = {dimension: {} for dimension in RANKING_COLUMNS}
+        for user_id, cumulative, project, remaining in rows:
+            fresh["cumulative"][user_id] = cumulative or 0.0
+            fresh["project"][user_id] = project or 0.0
+            fresh["remaining"][user_id] = remaining or 0.0
+
+        with self._lock:
+            # 快照开始后增量更新过的用户以内存为准
+            newer = [user_id for user_id, seq in self._updated_users.items() if seq > snapshot_seq]
+            for dimension, scores in fresh.items():
+                index = self._indexes[dimension]
+                for user_id in newer:
+                    score = index.score(user_id)
+                    if score is not None:
+                        scores[user_id] = score
+
+            drifted = set()
+            if self._loaded:
+                for dimension, scores in fresh.items():
+                    index = self._indexes[dimension]
+                    for user_id, score in scores.items():
+                        if index.score(user_id) != score:
+                            drifted.add(user_id)
+                    drifted.update(index.user_ids() - scores.keys())
+
+            for dimension, scores in fresh.items():
+                self._indexes[dimension].load(scores)
+            self._updated_users = {user_id: self._updated_users[user_id] for user_id in newer}
+            self._loaded = True
+            self.last_reconciled_at = datetime.now()
+
+        return len(drifted)
+
+    def update_user(self, contribution: Dict) -> None:
+        """
+        按 get_user_contribution 返回的贡献值增量更新排名（未加载时忽略）
+
+        Args:
+            contribution: 贡献值字典
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            self._update_seq += 1
+            self._updated_users[contribution["user_id"]] = self._update_seq
+            for dimension, column in RANKING_COLUMNS.items():
+                self._indexes[dimension].update(contribution["user_id"], contribution[column] or 0.0)
+
+    def refresh_users(self, session: Session, user_ids: Iterable[int]) -> None:
+        """
+        从数据库重新读取指定用户的贡献值（用于直接写表的调用方）
+
+        Args:
+            session: 数据库会话
+            user_ids: 用户ID列表
+        """
+        user_ids = list(user_ids)
+        if not self._loaded or not user_ids:
+            return
+        rows = session.execute(
+            text("""
+                SELECT
+                    user_id,
+                    cumulative_contribution,
+                    project_contribution,
+                    remaining_contribution
+                FROM user_contributions_v2
+                WHERE user_id IN :user_ids
+            """).bindparams(bindparam("user_ids", expanding=True)),
+            {"user_ids": user_ids}
+        ).fetchall()
+        for user_id, cumulative, project, remaining in rows:
+            self.update_user({
+                "user_id": user_id,
+                "cumulative_contribution": cumulative,
+                "project_contribution": project,
+                "remaining_contribution": remaining
+            })
+
+    def get_rank(self, session: Session, user_id: int, order_by: str = "cumulative") -> Optional[int]:
+        """
+        获取用户排名
+
+        Args:
+            session: 数据库会话
+            user_id: 用户ID
+            order_by: 排序维度（cumulative/project/remaining）
+
+        Returns:
+            排名（如果用户不存在返回None）
+        """
+        self.ensure_loaded(session)
+        with self._lock:
+            return self._indexes[order_by].rank(user_id)
+
+    def get_top(self, session: Session, limit: int = 10, order_by: str = "cumulative") -> List[Dict]:
+        """
+        获取排行榜前N名（只为上榜用户查询用户信息）
+
+        Args:
+            session: 数据库会话
+            limit: 返回数量
+            order_by: 排序维度（cumulative/project/remaining）
+
+        Returns:
+            排行榜列表
+        """
+        self.ensure_loaded(session)
+        ranking = []
+        start = 0
+        while len(ranking) < limit:
+            with self._lock:
+                window = self._indexes[order_by].slice(start, start + limit - len(ranking))
+            if not window:
+                break
+            start += len(window)
+
+            # 与原排行榜一致，只包含 users 表中存在的用户
+            users = {
+                row[0]: row[1:]
+                for row in session.execute(
+                    text("""
+                        SELECT uc.user_id, u.name, u.partner_level, uc.updated_at
+                        FROM user_contributions_v2 uc
+                        JOIN users u ON uc.user_id = u.id
+                        WHERE uc.user_id IN :user_ids
+                    """).bindparams(bindparam("user_ids", expanding=True)),
+                    {"user_ids": [user_id for user_id, _ in window]}
+                ).fetchall()
+            }
+            for user_id, contribution in window:
+                if user_id not in users:
+                    continue
+                name, partner_level, updated_at = users[user_id]
+                ranking.append({
+                    "rank": len(ranking) + 1,
+                    "user_id": user_id,
+                    "name": name,
+                    "partner_level": partner_level or 'normal_user',
+                    "contribution": contribution or 0.0,
+                    "updated_at": updated_at
+                })
+
+        return ranking
+
+
+# 每个数据库引擎一个排行榜实例
+_leaderboards: "weakref.WeakKeyDictionary[Engine, ContributionLeaderboard]" = weakref.WeakKeyDictionary()
+_leaderboards_lock = threading.Lock()
+# 已启动的对账任务（显式启动，停止后释放对引擎的引用）
+_reconcilers: Dict[Engine, "LeaderboardReconciler"] = {}
+
+
+def get_leaderboard(session: Session) -> ContributionLeaderboard:
+    """获取会话所在数据库的排行榜实例"""
+    engine = session.get_bind().engine
+    with _leaderboards_lock:
+        leaderboard = _leaderboards.get(engine)
+        if leaderboard is None:
+            leaderboard = ContributionLeaderboard()
+            _leaderboards[engine] = leaderboard
+        return leaderboard
+
+
+def start_reconciler(engine: Engine, interval: int = RECONCILE_INTERVAL) -> Optional["LeaderboardReconciler"]:
+    """
+    启动数据库的排行榜对账线程（应用启动时调用，重复调用不会重复启动）
+
+    Args:
+        engine: 数据库引擎
+        interval: 对账间隔（秒），为 0 时不启动
+
+    Returns:
+        对账任务（未启动时返回None）
+    """
+    if interval <= 0:
+        return None
+    with _leaderboards_lock:
+        reconciler = _reconcilers.get(engine)
+        if reconciler is None:
+            reconciler = LeaderboardReconciler(sessionmaker(bind=engine), interval)
+            _reconcilers[engine] = reconciler
+    reconciler.start()
+    return reconciler
+
+
+def stop_reconcilers() -> None:
+    """停止所有对账线程（应用关闭时调用，进程退出时也会自动调用）"""
+    with _leaderboards_lock:
+        reconcilers = list(_reconcilers.values())
+        _reconcilers.clear()
+    for reconciler in reconcilers:
+        reconciler.stop()
+
+
+atexit.register(stop_reconcilers)
+
+
+class LeaderboardReconciler:
+    """排行榜定期对账任务（后台线程）"""
+
+    def __init__(self, session_factory, interval: int = DEFAULT_RECONCILE_INTERVAL):
+        """
+        Args:
+            session_factory: 会话工厂（如 sessionmaker 实例）
+            interval: 对账间隔（秒）
+        """
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def reconcile_once(self) -> int:
+        """执行一次对账，返回修正的用户数"""
+        session = self.session_factory()
+        try:
+            return get_leaderboard(session).reconcile(session)
+        finally:
+            session.close()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                drifted = self.reconcile_once()
+                if drifted:
+                    print(f"⚠️  排行榜对账修正 {drifted} 位用户")
+            except Exception as e:
+                print(f"❌ 排行榜对账失败: {str(e)}")
+
+    def start(self):
+        """启动对账线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="leaderboard-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止对账线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -8,6 +8,7 @@ V2.0 融合版 - 贡献值管理器（三维贡献值模型）
    - 剩余贡献值（Remaining）：可用于兑换权益、参与项目竞拍
 2. 贡献值自动计算与更新
 3. 贡献值消费与回收
+4. 贡献值排行榜与用户排名（内存有序索引，见 contribution_leaderboard）
 """
 
 from sqlalchemy import text
@@ -15,6 +16,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Dict, Optional
 from enum import Enum
+from contribution_leaderboard import RANKING_COLUMNS, get_leaderboard
 
 
 class ContributionType(Enum):
@@ -34,6 +36,7 @@ class ContributionManagerV2:
     
     def __init__(self, session: Session):
         self.session = session
+        self.leaderboard = get_leaderboard(session)
     
     def get_user_contribution(self, user_id: int) -> Dict:
         """
@@ -63,7 +66,9 @@ class ContributionManagerV2:
         if not result:
             # 如果记录不存在，创建默认记录
             self._init_user_contribution(user_id)
-            return self.get_user_contribution(user_id)
+            contribution = self.get_user_contribution(user_id)
+            self.leaderboard.update_user(contribution)
+            return contribution
         
         return {
             "user_id": user_id,
@@ -203,7 +208,9 @@ class ContributionManagerV2:
         
         self.session.commit()
         
-        return self.get_user_contribution(user_id)
+        contribution = self.get_user_contribution(user_id)
+        self.leaderboard.update_user(contribution)
+        return contribution
     
     def consume_contribution(
         self,
@@ -254,7 +261,9 @@ class ContributionManagerV2:
         
         self.session.commit()
         
-        return self.get_user_contribution(user_id)
+        contribution = self.get_user_contribution(user_id)
+        self.leaderboard.update_user(contribution)
+        return contribution
     
     def _log_contribution_transaction(
         self,
@@ -322,45 +331,10 @@ class ContributionManagerV2:
         Returns:
             排行榜列表
         """
-        if order_by not in ["cumulative", "project", "remaining"]:
+        if order_by not in RANKING_COLUMNS:
             order_by = "cumulative"
         
-        column_map = {
-            "cumulative": "cumulative_contribution",
-            "project": "project_contribution",
-            "remaining": "remaining_contribution"
-        }
-        
-        order_column = column_map[order_by]
-        
-        results = self.session.execute(
-            text(f"""
-                SELECT 
-                    uc.user_id,
-                    u.name,
-                    u.partner_level,
-                    uc.{order_column},
-                    uc.updated_at
-                FROM user_contributions_v2 uc
-                JOIN users u ON uc.user_id = u.id
-                ORDER BY uc.{order_column} DESC
-                LIMIT :limit
-            """),
-            {"limit": limit}
-        ).fetchall()
-        
-        ranking = []
-        for rank, (user_id, name, partner_level, contribution, updated_at) in enumerate(results, 1):
-            ranking.append({
-                "rank": rank,
-                "user_id": user_id,
-                "name": name,
-                "partner_level": partner_level or 'normal_user',
-                "contribution": contribution or 0.0,
-                "updated_at": updated_at
-            })
-        
-        return ranking
+        return self.leaderboard.get_top(self.session, limit, order_by)
     
     def get_user_rank(self, user_id: int, order_by: str = "cumulative") -> Optional[int]:
         """
@@ -373,31 +347,10 @@ class ContributionManagerV2:
         Returns:
             排名（如果用户不存在返回None）
         """
-        if order_by not in ["cumulative", "project", "remaining"]:
+        if order_by not in RANKING_COLUMNS:
             order_by = "cumulative"
         
-        column_map = {
-            "cumulative": "cumulative_contribution",
-            "project": "project_contribution",
-            "remaining": "remaining_contribution"
-        }
-        
-        order_column = column_map[order_by]
-        
-        result = self.session.execute(
-            text(f"""
-                SELECT COUNT(*) + 1 as rank
-                FROM user_contributions_v2 uc1
-                WHERE uc1.{order_column} > (
-                    SELECT {order_column}
-                    FROM user_contributions_v2 uc2
-                    WHERE uc2.user_id = :user_id
-                )
-            """),
-            {"user_id": user_id}
-        ).fetchone()
-        
-        return result[0] if result else None
+        return self.leaderboard.get_rank(self.session, user_id, order_by)
 
 
 # 便捷函数
@@ -14,6 +14,7 @@ from models import (
 )
 from init_data import SessionLocal
 from api import get_current_user
+from permission_cache import user_has_permission
 from models import AuditLog
 from api import create_audit_log as audit_log
 
@@ -84,7 +85,7 @@ async def get_database_stats(
     需要权限：database:view
     """
     # 检查权限
-    if not current_user.has_permission("database:view"):
+    if not user_has_permission(current_user, "database:view"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="您没有查看数据库统计的权限"
@@ -138,7 +139,7 @@ async def list_users(
     需要权限：user:view
     """
     # 检查权限
-    if not current_user.has_permission("user:view"):
+    if not user_has_permission(current_user, "user:view"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="您没有查看用户列表的权限"
@@ -188,7 +189,7 @@ async def get_user(
     需要权限：user:view
     """
     # 检查权限
-    if not current_user.has_permission("user:view"):
+    if not user_has_permission(current_user, "user:view"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="您没有查看用户详情的权限"
@@ -232,7 +233,7 @@ async def list_roles(
     需要权限：role:view
     """
     # 检查权限
-    if not current_user.has_permission("role:view"):
+    if not user_has_permission(current_user, "role:view"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="您没有查看角色列表的权限"
@@ -283,7 +284,7 @@ async def get_role(
     需要权限：role:view
     """
     # 检查权限
-    if not current_user.has_permission("role:view"):
+    if not user_has_permission(current_user, "role:view"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="您没有查看角色详情的权限"
@@ -328,7 +329,7 @@ async def list_permissions(
     需要权限：permission:view
     """
     # 检查权限
-    if not current_user.has_permission("permission:view"):
+    if not user_has_permission(current_user, "permission:view"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="您没有查看权限列表的权限"
@@ -376,7 +377,7 @@ async def get_permission(
     需要权限：permission:view
     """
     # 检查权限
-    if not current_user.has_permission("permission:view"):
+    if not user_has_permission(current_user, "permission:view"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="您没有查看权限详情的权限"
@@ -2,18 +2,33 @@
 数据库连接管理工具
 支持以许锋身份连接数据库并管理生态机制
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, date
+from decimal import Decimal
 import os
+import sys
 from typing import List, Optional, Dict, Any
+
+# 分配引擎与 dividend_manager / project_manager 共用同一个模块（src.auth.distribution_engine），
+# 从 auth 目录启动时需要把移植包根目录加入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
 from models import (
     Base, User, Role, Permission, AuditLog, Session as UserSession,
     MemberLevelConfig, Partner, Project, ProjectParticipation,
     Referral, Commission, DividendPool, Dividend,
     MemberLevel, PartnerStatus, ProjectStatus, ReferralStatus
 )
+from src.auth.distribution_engine import (
+    DistributionEngine, DistributionError, DistributionResult, Payee, PayoutLine,
+    DEFAULT_CHUNK_SIZE
+)
+from ecosystem_summary import EcosystemSummaryCache, record_commission, record_dividends
+
+# 分配引擎中的分红池来源类型
+DIVIDEND_POOL_SOURCE = "partner_dividend_pool"
 
 
 class DatabaseManager:
@@ -30,6 +45,7 @@ class DatabaseManager:
         self.engine = create_engine(db_url, echo=False)
         self.SessionLocal = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
         self.current_user = None  # 当前登录用户
+        self.summary_cache = EcosystemSummaryCache(self.SessionLocal)
         
     def create_tables(self):
         """创建所有表"""
@@ -307,6 +323,7 @@ class DatabaseManager:
             
             session.add(partner)
             session.commit()
+            self.summary_cache.invalidate()
             
             # 记录操作日志
             audit_log = AuditLog(
@@ -376,6 +393,7 @@ class DatabaseManager:
             
             session.add(project)
             session.commit()
+            self.summary_cache.invalidate()
             
             # 记录操作日志
             audit_log = AuditLog(
@@ -469,6 +487,7 @@ class DatabaseManager:
             
             session.add(referral)
             session.commit()
+            self.summary_cache.invalidate()
             
             # 记录操作日志
             audit_log = AuditLog(
@@ -541,7 +560,9 @@ class DatabaseManager:
             )
             
             session.add(commission)
+            record_commission(session, commission.amount, pending=True)
             session.commit()
+            self.summary_cache.invalidate()
             
             # 更新合伙人累计数据
             referrer = session.query(Partner).filter(Partner.id == referral.referrer_id).first()
@@ -636,6 +657,7 @@ class DatabaseManager:
             
             session.add(dividend_pool)
             session.commit()
+            self.summary_cache.invalidate()
             
             # 记录操作日志
             audit_log = AuditLog(
@@ -669,13 +691,22 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def distribute_dividends(self, pool_id: int) -> Dict[str, Any]:
+    def distribute_dividends(
+        self,
+        pool_id: int,
+        dry_run: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Dict[str, Any]:
         """
         分配分红
-        
+
+        分红记录按块批量写入并逐块提交，中途失败后再次调用会从最后提交的位置继续。
+
         Args:
             pool_id: 分红池ID
-            
+            dry_run: 是否只预演（返回分配表，不写入数据）
+            chunk_size: 每块处理的合伙人数
+
         Returns:
             分配结果
         """
@@ -692,68 +723,97 @@ class DatabaseManager:
             if pool.status != "active":
                 return {"success": False, "message": "分红池状态不正确"}
             
-            # 获取所有专家会员
-            expert_partners = session.query(Partner).filter(
+            # 获取所有持有分红股权的专家会员
+            expert_partners = session.query(Partner.id, Partner.dividend_equity).filter(
                 Partner.member_level == MemberLevel.EXPERT,
-                Partner.status == PartnerStatus.ACTIVE
+                Partner.status == PartnerStatus.ACTIVE,
+                Partner.dividend_equity > 0
             ).all()
             
             if not expert_partners:
                 return {"success": False, "message": "没有专家会员"}
+
+            if not pool.total_equity or pool.total_equity <= 0:
+                return {"success": False, "message": "分红池总股权为0"}
             
-            # 分配分红
-            dividends_created = []
-            for partner in expert_partners:
-                if partner.dividend_equity <= 0:
-                    continue
-                
-                # 计算分红金额
-                dividend_amount = pool.pool_amount * (partner.dividend_equity / pool.total_equity)
-                
-                # 创建分红记录
-                dividend = Dividend(
-                    pool_id=pool_id,
-                    partner_id=partner.id,
-                    equity=partner.dividend_equity,
-                    pool_amount=pool.pool_amount,
-                    dividend_amount=dividend_amount,
-                    status="pending",
-                    period=pool.period
-                )
-                
-                session.add(dividend)
-                dividends_created.append(dividend.dividend_amount)
-                
-                # 更新分红池
-                pool.distributed_amount += dividend_amount
-                pool.remaining_amount -= dividend_amount
-            
-            pool.status = "closed"
-            pool.distribution_date = datetime.now()
-            session.commit()
-            
-            # 记录操作日志
-            audit_log = AuditLog(
-                user_id=self.current_user.id,
-                action="distribute_dividends",
-                resource_type="DividendPool",
-                resource_id=pool_id,
-                description=f"分配分红: {pool.period}, {len(dividends_created)}人, 总金额: {pool.distributed_amount}元",
-                status="success"
+            # 每位专家分得 分红池金额 × 股权 / 总股权，股权合计超过总股权时按比例缩减
+            payees = [
+                Payee(key=partner_id, weight=Decimal(str(equity)))
+                for partner_id, equity in expert_partners
+            ]
+            equity_total = sum(p.weight for p in payees)
+            pool_amount = Decimal(str(pool.pool_amount or 0))
+            amount = pool_amount * min(equity_total / Decimal(str(pool.total_equity)), Decimal("1"))
+
+            engine = DistributionEngine(session, chunk_size=chunk_size)
+            if dry_run:
+                result = engine.plan(DIVIDEND_POOL_SOURCE, pool_id, 1, amount, payees)
+                return {
+                    "success": True,
+                    "message": f"预演分红: {len(result.lines)}位专家会员",
+                    "dry_run": True,
+                    "summary": {
+                        "period": pool.period,
+                        "total_amount": float(result.allocated_amount),
+                        "partner_count": len(result.lines)
+                    },
+                    "payouts": [
+                        {"partner_id": row["key"], "equity": row["weight"], "dividend_amount": row["amount"]}
+                        for row in result.payout_table()
+                    ]
+                }
+
+            def write_chunk(session: Session, lines: List[PayoutLine], round_no: int) -> None:
+                now = datetime.now()
+                session.execute(insert(Dividend.__table__), [
+                    {
+                        'pool_id': pool_id,
+                        'partner_id': line.payee.key,
+                        'equity': float(line.payee.weight),
+                        'pool_amount': pool.pool_amount,
+                        'dividend_amount': float(line.amount),
+                        'status': "pending",
+                        'period': pool.period,
+                        'created_at': now,
+                        'updated_at': now
+                    }
+                    for line in lines
+                ])
+                record_dividends(session, len(lines), float(sum(line.amount for line in lines)))
+
+            def finalize(session: Session, result: DistributionResult) -> None:
+                distributed = float(result.allocated_amount)
+                pool.distributed_amount = (pool.distributed_amount or 0) + distributed
+                pool.remaining_amount = (pool.remaining_amount or 0) - distributed
+                pool.status = "closed"
+                pool.distribution_date = datetime.now()
+
+                # 记录操作日志
+                session.add(AuditLog(
+                    user_id=self.current_user.id,
+                    action="distribute_dividends",
+                    resource_type="DividendPool",
+                    resource_id=pool_id,
+                    description=f"分配分红: {pool.period}, {len(result.lines)}人, 总金额: {pool.distributed_amount}元",
+                    status="success"
+                ))
+
+            result = engine.run(
+                DIVIDEND_POOL_SOURCE, pool_id, 1, amount, payees, write_chunk, finalize,
+                on_progress=lambda _: self.summary_cache.invalidate()
             )
-            session.add(audit_log)
-            session.commit()
+            self.summary_cache.invalidate()
             
             return {
                 "success": True,
-                "message": f"成功分配分红给{len(dividends_created)}位专家会员",
+                "message": f"成功分配分红给{len(result.lines)}位专家会员",
                 "summary": {
                     "period": pool.period,
                     "total_amount": pool.distributed_amount,
-                    "partner_count": len(dividends_created)
+                    "partner_count": len(result.lines)
                 }
             }
-        except SQLAlchemyError as e:
+        except (SQLAlchemyError, DistributionError) as e:
             session.rollback()
             return {
                 "success": False,
@@ -767,6 +827,8 @@ class DatabaseManager:
     def get_ecosystem_summary(self) -> Dict[str, Any]:
         """
         获取生态机制汇总信息
+
+        计数由一条聚合SQL完成，佣金/分红合计读取增量维护的快照，结果缓存 DEFAULT_SUMMARY_TTL 秒。
         
         Returns:
             汇总信息
@@ -774,69 +836,18 @@ class DatabaseManager:
         if not self.current_user:
             return {"success": False, "message": "未登录"}
         
-        session = self.get_session()
         try:
-            # 基础统计
-            total_partners = session.query(Partner).count()
-            active_partners = session.query(Partner).filter(Partner.status == PartnerStatus.ACTIVE).count()
-            expert_partners = session.query(Partner).filter(Partner.member_level == MemberLevel.EXPERT).count()
-            
-            # 项目统计
-            total_projects = session.query(Project).count()
-            ongoing_projects = session.query(Project).filter(Project.status == ProjectStatus.ONGOING).count()
-            
-            # 推荐统计
-            total_referrals = session.query(Referral).count()
-            confirmed_referrals = session.query(Referral).filter(Referral.status == ReferralStatus.CONFIRMED).count()
-            
-            # 佣金统计
-            total_commissions = session.query(Commission).count()
-            pending_commissions = session.query(Commission).filter(Commission.status == "pending").count()
-            total_commission_amount = session.query(Commission).all()
-            sum_commission_amount = sum(c.amount for c in total_commission_amount)
-            
-            # 分红统计
-            total_pools = session.query(DividendPool).count()
-            active_pools = session.query(DividendPool).filter(DividendPool.status == "active").count()
-            total_dividend_amount = session.query(Dividend).all()
-            sum_dividend_amount = sum(d.dividend_amount for d in total_dividend_amount)
-            
+            cached = self.summary_cache.get()
             return {
                 "success": True,
-                "summary": {
-                    "partners": {
-                        "total": total_partners,
-                        "active": active_partners,
-                        "expert": expert_partners
-                    },
-                    "projects": {
-                        "total": total_projects,
-                        "ongoing": ongoing_projects
-                    },
-                    "referrals": {
-                        "total": total_referrals,
-                        "confirmed": confirmed_referrals
-                    },
-                    "commissions": {
-                        "total": total_commissions,
-                        "pending": pending_commissions,
-                        "total_amount": round(sum_commission_amount, 2)
-                    },
-                    "dividends": {
-                        "total_pools": total_pools,
-                        "active_pools": active_pools,
-                        "total_distributed": round(sum_dividend_amount, 2)
-                    }
-                },
-                "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                "summary": cached["summary"],
+                "generated_at": cached["generated_at"].strftime("%Y-%m-%d %H:%M:%S")
             }
         except SQLAlchemyError as e:
             return {
                 "success": False,
                 "message": f"获取汇总信息失败: {str(e)}"
             }
-        finally:
-            session.close()
 
 
 # ==================== 便捷函数 ====================
@@ -0,0 +1,354 @@
+"""
+灵值生态园 - 批量分配引擎
+分红、项目利润等"按权重分钱"场景共用的分配引擎
+
+- 使用 Decimal 按最大余额法分配，所有份额之和严格等于分配总额（精确到分）
+- 分配记录、贡献值流水按块批量写入，每块单独提交，不再长时间持有写锁
+- 分配进度记录在 distribution_runs 表中，中断后可从上次提交的位置继续
+- 支持预演（dry-run）：只计算分配表，不写入任何数据
+
+版本: v1.0
+更新日期: 2026年1月25日
+"""
+
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, ROUND_DOWN
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, Numeric, String, Table, Text,
+    UniqueConstraint, insert, select, update
+)
+from sqlalchemy.orm import Session
+
+
+# 金额精度（分）
+CENT = Decimal("0.01")
+
+# 默认每块处理的收款人数
+DEFAULT_CHUNK_SIZE = 500
+
+
+# 分配进度表（独立于各业务模型，供 models.py / models_extended.py 两套模型共用）
+_metadata = MetaData()
+
+distribution_runs = Table(
+    'distribution_runs',
+    _metadata,
+    Column('id', Integer, primary_key=True),
+    Column('source_type', String(50), nullable=False, comment='分配来源：dividend_pool/project_profit/...'),
+    Column('source_id', Integer, nullable=False, comment='来源ID（分红池ID/项目ID）'),
+    Column('round_no', Integer, nullable=False, comment='分配轮次'),
+    Column('total_amount', Numeric(20, 2), nullable=False, comment='本轮分配总额（元）'),
+    Column('payee_count', Integer, nullable=False, comment='收款人数'),
+    Column('weight_total', String(64), nullable=False, comment='权重总和（用于续跑时校验收款人未变化）'),
+    Column('cursor', Integer, comment='最后一个已提交收款人的键'),
+    Column('processed_count', Integer, default=0, comment='已处理收款人数'),
+    Column('allocated_amount', Numeric(20, 2), default=0, comment='已写入金额（元）'),
+    Column('status', String(20), nullable=False, default='running', comment='状态：running/completed/failed'),
+    Column('error_message', Text, comment='错误信息'),
+    Column('created_at', DateTime, default=datetime.now, comment='创建时间'),
+    Column('updated_at', DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间'),
+    UniqueConstraint('source_type', 'source_id', 'round_no', name='uq_distribution_runs_source_round'),
+)
+
+# 已确认建表的数据库引擎
+_prepared_engines = weakref.WeakSet()
+
+
+class DistributionError(Exception):
+    """分配引擎异常"""
+
+
+@dataclass
+class Payee:
+    """收款人"""
+    key: int                       # 收款记录键（股权ID/参与记录ID/合伙人ID），同一轮内唯一，用作续跑游标
+    weight: Decimal                # 分配权重
+    user_id: Optional[int] = None  # 用户ID（用于贡献值奖励）
+
+
+@dataclass
+class PayoutLine:
+    """分配表中的一行"""
+    payee: Payee
+    amount: Decimal
+
+
+@dataclass
+class DistributionResult:
+    """分配结果"""
+    source_type: str
+    source_id: int
+    round_no: int
+    total_amount: Decimal
+    lines: List[PayoutLine] = field(default_factory=list)
+    processed_count: int = 0
+    chunks_committed: int = 0
+    resumed: bool = False
+    dry_run: bool = False
+
+    @property
+    def allocated_amount(self) -> Decimal:
+        """分配表合计金额"""
+        return sum((line.amount for line in self.lines), Decimal("0"))
+
+    def payout_table(self) -> List[Dict]:
+        """分配表（用于预演展示）"""
+        return [
+            {
+                "key": line.payee.key,
+                "user_id": line.payee.user_id,
+                "weight": float(line.payee.weight),
+                "amount": float(line.amount),
+            }
+            for line in self.lines
+        ]
+
+
+def allocate_shares(total: Decimal, weights: Sequence[Decimal], quantum: Decimal = CENT) -> List[Decimal]:
+    """
+    按权重分配金额（最大余额法）
+
+    先将每份向下取整到 quantum，再把剩余的最小单位依次分给小数部分最大的份额，
+    因此各份额之和严格等于 total 向下取整到 quantum 后的金额，不会多分也不会丢分。
+
+    Args:
+        total: 分配总额
+        weights: 权重列表（非负）
+        quantum: 最小金额单位
+
+    Returns:
+        与 weights 顺序一致的分配金额列表
+    """
+    if not weights:
+        return []
+
+    weight_total = sum(weights, Decimal("0"))
+    if weight_total <= 0:
+        raise DistributionError("权重总和必须大于0")
+    if any(w < 0 for w in weights):
+        raise DistributionError("权重不能为负数")
+
+    total_units = int((Decimal(total) / quantum).to_integral_value(rounding=ROUND_DOWN))
+    raw_units = [total_units * w / weight_total for w in weights]
+    units = [int(r) for r in raw_units]
+
+    leftover = total_units - sum(units)
+    if leftover:
+        by_remainder = sorted(range(len(weights)), key=lambda i: (units[i] - raw_units[i], i))
+        for i in by_remainder[:leftover]:
+            units[i] += 1
+
+    return [quantum * u for u in units]
+
+
+def ensure_state_table(session: Session) -> None:
+    """确保分配进度表存在"""
+    engine = session.get_bind().engine
+    if engine not in _prepared_engines:
+        distribution_runs.create(bind=session.connection(), checkfirst=True)
+        _prepared_engines.add(engine)
+
+
+class DistributionEngine:
+    """批量分配引擎"""
+
+    def __init__(self, session: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        初始化分配引擎
+
+        Args:
+            session: 数据库会话（由调用方管理生命周期）
+            chunk_size: 每块处理的收款人数
+        """
+        self.session = session
+        self.chunk_size = max(1, chunk_size)
+
+    def get_open_run(self, source_type: str, source_id: int) -> Optional[Dict]:
+        """
+        获取未完成的分配轮次（用于续跑）
+
+        Args:
+            source_type: 分配来源
+            source_id: 来源ID
+
+        Returns:
+            分配进度记录，不存在时返回None
+        """
+        ensure_state_table(self.session)
+        row = self.session.execute(
+            select(distribution_runs).where(
+                distribution_runs.c.source_type == source_type,
+                distribution_runs.c.source_id == source_id,
+                distribution_runs.c.status != 'completed'
+            ).order_by(distribution_runs.c.round_no.desc())
+        ).mappings().first()
+        return dict(row) if row else None
+
+    def plan(
+        self,
+        source_type: str,
+        source_id: int,
+        round_no: int,
+        total_amount: Decimal,
+        payees: Sequence[Payee],
+        quantum: Decimal = CENT
+    ) -> DistributionResult:
+        """
+        计算分配表（不写入数据）
+
+        Args:
+            source_type: 分配来源
+            source_id: 来源ID
+            round_no: 分配轮次
+            total_amount: 分配总额
+            payees: 收款人列表
+            quantum: 最小金额单位
+
+        Returns:
+            dry_run=True 的分配结果
+        """
+        ordered = sorted(payees, key=lambda p: p.key)
+        amounts = allocate_shares(total_amount, [p.weight for p in ordered], quantum)
+        return DistributionResult(
+            source_type=source_type,
+            source_id=source_id,
+            round_no=round_no,
+            total_amount=Decimal(total_amount),
+            lines=[PayoutLine(payee=p, amount=a) for p, a in zip(ordered, amounts)],
+            dry_run=True
+        )
+
+    def run(
+        self,
+        source_type: str,
+        source_id: int,
+        round_no: int,
+        total_amount: Decimal,
+        payees: Sequence[Payee],
+        write_chunk: Callable[[Session, List[PayoutLine], int], None],
+        finalize: Callable[[Session, DistributionResult], None],
+        dry_run: bool = False,
+        quantum: Decimal = CENT,
+        on_progress: Optional[Callable[[DistributionResult], None]] = None
+    ) -> DistributionResult:
+        """
+        执行分配
+
+        Args:
+            source_type: 分配来源
+            source_id: 来源ID
+            round_no: 分配轮次
+            total_amount: 分配总额
+            payees: 收款人列表（续跑时必须与首次相同）
+            write_chunk: 批量写入一块分配记录的回调 (session, lines, round_no)，不要在回调内提交
+            finalize: 全部写入后更新汇总数据的回调 (session, result)，不要在回调内提交
+            dry_run: 是否只预演
+            quantum: 最小金额单位
+            on_progress: 每提交一块后的进度回调
+
+        Returns:
+            分配结果
+        """
+        result = self.plan(source_type, source_id, round_no, total_amount, payees, quantum)
+        if dry_run:
+            return result
+        result.dry_run = False
+
+        state = self._load_or_create_state(result)
+        result.resumed = state['processed_count'] > 0
+        cursor = state['cursor']
+        pending = [line for line in result.lines if cursor is None or line.payee.key > cursor]
+        result.processed_count = len(result.lines) - len(pending)
+
+        try:
+            for start in range(0, len(pending), self.chunk_size):
+                chunk = pending[start:start + self.chunk_size]
+                write_chunk(self.session, chunk, round_no)
+                result.processed_count += len(chunk)
+                self.session.execute(
+                    update(distribution_runs)
+                    .where(distribution_runs.c.id == state['id'])
+                    .values(
+                        cursor=chunk[-1].payee.key,
+                        processed_count=result.processed_count,
+                        allocated_amount=distribution_runs.c.allocated_amount
+                        + sum((line.amount for line in chunk), Decimal("0")),
+                        updated_at=datetime.now()
+                    )
+                )
+                self.session.commit()
+                result.chunks_committed += 1
+                if on_progress:
+                    on_progress(result)
+
+            finalize(self.session, result)
+            self.session.execute(
+                update(distribution_runs)
+                .where(distribution_runs.c.id == state['id'])
+                .values(status='completed', updated_at=datetime.now())
+            )
+            self.session.commit()
+            return result
+
+        except Exception as e:
+            self.session.rollback()
+            self.session.execute(
+                update(distribution_runs)
+                .where(distribution_runs.c.id == state['id'])
+                .values(status='failed', error_message=str(e), updated_at=datetime.now())
+            )
+            self.session.commit()
+            raise
+
+    def _load_or_create_state(self, result: DistributionResult) -> Dict:
+        """读取或创建本轮分配进度"""
+        ensure_state_table(self.session)
+        weight_total = str(sum((line.payee.weight for line in result.lines), Decimal("0")))
+
+        row = self.session.execute(
+            select(distribution_runs).where(
+                distribution_runs.c.source_type == result.source_type,
+                distribution_runs.c.source_id == result.source_id,
+                distribution_runs.c.round_no == result.round_no
+            )
+        ).mappings().first()
+
+        if row is not None:
+            if row['status'] == 'completed':
+                raise DistributionError(f"第{result.round_no}轮分配已完成，不能重复分配")
+            if (row['payee_count'] != len(result.lines)
+                    or Decimal(row['weight_total']) != Decimal(weight_total)
+                    or Decimal(row['total_amount']) != result.total_amount.quantize(CENT)):
+                raise DistributionError(f"第{result.round_no}轮分配的收款人或金额已变化，无法续跑")
+            self.session.execute(
+                update(distribution_runs)
+                .where(distribution_runs.c.id == row['id'])
+                .values(status='running', error_message=None, updated_at=datetime.now())
+            )
+            self.session.commit()
+            return dict(row)
+
+        inserted = self.session.execute(
+            insert(distribution_runs).values(
+                source_type=result.source_type,
+                source_id=result.source_id,
+                round_no=result.round_no,
+                total_amount=result.total_amount.quantize(CENT),
+                payee_count=len(result.lines),
+                weight_total=weight_total,
+                cursor=None,
+                processed_count=0,
+                allocated_amount=Decimal("0"),
+                status='running'
+            )
+        )
+        self.session.commit()
+        return {
+            'id': inserted.inserted_primary_key[0],
+            'cursor': None,
+            'processed_count': 0,
+        }
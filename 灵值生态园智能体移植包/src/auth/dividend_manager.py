@@ -16,7 +16,7 @@ from enum import Enum
 # 添加父目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, and_, or_, func
+from sqlalchemy import create_engine, and_, or_, func, insert
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
@@ -29,6 +29,11 @@ from src.auth.models_extended import (
 # 导入用户管理
 from src.auth.my_user import MyUser, TransactionType
 
+# 导入分配引擎
+from src.auth.distribution_engine import (
+    DistributionEngine, DistributionResult, Payee, PayoutLine, DEFAULT_CHUNK_SIZE
+)
+
 # 数据库配置
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auth.db")
 DATABASE_URL = f"sqlite:///{DB_PATH}"
@@ -43,6 +48,9 @@ engine = create_engine(
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 分配引擎中的分红来源类型
+DIVIDEND_SOURCE = "dividend_pool"
+
 
 class DividendPoolStatus(Enum):
     """分红池状态枚举"""
@@ -429,117 +437,196 @@ class DividendManager:
     def distribute_dividends(
         self,
         pool_id: int,
-        distribution_amount: Optional[Decimal] = None
+        distribution_amount: Optional[Decimal] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
     ) -> bool:
         """
         分配分红
-        
+
+        分配记录与贡献值奖励按块批量写入并逐块提交；如上一轮分配中途失败，
+        再次调用会从最后提交的位置继续该轮分配。
+
         Args:
             pool_id: 分红池ID
             distribution_amount: 分配金额（可选，如果不指定则使用可用金额）
-        
+            chunk_size: 每块处理的股权持有者数
+
         Returns:
             是否成功
         """
         try:
-            pool = self.get_dividend_pool(pool_id)
-            if not pool:
-                print(f"❌ 分红池不存在: ID={pool_id}")
-                return False
-            
-            # 确定分配金额
-            if distribution_amount is None:
-                distribution_amount = pool.available_amount
-            elif distribution_amount > pool.available_amount:
-                print(f"❌ 分配金额超过可用金额: 需要 {distribution_amount}, 可用 {pool.available_amount}")
+            plan = self._plan_dividends(pool_id, distribution_amount)
+            if plan is None:
                 return False
-            
-            # 获取所有活跃股权持有者
-            equities = self.session.query(EquityHolding).filter(
-                EquityHolding.pool_id == pool_id,
-                EquityHolding.status == EquityStatus.ACTIVE.value
-            ).all()
-            
-            if not equities:
-                print(f"❌ 无股权持有者")
-                return False
-            
-            # 计算总股权比例
-            total_equity_percentage = sum(e.equity_percentage for e in equities)
-            
-            if total_equity_percentage == 0:
-                print(f"❌ 总股权比例为0")
-                return False
-            
-            # 获取上一轮分配次数
-            last_round = self.session.query(
-                func.max(DividendDistribution.distribution_round)
-            ).filter(DividendDistribution.pool_id == pool_id).scalar() or 0
-            
-            current_round = last_round + 1
-            
-            # 分配分红给每个股权持有者
-            for equity in equities:
-                # 计算分红金额
-                dividend_amount = distribution_amount * (Decimal(str(equity.equity_percentage)) / Decimal(str(total_equity_percentage)))
-                
-                # 创建分红分配记录
-                distribution = DividendDistribution(
-                    pool_id=pool_id,
-                    equity_holding_id=equity.id,
-                    distribution_round=current_round,
-                    total_pool_amount=distribution_amount,
-                    user_equity_percentage=equity.equity_percentage,
-                    dividend_amount=dividend_amount,
-                    status=DividendStatus.PENDING.value,
-                    created_at=datetime.now()
-                )
-                
-                self.session.add(distribution)
-                
-                # 奖励贡献值（假设 1元 = 10贡献值）
-                contribution_reward = float(dividend_amount) * 10
-                
-                # 更新用户累计分红收益
-                user_level = self.user_mgr.get_member_level(equity.user_id)
-                if user_level:
-                    user_level.total_dividend_earned += dividend_amount
-                    user_level.updated_at = datetime.now()
-                
-                if not self.user_mgr.add_contribution(
-                    equity.user_id,
-                    contribution_reward,
-                    TransactionType.DIVIDEND,
-                    f"分红收益: {pool.pool_name} 第{current_round}轮"
-                ):
-                    print(f"⚠️  贡献值奖励失败: 用户ID={equity.user_id}")
-            
-            # 更新分红池
-            pool.available_amount -= distribution_amount
-            pool.distributed_amount += distribution_amount
-            pool.last_dividend_date = datetime.now()
-            pool.updated_at = datetime.now()
-            
-            # 记录审计日志
-            from src.auth.my_user import AuditLog
-            log = AuditLog(
-                user_id=0,  # 系统操作
-                action="distribute_dividends",
-                resource_type="dividend_pool",
-                resource_id=pool_id,
-                description=f"分配分红: {pool.pool_name} 第{current_round}轮, 总额: {distribution_amount}, 持有者: {len(equities)}人"
+            pool, round_no, amount, payees = plan
+
+            engine = DistributionEngine(self.session, chunk_size=chunk_size)
+            result = engine.run(
+                DIVIDEND_SOURCE,
+                pool_id,
+                round_no,
+                amount,
+                payees,
+                write_chunk=lambda session, lines, current_round: self._write_dividend_chunk(
+                    pool, lines, current_round, amount
+                ),
+                finalize=lambda session, result: self._finalize_dividends(pool, result)
             )
-            self.session.add(log)
-            
-            self.commit()
-            print(f"✅ 分红分配成功: {pool.pool_name} 第{current_round}轮, {len(equities)}人, 总额: {distribution_amount}")
+
+            resumed = "（续跑）" if result.resumed else ""
+            print(f"✅ 分红分配成功{resumed}: {pool.pool_name} 第{round_no}轮, {len(result.lines)}人, 总额: {result.allocated_amount}")
             return True
-            
+
         except Exception as e:
             self.session.rollback()
             print(f"❌ 分配分红失败: {str(e)}")
             return False
-    
+
+    def preview_dividends(
+        self,
+        pool_id: int,
+        distribution_amount: Optional[Decimal] = None
+    ) -> Optional[Dict]:
+        """
+        预演分红分配（只计算分配表，不写入数据）
+
+        Args:
+            pool_id: 分红池ID
+            distribution_amount: 分配金额（可选，如果不指定则使用可用金额）
+
+        Returns:
+            分配表，失败时返回None
+        """
+        try:
+            plan = self._plan_dividends(pool_id, distribution_amount)
+            if plan is None:
+                return None
+            pool, round_no, amount, payees = plan
+
+            result = DistributionEngine(self.session).plan(DIVIDEND_SOURCE, pool_id, round_no, amount, payees)
+            return {
+                "pool_id": pool_id,
+                "pool_name": pool.pool_name,
+                "distribution_round": round_no,
+                "total_amount": float(amount),
+                "allocated_amount": float(result.allocated_amount),
+                "holder_count": len(result.lines),
+                "payouts": result.payout_table()
+            }
+
+        except Exception as e:
+            print(f"❌ 预演分红失败: {str(e)}")
+            return None
+
+    def _plan_dividends(
+        self,
+        pool_id: int,
+        distribution_amount: Optional[Decimal]
+    ) -> Optional[Tuple[DividendPool, int, Decimal, List[Payee]]]:
+        """确定分红轮次、金额与收款人（有未完成的轮次时沿用该轮）"""
+        pool = self.get_dividend_pool(pool_id)
+        if not pool:
+            print(f"❌ 分红池不存在: ID={pool_id}")
+            return None
+
+        open_run = DistributionEngine(self.session).get_open_run(DIVIDEND_SOURCE, pool_id)
+
+        # 确定分配金额
+        if open_run is not None and distribution_amount is None:
+            distribution_amount = Decimal(open_run['total_amount'])
+        elif distribution_amount is None:
+            distribution_amount = pool.available_amount
+        elif distribution_amount > pool.available_amount:
+            print(f"❌ 分配金额超过可用金额: 需要 {distribution_amount}, 可用 {pool.available_amount}")
+            return None
+
+        # 获取所有活跃股权持有者
+        equities = self.session.query(
+            EquityHolding.id, EquityHolding.user_id, EquityHolding.equity_percentage
+        ).filter(
+            EquityHolding.pool_id == pool_id,
+            EquityHolding.status == EquityStatus.ACTIVE.value
+        ).all()
+
+        if not equities:
+            print("❌ 无股权持有者")
+            return None
+
+        payees = [
+            Payee(key=equity_id, user_id=user_id, weight=Decimal(str(percentage or 0)))
+            for equity_id, user_id, percentage in equities
+        ]
+
+        if sum(p.weight for p in payees) == 0:
+            print("❌ 总股权比例为0")
+            return None
+
+        if open_run is not None:
+            current_round = open_run['round_no']
+        else:
+            # 获取上一轮分配次数
+            last_round = self.session.query(
+                func.max(DividendDistribution.distribution_round)
+            ).filter(DividendDistribution.pool_id == pool_id).scalar() or 0
+            current_round = last_round + 1
+
+        return pool, current_round, Decimal(distribution_amount), payees
+
+    def _write_dividend_chunk(
+        self,
+        pool: DividendPool,
+        lines: List[PayoutLine],
+        current_round: int,
+        distribution_amount: Decimal
+    ) -> None:
+        """批量写入一块分红记录并奖励贡献值（不提交）"""
+        now = datetime.now()
+        self.session.execute(insert(DividendDistribution.__table__), [
+            {
+                'pool_id': pool.id,
+                'equity_holding_id': line.payee.key,
+                'distribution_round': current_round,
+                'total_pool_amount': distribution_amount,
+                'user_equity_percentage': float(line.payee.weight),
+                'dividend_amount': line.amount,
+                'status': DividendStatus.PENDING.value,
+                'created_at': now
+            }
+            for line in lines
+        ])
+
+        # 奖励贡献值（假设 1元 = 10贡献值），同时更新用户累计分红收益
+        dividends: Dict[int, Decimal] = {}
+        for line in lines:
+            dividends[line.payee.user_id] = dividends.get(line.payee.user_id, Decimal("0")) + line.amount
+        self.user_mgr.add_contributions_bulk(
+            [(line.payee.user_id, float(line.amount) * 10) for line in lines],
+            TransactionType.DIVIDEND,
+            f"分红收益: {pool.pool_name} 第{current_round}轮",
+            dividend_amounts=dividends
+        )
+
+    def _finalize_dividends(self, pool: DividendPool, result: DistributionResult) -> None:
+        """更新分红池汇总并记录审计日志（不提交）"""
+        distributed = result.allocated_amount
+
+        # 更新分红池
+        pool.available_amount -= distributed
+        pool.distributed_amount += distributed
+        pool.last_dividend_date = datetime.now()
+        pool.updated_at = datetime.now()
+
+        # 记录审计日志
+        from src.auth.my_user import AuditLog
+        log = AuditLog(
+            user_id=0,  # 系统操作
+            action="distribute_dividends",
+            resource_type="dividend_pool",
+            resource_id=pool.id,
+            description=f"分配分红: {pool.pool_name} 第{result.round_no}轮, 总额: {distributed}, 持有者: {len(result.lines)}人"
+        )
+        self.session.add(log)
+
     def get_user_dividends(self, user_id: int) -> List[DividendDistribution]:
         """
         获取用户的分红记录
@@ -14,6 +14,7 @@ from models import (
     MemberLevel, PartnerStatus, ProjectStatus, ReferralStatus
 )
 from database_manager import DatabaseManager
+from ecosystem_summary import record_commission_change
 from api import get_db, get_current_user, require_permission
 from models import User
 
@@ -571,6 +572,7 @@ async def update_commission(
         if not commission:
             raise HTTPException(status_code=404, detail="佣金记录不存在")
         
+        old_amount, old_status = commission.amount, commission.status
         update_data = commission_data.dict(exclude_unset=True)
         for key, value in update_data.items():
             if value is not None:
@@ -580,7 +582,9 @@ async def update_commission(
             commission.paid_at = datetime.now()
         
         commission.updated_at = datetime.now()
+        record_commission_change(db, old_amount, old_status, commission.amount, commission.status)
         db.commit()
+        db_manager.summary_cache.invalidate()
         
         return {"success": True, "message": "更新成功"}
     except HTTPException:
@@ -649,6 +653,7 @@ async def get_dividend_pools(
 @router.post("/dividend-pools/{pool_id}/distribute")
 async def distribute_dividends(
     pool_id: int,
+    dry_run: bool = Query(False, description="只预演，返回分配表而不写入数据"),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -659,7 +664,7 @@ async def distribute_dividends(
     require_permission(current_user, "dividend:distribute")
     
     try:
-        result = db_manager.distribute_dividends(pool_id)
+        result = db_manager.distribute_dividends(pool_id, dry_run=dry_run)
         if not result['success']:
             raise HTTPException(status_code=400, detail=result['message'])
         return result
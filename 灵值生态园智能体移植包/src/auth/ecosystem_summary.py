@@ -0,0 +1,282 @@
+"""
+灵值生态园 - 生态机制汇总服务
+
+- 合伙人/项目/推荐/分红池计数用一条聚合SQL（COUNT + SUM(CASE)）完成
+- 佣金与分红历史的计数、金额合计保存在快照行中，写入佣金/分红（含佣金状态、金额修改）时在同一事务内增量更新，
+  汇总查询不再随历史数据增长而变慢
+- 快照缺失或超过最长有效期时用一条聚合SQL重建，修正绕过管理器直接写表造成的偏差
+- 汇总结果带短 TTL 缓存，仪表盘高频刷新时不重复查询
+
+版本: v1.0
+更新日期: 2026年1月25日
+"""
+
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import (
+    Column, DateTime, Float, Integer, MetaData, Table, case, func, insert, select, true, update
+)
+from sqlalchemy.orm import Session
+
+from models import (
+    Partner, Project, Referral, Commission, DividendPool, Dividend,
+    MemberLevel, PartnerStatus, ProjectStatus, ReferralStatus
+)
+
+
+# 汇总结果缓存时间（秒）
+DEFAULT_SUMMARY_TTL = 30
+
+# 快照最长有效期，超过后下次查询时重建
+SNAPSHOT_MAX_AGE = timedelta(hours=1)
+
+# 快照行ID（全表只有一行）
+_SNAPSHOT_ID = 1
+
+
+# 汇总快照表（独立的 MetaData，由本模块按需建表）
+_metadata = MetaData()
+
+ecosystem_summary_snapshot = Table(
+    'ecosystem_summary_snapshot',
+    _metadata,
+    Column('id', Integer, primary_key=True),
+    Column('commission_count', Integer, nullable=False, default=0, comment='佣金记录数'),
+    Column('pending_commission_count', Integer, nullable=False, default=0, comment='待支付佣金数'),
+    Column('commission_amount', Float, nullable=False, default=0, comment='佣金总额'),
+    Column('dividend_count', Integer, nullable=False, default=0, comment='分红记录数'),
+    Column('dividend_amount', Float, nullable=False, default=0, comment='已分配分红总额'),
+    Column('rebuilt_at', DateTime, comment='最后一次全量重建时间'),
+    Column('updated_at', DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间'),
+)
+
+# 已确认建表的数据库引擎
+_prepared_engines = weakref.WeakSet()
+
+
+def _select_single_rows(*subqueries):
+    """把若干单行聚合子查询拼成一条 SELECT（单行之间的笛卡尔积仍是一行）"""
+    joined = subqueries[0]
+    for subquery in subqueries[1:]:
+        joined = joined.join(subquery, true())
+    return select(*subqueries).select_from(joined)
+
+
+def ensure_snapshot_table(session: Session) -> None:
+    """确保汇总快照表存在"""
+    engine = session.get_bind().engine
+    if engine not in _prepared_engines:
+        ecosystem_summary_snapshot.create(bind=session.connection(), checkfirst=True)
+        _prepared_engines.add(engine)
+
+
+def rebuild_snapshot(session: Session) -> Dict[str, Any]:
+    """
+    全量重建快照（一条聚合SQL统计佣金与分红），不提交
+
+    Args:
+        session: 数据库会话
+
+    Returns:
+        快照数据
+    """
+    ensure_snapshot_table(session)
+    commissions = select(
+        func.count(Commission.id).label('commission_count'),
+        func.coalesce(func.sum(case((Commission.status == 'pending', 1), else_=0)), 0).label('pending_commission_count'),
+        func.coalesce(func.sum(Commission.amount), 0).label('commission_amount')
+    ).subquery()
+    dividends = select(
+        func.count(Dividend.id).label('dividend_count'),
+        func.coalesce(func.sum(Dividend.dividend_amount), 0).label('dividend_amount')
+    ).subquery()
+    values = dict(session.execute(_select_single_rows(commissions, dividends)).mappings().one())
+    values['rebuilt_at'] = datetime.now()
+
+    updated = session.execute(
+        update(ecosystem_summary_snapshot)
+        .where(ecosystem_summary_snapshot.c.id == _SNAPSHOT_ID)
+        .values(**values)
+    )
+    if not updated.rowcount:
+        session.execute(insert(ecosystem_summary_snapshot).values(id=_SNAPSHOT_ID, **values))
+    return values
+
+
+def _apply_delta(session: Session, **deltas) -> None:
+    """在调用方事务内累加快照计数（快照尚未建立时跳过，首次查询时会全量重建）"""
+    ensure_snapshot_table(session)
+    session.execute(
+        update(ecosystem_summary_snapshot)
+        .where(ecosystem_summary_snapshot.c.id == _SNAPSHOT_ID)
+        .values({
+            name: getattr(ecosystem_summary_snapshot.c, name) + delta
+            for name, delta in deltas.items()
+        })
+    )
+
+
+def record_commission(session: Session, amount: float, pending: bool = True) -> None:
+    """
+    新增佣金记录后更新快照（不提交，随佣金记录一起提交）
+
+    Args:
+        session: 数据库会话
+        amount: 佣金金额
+        pending: 是否为待支付状态
+    """
+    _apply_delta(
+        session,
+        commission_count=1,
+        pending_commission_count=1 if pending else 0,
+        commission_amount=amount or 0
+    )
+
+
+def record_commission_change(session: Session, old_amount: float, old_status: str,
+                             new_amount: float, new_status: str) -> None:
+    """
+    修改佣金记录（状态、金额）后更新快照（不提交，随佣金记录一起提交）
+
+    Args:
+        session: 数据库会话
+        old_amount: 修改前金额
+        old_status: 修改前状态
+        new_amount: 修改后金额
+        new_status: 修改后状态
+    """
+    pending_delta = (new_status == 'pending') - (old_status == 'pending')
+    amount_delta = (new_amount or 0) - (old_amount or 0)
+    if pending_delta or amount_delta:
+        _apply_delta(session, pending_commission_count=pending_delta, commission_amount=amount_delta)
+
+
+def record_dividends(session: Session, count: int, amount: float) -> None:
+    """
+    批量写入分红记录后更新快照（不提交，随分红记录一起提交）
+
+    Args:
+        session: 数据库会话
+        count: 分红记录数
+        amount: 分红金额合计
+    """
+    _apply_delta(session, dividend_count=count, dividend_amount=amount or 0)
+
+
+def _load_snapshot(session: Session) -> Dict[str, Any]:
+    """读取快照，缺失或过期时重建并提交"""
+    ensure_snapshot_table(session)
+    row = session.execute(
+        select(ecosystem_summary_snapshot).where(ecosystem_summary_snapshot.c.id == _SNAPSHOT_ID)
+    ).mappings().first()
+    if row is not None and row['rebuilt_at'] and datetime.now() - row['rebuilt_at'] < SNAPSHOT_MAX_AGE:
+        return dict(row)
+
+    values = rebuild_snapshot(session)
+    session.commit()
+    return values
+
+
+def compute_summary(session: Session) -> Dict[str, Any]:
+    """
+    计算生态机制汇总
+
+    Args:
+        session: 数据库会话
+
+    Returns:
+        汇总数据（结构与 DatabaseManager.get_ecosystem_summary 的 summary 字段一致）
+    """
+    snapshot = _load_snapshot(session)
+
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    partners = select(
+        func.count(Partner.id).label('partners_total'),
+        count_if(Partner.status == PartnerStatus.ACTIVE).label('partners_active'),
+        count_if(Partner.member_level == MemberLevel.EXPERT).label('partners_expert')
+    ).subquery()
+    projects = select(
+        func.count(Project.id).label('projects_total'),
+        count_if(Project.status == ProjectStatus.ONGOING).label('projects_ongoing')
+    ).subquery()
+    referrals = select(
+        func.count(Referral.id).label('referrals_total'),
+        count_if(Referral.status == ReferralStatus.CONFIRMED).label('referrals_confirmed')
+    ).subquery()
+    pools = select(
+        func.count(DividendPool.id).label('pools_total'),
+        count_if(DividendPool.status == 'active').label('pools_active')
+    ).subquery()
+    counts = session.execute(_select_single_rows(partners, projects, referrals, pools)).mappings().one()
+
+    return {
+        "partners": {
+            "total": counts['partners_total'],
+            "active": counts['partners_active'],
+            "expert": counts['partners_expert']
+        },
+        "projects": {
+            "total": counts['projects_total'],
+            "ongoing": counts['projects_ongoing']
+        },
+        "referrals": {
+            "total": counts['referrals_total'],
+            "confirmed": counts['referrals_confirmed']
+        },
+        "commissions": {
+            "total": snapshot['commission_count'],
+            "pending": snapshot['pending_commission_count'],
+            "total_amount": round(snapshot['commission_amount'] or 0, 2)
+        },
+        "dividends": {
+            "total_pools": counts['pools_total'],
+            "active_pools": counts['pools_active'],
+            "total_distributed": round(snapshot['dividend_amount'] or 0, 2)
+        }
+    }
+
+
+class EcosystemSummaryCache:
+    """汇总结果 TTL 缓存"""
+
+    def __init__(self, session_factory: Callable[[], Session], ttl: float = DEFAULT_SUMMARY_TTL):
+        """
+        Args:
+            session_factory: 会话工厂
+            ttl: 缓存时间（秒），0 表示不缓存
+        """
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._summary: Optional[Dict[str, Any]] = None
+        self._generated_at: Optional[datetime] = None
+        self._expires_at = 0.0
+
+    def invalidate(self) -> None:
+        """佣金/分红写入提交后调用"""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def get(self) -> Dict[str, Any]:
+        """
+        获取汇总（缓存过期时重新计算）
+
+        Returns:
+            {"summary": 汇总数据, "generated_at": 生成时间}
+        """
+        with self._lock:
+            if self._summary is None or time.monotonic() >= self._expires_at:
+                session = self.session_factory()
+                try:
+                    self._summary = compute_summary(session)
+                finally:
+                    session.close()
+                self._generated_at = datetime.now()
+                self._expires_at = time.monotonic() + self.ttl
+            return {"summary": self._summary, "generated_at": self._generated_at}
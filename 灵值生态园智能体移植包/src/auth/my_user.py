@@ -16,7 +16,7 @@ from enum import Enum
 # 添加父目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, and_, or_
+from sqlalchemy import create_engine, and_, or_, func, bindparam, insert, select, update
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
@@ -432,6 +432,82 @@ class MyUser:
             print(f"❌ 增加贡献值失败: {str(e)}")
             return False
     
+    def add_contributions_bulk(
+        self,
+        credits: List[Tuple[int, float]],
+        transaction_type: TransactionType,
+        description: Optional[str] = None,
+        dividend_amounts: Optional[Dict[int, Decimal]] = None
+    ) -> int:
+        """
+        批量增加用户贡献值（用于分红、项目利润分配等批处理场景）
+
+        使用一条 executemany UPDATE 完成所有用户的累加，并批量写入审计日志；
+        不提交事务，由调用方与分配记录一并提交。
+        没有活跃会员级别的用户不会被更新，也不写审计日志，并打印出这些用户ID。
+
+        Args:
+            credits: [(用户ID, 增加数量)]，同一用户可出现多次
+            transaction_type: 交易类型
+            description: 描述
+            dividend_amounts: {用户ID: 分红金额}，提供时同时累加累计分红收益
+
+        Returns:
+            更新的会员级别记录数
+        """
+        merged: Dict[int, float] = {}
+        for user_id, amount in credits:
+            merged[user_id] = merged.get(user_id, 0.0) + amount
+        if not merged:
+            return 0
+
+        table = UserMemberLevel.__table__
+        active = {
+            user_id for (user_id,) in self.session.execute(
+                select(table.c.user_id).where(table.c.user_id.in_(merged), table.c.status == "active")
+            )
+        }
+        missing = sorted(merged.keys() - active)
+        if missing:
+            print(f"❌ 用户会员级别不存在，跳过贡献值增加: ID={missing}")
+        merged = {user_id: amount for user_id, amount in merged.items() if user_id in active}
+        if not merged:
+            return 0
+
+        now = datetime.now()
+        values = {
+            'contribution_value': table.c.contribution_value + bindparam('b_amount'),
+            'updated_at': now
+        }
+        params = [{'b_user_id': user_id, 'b_amount': amount} for user_id, amount in merged.items()]
+        if dividend_amounts is not None:
+            values['total_dividend_earned'] = (
+                func.coalesce(table.c.total_dividend_earned, 0) + bindparam('b_dividend')
+            )
+            for row in params:
+                row['b_dividend'] = dividend_amounts.get(row['b_user_id'], Decimal("0"))
+
+        result = self.session.execute(
+            update(table)
+            .where(table.c.user_id == bindparam('b_user_id'), table.c.status == "active")
+            .values(**values),
+            params
+        )
+
+        self.session.execute(insert(AuditLog.__table__), [
+            {
+                'user_id': user_id,
+                'action': "add_contribution",
+                'resource_type': "contribution",
+                'resource_id': user_id,
+                'description': f"{description or transaction_type.value}: +{amount} 贡献值",
+                'status': "success",
+                'created_at': now
+            }
+            for user_id, amount in merged.items()
+        ])
+        return result.rowcount
+
     def consume_contribution(
         self,
         user_id: int,
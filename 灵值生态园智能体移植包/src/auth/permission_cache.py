@@ -0,0 +1,282 @@
+"""
+权限解析缓存
+
+功能：
+1. 权限代码注册表：每个权限代码对应一个比特位
+2. 角色编译为整数位集（role_id -> bitmask），用户有效权限为其角色位集的按位或
+3. 按用户ID缓存有效权限，缓存项带角色版本号，角色权限变化时整体失效
+4. 缓存未命中时用 selectinload 一次性加载角色及权限，不再逐个懒加载
+5. 通过 ORM 修改角色权限（Role.permissions 增删、删除角色）的事务提交后自动使角色缓存失效
+
+权限检查为一次字典查找 + 一次按位与，与角色数、权限数无关。
+缓存只在本进程内有效，多进程部署时由 TTL 限定其他进程的过期时间。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session, selectinload
+
+from models import User, Role
+
+
+# 缓存项有效期（秒）
+DEFAULT_PERMISSION_CACHE_TTL = 300
+
+# 最多缓存的用户数
+DEFAULT_PERMISSION_CACHE_SIZE = 10000
+
+
+class PermissionRegistry:
+    """权限代码注册表（权限代码 -> 比特位）"""
+
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+        self._codes: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def bit(self, code: str) -> int:
+        """获取权限代码对应的位（未注册时分配新位）"""
+        bit = self._bits.get(code)
+        if bit is None:
+            bit = 1 << len(self._codes)
+            self._bits[code] = bit
+            self._codes.append(code)
+        return bit
+
+    def lookup(self, code: str) -> int:
+        """获取权限代码对应的位（未注册返回0）"""
+        return self._bits.get(code, 0)
+
+    def mask(self, codes: Iterable[str]) -> int:
+        """将权限代码集合编译为位集"""
+        mask = 0
+        for code in codes:
+            mask |= self.bit(code)
+        return mask
+
+    def codes(self, mask: int) -> List[str]:
+        """将位集还原为权限代码列表"""
+        codes = []
+        index = 0
+        while mask:
+            if mask & 1:
+                codes.append(self._codes[index])
+            mask >>= 1
+            index += 1
+        return codes
+
+
+@dataclass
+class UserPermissions:
+    """用户有效权限"""
+    user_id: int
+    is_superuser: bool
+    role_ids: tuple
+    mask: int
+    role_version: int
+    expires_at: float
+
+
+class PermissionResolver:
+    """用户有效权限解析器"""
+
+    def __init__(self, ttl: float = DEFAULT_PERMISSION_CACHE_TTL, max_users: int = DEFAULT_PERMISSION_CACHE_SIZE,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        """
+        Args:
+            ttl: 缓存项有效期（秒）
+            max_users: 最多缓存的用户数（超出时淘汰最久未使用的）
+            session_factory: 用户对象已脱离会话时使用的会话工厂（默认 init_data.SessionLocal）
+        """
+        self.ttl = ttl
+        self.max_users = max_users
+        self.session_factory = session_factory
+        self.registry = PermissionRegistry()
+        self._lock = threading.RLock()
+        self._role_masks: Dict[int, int] = {}
+        self._role_version = 0
+        self._users: "OrderedDict[int, UserPermissions]" = OrderedDict()
+
+    @property
+    def role_version(self) -> int:
+        return self._role_version
+
+    def invalidate_user(self, user_id: int) -> None:
+        """用户信息或角色分配变化后调用"""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def invalidate_roles(self) -> None:
+        """角色权限变化后调用（所有用户缓存随版本号失效）"""
+        with self._lock:
+            self._role_version += 1
+            self._role_masks.clear()
+
+    def clear(self) -> None:
+        """清空全部缓存"""
+        with self._lock:
+            self._role_version += 1
+            self._role_masks.clear()
+            self._users.clear()
+
+    def _compile_roles(self, session: Session, role_ids: Iterable[int]) -> None:
+        """编译尚未缓存的角色位集（一次查询加载角色及其权限）"""
+        missing = [role_id for role_id in role_ids if role_id not in self._role_masks]
+        if not missing:
+            return
+        # populate_existing：会话中已加载的角色也按数据库刷新权限集合
+        roles = session.execute(
+            select(Role).options(selectinload(Role.permissions)).where(Role.id.in_(missing))
+            .execution_options(populate_existing=True)
+        ).scalars().all()
+        with self._lock:
+            for role in roles:
+                self._role_masks[role.id] = self.registry.mask(p.code for p in role.permissions)
+
+    def _load(self, session: Session, user_id: int) -> Optional[UserPermissions]:
+        """缓存未命中：加载用户角色并计算有效权限"""
+        role_version = self._role_version
+        user = session.execute(
+            select(User).options(selectinload(User.roles)).where(User.id == user_id)
+        ).scalar_one_or_none()
+        if user is None:
+            return None
+
+        role_ids = tuple(role.id for role in user.roles)
+        if not user.is_superuser:
+            self._compile_roles(session, role_ids)
+
+        with self._lock:
+            mask = 0
+            for role_id in role_ids:
+                mask |= self._role_masks.get(role_id, 0)
+            entry = UserPermissions(
+                user_id=user_id,
+                is_superuser=bool(user.is_superuser),
+                role_ids=role_ids,
+                mask=mask,
+                role_version=role_version,
+                expires_at=time.monotonic() + self.ttl
+            )
+            # 加载期间角色发生变化时不写入缓存
+            if role_version == self._role_version:
+                self._users[user_id] = entry
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return entry
+
+    def resolve(self, session: Session, user_id: int) -> Optional[UserPermissions]:
+        """
+        获取用户有效权限
+
+        Args:
+            session: 数据库会话（仅缓存未命中时使用）
+            user_id: 用户ID
+
+        Returns:
+            用户有效权限，用户不存在时返回None
+        """
+        with self._lock:
+            entry = self._users.get(user_id)
+            if (entry is not None
+                    and entry.role_version == self._role_version
+                    and entry.expires_at > time.monotonic()):
+                self._users.move_to_end(user_id)
+                return entry
+        return self._load(session, user_id)
+
+    def has_permission(self, session: Session, user_id: int, permission_code: str) -> bool:
+        """检查用户是否有指定权限"""
+        entry = self.resolve(session, user_id)
+        if entry is None:
+            return False
+        if entry.is_superuser:
+            return True
+        return bool(entry.mask & self.registry.lookup(permission_code))
+
+    def get_all_permissions(self, session: Session, user_id: int) -> list:
+        """获取用户的所有权限（与 User.get_all_permissions 返回格式一致）"""
+        entry = self.resolve(session, user_id)
+        if entry is None:
+            return []
+        if entry.is_superuser:
+            return ['all']
+        return self.registry.codes(entry.mask)
+
+
+# 进程内共享的解析器
+permission_resolver = PermissionResolver()
+
+
+# 会话中有待提交的角色权限变更时的标记
+_ROLES_CHANGED = 'permission_cache_roles_changed'
+
+
+def _mark_roles_changed(role: Role) -> None:
+    session = object_session(role)
+    if session is not None:
+        session.info[_ROLES_CHANGED] = True
+    else:
+        permission_resolver.invalidate_roles()
+
+
+@event.listens_for(Role.permissions, 'append')
+@event.listens_for(Role.permissions, 'remove')
+def _on_role_permissions_changed(target, value, initiator):
+    _mark_roles_changed(target)
+
+
+@event.listens_for(Role, 'after_delete')
+def _on_role_deleted(mapper, connection, target):
+    _mark_roles_changed(target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # 提交后才失效：提交前其他会话仍会读到旧权限，若此时失效会把旧权限按新版本号缓存
+    if session.info.pop(_ROLES_CHANGED, False):
+        permission_resolver.invalidate_roles()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(_ROLES_CHANGED, None)
+
+
+@contextmanager
+def _user_session(user: User):
+    """用户所在的会话；用户已脱离会话时临时打开一个新会话"""
+    session = object_session(user)
+    if session is not None:
+        yield session
+        return
+    factory = permission_resolver.session_factory
+    if factory is None:
+        from init_data import SessionLocal
+        factory = SessionLocal
+    session = factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def user_has_permission(user: User, permission_code: str) -> bool:
+    """检查已加载的用户是否有指定权限（使用用户所在的会话）"""
+    with _user_session(user) as session:
+        return permission_resolver.has_permission(session, user.id, permission_code)
+
+
+def user_permissions(user: User) -> list:
+    """获取已加载用户的所有权限"""
+    with _user_session(user) as session:
+        return permission_resolver.get_all_permissions(session, user.id)
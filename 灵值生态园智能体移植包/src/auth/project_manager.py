@@ -16,7 +16,7 @@ from enum import Enum
 # 添加父目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, and_, or_, func
+from sqlalchemy import create_engine, and_, or_, func, bindparam, insert, update
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
@@ -29,6 +29,11 @@ from src.auth.models_extended import (
 # 导入用户管理
 from src.auth.my_user import MyUser, TransactionType
 
+# 导入分配引擎
+from src.auth.distribution_engine import (
+    DistributionEngine, DistributionResult, Payee, PayoutLine, DEFAULT_CHUNK_SIZE
+)
+
 # 数据库配置
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auth.db")
 DATABASE_URL = f"sqlite:///{DB_PATH}"
@@ -43,6 +48,9 @@ engine = create_engine(
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 分配引擎中的项目利润来源类型
+PROJECT_PROFIT_SOURCE = "project_profit"
+
 
 class ProjectStatus(Enum):
     """项目状态枚举"""
@@ -413,86 +421,171 @@ class ProjectManager:
     
     # ==================== 利润分配管理 ====================
     
-    def distribute_project_profit(self, project_id: int) -> bool:
+    def distribute_project_profit(self, project_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> bool:
         """
         分配项目利润
-        
+
+        分配记录与贡献值奖励按块批量写入并逐块提交；如上一轮分配中途失败，
+        再次调用会从最后提交的位置继续该轮分配。
+
         Args:
             project_id: 项目ID
-        
+            chunk_size: 每块处理的参与者数
+
         Returns:
             是否分配成功
         """
         try:
-            project = self.get_project(project_id)
-            if not project:
-                print(f"❌ 项目不存在: ID={project_id}")
+            plan = self._plan_project_profit(project_id)
+            if plan is None:
                 return False
-            
-            if project.total_profit <= 0:
-                print(f"❌ 项目无利润可分配")
-                return False
-            
-            # 获取所有活跃参与者
-            participations = self.get_project_participants(project_id)
-            
-            if not participations:
-                print(f"❌ 项目无参与者")
-                return False
-            
-            # 计算分配总额
-            distribution_total = project.total_profit * Decimal(str(project.profit_distribution_rate))
-            
-            # 分配利润给每个参与者
-            for participation in participations:
-                # 计算应得利润
-                share_ratio = participation.share_percentage / 100
-                profit_share = distribution_total * Decimal(str(share_ratio))
-                
-                # 更新参与记录
-                participation.profit_share = profit_share
-                
-                # 创建利润分配记录
-                distribution = ProjectProfitDistribution(
-                    project_id=project_id,
-                    participation_id=participation.id,
-                    profit_amount=profit_share,
-                    distribution_date=datetime.now()
-                )
-                
-                self.session.add(distribution)
-                
-                # 奖励贡献值（假设 1元 = 10贡献值）
-                contribution_reward = float(profit_share) * 10
-                
-                if not self.user_mgr.add_contribution(
-                    participation.user_id,
-                    contribution_reward,
-                    TransactionType.PROJECT_REWARD,
-                    f"项目利润分配: {project.project_name}"
-                ):
-                    print(f"⚠️  贡献值奖励失败: 用户ID={participation.user_id}")
-            
-            # 记录审计日志
-            from src.auth.my_user import AuditLog
-            log = AuditLog(
-                user_id=0,  # 系统操作
-                action="distribute_profit",
-                resource_type="project",
-                resource_id=project_id,
-                description=f"项目利润分配: {project.project_name}, 总额: {distribution_total}, 参与者: {len(participations)}人"
+            project, round_no, amount, payees = plan
+
+            engine = DistributionEngine(self.session, chunk_size=chunk_size)
+            result = engine.run(
+                PROJECT_PROFIT_SOURCE,
+                project_id,
+                round_no,
+                amount,
+                payees,
+                write_chunk=lambda session, lines, current_round: self._write_profit_chunk(
+                    project, lines, current_round
+                ),
+                finalize=lambda session, result: self._finalize_project_profit(project, result)
             )
-            self.session.add(log)
-            
-            self.commit()
-            print(f"✅ 项目利润分配成功: {project.project_name}, {len(participations)}人, 总额: {distribution_total}")
+
+            resumed = "（续跑）" if result.resumed else ""
+            print(f"✅ 项目利润分配成功{resumed}: {project.project_name}, {len(result.lines)}人, 总额: {result.allocated_amount}")
             return True
-            
+
         except Exception as e:
             self.session.rollback()
             print(f"❌ 分配项目利润失败: {str(e)}")
             return False
-    
+
+    def preview_project_profit(self, project_id: int) -> Optional[Dict]:
+        """
+        预演项目利润分配（只计算分配表，不写入数据）
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            分配表，失败时返回None
+        """
+        try:
+            plan = self._plan_project_profit(project_id)
+            if plan is None:
+                return None
+            project, round_no, amount, payees = plan
+
+            result = DistributionEngine(self.session).plan(
+                PROJECT_PROFIT_SOURCE, project_id, round_no, amount, payees
+            )
+            return {
+                "project_id": project_id,
+                "project_name": project.project_name,
+                "distribution_round": round_no,
+                "total_amount": float(amount),
+                "allocated_amount": float(result.allocated_amount),
+                "participant_count": len(result.lines),
+                "payouts": result.payout_table()
+            }
+
+        except Exception as e:
+            print(f"❌ 预演项目利润分配失败: {str(e)}")
+            return None
+
+    def _plan_project_profit(self, project_id: int) -> Optional[Tuple[Project, int, Decimal, List[Payee]]]:
+        """确定利润分配轮次、金额与收款人（有未完成的轮次时沿用该轮）"""
+        project = self.get_project(project_id)
+        if not project:
+            print(f"❌ 项目不存在: ID={project_id}")
+            return None
+
+        if not project.total_profit or project.total_profit <= 0:
+            print("❌ 项目无利润可分配")
+            return None
+
+        # 获取所有活跃参与者
+        participations = self.session.query(
+            ProjectParticipation.id, ProjectParticipation.user_id, ProjectParticipation.share_percentage
+        ).filter(
+            ProjectParticipation.project_id == project_id,
+            ProjectParticipation.status == ParticipationStatus.ACTIVE.value
+        ).all()
+
+        if not participations:
+            print("❌ 项目无参与者")
+            return None
+
+        payees = [
+            Payee(key=participation_id, user_id=user_id, weight=Decimal(str(percentage or 0)))
+            for participation_id, user_id, percentage in participations
+        ]
+
+        # 计算分配总额：每人应得 分配总额 × 占股比例 / 100，占股合计超过100%时按比例缩减
+        total_share = sum(p.weight for p in payees)
+        if total_share == 0:
+            print("❌ 参与者占股比例为0")
+            return None
+        distribution_total = project.total_profit * Decimal(str(project.profit_distribution_rate))
+        amount = distribution_total * min(total_share, Decimal("100")) / Decimal("100")
+
+        open_run = DistributionEngine(self.session).get_open_run(PROJECT_PROFIT_SOURCE, project_id)
+        if open_run is not None:
+            current_round = open_run['round_no']
+        else:
+            last_round = self.session.query(
+                func.max(ProjectProfitDistribution.distribution_round)
+            ).filter(ProjectProfitDistribution.project_id == project_id).scalar() or 0
+            current_round = last_round + 1
+
+        return project, current_round, amount, payees
+
+    def _write_profit_chunk(self, project: Project, lines: List[PayoutLine], current_round: int) -> None:
+        """批量写入一块利润分配记录、更新参与记录并奖励贡献值（不提交）"""
+        now = datetime.now()
+        self.session.execute(insert(ProjectProfitDistribution.__table__), [
+            {
+                'project_id': project.id,
+                'participation_id': line.payee.key,
+                'distribution_round': current_round,
+                'profit_amount': line.amount,
+                'distribution_date': now,
+                'created_at': now
+            }
+            for line in lines
+        ])
+
+        # 更新参与记录的应得利润
+        table = ProjectParticipation.__table__
+        self.session.execute(
+            update(table)
+            .where(table.c.id == bindparam('b_id'))
+            .values(profit_share=bindparam('b_profit_share'), updated_at=now),
+            [{'b_id': line.payee.key, 'b_profit_share': line.amount} for line in lines]
+        )
+
+        # 奖励贡献值（假设 1元 = 10贡献值）
+        self.user_mgr.add_contributions_bulk(
+            [(line.payee.user_id, float(line.amount) * 10) for line in lines],
+            TransactionType.PROJECT_REWARD,
+            f"项目利润分配: {project.project_name}"
+        )
+
+    def _finalize_project_profit(self, project: Project, result: DistributionResult) -> None:
+        """记录利润分配审计日志（不提交）"""
+        from src.auth.my_user import AuditLog
+        log = AuditLog(
+            user_id=0,  # 系统操作
+            action="distribute_profit",
+            resource_type="project",
+            resource_id=project.id,
+            description=f"项目利润分配: {project.project_name} 第{result.round_no}轮, 总额: {result.allocated_amount}, 参与者: {len(result.lines)}人"
+        )
+        self.session.add(log)
+
     def get_project_profit_distribution(self, project_id: int) -> List[ProjectProfitDistribution]:
         """
         获取项目的利润分配记录
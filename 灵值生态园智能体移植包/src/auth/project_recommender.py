@@ -0,0 +1,498 @@
+"""
+V2.0 融合版 - 项目推荐引擎
+
+功能：
+1. 用户特征：职称、合伙人等级、累计贡献值、历史参与项目数及项目类型分布
+2. 项目特征：项目类型、最低参与金额档位、剩余名额比例
+3. 用 NumPy 对全部候选项目（或一批用户 × 全部项目）一次性矩阵打分
+4. argpartition 取 Top-K，不对全部候选排序
+5. 分配记录批量写入（executemany）
+6. 夜间批量模式：为所有用户预计算推荐并写入 project_assignments
+
+匹配分数 = Σ 权重 × 因子，各因子取值 0~1：
+- profile:      用户画像分（职称/等级/经验，与原规则一致）
+- type:         用户历史参与中该项目类型的占比
+- tier:         项目金额档位与用户档位的接近程度
+- availability: 项目剩余名额比例
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+# 各匹配因子的权重（合计为1）
+RECOMMENDATION_WEIGHTS = {
+    "profile": 0.2,
+    "type": 0.3,
+    "tier": 0.3,
+    "availability": 0.2
+}
+
+# 默认推荐数量
+DEFAULT_TOP_K = 5
+
+# 夜间批量模式每批处理的用户数
+DEFAULT_USER_BATCH_SIZE = 1000
+
+# 候选项目筛选索引
+RECOMMENDATION_INDEX = (
+    "idx_projects_recommendation",
+    "status, current_participants, min_participation_amount"
+)
+
+# 合伙人等级 -> 档位
+PARTNER_LEVEL_TIERS = {
+    "founding": 1.0,
+    "senior": 0.75,
+    "regular": 0.5
+}
+DEFAULT_LEVEL_TIER = 0.25
+
+# 经验达到该项目数时经验档位为1
+EXPERIENCE_SATURATION = 10
+
+
+def ensure_recommendation_index(bind) -> None:
+    """
+    创建候选项目筛选索引（已存在时跳过）
+
+    Args:
+        bind: 数据库引擎或连接
+    """
+    name, columns = RECOMMENDATION_INDEX
+    statement = text(f"CREATE INDEX IF NOT EXISTS {name} ON projects({columns})")
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            conn.execute(statement)
+    else:
+        bind.execute(statement)
+
+
+def profile_score(position: Optional[str], partner_level: Optional[str], project_experience: int) -> float:
+    """
+    用户画像分（原 _calculate_project_match_score 规则）
+
+    Returns:
+        0 ~ 1.1 的分数
+    """
+    score = 0.0
+
+    # 职称匹配
+    if position:
+        if "总监" in position or "经理" in position:
+            score += 0.4
+        elif "专家" in position:
+            score += 0.5
+        else:
+            score += 0.3
+
+    # 贡献值等级匹配
+    if partner_level:
+        if "founding" in partner_level:
+            score += 0.4
+        elif "senior" in partner_level:
+            score += 0.3
+        elif "regular" in partner_level:
+            score += 0.2
+        else:
+            score += 0.1
+
+    # 项目经验匹配
+    if project_experience > 10:
+        score += 0.2
+    elif project_experience > 5:
+        score += 0.15
+    elif project_experience > 2:
+        score += 0.1
+    else:
+        score += 0.05
+
+    return score
+
+
+# profile_score 的最大值，用于归一化
+_MAX_PROFILE_SCORE = 1.1
+
+
+def _level_tier(partner_level: Optional[str]) -> float:
+    for keyword, tier in PARTNER_LEVEL_TIERS.items():
+        if partner_level and keyword in partner_level:
+            return tier
+    return DEFAULT_LEVEL_TIER
+
+
+@dataclass
+class ProjectCatalog:
+    """候选项目特征（按列存储的数组）"""
+    ids: np.ndarray             # 项目ID
+    min_amount: np.ndarray      # 最低参与金额
+    tier: np.ndarray            # 金额档位（0~1，按最低参与金额的名次）
+    availability: np.ndarray    # 剩余名额比例（0~1）
+    type_index: np.ndarray      # 项目类型编号
+    types: List[str]            # 项目类型列表
+    details: List[Dict]         # 展示字段
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass
+class UserFeatures:
+    """一批用户的特征（按行对应 user_ids）"""
+    user_ids: List[int]
+    contribution: np.ndarray    # 累计贡献值（用于筛选可参与的项目）
+    profile: np.ndarray         # 画像分（0~1）
+    tier: np.ndarray            # 用户档位（0~1）
+    type_share: np.ndarray      # 历史项目类型占比（用户数 × 类型数）
+    joined: List[set]           # 已参与的项目ID
+    experience: List[int]       # 历史参与项目数
+
+
+class ProjectRecommender:
+    """项目推荐引擎"""
+
+    def __init__(self, session: Session, weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            session: 数据库会话
+            weights: 匹配因子权重（默认 RECOMMENDATION_WEIGHTS）
+        """
+        self.session = session
+        self.weights = dict(RECOMMENDATION_WEIGHTS, **(weights or {}))
+        self._index_ready = False
+
+    # ---------- 特征加载 ----------
+
+    def load_catalog(self) -> ProjectCatalog:
+        """加载全部有名额的进行中项目（走 status/current_participants 索引）"""
+        if not self._index_ready:
+            ensure_recommendation_index(self.session.connection())
+            self._index_ready = True
+
+        rows = self.session.execute(
+            text("""
+                SELECT
+                    p.id,
+                    p.name,
+                    p.project_code,
+                    p.description,
+                    p.min_participation_amount,
+                    p.current_participants,
+                    p.max_participants,
+                    p.project_type
+                FROM projects p
+                WHERE p.status = 'active'
+                AND p.current_participants < p.max_participants
+                ORDER BY p.id
+            """)
+        ).fetchall()
+
+        types: List[str] = []
+        type_lookup: Dict[str, int] = {}
+        type_index = []
+        for row in rows:
+            project_type = row[7] or ""
+            if project_type not in type_lookup:
+                type_lookup[project_type] = len(types)
+                types.append(project_type)
+            type_index.append(type_lookup[project_type])
+
+        count = len(rows)
+        min_amount = np.array([row[4] or 0.0 for row in rows], dtype=float)
+        current = np.array([row[5] or 0 for row in rows], dtype=float)
+        maximum = np.array([row[6] or 0 for row in rows], dtype=float)
+
+        # 最低参与金额在不同金额中的名次作为项目档位（金额相同档位相同）
+        levels, level_index = np.unique(min_amount, return_inverse=True)
+        tier = level_index / (len(levels) - 1) if len(levels) > 1 else np.zeros(count)
+
+        availability = np.divide(
+            maximum - current, maximum, out=np.zeros(count), where=maximum > 0
+        )
+
+        return ProjectCatalog(
+            ids=np.array([row[0] for row in rows], dtype=np.int64),
+            min_amount=min_amount,
+            tier=tier,
+            availability=np.clip(availability, 0.0, 1.0),
+            type_index=np.array(type_index, dtype=np.int64),
+            types=types,
+            details=[
+                {
+                    "project_id": row[0],
+                    "project_name": row[1],
+                    "project_code": row[2],
+                    "description": row[3],
+                    "min_amount": row[4],
+                    "current_participants": row[5],
+                    "max_participants": row[6]
+                }
+                for row in rows
+            ]
+        )
+
+    def load_user_features(self, user_ids: Sequence[int], catalog: ProjectCatalog) -> UserFeatures:
+        """
+        批量加载用户特征（两次查询，与用户数无关）
+
+        Args:
+            user_ids: 用户ID列表
+            catalog: 候选项目（提供项目类型编号）
+
+        Returns:
+            用户特征，不存在的用户会被忽略
+        """
+        user_ids = list(user_ids)
+        profiles = self.session.execute(
+            text("""
+                SELECT u.id, u.position, u.partner_level, uc.cumulative_contribution
+                FROM users u
+                LEFT JOIN user_contributions_v2 uc ON u.id = uc.user_id
+                WHERE u.id IN :user_ids
+                ORDER BY u.id
+            """).bindparams(bindparam("user_ids", expanding=True)),
+            {"user_ids": user_ids}
+        ).fetchall()
+
+        history = self.session.execute(
+            text("""
+                SELECT pp.partner_id, pp.project_id, p.project_type
+                FROM project_participations pp
+                LEFT JOIN projects p ON pp.project_id = p.id
+                WHERE pp.partner_id IN :user_ids
+            """).bindparams(bindparam("user_ids", expanding=True)),
+            {"user_ids": user_ids}
+        ).fetchall()
+
+        row_of = {row[0]: i for i, row in enumerate(profiles)}
+        type_lookup = {project_type: i for i, project_type in enumerate(catalog.types)}
+        type_counts = np.zeros((len(profiles), max(len(catalog.types), 1)))
+        experience = [0] * len(profiles)
+        joined = [set() for _ in profiles]
+        for user_id, project_id, project_type in history:
+            i = row_of.get(user_id)
+            if i is None:
+                continue
+            experience[i] += 1
+            joined[i].add(project_id)
+            j = type_lookup.get(project_type or "")
+            if j is not None:
+                type_counts[i, j] += 1
+
+        experience_array = np.array(experience, dtype=float)
+        type_share = np.divide(
+            type_counts, experience_array[:, None],
+            out=np.zeros_like(type_counts), where=experience_array[:, None] > 0
+        )
+
+        profile = np.array([
+            profile_score(position, level, experience[i]) / _MAX_PROFILE_SCORE
+            for i, (_, position, level, _) in enumerate(profiles)
+        ])
+        level_tier = np.array([_level_tier(level) for _, _, level, _ in profiles])
+        tier = 0.5 * level_tier + 0.5 * np.minimum(experience_array / EXPERIENCE_SATURATION, 1.0)
+
+        return UserFeatures(
+            user_ids=[row[0] for row in profiles],
+            contribution=np.array([row[3] or 0.0 for row in profiles], dtype=float),
+            profile=profile,
+            tier=tier,
+            type_share=type_share,
+            joined=joined,
+            experience=experience
+        )
+
+    # ---------- 打分 ----------
+
+    def score_matrix(self, users: UserFeatures, catalog: ProjectCatalog) -> Dict[str, np.ndarray]:
+        """
+        计算用户 × 项目的匹配分数矩阵
+
+        Returns:
+            {"score": 总分（不可参与的项目为 -inf）, 以及各因子矩阵}
+        """
+        user_count, project_count = len(users.user_ids), len(catalog)
+        shape = (user_count, project_count)
+
+        if catalog.types:
+            type_factor = users.type_share[:, catalog.type_index]
+        else:
+            type_factor = np.zeros(shape)
+        factors = {
+            "profile": np.broadcast_to(users.profile[:, None], shape),
+            "type": type_factor,
+            "tier": 1.0 - np.abs(catalog.tier[None, :] - users.tier[:, None]),
+            "availability": np.broadcast_to(catalog.availability[None, :], shape)
+        }
+
+        score = np.zeros(shape)
+        for name, factor in factors.items():
+            score += self.weights[name] * factor
+
+        # 最低参与金额超过用户累计贡献值、或已参与的项目不推荐
+        eligible = catalog.min_amount[None, :] <= users.contribution[:, None]
+        if any(users.joined):
+            position = {project_id: j for j, project_id in enumerate(catalog.ids.tolist())}
+            for i, project_ids in enumerate(users.joined):
+                for project_id in project_ids:
+                    j = position.get(project_id)
+                    if j is not None:
+                        eligible[i, j] = False
+        score[~eligible] = -np.inf
+
+        factors["score"] = score
+        return factors
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> List[int]:
+        """
+        取一行分数中的前K个列下标（argpartition 选出后只对K个排序，同分按项目顺序）
+
+        Args:
+            scores: 一维分数数组
+            k: 数量
+
+        Returns:
+            列下标列表（按分数降序，跳过 -inf）
+        """
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if len(candidates) > k:
+            part = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[part]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order].tolist()
+
+    def _build_recommendations(
+        self,
+        row: int,
+        factors: Dict[str, np.ndarray],
+        catalog: ProjectCatalog,
+        k: int
+    ) -> List[Dict]:
+        recommendations = []
+        for j in self.top_k(factors["score"][row], k):
+            item = dict(catalog.details[j])
+            item["match_score"] = round(float(factors["score"][row, j]), 4)
+            item["match_factors"] = {
+                name: round(float(factors[name][row, j]), 4) for name in self.weights
+            }
+            recommendations.append(item)
+        return recommendations
+
+    # ---------- 推荐与写入 ----------
+
+    def recommend(self, user_id: int, k: int = DEFAULT_TOP_K, catalog: Optional[ProjectCatalog] = None) -> List[Dict]:
+        """
+        为单个用户推荐项目（不写入）
+
+        Args:
+            user_id: 用户ID
+            k: 推荐数量
+            catalog: 候选项目（默认重新加载）
+
+        Returns:
+            推荐项目列表（按匹配分数降序）
+        """
+        catalog = catalog if catalog is not None else self.load_catalog()
+        users = self.load_user_features([user_id], catalog)
+        if not users.user_ids or not len(catalog):
+            return []
+        factors = self.score_matrix(users, catalog)
+        return self._build_recommendations(0, factors, catalog, k)
+
+    def save_assignments(self, recommendations: Dict[int, List[Dict]], assignment_type: str = 'auto') -> int:
+        """
+        批量写入分配记录（一次 executemany，不提交）
+
+        Args:
+            recommendations: {用户ID: 推荐项目列表}
+            assignment_type: 分配类型
+
+        Returns:
+            写入条数
+        """
+        params = [
+            {
+                "user_id": user_id,
+                "project_id": item["project_id"],
+                "assignment_type": assignment_type,
+                "match_score": item["match_score"],
+                "match_factors": json.dumps(item.get("match_factors", {}))
+            }
+            for user_id, items in recommendations.items()
+            for item in items
+        ]
+        if params:
+            self.session.execute(
+                text("""
+                    INSERT INTO project_assignments (
+                        user_id, project_id, assignment_type, match_score,
+                        match_factors, assigned_at, status
+                    ) VALUES (
+                        :user_id, :project_id, :assignment_type, :match_score,
+                        :match_factors, datetime('now'), 'pending'
+                    )
+                """),
+                params
+            )
+        return len(params)
+
+    def recommend_all(
+        self,
+        k: int = DEFAULT_TOP_K,
+        batch_size: int = DEFAULT_USER_BATCH_SIZE,
+        assignment_type: str = 'batch'
+    ) -> Dict:
+        """
+        夜间批量模式：为所有用户预计算推荐
+
+        按用户分批打分，每批替换该批用户未处理的同类型推荐并提交一次。
+
+        Args:
+            k: 每个用户的推荐数量
+            batch_size: 每批用户数
+            assignment_type: 写入的分配类型
+
+        Returns:
+            {"users": 处理用户数, "assignments": 写入推荐数, "projects": 候选项目数}
+        """
+        catalog = self.load_catalog()
+        user_ids = [row[0] for row in self.session.execute(text("SELECT id FROM users ORDER BY id")).fetchall()]
+
+        assignments = 0
+        for start in range(0, len(user_ids), max(1, batch_size)):
+            chunk = user_ids[start:start + batch_size]
+            users = self.load_user_features(chunk, catalog)
+
+            self.session.execute(
+                text("""
+                    DELETE FROM project_assignments
+                    WHERE assignment_type = :assignment_type
+                    AND status = 'pending'
+                    AND user_id IN :user_ids
+                """).bindparams(bindparam("user_ids", expanding=True)),
+                {"assignment_type": assignment_type, "user_ids": chunk}
+            )
+
+            if len(catalog) and users.user_ids:
+                factors = self.score_matrix(users, catalog)
+                assignments += self.save_assignments(
+                    {
+                        user_id: self._build_recommendations(row, factors, catalog, k)
+                        for row, user_id in enumerate(users.user_ids)
+                    },
+                    assignment_type
+                )
+            self.session.commit()
+
+        return {
+            "users": len(user_ids),
+            "assignments": assignments,
+            "projects": len(catalog)
+        }
@@ -11,6 +11,7 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
+from contribution_leaderboard import get_leaderboard
 from enums.partner_level import (
     PartnerLevelType,
     ReferralLevel,
@@ -277,6 +278,9 @@ class ReferralCommissionManagerV2:
         
         self.session.commit()
         
+        if reward_amount > 0:
+            get_leaderboard(self.session).refresh_users(self.session, [user_id])
+        
         return {
             "success": True,
             "new_level": new_level.value,
@@ -6,7 +6,9 @@ V2.0 融合版 - 综合测试脚本
 2. 三级推荐佣金系统
 3. 三维贡献值模型
 4. 系统自动运营规则
-5. 整体集成测试
+5. 贡献值排行榜
+6. 项目推荐引擎
+7. 整体集成测试
 """
 
 import sys
@@ -21,6 +23,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from contribution_manager_v2 import ContributionManagerV2, ContributionType
 from referral_commission_manager_v2 import ReferralCommissionManagerV2
 from auto_operation_manager import AutoOperationManager
+from project_recommender import ProjectRecommender, ProjectCatalog, UserFeatures
 from enums.partner_level import PartnerLevelType, get_partner_level_config
 
 
@@ -225,8 +228,78 @@ class V2FusionTestSuite:
         # 验证所有结果都是字典
         assert isinstance(result, dict)
     
+    def test_contribution_leaderboard(self):
+        """测试5：贡献值排行榜（内存排名与数据库一致）"""
+        manager = ContributionManagerV2(self.session)
+        column_map = {
+            "cumulative": "cumulative_contribution",
+            "project": "project_contribution",
+            "remaining": "remaining_contribution"
+        }
+        
+        for order_by, column in column_map.items():
+            ranking = manager.get_contribution_ranking(limit=5, order_by=order_by)
+            print(f"\n{order_by} 排行榜前{len(ranking)}名：")
+            for item in ranking:
+                print(f"  第{item['rank']}名：{item['name']} - {item['contribution']:.2f}")
+            
+            contributions = [item['contribution'] for item in ranking]
+            assert contributions == sorted(contributions, reverse=True), f"{order_by} 排行榜未按贡献值降序"
+            
+            for item in ranking:
+                expected = self.session.execute(
+                    text(f"""
+                        SELECT COUNT(*) + 1
+                        FROM user_contributions_v2
+                        WHERE {column} > (
+                            SELECT {column} FROM user_contributions_v2 WHERE user_id = :user_id
+                        )
+                    """),
+                    {"user_id": item['user_id']}
+                ).scalar()
+                rank = manager.get_user_rank(item['user_id'], order_by=order_by)
+                assert rank == expected, f"{order_by} 用户{item['user_id']}排名不一致：{rank} vs {expected}"
+    
+    def test_project_recommender(self):
+        """测试6：项目推荐引擎（Top-K 与全量排序一致，已参与/金额不足的项目不推荐）"""
+        import numpy as np
+        
+        rng = np.random.default_rng(7)
+        project_count, user_count, type_count = 300, 20, 4
+        catalog = ProjectCatalog(
+            ids=np.arange(1, project_count + 1),
+            min_amount=rng.uniform(0, 5000, project_count),
+            tier=rng.uniform(0, 1, project_count),
+            availability=rng.uniform(0, 1, project_count),
+            type_index=rng.integers(0, type_count, project_count),
+            types=[f"type{i}" for i in range(type_count)],
+            details=[{"project_id": i} for i in range(1, project_count + 1)]
+        )
+        type_share = rng.uniform(0, 1, (user_count, type_count))
+        users = UserFeatures(
+            user_ids=list(range(1, user_count + 1)),
+            contribution=rng.uniform(0, 6000, user_count),
+            profile=rng.uniform(0, 1, user_count),
+            tier=rng.uniform(0, 1, user_count),
+            type_share=type_share / type_share.sum(axis=1, keepdims=True),
+            joined=[{1, 2, 3} for _ in range(user_count)],
+            experience=[3] * user_count
+        )
+        
+        recommender = ProjectRecommender(self.session)
+        scores = recommender.score_matrix(users, catalog)["score"]
+        for row in range(user_count):
+            top = recommender.top_k(scores[row], 5)
+            finite = [j for j in range(project_count) if np.isfinite(scores[row, j])]
+            expected = sorted(finite, key=lambda j: (-scores[row, j], j))[:5]
+            assert top == expected, f"用户{row + 1}的Top-K与全量排序不一致"
+            for j in top:
+                assert catalog.ids[j] not in users.joined[row], "推荐了已参与的项目"
+                assert catalog.min_amount[j] <= users.contribution[row], "推荐了金额不足的项目"
+        print(f"  {user_count}位用户 × {project_count}个项目，Top-5 与全量排序一致")
+    
     def test_integration(self):
-        """测试5：整体集成测试"""
+        """测试7：整体集成测试"""
         print("\nV2.0融合版功能验证：")
         
         # 1. 验证数据库表
@@ -315,6 +388,8 @@ class V2FusionTestSuite:
         self.test("三级推荐佣金系统", self.test_three_level_commission)
         self.test("三维贡献值模型", self.test_contribution_model)
         self.test("系统自动运营规则", self.test_auto_operations)
+        self.test("贡献值排行榜", self.test_contribution_leaderboard)
+        self.test("项目推荐引擎", self.test_project_recommender)
         self.test("整体集成测试", self.test_integration)
         
         self.teardown()
@@ -491,6 +491,45 @@ def update_referral_commissions_table():
         raise
 
 
+def create_leaderboard_indexes():
+    """
+    创建贡献值排行榜覆盖索引（累计/项目/剩余贡献值）
+    """
+    print("\n🔄 开始创建贡献值排行榜索引...")
+    
+    try:
+        from contribution_leaderboard import LEADERBOARD_INDEXES, ensure_leaderboard_indexes
+        
+        ensure_leaderboard_indexes(engine)
+        
+        for name, _ in LEADERBOARD_INDEXES.values():
+            print(f"   ✓ 已创建索引：{name}")
+        print("\n✅ 贡献值排行榜索引创建完成！")
+        
+    except Exception as e:
+        print(f"❌ 创建失败：{str(e)}")
+        raise
+
+
+def create_project_recommendation_index():
+    """
+    创建项目推荐候选筛选索引（status, current_participants, min_participation_amount）
+    """
+    print("\n🔄 开始创建项目推荐索引...")
+    
+    try:
+        from project_recommender import RECOMMENDATION_INDEX, ensure_recommendation_index
+        
+        ensure_recommendation_index(engine)
+        
+        print(f"   ✓ 已创建索引：{RECOMMENDATION_INDEX[0]}")
+        print("\n✅ 项目推荐索引创建完成！")
+        
+    except Exception as e:
+        print(f"❌ 创建失败：{str(e)}")
+        raise
+
+
 def migrate_existing_contributions():
     """
     迁移现有贡献值数据到V2.0格式
@@ -580,6 +619,12 @@ def main():
         # 8. 迁移现有贡献值数据
         migrate_existing_contributions()
         
+        # 9. 创建贡献值排行榜索引
+        create_leaderboard_indexes()
+        
+        # 10. 创建项目推荐索引
+        create_project_recommendation_index()
+        
         print("\n" + "="*60)
         print("✅ V2.0 融合版数据库更新完成！")
         print("="*60)
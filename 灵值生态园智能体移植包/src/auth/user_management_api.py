@@ -495,12 +495,19 @@ def get_dividend_stats(pool_id: int):
 @handle_error
 def distribute_dividends(pool_id: int):
     """分配分红"""
-    data = request.json
+    data = request.json or {}
+    distribution_amount = Decimal(str(data.get('distribution_amount'))) if data.get('distribution_amount') else None
     
     with DividendManager() as div_mgr:
+        if data.get('dry_run'):
+            preview = div_mgr.preview_dividends(pool_id=pool_id, distribution_amount=distribution_amount)
+            if preview is None:
+                return error_response("分红预演失败", 400)
+            return jsonify(success_response(preview, message="分红预演成功"))
+        
         success = div_mgr.distribute_dividends(
             pool_id=pool_id,
-            distribution_amount=Decimal(str(data.get('distribution_amount'))) if data.get('distribution_amount') else None
+            distribution_amount=distribution_amount
         )
         
         if success: